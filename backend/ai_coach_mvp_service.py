@@ -17,6 +17,10 @@ from models import (
     TaskWhyStatementResponse
 )
 from supabase_client import get_supabase_client
+from bulk_writes import bulk_insert
+from cache_invalidation import publish_change
+from cache_warming import request_warmup
+from cache_service import cache_result
 
 logger = logging.getLogger(__name__)
 
@@ -29,20 +33,15 @@ class AiCoachMvpService:
     # ================================
     # TODAY PRIORITIZATION (MVP)
     # ================================
-    async def get_today_priorities(self, user_id: str, coaching_top_n: int = 3, use_hrm: bool = False) -> Dict[str, Any]:
+    @staticmethod
+    @cache_result("today_priorities", ttl_seconds=300, depends_on=("tasks", "projects", "areas", "pillars"))
+    async def load_today_context(user_id: str) -> Dict[str, Any]:
         """
-        Compute rule-based priority scores for all active tasks and optionally add
-        Gemini coaching for the top N (default 3). Returns list sorted by score desc
-        with a transparent scoring breakdown per task.
-        
-        Enhanced with optional HRM integration for deeper insights.
+        Database side of get_today_priorities: the user's timezone, active tasks and the
+        projects, areas, pillars and dependencies they reference. Cached (and warmed after
+        login); scoring and AI coaching still run on every request.
         """
-        from datetime import timezone
-        from zoneinfo import ZoneInfo
-        import os
-        from emergentintegrations.llm.chat import LlmChat, UserMessage
-        
-        supabase = self.supabase
+        supabase = get_supabase_client()
         # 1) Get user timezone (optional)
         tz_name = "UTC"
         try:
@@ -52,10 +51,6 @@ class AiCoachMvpService:
                 tz_name = row.get('timezone') or row.get('time_zone') or row.get('tz') or 'UTC'
         except Exception:
             tz_name = "UTC"
-        try:
-            user_tz = ZoneInfo(tz_name)
-        except Exception:
-            user_tz = ZoneInfo('UTC')
         
         # 2) Fetch active, incomplete tasks
         tasks_resp = supabase.table('tasks').select(
@@ -67,7 +62,7 @@ class AiCoachMvpService:
         active_statuses = {'todo', 'in_progress', 'review'}
         tasks = [t for t in tasks if (t.get('status') in active_statuses or not t.get('status'))]
         if not tasks:
-            return { 'date': datetime.now(user_tz).isoformat(), 'tasks': [] }
+            return {'tz_name': tz_name, 'tasks': [], 'projects': {}, 'areas': {}, 'pillars': {}, 'dep_lookup': {}}
         
         # 3) Fetch related projects and areas
         project_ids = list({t.get('project_id') for t in tasks if t.get('project_id')})
@@ -106,6 +101,43 @@ class AiCoachMvpService:
                 for d in (deps_resp.data or []):
                     dep_lookup[d['id']] = d
         
+        return {
+            'tz_name': tz_name,
+            'tasks': tasks,
+            'projects': projects,
+            'areas': areas,
+            'pillars': pillars,
+            'dep_lookup': dep_lookup
+        }
+    
+    async def get_today_priorities(self, user_id: str, coaching_top_n: int = 3, use_hrm: bool = False) -> Dict[str, Any]:
+        """
+        Compute rule-based priority scores for all active tasks and optionally add
+        Gemini coaching for the top N (default 3). Returns list sorted by score desc
+        with a transparent scoring breakdown per task.
+        
+        Enhanced with optional HRM integration for deeper insights.
+        """
+        from datetime import timezone
+        from zoneinfo import ZoneInfo
+        import os
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+        
+        # 1-4) Timezone, active tasks and what they reference (cached, see load_today_context)
+        context = await self.load_today_context(user_id)
+        tz_name = context['tz_name']
+        try:
+            user_tz = ZoneInfo(tz_name)
+        except Exception:
+            user_tz = ZoneInfo('UTC')
+        tasks = context['tasks']
+        if not tasks:
+            return { 'date': datetime.now(user_tz).isoformat(), 'tasks': [] }
+        projects = context['projects']
+        areas = context['areas']
+        pillars = context['pillars']
+        dep_lookup = context['dep_lookup']
+        
         # 5) Score tasks
         from math import fsum
         today_local = datetime.now(user_tz).date()
@@ -809,11 +841,11 @@ Provide a practical, actionable breakdown that the user can immediately implemen
             List of created task dictionaries
         """
         try:
-            supabase = self.supabase
-            created_tasks = []
+            now = datetime.utcnow().isoformat()
+            task_rows = []
             
             for i, task_suggestion in enumerate(suggested_tasks):
-                task_dict = {
+                task_rows.append({
                     'id': str(uuid.uuid4()),
                     'user_id': user_id,
                     'project_id': project_id,
@@ -824,17 +856,21 @@ Provide a practical, actionable breakdown that the user can immediately implemen
                     'completed': False,
                     'sort_order': i,
                     'estimated_duration': task_suggestion.get('estimated_duration'),
-                    'created_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat(),
-                    'date_created': datetime.utcnow().isoformat()
-                }
-                
-                response = supabase.table('tasks').insert(task_dict).execute()
-                
-                if response.data:
-                    created_tasks.append(response.data[0])
+                    'created_at': now,
+                    'updated_at': now,
+                    'date_created': now
+                })
+            
+            # One multi-row insert instead of a round trip per task
+            result = await bulk_insert('tasks', task_rows)
+            created_tasks = result.written
+            if created_tasks:
+                await publish_change(user_id, 'tasks')
+                request_warmup(user_id, 'bulk_import', force=True)
+            for row, error in result.failed:
+                logger.warning(f"⚠️ Suggested task '{row['name']}' was not created for project {project_id}: {error}")
             
-            logger.info(f"✅ Created {len(created_tasks)} tasks from suggestions for project: {project_id}")
+            logger.info(f"✅ Created {len(created_tasks)} of {len(task_rows)} tasks from suggestions for project: {project_id}")
             return created_tasks
             
         except Exception as e:
@@ -36,6 +36,9 @@ from models import (
     TaskWhyStatementResponse
 )
 from supabase_client import get_supabase_client
+from bulk_writes import bulk_insert
+from cache_invalidation import publish_change
+from cache_warming import request_warmup
 
 # Configure logging for debugging and monitoring
 logger = logging.getLogger(__name__)
@@ -915,12 +918,12 @@ class AiCoachMvpService:
             List of created task records
         """
         try:
-            supabase = self.supabase
-            created_tasks = []
+            now = datetime.utcnow().isoformat()
+            task_rows = []
             
             for i, task_suggestion in enumerate(suggested_tasks):
                 # Build task record
-                task_dict = {
+                task_rows.append({
                     'id': str(uuid.uuid4()),
                     'user_id': user_id,
                     'project_id': project_id,
@@ -931,19 +934,27 @@ class AiCoachMvpService:
                     'completed': False,
                     'sort_order': i,  # Maintain template order
                     'estimated_duration': task_suggestion.get('estimated_duration'),
-                    'created_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat(),
-                    'date_created': datetime.utcnow().isoformat()
-                }
-                
-                # Insert into database
-                response = supabase.table('tasks').insert(task_dict).execute()
-                
-                if response.data:
-                    created_tasks.append(response.data[0])
+                    'created_at': now,
+                    'updated_at': now,
+                    'date_created': now
+                })
+            
+            # Insert every task in one multi-row request
+            result = await bulk_insert('tasks', task_rows)
+            created_tasks = result.written
+            if created_tasks:
+                await publish_change(user_id, 'tasks')
+                request_warmup(user_id, 'bulk_import', force=True)
+            
+            # Rows rejected by the database are dropped from the result; say which ones
+            for row, error in result.failed:
+                logger.warning(
+                    f"⚠️ Suggested task '{row['name']}' was not created "
+                    f"for project {project_id}: {error}"
+                )
             
             logger.info(
-                f"✅ Created {len(created_tasks)} tasks from suggestions "
+                f"✅ Created {len(created_tasks)} of {len(task_rows)} tasks from suggestions "
                 f"for project: {project_id}"
             )
             return created_tasks
@@ -10,6 +10,7 @@ from typing import Dict, Any, Optional
 from enum import Enum
 
 from supabase_client import get_supabase_client
+from projections import select_columns, AI_INTERACTION_STATS
 
 logger = logging.getLogger(__name__)
 
@@ -196,9 +197,9 @@ class AIQuotaService:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            response = self.supabase.table('ai_interactions').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', cutoff_date.isoformat()).execute()
+            response = self.supabase.table('ai_interactions').select(
+                select_columns(AI_INTERACTION_STATS)
+            ).eq('user_id', user_id).gte('created_at', cutoff_date.isoformat()).execute()
             
             interactions = response.data or []
             
@@ -6,6 +6,8 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from supabase import create_client, Client
+from db_resilience import install_sync_client
+from cache_invalidation import publish_change
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,7 @@ class AlignmentScoreService:
             raise ValueError("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY environment variables")
         
         self.supabase: Client = create_client(supabase_url, supabase_key)
+        install_sync_client(self.supabase)
 
     def calculate_project_points(self, project_data: Dict, area_data: Optional[Dict] = None) -> Dict:
         """
@@ -122,23 +125,42 @@ class AlignmentScoreService:
         logger.warning(f"DEPRECATED: Task completion scoring disabled for task {task_id}. Points now awarded only on project completion.")
         return None
 
+    @staticmethod
+    def _first_day_of_month() -> datetime:
+        now = datetime.now()
+        return datetime(now.year, now.month, 1)
+
+    def _points_earned_since(self, user_id: str, since: datetime) -> int:
+        """Sum of points earned since `since`; raises on database errors"""
+        response = self.supabase.table('alignment_scores')\
+            .select('points_earned')\
+            .eq('user_id', user_id)\
+            .gte('created_at', since.isoformat())\
+            .execute()
+        
+        if response.data:
+            return sum(record['points_earned'] for record in response.data)
+        return 0
+
+    def _fetch_monthly_goal(self, user_id: str) -> Optional[int]:
+        """The user's monthly goal, None if unset or no profile; raises on database errors"""
+        response = self.supabase.table('user_profiles')\
+            .select('monthly_alignment_goal')\
+            .eq('id', user_id)\
+            .limit(1)\
+            .execute()
+        
+        if response.data and response.data[0].get('monthly_alignment_goal'):
+            return response.data[0]['monthly_alignment_goal']
+        return None
+
     async def get_rolling_weekly_score(self, user_id: str) -> int:
         """
         Get user's rolling 7-day alignment score from project completions
         """
         try:
             seven_days_ago = datetime.now() - timedelta(days=7)
-            
-            response = self.supabase.table('alignment_scores')\
-                .select('points_earned')\
-                .eq('user_id', user_id)\
-                .gte('created_at', seven_days_ago.isoformat())\
-                .execute()
-            
-            if response.data:
-                total_points = sum(record['points_earned'] for record in response.data)
-                return total_points
-            return 0
+            return self._points_earned_since(user_id, seven_days_ago)
             
         except Exception as e:
             logger.error(f"Error fetching rolling weekly score: {e}")
@@ -149,20 +171,7 @@ class AlignmentScoreService:
         Get user's current month alignment score from project completions
         """
         try:
-            # Get first day of current month
-            now = datetime.now()
-            first_day_of_month = datetime(now.year, now.month, 1)
-            
-            response = self.supabase.table('alignment_scores')\
-                .select('points_earned')\
-                .eq('user_id', user_id)\
-                .gte('created_at', first_day_of_month.isoformat())\
-                .execute()
-            
-            if response.data:
-                total_points = sum(record['points_earned'] for record in response.data)
-                return total_points
-            return 0
+            return self._points_earned_since(user_id, self._first_day_of_month())
             
         except Exception as e:
             logger.error(f"Error fetching monthly score: {e}")
@@ -173,15 +182,7 @@ class AlignmentScoreService:
         Get user's monthly alignment goal
         """
         try:
-            response = self.supabase.table('user_profiles')\
-                .select('monthly_alignment_goal')\
-                .eq('id', user_id)\
-                .single()\
-                .execute()
-            
-            if response.data and response.data['monthly_alignment_goal']:
-                return response.data['monthly_alignment_goal']
-            return None
+            return self._fetch_monthly_goal(user_id)
             
         except Exception as e:
             logger.error(f"Error fetching monthly goal: {e}")
@@ -197,6 +198,8 @@ class AlignmentScoreService:
                 .update({'monthly_alignment_goal': goal}) \
                 .eq('id', user_id) \
                 .execute()
+            # The alignment dashboard and scores caches read the goal
+            await publish_change(user_id, 'alignment_goal')
 
             # Read-back to verify persistence (more reliable than relying on update return data)
             verify = self.supabase.table('user_profiles') \
@@ -222,16 +225,38 @@ class AlignmentScoreService:
         Get comprehensive alignment data for dashboard widget
         Enhanced with optional HRM insights for deeper analysis
         """
+        dashboard_data = await self.get_dashboard_scores(user_id)
+        if use_hrm:
+            dashboard_data = await self.add_hrm_enhancement(user_id, dashboard_data)
+        return dashboard_data
+
+    @staticmethod
+    def empty_dashboard_scores() -> Dict:
+        """Dashboard scores shown when they can't be read"""
+        return {
+            'rolling_weekly_score': 0,
+            'monthly_score': 0,
+            'monthly_goal': None,
+            'progress_percentage': 0,
+            'has_goal_set': False
+        }
+
+    async def get_dashboard_scores(self, user_id: str, strict: bool = False) -> Dict:
+        """
+        Database side of the alignment dashboard: scores, goal and progress (no HRM).
+        On database errors returns empty_dashboard_scores(), or raises with strict, for
+        callers that cache the result and must not keep the placeholder.
+        """
         try:
-            rolling_weekly = await self.get_rolling_weekly_score(user_id)
-            monthly_score = await self.get_monthly_score(user_id)
-            monthly_goal = await self.get_user_monthly_goal(user_id)
+            rolling_weekly = self._points_earned_since(user_id, datetime.now() - timedelta(days=7))
+            monthly_score = self._points_earned_since(user_id, self._first_day_of_month())
+            monthly_goal = self._fetch_monthly_goal(user_id)
             
             # Calculate progress percentage (use 1000 as silent placeholder if no goal set)
             effective_goal = monthly_goal if monthly_goal else 1000
             progress_percentage = min((monthly_score / effective_goal) * 100, 100) if effective_goal > 0 else 0
             
-            dashboard_data = {
+            return {
                 'rolling_weekly_score': rolling_weekly,
                 'monthly_score': monthly_score,
                 'monthly_goal': monthly_goal,
@@ -239,46 +264,42 @@ class AlignmentScoreService:
                 'has_goal_set': monthly_goal is not None
             }
             
-            # Optional HRM enhancement
-            if use_hrm:
-                try:
-                    from hrm_service import HierarchicalReasoningModel, AnalysisDepth
-                    hrm = HierarchicalReasoningModel(user_id)
-                    
-                    # Get global alignment analysis
-                    insight = await hrm.analyze_entity(
-                        entity_type='global',
-                        entity_id=None,
-                        analysis_depth=AnalysisDepth.BALANCED
-                    )
-                    
-                    dashboard_data['hrm_enhancement'] = {
-                        'confidence_score': insight.confidence_score,
-                        'reasoning_summary': insight.summary,
-                        'hierarchy_reasoning': insight.reasoning_path[:3],
-                        'recommendations': insight.recommendations[:3]
-                    }
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to enhance alignment dashboard with HRM: {e}")
-                    dashboard_data['hrm_enhancement'] = {
-                        'confidence_score': 0.5,
-                        'reasoning_summary': "HRM analysis temporarily unavailable",
-                        'hierarchy_reasoning': [],
-                        'recommendations': ["Continue working on your current projects"]
-                    }
+        except Exception as e:
+            logger.error(f"Error fetching alignment dashboard data: {e}")
+            if strict:
+                raise
+            return self.empty_dashboard_scores()
+
+    async def add_hrm_enhancement(self, user_id: str, dashboard_data: Dict) -> Dict:
+        """Dashboard data plus the HRM global alignment analysis (an LLM call)"""
+        dashboard_data = dict(dashboard_data)
+        try:
+            from hrm_service import HierarchicalReasoningModel, AnalysisDepth
+            hrm = HierarchicalReasoningModel(user_id)
             
-            return dashboard_data
+            # Get global alignment analysis
+            insight = await hrm.analyze_entity(
+                entity_type='global',
+                entity_id=None,
+                analysis_depth=AnalysisDepth.BALANCED
+            )
+            
+            dashboard_data['hrm_enhancement'] = {
+                'confidence_score': insight.confidence_score,
+                'reasoning_summary': insight.summary,
+                'hierarchy_reasoning': insight.reasoning_path[:3],
+                'recommendations': insight.recommendations[:3]
+            }
             
         except Exception as e:
-            logger.error(f"Error fetching alignment dashboard data: {e}")
-            return {
-                'rolling_weekly_score': 0,
-                'monthly_score': 0,
-                'monthly_goal': None,
-                'progress_percentage': 0,
-                'has_goal_set': False
+            logger.warning(f"Failed to enhance alignment dashboard with HRM: {e}")
+            dashboard_data['hrm_enhancement'] = {
+                'confidence_score': 0.5,
+                'reasoning_summary': "HRM analysis temporarily unavailable",
+                'hierarchy_reasoning': [],
+                'recommendations': ["Continue working on your current projects"]
             }
+        return dashboard_data
 
     async def get_weekly_score(self, user_id: str, use_hrm: bool = False) -> Dict:
         """
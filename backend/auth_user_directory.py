@@ -0,0 +1,140 @@
+"""
+Auth User Directory
+Indexed, cached lookups of Supabase Auth (auth.users) accounts, replacing scans of
+auth.admin.list_users(): those fetch one page of users (50 by default, so the scan was
+also incomplete) and compare every entry in Python.
+
+- By id: GoTrue's admin get_user_by_id (primary key lookup).
+- By email: the auth_user_id_by_email SQL function (migration 023), which reads
+  auth.users through its email index.
+
+Found accounts are cached for AUTH_USER_CACHE_SECONDS, tagged with the user so account
+deletion can drop them. Misses are not cached: an account created a moment later must be
+found by the next lookup.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cache_service import cache_service, user_tag
+from supabase_client import run_query, supabase_manager
+
+logger = logging.getLogger(__name__)
+
+AUTH_USER_KEY_PREFIX = 'auth_user'
+
+
+def _email_digest(email: str) -> str:
+    """Cache keys name emails by digest, keeping addresses out of Redis keys and metrics"""
+    return hashlib.sha256(email.encode('utf-8')).hexdigest()[:32]
+
+
+def normalize_email(email: Optional[str]) -> str:
+    """GoTrue stores emails trimmed and lower-cased"""
+    return (email or '').strip().lower()
+
+
+class AuthUserDirectory:
+    """Looks up auth users by id or email without listing them"""
+
+    def __init__(self, cache=None, client_factory: Optional[Callable[[], Any]] = None,
+                 query: Optional[Callable[[Callable], Awaitable[Any]]] = None,
+                 ttl_seconds: Optional[int] = None):
+        self.cache = cache or cache_service
+        self._client = client_factory or supabase_manager.get_client
+        self._query = query or run_query
+        self.ttl = ttl_seconds or int(os.getenv('AUTH_USER_CACHE_SECONDS', '3600'))
+        self.stats = {
+            'id_lookups': 0,
+            'email_lookups': 0,
+            'cache_hits': 0,
+            'not_found': 0,
+            'errors': 0
+        }
+
+    @staticmethod
+    def id_key(user_id: str) -> str:
+        return f"{AUTH_USER_KEY_PREFIX}:id:{user_id}"
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        return f"{AUTH_USER_KEY_PREFIX}:email:{_email_digest(normalize_email(email))}"
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The auth user `{'id', 'email'}` with this id, or None if it can't be found"""
+        if not user_id:
+            return None
+        uid = str(user_id)
+        cached = await self.cache.get(self.id_key(uid))
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        self.stats['id_lookups'] += 1
+        try:
+            # The admin client is synchronous; keep its HTTP call off the event loop
+            response = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self._client().auth.admin.get_user_by_id(uid)
+            )
+        except Exception as e:
+            # GoTrue answers an unknown id with an error as well
+            self.stats['errors'] += 1
+            logger.info(f"Auth user lookup failed for {uid}: {e}")
+            return None
+
+        user = getattr(response, 'user', None)
+        if not user:
+            self.stats['not_found'] += 1
+            return None
+        record = {'id': str(user.id), 'email': getattr(user, 'email', None)}
+        await self._remember(record)
+        return record
+
+    async def find_user_id(self, email: str) -> Optional[str]:
+        """Id of the auth user with this email, or None if there is none (or the lookup failed)"""
+        normalized = normalize_email(email)
+        if not normalized:
+            return None
+        cached = await self.cache.get(self.email_key(normalized))
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        self.stats['email_lookups'] += 1
+        try:
+            response = await self._query(lambda db: db.rpc('auth_user_id_by_email', {'p_email': normalized}))
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Auth user email lookup failed (is migration 023 applied?): {e}")
+            return None
+
+        user_id = response.data
+        if isinstance(user_id, list):
+            user_id = user_id[0] if user_id else None
+        if not user_id:
+            self.stats['not_found'] += 1
+            return None
+        await self._remember({'id': str(user_id), 'email': normalized})
+        return str(user_id)
+
+    async def _remember(self, record: Dict[str, Any]):
+        tags = (user_tag(record['id']),)
+        await self.cache.set(self.id_key(record['id']), record, self.ttl, tags=tags)
+        if record.get('email'):
+            await self.cache.set(self.email_key(record['email']), record['id'], self.ttl, tags=tags)
+
+    async def forget(self, user_id: str, email: Optional[str] = None):
+        """Drop a user's cached lookups, e.g. after the account is deleted"""
+        await self.cache.delete(self.id_key(str(user_id)))
+        if email:
+            await self.cache.delete(self.email_key(email))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+# Global directory
+auth_user_directory = AuthUserDirectory()
@@ -0,0 +1,300 @@
+"""
+Bulk Write Pipeline
+Buffers rows for one table and writes them as multi-row PostgREST inserts / upserts,
+chunked by row count and payload size. A chunk that Postgres rejects is bisected so
+only the offending rows are reported as failed; `atomic=True` instead sends every row
+to the bulk_write_rows / bulk_update_rows SQL functions (migration 022) in a single
+transaction.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from supabase_client import run_query, supabase_manager
+from query_coalescing import query_coalescer
+
+logger = logging.getLogger(__name__)
+
+BULK_WRITE_MAX_ROWS = int(os.getenv('BULK_WRITE_MAX_ROWS', '500'))
+BULK_WRITE_MAX_BYTES = int(os.getenv('BULK_WRITE_MAX_BYTES', str(512 * 1024)))
+
+_MODES = ('insert', 'upsert')
+
+
+class BulkWriteError(Exception):
+    """Some rows of a bulk write were rejected"""
+
+    def __init__(self, result: 'BulkWriteResult'):
+        self.result = result
+        first_error = result.failed[0][1] if result.failed else ''
+        super().__init__(f"{len(result.failed)} of {result.attempted} rows failed for "
+                         f"{result.table}: {first_error}")
+
+
+class BulkWriteResult:
+    """Outcome of a bulk write: rows written, rows rejected (with the error) and round trips"""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.written: List[Dict[str, Any]] = []
+        self.failed: List[Tuple[Dict[str, Any], str]] = []
+        self.round_trips = 0
+
+    @property
+    def attempted(self) -> int:
+        return len(self.written) + len(self.failed)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def raise_for_failures(self) -> 'BulkWriteResult':
+        if self.failed:
+            raise BulkWriteError(self)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'table': self.table,
+            'written': len(self.written),
+            'failed': len(self.failed),
+            'round_trips': self.round_trips,
+            'errors': sorted({error for _, error in self.failed})
+        }
+
+
+def payload_size(row: Dict[str, Any]) -> int:
+    """Bytes a row adds to a JSON request body"""
+    return len(json.dumps(row, default=str, separators=(',', ':')).encode()) + 1
+
+
+def chunk_rows(rows: Iterable[Dict[str, Any]], max_rows: int, max_bytes: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split rows into request-sized chunks.
+
+    PostgREST multi-row inserts take their column list from the first object, so rows
+    are grouped by key set first; each chunk then stays under both max_rows and
+    max_bytes (a single row larger than max_bytes gets a chunk of its own).
+    """
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    chunks: List[List[Dict[str, Any]]] = []
+    for group in groups.values():
+        chunk: List[Dict[str, Any]] = []
+        size = 2
+        for row in group:
+            row_size = payload_size(row)
+            if chunk and (len(chunk) >= max_rows or size + row_size > max_bytes):
+                chunks.append(chunk)
+                chunk, size = [], 2
+            chunk.append(row)
+            size += row_size
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+
+class BulkWriter:
+    """
+    Buffered multi-row writer for one table.
+
+        async with BulkWriter('tasks') as writer:
+            for task in tasks:
+                await writer.add(task)
+        created = writer.result.written
+
+    Rows are flushed whenever a full chunk is buffered and when the block exits. With
+    atomic=True nothing is written until flush(), which sends all rows in one transaction.
+    """
+
+    def __init__(self, table: str, mode: str = 'insert', on_conflict: str = 'id',
+                 atomic: bool = False, max_rows: Optional[int] = None, max_bytes: Optional[int] = None):
+        if mode not in _MODES:
+            raise ValueError(f"Unsupported bulk write mode: {mode}")
+        self.table = table
+        self.mode = mode
+        self.on_conflict = on_conflict
+        self.atomic = atomic
+        self.max_rows = max_rows or BULK_WRITE_MAX_ROWS
+        self.max_bytes = max_bytes or BULK_WRITE_MAX_BYTES
+        self.result = BulkWriteResult(table)
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffered_bytes = 0
+
+    async def __aenter__(self) -> 'BulkWriter':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.flush()
+
+    async def add(self, row: Dict[str, Any]):
+        """Buffer a row, writing the buffer out once it fills a chunk"""
+        row = supabase_manager._serialize_document(row)
+        self._buffer.append(row)
+        self._buffered_bytes += payload_size(row)
+        if not self.atomic and (len(self._buffer) >= self.max_rows or self._buffered_bytes >= self.max_bytes):
+            await self.flush()
+
+    async def extend(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            await self.add(row)
+
+    async def flush(self) -> BulkWriteResult:
+        """Write every buffered row; failures are collected on self.result, not raised"""
+        rows, self._buffer, self._buffered_bytes = self._buffer, [], 0
+        if not rows:
+            return self.result
+
+        if self.atomic:
+            await self._write_atomic(rows)
+        else:
+            for chunk in chunk_rows(rows, self.max_rows, self.max_bytes):
+                await self._write_chunk(chunk)
+
+        if self.result.failed:
+            logger.warning(f"⚠️ Bulk {self.mode} into {self.table}: {len(self.result.failed)} rows failed "
+                           f"({len(self.result.written)} written)")
+        return self.result
+
+    def _build(self, db, chunk: List[Dict[str, Any]]):
+        if self.mode == 'upsert':
+            return db.table(self.table).upsert(chunk, on_conflict=self.on_conflict)
+        return db.table(self.table).insert(chunk)
+
+    async def _write_chunk(self, chunk: List[Dict[str, Any]]):
+        self.result.round_trips += 1
+        try:
+            response = await run_query(lambda db: self._build(db, chunk))
+        except APIError as e:
+            # The chunk was one statement, so nothing was written; split it to find the bad rows
+            if len(chunk) == 1:
+                self.result.failed.append((chunk[0], _error_message(e)))
+                return
+            middle = len(chunk) // 2
+            await self._write_chunk(chunk[:middle])
+            await self._write_chunk(chunk[middle:])
+            return
+        except Exception as e:
+            # Connection-level failures would fail every half as well
+            logger.error(f"Bulk {self.mode} into {self.table} failed: {e}")
+            self.result.failed.extend((row, str(e)) for row in chunk)
+            return
+        self.result.written.extend(response.data or [])
+
+    async def _write_atomic(self, rows: List[Dict[str, Any]]):
+        params = {
+            'p_table': self.table,
+            'p_rows': rows,
+            'p_mode': self.mode,
+            'p_on_conflict': [c.strip() for c in self.on_conflict.split(',')]
+        }
+        self.result.round_trips += 1
+        try:
+            response = await run_query(lambda db: db.rpc('bulk_write_rows', params))
+        except Exception as e:
+            logger.error(f"Atomic bulk {self.mode} into {self.table} failed: {e}")
+            self.result.failed.extend((row, _error_message(e)) for row in rows)
+            return
+        finally:
+            # The write went through /rpc, so drop shared reads of the table explicitly
+            query_coalescer.invalidate(f"/{self.table}")
+        self.result.written.extend(response.data or [])
+
+
+def _error_message(error: Exception) -> str:
+    return getattr(error, 'message', None) or str(error)
+
+
+async def bulk_insert(table: str, rows: Iterable[Dict[str, Any]], **options) -> BulkWriteResult:
+    """Insert rows with as few round trips as the chunk limits allow"""
+    async with BulkWriter(table, mode='insert', **options) as writer:
+        await writer.extend(rows)
+    return writer.result
+
+
+async def bulk_upsert(table: str, rows: Iterable[Dict[str, Any]], on_conflict: str = 'id', **options) -> BulkWriteResult:
+    """Insert-or-update rows, resolving conflicts on `on_conflict`"""
+    async with BulkWriter(table, mode='upsert', on_conflict=on_conflict, **options) as writer:
+        await writer.extend(rows)
+    return writer.result
+
+
+async def bulk_update(table: str, rows: Iterable[Dict[str, Any]], key: str = 'id',
+                      atomic: bool = False, max_rows: Optional[int] = None) -> BulkWriteResult:
+    """
+    Apply per-row partial updates, e.g. [{'id': ..., 'sort_order': 0}, ...].
+
+    Rows carrying the same changes are sent as one PATCH filtered by `key=in.(...)`,
+    so marking 40 tasks complete is one request. atomic=True sends every row to
+    bulk_update_rows instead, which also handles rows with distinct changes in a
+    single round trip and transaction.
+    """
+    result = BulkWriteResult(table)
+    max_rows = max_rows or BULK_WRITE_MAX_ROWS
+
+    keyed: List[Dict[str, Any]] = []
+    for row in rows:
+        row = supabase_manager._serialize_document(row)
+        if row.get(key) is None:
+            result.failed.append((row, f"missing {key}"))
+        else:
+            keyed.append(row)
+    if not keyed:
+        return result
+
+    if atomic:
+        result.round_trips += 1
+        params = {'p_table': table, 'p_rows': keyed, 'p_key': key}
+        try:
+            response = await run_query(lambda db: db.rpc('bulk_update_rows', params))
+            result.written.extend(response.data or [])
+        except Exception as e:
+            logger.error(f"Atomic bulk update of {table} failed: {e}")
+            result.failed.extend((row, _error_message(e)) for row in keyed)
+        finally:
+            query_coalescer.invalidate(f"/{table}")
+        return result
+
+    # Group rows by their change set
+    groups: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+    for row in keyed:
+        changes = {k: v for k, v in row.items() if k != key}
+        signature = json.dumps(changes, sort_keys=True, default=str)
+        groups.setdefault(signature, (changes, []))[1].append(row)
+
+    async def patch(changes: Dict[str, Any], batch: List[Dict[str, Any]]):
+        result.round_trips += 1
+        ids = [row[key] for row in batch]
+        try:
+            response = await run_query(lambda db: db.table(table).update(changes).in_(key, ids))
+        except APIError as e:
+            if len(batch) == 1:
+                result.failed.append((batch[0], _error_message(e)))
+                return
+            middle = len(batch) // 2
+            await patch(changes, batch[:middle])
+            await patch(changes, batch[middle:])
+            return
+        except Exception as e:
+            logger.error(f"Bulk update of {table} failed: {e}")
+            result.failed.extend((row, str(e)) for row in batch)
+            return
+        result.written.extend(response.data or [])
+
+    for changes, batch in groups.values():
+        if not changes:
+            continue
+        for start in range(0, len(batch), max_rows):
+            await patch(changes, batch[start:start + max_rows])
+
+    if result.failed:
+        logger.warning(f"⚠️ Bulk update of {table}: {len(result.failed)} rows failed "
+                       f"({len(result.written)} updated)")
+    return result
@@ -0,0 +1,167 @@
+"""
+Cache Value Codec
+Encodes cached values to compact bytes for Redis and the in-process tier. Every payload
+starts with a format byte naming the serializer and whether the body is compressed, so
+workers of different releases can share a Redis during a rolling deploy: payloads in an
+unknown format are treated as misses instead of being misread, and plain JSON text left
+by older releases still decodes.
+
+Serializers: orjson (default when installed), msgpack (optional) and stdlib json.
+Bodies above CACHE_COMPRESS_MIN_BYTES are zlib-compressed when that makes them smaller.
+"""
+
+import os
+import json
+import zlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Format byte: serializer id in the low bits, compression flag in the high bit.
+# Never reuse an id; add a new one when a serializer's output changes.
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+FLAG_ZLIB = 0x80
+
+
+class CodecError(ValueError):
+    """Payload is corrupt or was written in a format this release does not know"""
+
+
+def _json_dumps(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers beyond 64 bits; stdlib json handles those
+            pass
+    return json.dumps(value, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: Union[bytes, memoryview]) -> Any:
+    # orjson reads the memoryview in place; stdlib json needs bytes
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(bytes(data))
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+
+def _msgpack_loads(data: Union[bytes, memoryview]) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+SERIALIZERS: Dict[str, Tuple[int, Callable[[Any], bytes]]] = {
+    'json': (FORMAT_JSON, _json_dumps),
+    'orjson': (FORMAT_JSON, _json_dumps),
+}
+DESERIALIZERS: Dict[int, Callable[[Union[bytes, memoryview]], Any]] = {
+    FORMAT_JSON: _json_loads,
+}
+if MSGPACK_AVAILABLE:
+    SERIALIZERS['msgpack'] = (FORMAT_MSGPACK, _msgpack_dumps)
+    DESERIALIZERS[FORMAT_MSGPACK] = _msgpack_loads
+
+
+class CacheCodec:
+    """
+    Serializer + optional compression with a leading format byte.
+
+    encode() returns the uncompressed payload (what the in-process tier keeps, so hits
+    there skip decompression); compress() turns it into what is sent to Redis.
+    decode() accepts either.
+    """
+
+    def __init__(self, name: Optional[str] = None, compress_min_bytes: Optional[int] = None,
+                 compress_level: Optional[int] = None):
+        name = name or os.getenv('CACHE_CODEC', 'json')
+        if name not in SERIALIZERS:
+            logger.warning(f"Cache codec '{name}' not available, using json")
+            name = 'json'
+        self.name = name
+        self.format, self._dumps = SERIALIZERS[name]
+        self.compress_min_bytes = (compress_min_bytes if compress_min_bytes is not None
+                                   else int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '4096')))
+        self.compress_level = (compress_level if compress_level is not None
+                               else int(os.getenv('CACHE_COMPRESS_LEVEL', '1')))
+        self.stats = {
+            'encoded': 0,
+            'compressed': 0,
+            'raw_bytes': 0,
+            'stored_bytes': 0,
+            'decode_errors': 0
+        }
+
+    def encode(self, value: Any) -> bytes:
+        self.stats['encoded'] += 1
+        return bytes((self.format,)) + self._dumps(value)
+
+    def compress(self, payload: bytes) -> bytes:
+        """Compress an encoded payload if it is large enough and actually shrinks"""
+        self.stats['raw_bytes'] += len(payload)
+        if len(payload) >= self.compress_min_bytes and not payload[0] & FLAG_ZLIB:
+            compressed = zlib.compress(memoryview(payload)[1:], self.compress_level)
+            if len(compressed) + 1 < len(payload):
+                self.stats['compressed'] += 1
+                self.stats['stored_bytes'] += len(compressed) + 1
+                return bytes((payload[0] | FLAG_ZLIB,)) + compressed
+        self.stats['stored_bytes'] += len(payload)
+        return payload
+
+    def expand(self, payload: Union[bytes, str]) -> bytes:
+        """Undo compress(): the uncompressed payload, format byte included"""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        if payload and payload[0] & FLAG_ZLIB:
+            try:
+                return bytes((payload[0] & ~FLAG_ZLIB,)) + zlib.decompress(memoryview(payload)[1:])
+            except zlib.error as e:
+                self.stats['decode_errors'] += 1
+                raise CodecError(f"corrupt cache payload: {e}") from e
+        return payload
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        if not payload:
+            raise CodecError("empty cache payload")
+
+        header = payload[0]
+        # Plain JSON text from releases before the format byte (always printable ASCII first)
+        if header >= 0x20 and header != 0x7f and header < FLAG_ZLIB:
+            return json.loads(payload)
+
+        loads = DESERIALIZERS.get(header & ~FLAG_ZLIB)
+        if loads is None:
+            self.stats['decode_errors'] += 1
+            raise CodecError(f"unknown cache payload format 0x{header:02x}")
+        body = memoryview(payload)[1:]
+        try:
+            if header & FLAG_ZLIB:
+                body = zlib.decompress(body)
+            return loads(body)
+        except Exception as e:
+            self.stats['decode_errors'] += 1
+            raise CodecError(f"corrupt cache payload: {e}") from e
+
+    def get_stats(self) -> Dict[str, Any]:
+        ratio = (self.stats['stored_bytes'] / self.stats['raw_bytes']) if self.stats['raw_bytes'] else 1.0
+        return {
+            'codec': self.name,
+            'compress_min_bytes': self.compress_min_bytes,
+            **self.stats,
+            'compression_ratio': round(ratio, 3)
+        }
@@ -0,0 +1,115 @@
+"""
+Cache Invalidation Bus
+Single write-path entry point for "a user's data changed". Mutations (REST services,
+GraphQL) and the /webhooks/cache-invalidation handler publish a change event of
+(user, entity type, id); the bus bumps the user's version counters for the changed entity
+types, which moves versioned cache keys and ETags on, and evicts exactly the cache entries
+tagged as depending on that entity type or record. Eviction goes through
+CacheService.invalidate_tags, which deletes the Redis entries and tells every worker to
+drop its L1 copies.
+"""
+
+import logging
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from cache_service import cache_service, entity_tag, user_tag
+
+logger = logging.getLogger(__name__)
+
+# Table and singular names mapped to the entity types caches declare in depends_on
+ENTITY_TYPES = {
+    'pillars': 'pillars', 'pillar': 'pillars',
+    'areas': 'areas', 'area': 'areas',
+    'projects': 'projects', 'project': 'projects',
+    'tasks': 'tasks', 'task': 'tasks',
+    'journal': 'journal', 'journal_entries': 'journal', 'journal_entry': 'journal',
+    'journal_templates': 'journal_templates',
+    'sleep_reflections': 'sleep_reflections',
+    'alignment_goal': 'alignment_goal', 'monthly_alignment_goal': 'alignment_goal',
+}
+
+
+class ChangeEvent(NamedTuple):
+    user_id: str
+    entity_type: str
+    entity_id: Optional[str] = None
+    cascade: Sequence[str] = ()
+
+
+def normalize_entity(entity_type: str) -> Optional[str]:
+    """Entity type for a table or entity name; None if unknown"""
+    return ENTITY_TYPES.get((entity_type or '').strip().lower())
+
+
+class InvalidationBus:
+    """Turns change events into tag invalidations and notifies local subscribers"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or cache_service
+        self._subscribers: List[Callable[[ChangeEvent], Awaitable[None]]] = []
+        self.stats = {
+            'published': 0,
+            'evicted': 0,
+            'unknown_entity': 0,
+            'by_entity': {}
+        }
+
+    def subscribe(self, handler: Callable[[ChangeEvent], Awaitable[None]]):
+        """Run `handler(event)` after every change published in this worker"""
+        self._subscribers.append(handler)
+
+    def tags_for(self, event: ChangeEvent) -> List[str]:
+        entity = normalize_entity(event.entity_type)
+        if entity is None:
+            # Unknown data: everything cached for the user may depend on it
+            return [user_tag(event.user_id)]
+        tags = [user_tag(event.user_id, entity)]
+        tags += [user_tag(event.user_id, normalize_entity(c) or c) for c in event.cascade]
+        if event.entity_id:
+            tags.append(entity_tag(entity, event.entity_id))
+        return tags
+
+    async def publish(self, user_id: str, entity_type: str, entity_id: Optional[str] = None,
+                      cascade: Sequence[str] = ()) -> int:
+        """
+        Publish a change and evict what depends on it; returns the number of entries evicted.
+        `cascade` names entity types changed as a side effect (e.g. tasks deleted with their project).
+        """
+        event = ChangeEvent(str(user_id), entity_type, str(entity_id) if entity_id else None, tuple(cascade))
+        try:
+            entity = normalize_entity(entity_type)
+            if entity is None:
+                self.stats['unknown_entity'] += 1
+            by_entity = self.stats['by_entity']
+            by_entity[entity or 'unknown'] = by_entity.get(entity or 'unknown', 0) + 1
+
+            changed = None if entity is None else [entity] + [normalize_entity(c) or c for c in event.cascade]
+            await self.cache.bump_data_version(event.user_id, changed)
+            evicted = await self.cache.invalidate_tags(self.tags_for(event))
+            self.stats['published'] += 1
+            self.stats['evicted'] += evicted
+            logger.debug(f"🗂️ Change {entity or entity_type}:{event.entity_id} for user {event.user_id} "
+                         f"evicted {evicted} cache entries")
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for user {user_id} ({entity_type}): {e}")
+            return 0
+
+        for handler in self._subscribers:
+            try:
+                await handler(event)
+            except Exception as e:
+                logger.warning(f"Cache change subscriber failed: {e}")
+        return evicted
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'by_entity': dict(self.stats['by_entity'])}
+
+
+# Global invalidation bus
+invalidation_bus = InvalidationBus()
+
+
+async def publish_change(user_id: str, entity_type: str, entity_id: Optional[str] = None,
+                         cascade: Sequence[str] = ()) -> int:
+    """Publish a (user, entity type, id) change on the global bus"""
+    return await invalidation_bus.publish(user_id, entity_type, entity_id, cascade)
@@ -0,0 +1,195 @@
+"""
+Cache Metrics
+Per-prefix counters and latency histograms for CacheService, so TTLs and L1 sizing can be
+tuned from data. Prefixes are the first key segment ("dashboard", "insights"), plus the
+second one for namespaces shared by several caches ("http:pillars", "user_data:hierarchy").
+
+Exposed as JSON by CacheService.get_stats() and in the Prometheus text format by
+render_prometheus(), which needs no client library.
+"""
+
+import os
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Namespaces whose second segment names the actual cache
+COMPOUND_PREFIXES = {'http', 'user_data'}
+
+# Latency buckets in seconds: L1 hits sit in the first few, Redis round trips in the middle
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Caps the number of prefixes tracked; later ones are counted under 'other'
+MAX_PREFIXES = int(os.getenv('CACHE_METRICS_MAX_PREFIXES', '200'))
+
+PREFIX_COUNTERS = ('l1_hits', 'l2_hits', 'misses', 'stale_served', 'sets', 'evictions', 'bytes_read', 'bytes_written')
+
+
+def metric_prefix(key: str) -> str:
+    """Metrics bucket of a cache key"""
+    parts = key.split(':', 2)
+    if parts[0] in COMPOUND_PREFIXES and len(parts) > 1:
+        return f"{parts[0]}:{parts[1]}"
+    return parts[0]
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram in the Prometheus sense: counts, sum and total"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None without observations)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+    def get_stats(self) -> Dict:
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum / self.count * 1000, 3) if self.count else None,
+            'p50_ms': None if p50 is None else round(p50 * 1000, 3),
+            'p99_ms': None if p99 is None or p99 == float('inf') else round(p99 * 1000, 3)
+        }
+
+
+class CacheMetrics:
+    """Per-prefix counters and (operation, tier) latency histograms"""
+
+    def __init__(self, max_prefixes: int = MAX_PREFIXES):
+        self.max_prefixes = max_prefixes
+        self.prefixes: Dict[str, Dict[str, int]] = {}
+        self.evictions: Dict[Tuple[str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def _counters(self, key: str) -> Tuple[str, Dict[str, int]]:
+        prefix = metric_prefix(key)
+        counters = self.prefixes.get(prefix)
+        if counters is None:
+            if len(self.prefixes) >= self.max_prefixes:
+                prefix = 'other'
+                counters = self.prefixes.get(prefix)
+            if counters is None:
+                counters = self.prefixes[prefix] = dict.fromkeys(PREFIX_COUNTERS, 0)
+        return prefix, counters
+
+    def record(self, key: str, counter: str, amount: int = 1):
+        self._counters(key)[1][counter] += amount
+
+    def record_eviction(self, key: str, reason: str):
+        """L1 eviction listener (see MemoryCache.on_evict)"""
+        prefix, counters = self._counters(key)
+        counters['evictions'] += 1
+        self.evictions[(prefix, reason)] = self.evictions.get((prefix, reason), 0) + 1
+
+    def observe(self, operation: str, tier: str, seconds: float):
+        histogram = self.latency.get((operation, tier))
+        if histogram is None:
+            histogram = self.latency[(operation, tier)] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def get_stats(self) -> Dict:
+        prefixes = {}
+        for prefix, counters in sorted(self.prefixes.items()):
+            hits = counters['l1_hits'] + counters['l2_hits']
+            lookups = hits + counters['misses']
+            prefixes[prefix] = {
+                **counters,
+                'hit_rate_percentage': round(hits / lookups * 100, 2) if lookups else 0
+            }
+        return {
+            'prefixes': prefixes,
+            'latency': {f"{operation}_{tier}": h.get_stats() for (operation, tier), h in sorted(self.latency.items())}
+        }
+
+    def reset(self):
+        self.prefixes.clear()
+        self.evictions.clear()
+        self.latency.clear()
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bound(value: float) -> str:
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+def render_prometheus(metrics: CacheMetrics, stats: Dict, namespace: str = 'aurum_cache') -> str:
+    """Prometheus text exposition (format 0.0.4) of the cache metrics and gauges from get_stats()"""
+    lines = []
+
+    def family(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {namespace}_{name} {help_text}")
+        lines.append(f"# TYPE {namespace}_{name} {kind}")
+
+    family('lookups_total', 'counter', 'Cache lookups by prefix and result')
+    for prefix, counters in sorted(metrics.prefixes.items()):
+        for result in ('l1_hits', 'l2_hits', 'misses', 'stale_served'):
+            lines.append(f'{namespace}_lookups_total{{prefix="{_label(prefix)}",result="{result}"}} {counters[result]}')
+
+    family('sets_total', 'counter', 'Cache writes by prefix')
+    for prefix, counters in sorted(metrics.prefixes.items()):
+        lines.append(f'{namespace}_sets_total{{prefix="{_label(prefix)}"}} {counters["sets"]}')
+
+    family('bytes_total', 'counter', 'Payload bytes read from and written to Redis by prefix')
+    for prefix, counters in sorted(metrics.prefixes.items()):
+        lines.append(f'{namespace}_bytes_total{{prefix="{_label(prefix)}",direction="read"}} {counters["bytes_read"]}')
+        lines.append(f'{namespace}_bytes_total{{prefix="{_label(prefix)}",direction="write"}} {counters["bytes_written"]}')
+
+    family('l1_evictions_total', 'counter', 'In-process cache evictions by prefix and reason')
+    for (prefix, reason), count in sorted(metrics.evictions.items()):
+        lines.append(f'{namespace}_l1_evictions_total{{prefix="{_label(prefix)}",reason="{reason}"}} {count}')
+
+    family('operation_seconds', 'histogram', 'Cache operation latency by tier')
+    for (operation, tier), histogram in sorted(metrics.latency.items()):
+        labels = f'operation="{operation}",tier="{tier}"'
+        for bound, total in histogram.cumulative():
+            lines.append(f'{namespace}_operation_seconds_bucket{{{labels},le="{_bound(bound)}"}} {total}')
+        lines.append(f'{namespace}_operation_seconds_sum{{{labels}}} {histogram.sum!r}')
+        lines.append(f'{namespace}_operation_seconds_count{{{labels}}} {histogram.count}')
+
+    memory = stats.get('memory_cache', {})
+    gauges = (
+        ('l1_entries', 'Entries in the in-process cache', memory.get('entries', 0)),
+        ('l1_bytes', 'Estimated bytes held by the in-process cache', memory.get('bytes', 0)),
+        ('redis_available', 'Whether Redis (L2) is configured', int(bool(stats.get('redis_available')))),
+    )
+    for name, help_text, value in gauges:
+        family(name, 'gauge', help_text)
+        lines.append(f'{namespace}_{name} {value}')
+
+    counters = (
+        ('loads_total', 'Loader calls on cache misses', 'loads'),
+        ('refreshes_total', 'Background stale-while-revalidate refreshes', 'refreshes'),
+        ('lock_waits_total', 'Misses that waited for another worker to compute the value', 'lock_waits'),
+        ('tag_invalidations_total', 'Tag invalidation calls', 'tag_invalidations'),
+    )
+    for name, help_text, stat in counters:
+        family(name, 'counter', help_text)
+        lines.append(f'{namespace}_{name} {stats.get(stat, 0)}')
+
+    return '\n'.join(lines) + '\n'
@@ -3,14 +3,28 @@ Advanced Caching Service with Redis
 Provides multi-level caching for API responses and database queries
 """
 
+import os
+import copy
 import json
+import fnmatch
+import uuid
 import logging
+import math
+import time
+import random
 import hashlib
 import asyncio
-from typing import Any, Dict, List, Optional, Union
-from datetime import datetime, timedelta
+import typing
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Union
 from functools import wraps
 
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from memory_cache import MemoryCache
+from cache_codec import CacheCodec
+from cache_metrics import CacheMetrics, render_prometheus
+
 # Redis imports with fallback
 try:
     import redis.asyncio as redis
@@ -20,20 +34,90 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Redis set holding the keys that carry a tag
+TAG_KEY_PREFIX = 'cache:tag:'
+# Redis hash holding a user's data version counters
+VERSION_KEY_PREFIX = 'cache:versions:'
+# Version fields besides the per-entity-type ones: bumped by every write, and by writes
+# that invalidate everything cached for the user
+ANY_CHANGE = '*'
+USER_EPOCH = '!'
+# Redis lock held by the worker recomputing a key
+LOCK_KEY_PREFIX = 'cache:lock:'
+
+
+def _text(value: Union[bytes, str]) -> str:
+    """Redis returns bytes (values are binary); keys and tokens are text"""
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def user_tag(user_id: str, entity: Optional[str] = None) -> str:
+    """Tag for everything cached for a user, or for what depends on one entity type of theirs"""
+    return f"user:{user_id}" if entity is None else f"user:{user_id}:{entity}"
+
+
+def entity_tag(entity: str, entity_id: str) -> str:
+    """Tag for entries that depend on one record, e.g. project:{id}"""
+    return f"{entity}:{entity_id}"
+
+
 class CacheService:
     """
-    Advanced caching service with multiple storage backends
-    Supports both Redis and in-memory caching with intelligent fallback
+    Two-level cache: an in-process L1 (bounded LRU + TTL, see memory_cache.py) in front
+    of Redis as L2. L1 holds the encoded JSON for at most CACHE_L1_TTL_SECONDS, so a hot
+    key costs a local lookup and a decode instead of a network hop. Writes and deletes
+    publish the key on a Redis channel and every other worker drops its L1 copy; without
+    Redis the memory tier is the whole cache.
+    
+    Entries can be tagged (user_tag / entity_tag). Each tag maps to the set of keys that
+    carry it, so invalidate_tags deletes exactly those keys in O(k) instead of scanning
+    the keyspace.
     """
     
     def __init__(self):
         self.redis_client = None
-        self.memory_cache: Dict[str, Dict] = {}
+        # Dedicated connection for the invalidation listener, which holds it for good
+        self.pubsub_client = None
+        self.memory_cache = MemoryCache()
+        self.codec = CacheCodec()
+        # Per-prefix counters and L1 / L2 latency histograms (see cache_metrics.py)
+        self.metrics = CacheMetrics()
+        self.memory_cache.on_evict = self.metrics.record_eviction
+        self.l1_ttl = float(os.getenv('CACHE_L1_TTL_SECONDS', '30'))
+        self.invalidation_channel = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')
+        self.instance_id = uuid.uuid4().hex
+        # Tag sets outlive the entries they index by at least this long
+        self.tag_ttl = int(os.getenv('CACHE_TAG_TTL_SECONDS', '86400'))
+        self._listener_task: Optional[asyncio.Task] = None
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._refreshing: Set[str] = set()
+        # Stale-while-revalidate: recompute lock lifetime, how long a miss waits for
+        # another worker's result, and how eagerly XFetch refreshes ahead of expiry
+        self.lock_ttl = float(os.getenv('CACHE_LOCK_TTL_SECONDS', '10'))
+        self.lock_wait = float(os.getenv('CACHE_LOCK_WAIT_SECONDS', '2'))
+        self.early_expiry_beta = float(os.getenv('CACHE_EARLY_EXPIRY_BETA', '1.0'))
+        # Data versions when running without Redis (single worker)
+        self._versions: Dict[str, Dict[str, int]] = {}
+        # Local copy of each user's Redis version hash, kept in L1 under its Redis key so
+        # bumps on other workers drop it over pub/sub; reads that overlap a drop are not kept
+        self.version_ttl = float(os.getenv('CACHE_VERSION_TTL_SECONDS', '2'))
+        self._version_generation = 0
         self.cache_stats = {
             'hits': 0,
             'misses': 0,
             'sets': 0,
-            'deletes': 0
+            'deletes': 0,
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'loads': 0,
+            'invalidations_published': 0,
+            'invalidations_received': 0,
+            'tag_invalidations': 0,
+            'stale_served': 0,
+            'early_refreshes': 0,
+            'refreshes': 0,
+            'lock_waits': 0
         }
         
         # Initialize Redis connection
@@ -69,19 +153,31 @@ class CacheService:
             
             # Try to initialize Redis with rapid timeout
             try:
-                self.redis_client = redis.from_url(
-                    redis_url, 
-                    decode_responses=True,
+                # Callers wait for a free connection instead of failing under bursts;
+                # every call is bounded by its own timeout anyway
+                pool = redis.BlockingConnectionPool.from_url(
+                    redis_url,
+                    decode_responses=False,  # values are binary (see cache_codec.py)
                     socket_connect_timeout=2,
                     socket_timeout=2,
                     retry_on_timeout=False,  # No retries for better performance
-                    max_connections=5
+                    max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', '50')),
+                    timeout=float(os.getenv('REDIS_POOL_TIMEOUT_SECONDS', '1'))
+                )
+                self.redis_client = redis.Redis(connection_pool=pool)
+                # No socket timeout: the listener blocks on reads between messages
+                self.pubsub_client = redis.from_url(
+                    redis_url,
+                    decode_responses=False,
+                    socket_connect_timeout=2,
+                    max_connections=1
                 )
                 logger.info(f"✅ Redis cache initialized successfully")
                 
             except Exception as e:
                 logger.info(f"⚠️ Redis initialization failed: {e}, using memory cache")
                 self.redis_client = None
+                self.pubsub_client = None
             
         except Exception as e:
             logger.info(f"⚠️ Redis setup failed: {e}, using memory cache")
@@ -109,75 +205,105 @@ class CacheService:
         return cache_key
     
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache with Redis fallback to memory"""
+        """Get value from the in-process L1, falling back to Redis (L2) and filling L1 on a hit"""
         try:
-            # Try Redis first only if available and initialized properly
+            # L1: no network hop
+            started = time.perf_counter()
+            cached_data = self.memory_cache.get(key)
+            if cached_data is not None:
+                value = self.codec.decode(cached_data)
+                self.metrics.observe('get', 'l1', time.perf_counter() - started)
+                self.metrics.record(key, 'l1_hits')
+                self.cache_stats['hits'] += 1
+                self.cache_stats['l1_hits'] += 1
+                return value
+            self.metrics.observe('get', 'l1', time.perf_counter() - started)
+            
+            # L2: Redis, only if available and initialized properly
             if self.redis_client:
+                self._ensure_invalidation_listener()
                 try:
-                    # Set a short timeout to prevent Redis from blocking performance
-                    cached_data = await asyncio.wait_for(
-                        self.redis_client.get(key), 
+                    # GET and PTTL in one round trip so L1 never outlives the Redis entry
+                    async def fetch():
+                        async with self.redis_client.pipeline(transaction=False) as pipe:
+                            pipe.get(key)
+                            pipe.pttl(key)
+                            return await pipe.execute()
+                    
+                    started = time.perf_counter()
+                    cached_data, ttl_ms = await asyncio.wait_for(
+                        fetch(),
                         timeout=0.1  # 100ms timeout for Redis calls
                     )
+                    self.metrics.observe('get', 'l2', time.perf_counter() - started)
                     if cached_data:
+                        # L1 keeps the uncompressed payload so its hits skip decompression
+                        payload = self.codec.expand(cached_data)
+                        value = self.codec.decode(payload)
+                        l1_ttl = self.l1_ttl if not ttl_ms or ttl_ms < 0 else min(self.l1_ttl, ttl_ms / 1000)
+                        self.memory_cache.set(key, payload, l1_ttl, size=len(payload))
+                        self.metrics.record(key, 'l2_hits')
+                        self.metrics.record(key, 'bytes_read', len(cached_data))
                         self.cache_stats['hits'] += 1
-                        return json.loads(cached_data)
+                        self.cache_stats['l2_hits'] += 1
+                        return value
                 except (asyncio.TimeoutError, Exception) as e:
-                    # Redis failed - fall back to memory immediately
+                    # Redis failed - treat as a miss
                     logger.debug(f"Redis get timeout/error: {e}")
-                    pass
-            
-            # Fallback to memory cache
-            if key in self.memory_cache:
-                cache_entry = self.memory_cache[key]
-                
-                # Check expiration
-                if cache_entry['expires_at'] > datetime.utcnow():
-                    self.cache_stats['hits'] += 1
-                    return cache_entry['data']
-                else:
-                    # Remove expired entry
-                    del self.memory_cache[key]
             
+            self.metrics.record(key, 'misses')
             self.cache_stats['misses'] += 1
             return None
             
         except Exception as e:
             logger.debug(f"Cache get error: {e}")
+            self.metrics.record(key, 'misses')
             self.cache_stats['misses'] += 1
             return None
     
-    async def set(self, key: str, value: Any, ttl_seconds: int = 300) -> bool:
-        """Set value in cache with TTL"""
+    async def set(self, key: str, value: Any, ttl_seconds: int = 300, tags: Sequence[str] = ()) -> bool:
+        """Set value in Redis (L2) and the local L1, telling other workers to drop their L1 copy"""
         try:
-            serialized_value = json.dumps(value, default=str)
+            serialized_value = self.codec.encode(value)
+            tags = tuple(tags)
+            self.metrics.record(key, 'sets')
             
             # Try Redis first only if available
             if self.redis_client:
+                self._ensure_invalidation_listener()
                 try:
+                    stored = self.codec.compress(serialized_value)
+                    
+                    async def store():
+                        async with self.redis_client.pipeline(transaction=False) as pipe:
+                            pipe.setex(key, ttl_seconds, stored)
+                            for tag in tags:
+                                pipe.sadd(TAG_KEY_PREFIX + tag, key)
+                                pipe.expire(TAG_KEY_PREFIX + tag, max(ttl_seconds, self.tag_ttl))
+                            pipe.publish(self.invalidation_channel, self._invalidation_message([key]))
+                            return await pipe.execute()
+                    
+                    started = time.perf_counter()
                     await asyncio.wait_for(
-                        self.redis_client.setex(key, ttl_seconds, serialized_value),
+                        store(),
                         timeout=0.1  # 100ms timeout for Redis calls
                     )
+                    self.metrics.observe('set', 'l2', time.perf_counter() - started)
+                    self.metrics.record(key, 'bytes_written', len(stored))
+                    self.memory_cache.set(key, serialized_value, min(ttl_seconds, self.l1_ttl),
+                                          size=len(serialized_value), tags=tags)
                     self.cache_stats['sets'] += 1
                     return True
                 except (asyncio.TimeoutError, Exception) as e:
-                    # Redis failed - continue to memory cache
+                    # Redis failed - continue to memory cache, but only for as long as an L1
+                    # copy lives: other workers' invalidations may not reach this one meanwhile
                     logger.debug(f"Redis set timeout/error: {e}")
-                    pass
+                    ttl_seconds = min(ttl_seconds, self.l1_ttl)
             
-            # Fallback to memory cache (always works)
-            expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-            self.memory_cache[key] = {
-                'data': value,
-                'expires_at': expires_at
-            }
-            
-            # Memory cache cleanup (keep last 1000 entries)
-            if len(self.memory_cache) > 1000:
-                oldest_keys = sorted(self.memory_cache.keys())[:100]
-                for old_key in oldest_keys:
-                    del self.memory_cache[old_key]
+            # Without Redis the memory tier holds the value for its full TTL
+            started = time.perf_counter()
+            self.memory_cache.set(key, serialized_value, ttl_seconds, size=len(serialized_value), tags=tags)
+            self.metrics.observe('set', 'l1', time.perf_counter() - started)
             
             self.cache_stats['sets'] += 1
             return True
@@ -186,6 +312,166 @@ class CacheService:
             logger.error(f"Cache set error: {e}")
             return False
     
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl_seconds: int = 300,
+                          tags: Sequence[str] = (), stale_ttl_seconds: float = 0) -> Any:
+        """
+        Read-through: return the cached value or run `loader`, cache and return its result.
+        Concurrent misses for the same key in this worker share one loader call.
+        
+        With stale_ttl_seconds > 0 the value is fresh for ttl_seconds and kept for another
+        stale_ttl_seconds: a stale hit is returned immediately while one background refresh
+        runs (one per key across workers, via a Redis lock). Refreshes also start early with
+        a probability that grows towards expiry and with the loader's cost (XFetch), so
+        popular keys rarely expire at all.
+        """
+        cached = await self.get(key)
+        if stale_ttl_seconds <= 0:
+            if cached is not None:
+                return cached
+            return await self._load(key, loader, ttl_seconds, tags, 0)
+        
+        if isinstance(cached, dict) and cached.get('_swr') == 1:
+            if not self._should_refresh(cached):
+                return cached['value']
+            if time.time() >= cached['fresh_until']:
+                self.metrics.record(key, 'stale_served')
+                self.cache_stats['stale_served'] += 1
+            else:
+                self.cache_stats['early_refreshes'] += 1
+            self._schedule_refresh(key, loader, ttl_seconds, tags, stale_ttl_seconds)
+            return cached['value']
+        if cached is not None:
+            # Written without refresh metadata (e.g. by an older deploy)
+            return cached
+        return await self._load(key, loader, ttl_seconds, tags, stale_ttl_seconds, use_lock=True)
+    
+    def _should_refresh(self, entry: Dict[str, Any]) -> bool:
+        """XFetch: refresh once now - delta * beta * ln(rand) passes the soft expiry"""
+        gap = entry.get('delta', 0) * self.early_expiry_beta * -math.log(random.random() or 1e-12)
+        return time.time() + gap >= entry['fresh_until']
+    
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl_seconds: int,
+                    tags: Sequence[str], stale_ttl_seconds: float, use_lock: bool = False) -> Any:
+        """
+        Run the loader once per key in this worker and cache its result. With use_lock,
+        a worker that finds another one computing the key waits briefly for its result.
+        """
+        pending = self._loading.get(key)
+        if pending is not None:
+            return copy.deepcopy(await asyncio.shield(pending))
+        
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._loading[key] = future
+        token = None
+        try:
+            if use_lock:
+                token = await self._acquire_lock(key)
+                if token is None:
+                    value = await self._wait_for_peer(key)
+                    if value is not None:
+                        future.set_result(value)
+                        return value
+            
+            started = time.monotonic()
+            value = await loader()
+            self.cache_stats['loads'] += 1
+            if value is not None:
+                if stale_ttl_seconds > 0:
+                    entry = {
+                        '_swr': 1,
+                        'value': value,
+                        'fresh_until': time.time() + ttl_seconds,
+                        'delta': time.monotonic() - started
+                    }
+                    await self.set(key, entry, int(ttl_seconds + stale_ttl_seconds), tags=tags)
+                else:
+                    await self.set(key, value, ttl_seconds, tags=tags)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+            if token is not None:
+                await self._release_lock(key, token)
+    
+    async def _wait_for_peer(self, key: str) -> Any:
+        """Poll for the value another worker is computing; None if it doesn't show up in time"""
+        self.cache_stats['lock_waits'] += 1
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            cached = await self.get(key)
+            if isinstance(cached, dict) and cached.get('_swr') == 1:
+                return cached['value']
+        return None
+    
+    def _schedule_refresh(self, key: str, loader: Callable[[], Awaitable[Any]], ttl_seconds: int,
+                          tags: Sequence[str], stale_ttl_seconds: float):
+        """Refresh a stale key in the background unless this worker already is"""
+        if key in self._loading or key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(key, loader, ttl_seconds, tags, stale_ttl_seconds))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]], ttl_seconds: int,
+                       tags: Sequence[str], stale_ttl_seconds: float):
+        token = None
+        try:
+            token = await self._acquire_lock(key)
+            # Another worker holding the lock is already refreshing this key
+            if token is None:
+                return
+            await self._load(key, loader, ttl_seconds, tags, stale_ttl_seconds)
+            self.cache_stats['refreshes'] += 1
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+            if token is not None:
+                await self._release_lock(key, token)
+    
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """
+        Take the per-key recompute lock shared by all workers. Returns the lock token,
+        or None if another worker holds it (always granted without Redis).
+        """
+        if not self.redis_client:
+            return ''
+        token = uuid.uuid4().hex
+        try:
+            if await self.redis_client.set(LOCK_KEY_PREFIX + key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                return token
+            return None
+        except Exception as e:
+            # Don't hold up loads because Redis is unhappy
+            logger.warning(f"Redis cache lock error: {e}")
+            return ''
+    
+    async def _release_lock(self, key: str, token: str):
+        if not self.redis_client or not token:
+            return
+        lock_key = LOCK_KEY_PREFIX + key
+        try:
+            # Only delete the lock if it is still ours (it may have expired and been retaken)
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(lock_key)
+                if _text(await pipe.get(lock_key)) == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis cache lock release error: {e}")
+    
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
         try:
@@ -194,14 +480,16 @@ class CacheService:
             # Try Redis first
             if self.redis_client:
                 try:
-                    result = await self.redis_client.delete(key)
+                    async with self.redis_client.pipeline(transaction=False) as pipe:
+                        pipe.delete(key)
+                        pipe.publish(self.invalidation_channel, self._invalidation_message([key]))
+                        result, _ = await pipe.execute()
                     deleted = result > 0
                 except Exception as e:
                     logger.warning(f"Redis delete error: {e}")
             
             # Also remove from memory cache
-            if key in self.memory_cache:
-                del self.memory_cache[key]
+            if self.memory_cache.delete(key):
                 deleted = True
             
             if deleted:
@@ -213,24 +501,75 @@ class CacheService:
             logger.error(f"Cache delete error: {e}")
             return False
     
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Delete every entry carrying any of the tags, in Redis, locally and in other workers' L1"""
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return 0
+        try:
+            deleted_count = 0
+            
+            if self.redis_client:
+                try:
+                    # Read and drop each tag set atomically, so keys tagged meanwhile land in a fresh set
+                    async with self.redis_client.pipeline(transaction=True) as pipe:
+                        for tag in tags:
+                            pipe.smembers(TAG_KEY_PREFIX + tag)
+                        pipe.delete(*(TAG_KEY_PREFIX + tag for tag in tags))
+                        results = await pipe.execute()
+                    keys = sorted({_text(key) for members in results[:-1] for key in members})
+                    
+                    async with self.redis_client.pipeline(transaction=False) as pipe:
+                        if keys:
+                            pipe.delete(*keys)
+                        pipe.publish(self.invalidation_channel, self._invalidation_message(keys, tags))
+                        results = await pipe.execute()
+                    if keys:
+                        deleted_count += results[0]
+                    for key in keys:
+                        self.memory_cache.delete(key)
+                except Exception as e:
+                    logger.warning(f"Redis tag invalidation error: {e}")
+            
+            deleted_count += self.memory_cache.invalidate_tags(tags)
+            
+            self.cache_stats['tag_invalidations'] += 1
+            self.cache_stats['deletes'] += deleted_count
+            return deleted_count
+            
+        except Exception as e:
+            logger.error(f"Cache tag invalidation error: {e}")
+            return 0
+    
     async def invalidate_pattern(self, pattern: str) -> int:
-        """Invalidate all keys matching pattern"""
+        """
+        Invalidate all keys matching a glob pattern.
+        Prefer invalidate_tags: this walks the keyspace with SCAN (incremental, never
+        blocking Redis like KEYS did) and is kept for ad-hoc maintenance.
+        """
         try:
             deleted_count = 0
             
             # Redis pattern invalidation
             if self.redis_client:
                 try:
-                    keys = await self.redis_client.keys(pattern)
-                    if keys:
-                        deleted_count += await self.redis_client.delete(*keys)
+                    batch = []
+                    async for key in self.redis_client.scan_iter(match=pattern, count=500):
+                        batch.append(_text(key))
+                        if len(batch) >= 500:
+                            deleted_count += await self.redis_client.delete(*batch)
+                            await self._publish_invalidation(batch)
+                            batch = []
+                    if batch:
+                        deleted_count += await self.redis_client.delete(*batch)
+                        await self._publish_invalidation(batch)
                 except Exception as e:
                     logger.warning(f"Redis pattern delete error: {e}")
             
-            # Memory cache pattern invalidation
-            keys_to_delete = [key for key in self.memory_cache.keys() if pattern.replace('*', '') in key]
+            # Memory cache pattern invalidation (same glob semantics as Redis)
+            keys_to_delete = [key for key in self.memory_cache.keys() if fnmatch.fnmatchcase(key, pattern)]
             for key in keys_to_delete:
-                del self.memory_cache[key]
+                self.memory_cache.delete(key)
                 deleted_count += 1
             
             self.cache_stats['deletes'] += deleted_count
@@ -240,6 +579,62 @@ class CacheService:
             logger.error(f"Cache pattern invalidation error: {e}")
             return 0
     
+    # Cross-worker L1 invalidation over Redis pub/sub
+    def _invalidation_message(self, keys: List[str], tags: Sequence[str] = ()) -> str:
+        self.cache_stats['invalidations_published'] += 1
+        return json.dumps({'origin': self.instance_id, 'keys': list(keys), 'tags': list(tags)})
+    
+    async def _publish_invalidation(self, keys: List[str]):
+        try:
+            await self.redis_client.publish(self.invalidation_channel, self._invalidation_message(keys))
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish error: {e}")
+    
+    def _ensure_invalidation_listener(self):
+        """Start the pub/sub listener once an event loop is running"""
+        if self._listener_task is None or self._listener_task.done():
+            try:
+                self._listener_task = asyncio.get_running_loop().create_task(self._listen_for_invalidations())
+            except RuntimeError:
+                pass
+    
+    def _apply_invalidation(self, data) -> int:
+        """Drop L1 entries named by another worker's invalidation message"""
+        payload = json.loads(data)
+        if payload.get('origin') == self.instance_id:
+            return 0
+        self._version_generation += 1
+        dropped = sum(1 for key in payload.get('keys', []) if self.memory_cache.delete(key))
+        dropped += self.memory_cache.invalidate_tags(payload.get('tags', []))
+        self.cache_stats['invalidations_received'] += 1
+        return dropped
+    
+    async def _listen_for_invalidations(self):
+        backoff = 0.5
+        while self.redis_client:
+            # Off the shared pool, so the listener never takes a connection callers need
+            pubsub = (self.pubsub_client or self.redis_client).pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                backoff = 0.5
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._apply_invalidation(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected; L1 can no longer be trusted
+                logger.warning(f"Cache invalidation listener error: {e}; clearing L1")
+                self._version_generation += 1
+                self.memory_cache.clear()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         total_requests = self.cache_stats['hits'] + self.cache_stats['misses']
@@ -248,14 +643,22 @@ class CacheService:
         return {
             **self.cache_stats,
             'hit_rate_percentage': round(hit_rate, 2),
+            'l1_ttl_seconds': self.l1_ttl,
             'memory_cache_size': len(self.memory_cache),
+            'memory_cache': self.memory_cache.get_stats(),
+            'codec': self.codec.get_stats(),
+            **self.metrics.get_stats(),
             'redis_available': self.redis_client is not None
         }
     
+    def get_prometheus_metrics(self) -> str:
+        """Cache statistics in the Prometheus text exposition format"""
+        return render_prometheus(self.metrics, self.get_stats())
+    
     async def cache_user_data(self, user_id: str, data_type: str, data: Any, ttl_seconds: int = 300):
         """Cache user-specific data with automatic key generation"""
         cache_key = self._generate_cache_key(f"user_data:{data_type}", user_id=user_id)
-        await self.set(cache_key, data, ttl_seconds)
+        await self.set(cache_key, data, ttl_seconds, tags=(user_tag(user_id), user_tag(user_id, data_type)))
     
     async def get_user_data(self, user_id: str, data_type: str) -> Optional[Any]:
         """Get cached user-specific data"""
@@ -263,22 +666,122 @@ class CacheService:
         return await self.get(cache_key)
     
     async def invalidate_user_cache(self, user_id: str, data_type: str = None):
-        """Invalidate all cached data for a user or specific data type"""
-        if data_type:
-            pattern = f"user_data:{data_type}:user:{user_id}*"
+        """
+        Invalidate all cached data for a user, or only what depends on one entity type
+        (e.g. data_type='tasks' drops task lists, dashboards and insights but not pillars).
+        Also bumps the user's data versions, which moves versioned keys and ETags on.
+        """
+        await self.bump_data_version(user_id, [data_type] if data_type else None)
+        return await self.invalidate_tags([user_tag(user_id, data_type)])
+    
+    async def get_data_versions(self, user_id: str, entities: Optional[Sequence[str]] = None) -> Optional[Dict[str, int]]:
+        """
+        A user's data version counters: ANY_CHANGE, USER_EPOCH and one per entity type
+        (all of them if `entities` is None). None if Redis can't be read, since guessing
+        could pair a key with data it never held; callers should bypass the cache then.
+        """
+        uid = str(user_id)
+        fields = None if entities is None else [ANY_CHANGE, USER_EPOCH, *entities]
+        if self.redis_client:
+            key = VERSION_KEY_PREFIX + uid
+            local = self.memory_cache.get(key)
+            if local is None:
+                self._ensure_invalidation_listener()
+                generation = self._version_generation
+                try:
+                    raw = await asyncio.wait_for(
+                        self.redis_client.hgetall(key),
+                        timeout=0.1  # 100ms timeout for Redis calls
+                    )
+                except (asyncio.TimeoutError, Exception) as e:
+                    logger.warning(f"Redis data version read error: {e}")
+                    return None
+                local = {_text(k): int(v) for k, v in raw.items()}
+                if generation == self._version_generation:
+                    self.memory_cache.set(key, local, self.version_ttl, size=64 * (len(local) + 1))
         else:
-            pattern = f"user_data:*:user:{user_id}*"
-        
-        return await self.invalidate_pattern(pattern)
+            local = self._versions.get(uid, {})
+        versions = dict(local) if fields is None else {field: local.get(field, 0) for field in fields}
+        versions.setdefault(ANY_CHANGE, 0)
+        versions.setdefault(USER_EPOCH, 0)
+        return versions
+    
+    async def get_data_version(self, user_id: str) -> int:
+        """Overall data version of a user; changes whenever any of their data is written"""
+        versions = await self.get_data_versions(user_id, ())
+        return versions[ANY_CHANGE] if versions else 0
+    
+    async def bump_data_version(self, user_id: str, entities: Optional[Sequence[str]] = None) -> int:
+        """
+        Advance a user's data versions after a write to `entities`, or to anything
+        (None: bumps the user epoch, which every versioned key includes). Counters never
+        expire: a restarted counter could line up with keys written before it was lost.
+        """
+        uid = str(user_id)
+        fields = [ANY_CHANGE] + ([USER_EPOCH] if entities is None else list(dict.fromkeys(entities)))
+        if self.redis_client:
+            key = VERSION_KEY_PREFIX + uid
+            try:
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    for field in fields:
+                        pipe.hincrby(key, field, 1)
+                    # Other workers drop their copy of the hash
+                    pipe.publish(self.invalidation_channel, self._invalidation_message([key]))
+                    results = await pipe.execute()
+                # Drop our copy too, and keep reads that overlapped the bump from restoring it
+                self._version_generation += 1
+                self.memory_cache.delete(key)
+                return int(results[0])
+            except Exception as e:
+                logger.warning(f"Redis data version bump error: {e}")
+        local = self._versions.setdefault(uid, {})
+        for field in fields:
+            local[field] = local.get(field, 0) + 1
+        return local[ANY_CHANGE]
+
+
+def version_token(versions: Dict[str, int], entities: Sequence[str]) -> str:
+    """
+    Key / ETag component naming the state of the given entity types: the user epoch plus
+    the sum of their counters (counters only grow, so the sum changes with any of them)
+    """
+    return f"{versions.get(USER_EPOCH, 0)}.{sum(versions.get(e, 0) for e in entities)}"
+
+
+def _result_restorer(func: Callable) -> Callable[[Any], Any]:
+    """
+    Rebuilds a cached (JSON) result into func's declared return type, e.g. models and
+    datetimes; identity when func declares none
+    """
+    try:
+        declared = typing.get_type_hints(func).get('return')
+    except Exception:
+        declared = None
+    if declared is None or declared is Any:
+        return lambda value: value
+    return TypeAdapter(declared).validate_python
 
 # Global cache service instance
 cache_service = CacheService()
 
-def cache_result(cache_key_prefix: str, ttl_seconds: int = 300, user_specific: bool = True):
+def cache_result(cache_key_prefix: str, ttl_seconds: int = 300, user_specific: bool = True,
+                 depends_on: Sequence[str] = (), stale_ttl_seconds: int = 0):
     """
-    Decorator for caching function results
+    Decorator for caching function results.
+    User-specific results are tagged user:{id} and user:{id}:{entity} for each entity type
+    in `depends_on` (default: the prefix), so invalidate_user_cache(user_id, entity) drops them.
+    Their keys also carry the version of those entity types, so a load that raced a write
+    is stored under a key no later read asks for. With Redis, TTLs then only bound memory
+    use; without it, versions are per worker and the TTL bounds how long other workers'
+    writes go unseen, so keep it short there.
+    With stale_ttl_seconds > 0, a result past ttl_seconds is served stale for up to that
+    long while a single background refresh recomputes it (default 0: expire outright).
+    Results are cached in their JSON form (jsonable_encoder) and rebuilt into the declared
+    return type, so a hit returns the same models / datetimes as a miss.
     """
     def decorator(func):
+        restore = _result_restorer(func)
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # Extract user_id if this is user-specific caching
@@ -287,47 +790,55 @@ def cache_result(cache_key_prefix: str, ttl_seconds: int = 300, user_specific: b
                 # Assume first argument is user_id for user-specific functions
                 user_id = str(args[0])
             
-            # Generate cache key
-            cache_key = cache_service._generate_cache_key(
-                cache_key_prefix,
-                user_id=user_id,
-                **{k: str(v) for k, v in kwargs.items() if v is not None}
-            )
+            entities = tuple(depends_on or (cache_key_prefix,))
+            params = {k: str(v) for k, v in kwargs.items() if v is not None}
+            if user_id:
+                versions = await cache_service.get_data_versions(user_id, entities)
+                if versions is None:
+                    return await func(*args, **kwargs)
+                params['v'] = version_token(versions, entities)
             
-            # Try to get from cache
-            cached_result = await cache_service.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"🎯 Cache HIT: {cache_key}")
-                return cached_result
+            # Generate cache key
+            cache_key = cache_service._generate_cache_key(cache_key_prefix, user_id=user_id, **params)
             
-            # Cache miss - execute function
-            logger.debug(f"💿 Cache MISS: {cache_key}")
-            result = await func(*args, **kwargs)
+            # Read-through: L1, then Redis, then the function itself (once per key per worker)
+            async def load():
+                logger.debug(f"💿 Cache MISS: {cache_key}")
+                return jsonable_encoder(await func(*args, **kwargs))
             
-            # Cache the result
-            await cache_service.set(cache_key, result, ttl_seconds)
+            tags = ()
+            if user_id:
+                tags = (user_tag(user_id),) + tuple(user_tag(user_id, e) for e in entities)
             
-            return result
+            result = await cache_service.get_or_load(cache_key, load, ttl_seconds, tags=tags,
+                                                     stale_ttl_seconds=stale_ttl_seconds)
+            return None if result is None else restore(result)
         return wrapper
     return decorator
 
 # Convenience decorators for common caching patterns
 def cache_dashboard_data(ttl_seconds: int = 180):
     """Cache dashboard data for 3 minutes"""
-    return cache_result("dashboard", ttl_seconds=ttl_seconds, user_specific=True)
+    return cache_result("dashboard", ttl_seconds=ttl_seconds, user_specific=True,
+                        depends_on=("pillars", "areas", "projects", "tasks"))
 
 def cache_user_projects(ttl_seconds: int = 300):
     """Cache user projects for 5 minutes"""
-    return cache_result("projects", ttl_seconds=ttl_seconds, user_specific=True)
+    return cache_result("projects", ttl_seconds=ttl_seconds, user_specific=True,
+                        depends_on=("projects", "tasks"))
 
 def cache_user_areas(ttl_seconds: int = 300):
     """Cache user areas for 5 minutes"""
-    return cache_result("areas", ttl_seconds=ttl_seconds, user_specific=True)
+    return cache_result("areas", ttl_seconds=ttl_seconds, user_specific=True,
+                        depends_on=("areas", "projects", "tasks"))
 
 def cache_user_pillars(ttl_seconds: int = 300):
     """Cache user pillars for 5 minutes"""
-    return cache_result("pillars", ttl_seconds=ttl_seconds, user_specific=True)
+    return cache_result("pillars", ttl_seconds=ttl_seconds, user_specific=True,
+                        depends_on=("pillars", "areas", "projects", "tasks"))
 
-def cache_insights_data(ttl_seconds: int = 600):
+def cache_insights_data(ttl_seconds: int = 600, stale_ttl_seconds: int = 0):
     """Cache insights data for 10 minutes"""
-    return cache_result("insights", ttl_seconds=ttl_seconds, user_specific=True)
\ No newline at end of file
+    return cache_result("insights", ttl_seconds=ttl_seconds, user_specific=True,
+                        depends_on=("pillars", "areas", "projects", "tasks", "journal"),
+                        stale_ttl_seconds=stale_ttl_seconds)
\ No newline at end of file
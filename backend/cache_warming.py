@@ -0,0 +1,188 @@
+"""
+Cache Warming
+Precomputes a user's most requested payloads (pillar hierarchy, areas, projects, tasks,
+alignment scores, today-priorities data) right after login, token refresh, onboarding
+or a bulk import, so the first dashboard load hits the cache instead of paying for every
+query at once.
+
+Warming is background work with hard bounds: a fixed pool of CACHE_WARM_CONCURRENCY
+workers per process drains a queue of at most CACHE_WARM_QUEUE_SIZE users (requests
+beyond that are dropped), a user is warmed at most once per CACHE_WARM_COOLDOWN_SECONDS
+across all workers, and nothing is warmed while a database circuit is open. A login
+storm therefore adds at most `concurrency` query chains per process to the database.
+
+Warmers are registered by name and called as `await warmer(user_id)`; they fill the same
+cache keys the endpoints read (see cache_user_endpoint's `.warm` and cache_result).
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from cache_service import cache_service
+from db_resilience import db_resilience
+
+logger = logging.getLogger(__name__)
+
+# Redis key marking a user as warmed recently (cross-worker cooldown)
+WARM_KEY_PREFIX = 'cache:warm:'
+
+
+class CacheWarmer:
+    """Bounded background queue of per-user cache warming jobs"""
+
+    def __init__(self, cache=None, concurrency: Optional[int] = None, queue_size: Optional[int] = None,
+                 cooldown_seconds: Optional[float] = None, timeout_seconds: Optional[float] = None,
+                 is_degraded: Optional[Callable[[], bool]] = None):
+        self.cache = cache or cache_service
+        self.enabled = os.getenv('CACHE_WARMING_ENABLED', 'true').lower() == 'true'
+        self.concurrency = concurrency or int(os.getenv('CACHE_WARM_CONCURRENCY', '2'))
+        self.queue_size = queue_size or int(os.getenv('CACHE_WARM_QUEUE_SIZE', '500'))
+        self.cooldown = (cooldown_seconds if cooldown_seconds is not None
+                         else float(os.getenv('CACHE_WARM_COOLDOWN_SECONDS', '300')))
+        self.timeout = timeout_seconds or float(os.getenv('CACHE_WARM_TIMEOUT_SECONDS', '30'))
+        self.is_degraded = is_degraded or (lambda: bool(db_resilience.open_circuits()))
+        self._warmers: Dict[str, Callable[[str], Awaitable[Any]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: Set[asyncio.Task] = set()
+        self._pending: Set[str] = set()
+        # Last warm per user when running without Redis
+        self._recent: Dict[str, float] = {}
+        self.stats = {
+            'requested': 0,
+            'queued': 0,
+            'dropped': 0,
+            'skipped_recent': 0,
+            'skipped_degraded': 0,
+            'users_warmed': 0,
+            'entries_computed': 0,
+            'failures': 0,
+            'by_reason': {}
+        }
+
+    def register(self, name: str, warmer: Callable[[str], Awaitable[Any]]):
+        """
+        Add a warmer; it runs for every warmed user, after those registered before it.
+        A warmer returns False when the payload was already cached.
+        """
+        self._warmers[name] = warmer
+
+    def request(self, user_id: str, reason: str = 'login', force: bool = False) -> bool:
+        """
+        Queue a user for warming without waiting; returns False if the request was dropped.
+        `force` skips the cooldown, for events that changed the data (e.g. bulk imports).
+        """
+        if not self.enabled or not self._warmers or not user_id:
+            return False
+        user_id = str(user_id)
+        self.stats['requested'] += 1
+        self.stats['by_reason'][reason] = self.stats['by_reason'].get(reason, 0) + 1
+        if user_id in self._pending:
+            return True
+        try:
+            self._ensure_workers()
+        except RuntimeError:
+            # No running event loop (scripts, sync tests): nothing to run the job on
+            return False
+        try:
+            self._queue.put_nowait((user_id, reason, force))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            logger.debug(f"Cache warming queue full, dropped user {user_id}")
+            return False
+        self._pending.add(user_id)
+        self.stats['queued'] += 1
+        return True
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = {task for task in self._workers if not task.done()}
+        while len(self._workers) < self.concurrency:
+            self._workers.add(loop.create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            user_id, reason, force = await self._queue.get()
+            try:
+                await self.warm_user(user_id, reason, force=force)
+            except Exception as e:
+                logger.warning(f"Cache warming failed for user {user_id}: {e}")
+            finally:
+                self._pending.discard(user_id)
+                self._queue.task_done()
+
+    async def _claim(self, user_id: str) -> bool:
+        """Start the cooldown for a user; False if another worker warmed them recently"""
+        if self.cooldown <= 0:
+            return True
+        if self.cache.redis_client:
+            try:
+                return bool(await self.cache.redis_client.set(
+                    WARM_KEY_PREFIX + user_id, self.cache.instance_id, nx=True, px=int(self.cooldown * 1000)
+                ))
+            except Exception as e:
+                logger.debug(f"Redis warm cooldown error: {e}")
+        now = time.monotonic()
+        if now - self._recent.get(user_id, float('-inf')) < self.cooldown:
+            return False
+        self._recent[user_id] = now
+        if len(self._recent) > 10 * self.queue_size:
+            self._recent = {u: t for u, t in self._recent.items() if now - t < self.cooldown}
+        return True
+
+    async def warm_user(self, user_id: str, reason: str = 'login', force: bool = False) -> int:
+        """Run every warmer for a user now; returns how many entries had to be computed"""
+        user_id = str(user_id)
+        if self.is_degraded():
+            self.stats['skipped_degraded'] += 1
+            return 0
+        if not await self._claim(user_id) and not force:
+            self.stats['skipped_recent'] += 1
+            return 0
+
+        started = time.perf_counter()
+        computed = 0
+        for name, warmer in self._warmers.items():
+            try:
+                if await asyncio.wait_for(warmer(user_id), timeout=self.timeout) is not False:
+                    computed += 1
+            except Exception as e:
+                self.stats['failures'] += 1
+                logger.warning(f"Cache warmer '{name}' failed for user {user_id}: {e}")
+        self.stats['users_warmed'] += 1
+        self.stats['entries_computed'] += computed
+        logger.info(f"🔥 Warmed cache for user {user_id} ({reason}): {computed}/{len(self._warmers)} "
+                    f"payloads in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return computed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'by_reason': dict(self.stats['by_reason']),
+            'enabled': self.enabled,
+            'warmers': list(self._warmers),
+            'concurrency': self.concurrency,
+            'queue_depth': self._queue.qsize() if self._queue else 0
+        }
+
+    def stop(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+
+
+# Global cache warmer
+cache_warmer = CacheWarmer()
+
+
+def request_warmup(user_id: str, reason: str = 'login', force: bool = False) -> bool:
+    """Queue a user on the global warmer (never blocks, never raises)"""
+    try:
+        return cache_warmer.request(user_id, reason, force=force)
+    except Exception as e:
+        logger.warning(f"Cache warming request failed: {e}")
+        return False
@@ -4,84 +4,344 @@ Optimizes database connections for high-performance operations
 """
 
 import os
+import time
 import logging
-from typing import Optional
+from collections import deque
+from typing import Deque, Dict, Optional, Set
 import asyncio
 from contextlib import asynccontextmanager
 
+from httpx import AsyncClient, Limits, TransportError
+from postgrest import AsyncPostgrestClient
+
+from db_resilience import db_resilience
+
 logger = logging.getLogger(__name__)
 
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the acquire timeout"""
+    pass
+
+
+class _SingleConnectionPostgrestClient(AsyncPostgrestClient):
+    """
+    PostgREST client whose HTTP session holds exactly one keep-alive connection.
+    Requests go through the resilience layer (circuit breakers, retries, hedged reads).
+    """
+
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout) -> AsyncClient:
+        return AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=db_resilience.async_transport(
+                Limits(max_connections=1, max_keepalive_connections=1, keepalive_expiry=None)
+            )
+        )
+
+
+class PooledConnection:
+    """
+    A keep-alive PostgREST session checked out from the pool.
+    Exposes the same `table()` / `rpc()` entry points as the PostgREST client.
+    """
+
+    def __init__(self, connection_id: int, base_url: str, headers: Dict[str, str], timeout: float):
+        self.id = connection_id
+        self.client = _SingleConnectionPostgrestClient(base_url, headers=headers, timeout=timeout)
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.query_count = 0
+        self.broken = False
+
+    def table(self, table_name: str):
+        """Get a request builder for a table"""
+        self.query_count += 1
+        return self.client.from_(table_name)
+
+    from_ = table
+
+    def rpc(self, func: str, params: dict):
+        """Call a Postgres function through PostgREST"""
+        self.query_count += 1
+        return self.client.rpc(func, params)
+
+    def idle_for(self, now: float) -> float:
+        return now - self.last_used_at
+
+    def age(self, now: float) -> float:
+        return now - self.created_at
+
+    async def close(self):
+        try:
+            await self.client.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection {self.id}: {e}")
+
+
 class ConnectionPoolManager:
     """
     Manages database connection pools for optimal performance
+
+    Each pooled connection is a PostgREST session pinned to a single keep-alive
+    HTTP connection, so one checked-out connection serves one query at a time and
+    `max_size` bounds the number of in-flight queries per worker.
     """
-    
+
     def __init__(self):
-        self.pool = None
-        self.pool_size = 10
-        self.max_overflow = 20
-        self.pool_timeout = 30
-        self.pool_recycle = 3600  # 1 hour
-        
+        self.min_size = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+        self.pool_size = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+        self.pool_timeout = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30'))
+        self.max_idle_time = float(os.getenv('DB_POOL_MAX_IDLE_SECONDS', '300'))
+        self.pool_recycle = float(os.getenv('DB_POOL_RECYCLE_SECONDS', '3600'))  # 1 hour
+        self.request_timeout = float(os.getenv('SUPABASE_REQUEST_TIMEOUT', '30'))
+
+        self._base_url: Optional[str] = None
+        self._headers: Dict[str, str] = {}
+
+        self._idle: Deque[PooledConnection] = deque()
+        self._in_use: Set[PooledConnection] = set()
+        self._size = 0
+        self._next_id = 0
+        self._waiters = 0
+        self._condition = asyncio.Condition()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self._acquire_latencies_ms: Deque[float] = deque(maxlen=2048)
+        self._counters = {
+            'acquires': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0
+        }
+
+    def configure(self, rest_url: str, api_key: str, request_timeout: Optional[float] = None):
+        """Set the PostgREST endpoint and credentials used for new connections"""
+        self._base_url = rest_url
+        self._headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'apikey': api_key,
+            'Authorization': f"Bearer {api_key}"
+        }
+        if request_timeout is not None:
+            self.request_timeout = request_timeout
+
+    def _open_connection(self) -> PooledConnection:
+        if not self._base_url:
+            raise RuntimeError("Connection pool is not configured")
+        self._next_id += 1
+        self._counters['created'] += 1
+        return PooledConnection(self._next_id, self._base_url, self._headers, self.request_timeout)
+
+    def _is_expired(self, conn: PooledConnection, now: float) -> bool:
+        return conn.broken or conn.age(now) > self.pool_recycle
+
     async def initialize_pool(self):
         """Initialize connection pool with optimized settings"""
         try:
-            # For now, we'll prepare the infrastructure for connection pooling
-            # This would typically use asyncpg or similar for PostgreSQL
             logger.info("🔄 Initializing database connection pool...")
-            
-            # Connection pool would be initialized here
-            # Example configuration for future implementation:
-            pool_config = {
-                'min_size': 5,
-                'max_size': self.pool_size,
-                'max_queries': 50000,
-                'max_inactive_connection_lifetime': 300,
-                'timeout': self.pool_timeout,
-                'command_timeout': 60,
-                'server_settings': {
-                    'jit': 'off',  # Disable JIT for faster simple queries
-                    'application_name': 'aurum_life_performance'
-                }
-            }
-            
-            logger.info(f"✅ Connection pool configured: {pool_config}")
-            
+            self._closed = False
+
+            async with self._condition:
+                while self._size < self.min_size:
+                    self._idle.append(self._open_connection())
+                    self._size += 1
+
+            self._ensure_maintenance()
+            logger.info(f"✅ Connection pool ready: min={self.min_size} max={self.pool_size} "
+                        f"acquire_timeout={self.pool_timeout}s idle={self.max_idle_time}s")
+
         except Exception as e:
             logger.error(f"❌ Connection pool initialization failed: {e}")
-    
+
+    def _ensure_maintenance(self):
+        """Start the idle-recycling task once an event loop is running"""
+        if self._maintenance_task is None or self._maintenance_task.done():
+            try:
+                self._maintenance_task = asyncio.get_running_loop().create_task(self._maintenance_loop())
+            except RuntimeError:
+                pass
+
+    async def _maintenance_loop(self):
+        interval = max(1.0, min(30.0, self.max_idle_time / 2))
+        while not self._closed:
+            await asyncio.sleep(interval)
+            try:
+                await self.recycle_idle_connections()
+            except Exception as e:
+                logger.warning(f"Connection pool maintenance error: {e}")
+
+    async def recycle_idle_connections(self) -> int:
+        """Close idle connections past their idle or lifetime limits, keeping min_size warm"""
+        now = time.monotonic()
+        to_close = []
+        async with self._condition:
+            keep: Deque[PooledConnection] = deque()
+            for conn in self._idle:
+                over_min = self._size - len(to_close) > self.min_size
+                if self._is_expired(conn, now) or (over_min and conn.idle_for(now) > self.max_idle_time):
+                    to_close.append(conn)
+                else:
+                    keep.append(conn)
+            self._idle = keep
+            self._size -= len(to_close)
+            self._counters['recycled'] += len(to_close)
+            if to_close:
+                self._condition.notify(len(to_close))
+
+        for conn in to_close:
+            await conn.close()
+        return len(to_close)
+
+    async def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to `timeout` seconds for one to free up"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        self._ensure_maintenance()
+        timeout = self.pool_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        stale = []
+
+        async with self._condition:
+            while True:
+                conn = None
+                while self._idle:
+                    candidate = self._idle.pop()  # LIFO keeps the warmest connections busy
+                    if self._is_expired(candidate, time.monotonic()):
+                        stale.append(candidate)
+                        self._size -= 1
+                        self._counters['recycled'] += 1
+                        continue
+                    conn = candidate
+                    break
+
+                if conn is None and self._size < self.pool_size:
+                    conn = self._open_connection()
+                    self._size += 1
+
+                if conn is not None:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {timeout:.1f}s waiting for a database connection "
+                        f"({self._size} open, {len(self._in_use)} in use)"
+                    )
+
+                self._waiters += 1
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self._waiters -= 1
+
+            self._in_use.add(conn)
+            self._counters['acquires'] += 1
+
+        try:
+            for old in stale:
+                await old.close()
+        except BaseException:
+            # Cancelled while cleaning up: hand the slot back instead of leaking it
+            await self.release(conn)
+            raise
+
+        self._acquire_latencies_ms.append((time.monotonic() - start) * 1000)
+        return conn
+
+    async def release(self, conn: PooledConnection):
+        """Return a connection to the pool, discarding it if broken or past its lifetime"""
+        now = time.monotonic()
+        conn.last_used_at = now
+        discard = False
+
+        async with self._condition:
+            self._in_use.discard(conn)
+            if self._closed or self._is_expired(conn, now):
+                discard = True
+                self._size -= 1
+                self._counters['discarded'] += 1
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+        if discard:
+            await conn.close()
+
     @asynccontextmanager
     async def get_connection(self):
         """Get connection from pool with proper resource management"""
-        connection = None
+        connection = await self.acquire()
         try:
-            # This would acquire a connection from the pool
-            # For now, we'll use the existing Supabase client
-            from supabase_client import get_supabase_client
-            connection = get_supabase_client()
-            
             yield connection
-            
-        except Exception as e:
+        except TransportError as e:
+            # The keep-alive socket is in an unknown state; never hand it out again
+            connection.broken = True
             logger.error(f"Connection pool error: {e}")
             raise
         finally:
-            # Connection would be returned to pool here
-            pass
-    
+            await self.release(connection)
+
     async def execute_optimized_query(self, query_func, *args, **kwargs):
         """Execute query with connection pool optimization"""
         async with self.get_connection() as conn:
             return await query_func(conn, *args, **kwargs)
-    
+
+    async def close(self):
+        """Close every idle connection; in-use connections are closed when released"""
+        self._closed = True
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+
+        async with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for conn in idle:
+            await conn.close()
+
+    @staticmethod
+    def _percentile(sorted_values, pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+        return round(sorted_values[index], 3)
+
     def get_pool_stats(self):
         """Get connection pool statistics"""
+        latencies = sorted(self._acquire_latencies_ms)
+
         return {
             'pool_size': self.pool_size,
-            'max_overflow': self.max_overflow,
+            'min_size': self.min_size,
+            'size': self._size,
+            'idle': len(self._idle),
+            'in_use': len(self._in_use),
+            'waiters': self._waiters,
             'timeout': self.pool_timeout,
+            'max_idle_time': self.max_idle_time,
             'recycle_time': self.pool_recycle,
-            'status': 'configured'
+            **self._counters,
+            'acquire_latency_ms': {
+                'p50': self._percentile(latencies, 50),
+                'p95': self._percentile(latencies, 95),
+                'p99': self._percentile(latencies, 99),
+                'max': round(latencies[-1], 3) if latencies else 0.0,
+                'samples': len(latencies)
+            },
+            'status': 'closed' if self._closed else ('active' if self._base_url else 'unconfigured')
         }
 
 # Global connection pool manager
@@ -91,19 +351,16 @@ async def initialize_performance_infrastructure():
     """Initialize all performance optimization infrastructure"""
     try:
         logger.info("🚀 Initializing performance optimization infrastructure...")
-        
+
         # Initialize connection pool
         await connection_pool.initialize_pool()
-        
+
         # Initialize cache service
         from cache_service import cache_service
         logger.info("✅ Cache service initialized")
-        
+
         # Log performance readiness
         logger.info("✅ Performance optimization infrastructure ready")
-        
+
     except Exception as e:
         logger.error(f"❌ Performance infrastructure initialization failed: {e}")
-
-# Auto-initialize on import
-asyncio.create_task(initialize_performance_infrastructure())
\ No newline at end of file
@@ -0,0 +1,479 @@
+"""
+Supabase Resilience Layer
+Per-table circuit breakers, a retry budget with jittered backoff and optional hedged
+reads, applied at the HTTP transport of every PostgREST session - the pooled async
+connections used by SupabaseManager.run_query and the sync client behind the direct
+`supabase.table(...).execute()` and `supabase.auth.admin` calls. When PostgREST is
+degraded, calls against an open breaker fail immediately instead of each waiting out
+its own timeout.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean PostgREST (or the gateway in front of it) is unhealthy
+_FAILURE_STATUSES = {500, 502, 503, 504}
+_IDEMPOTENT_METHODS = ('GET', 'HEAD')
+# The request never reached the server, so even writes are safe to retry
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(Exception):
+    """A call was rejected because the circuit for its table is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {name}; retrying in {retry_in:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed -> open after `failure_threshold` consecutive failures; open rejects calls
+    for `reset_timeout` seconds, then half-open lets `half_open_max_calls` probes
+    through: a successful probe closes the circuit, a failed one reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._counters = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims a probe slot when half-open)"""
+        if self.state == self.OPEN:
+            if self.retry_in() > 0:
+                self._counters['rejected'] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probes = 0
+            logger.info(f"🟡 Circuit half-open for {self.name}")
+
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self._counters['rejected'] += 1
+                return False
+            self._probes += 1
+        return True
+
+    def release(self):
+        """Give back a probe slot claimed by allow() for a call that ended without an outcome"""
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self):
+        self._counters['successes'] += 1
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            logger.info(f"🟢 Circuit closed for {self.name}")
+
+    def record_failure(self):
+        self._counters['failures'] += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self._counters['opened'] += 1
+                logger.warning(f"🔴 Circuit open for {self.name} after {self.consecutive_failures} "
+                               f"consecutive failures; rejecting calls for {self.reset_timeout:.0f}s")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in_s': round(self.retry_in(), 2) if self.state == self.OPEN else 0.0,
+            **self._counters
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries (and hedges) at a fraction of recent traffic, so a struggling backend
+    is not hit with a multiple of its normal load: over the last `window` seconds,
+    retries may not exceed `min_per_second * window + ratio * requests`.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _prune(self, now: float):
+        horizon = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < horizon:
+                events.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def available(self) -> float:
+        self._prune(time.monotonic())
+        return self.min_per_second * self.window + self.ratio * len(self._requests) - len(self._retries)
+
+    def try_acquire(self) -> bool:
+        """Spend one retry if the budget allows it"""
+        if self.available() < 1:
+            self.exhausted += 1
+            return False
+        self._retries.append(time.monotonic())
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'available': round(self.available(), 2),
+            'requests_in_window': len(self._requests),
+            'retries_in_window': len(self._retries),
+            'exhausted': self.exhausted
+        }
+
+
+class LatencyTracker:
+    """Recent successful read latencies for one table; its p95 is the hedge delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def resource_name(request: httpx.Request) -> str:
+    """Table (or rpc/<function>) a PostgREST request targets; 'auth' for GoTrue calls"""
+    path = request.url.path
+    # Admin paths carry user ids; one breaker covers the auth service
+    if '/auth/v1/' in path:
+        return 'auth'
+    marker = '/rest/v1/'
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    return path.strip('/') or 'unknown'
+
+
+class DatabaseResilience:
+    """Breakers, retry budget and latency trackers shared by every PostgREST session in this worker"""
+
+    def __init__(self):
+        self.enabled = os.getenv('DB_RESILIENCE_ENABLED', 'true').lower() == 'true'
+        self.failure_threshold = int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', '5'))
+        self.reset_timeout = float(os.getenv('DB_BREAKER_RESET_SECONDS', '30'))
+        self.half_open_max_calls = int(os.getenv('DB_BREAKER_HALF_OPEN_CALLS', '1'))
+        self.max_retries = int(os.getenv('DB_RETRY_MAX_ATTEMPTS', '2'))
+        self.backoff_base = float(os.getenv('DB_RETRY_BACKOFF_MS', '50')) / 1000
+        self.backoff_cap = float(os.getenv('DB_RETRY_BACKOFF_CAP_MS', '1000')) / 1000
+        # The sync client runs inside async handlers, where backoff blocks the event loop
+        self.sync_backoff_cap = float(os.getenv('DB_SYNC_RETRY_BACKOFF_CAP_MS', '0')) / 1000
+        self.hedge_enabled = os.getenv('DB_HEDGE_ENABLED', 'false').lower() == 'true'
+        self.hedge_min_delay = float(os.getenv('DB_HEDGE_MIN_DELAY_MS', '20')) / 1000
+        self.hedge_min_samples = int(os.getenv('DB_HEDGE_MIN_SAMPLES', '20'))
+
+        self.budget = RetryBudget(
+            ratio=float(os.getenv('DB_RETRY_BUDGET_RATIO', '0.1')),
+            min_per_second=float(os.getenv('DB_RETRY_BUDGET_MIN_PER_SECOND', '1'))
+        )
+        self.hedge_max_connections = int(os.getenv('DB_HEDGE_MAX_CONNECTIONS', '4'))
+        self._hedge_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self._counters = {'requests': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'rejected': 0}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout, self.half_open_max_calls)
+            self.breakers[name] = breaker
+        return breaker
+
+    def tracker(self, name: str) -> LatencyTracker:
+        tracker = self.latencies.get(name)
+        if tracker is None:
+            tracker = self.latencies[name] = LatencyTracker()
+        return tracker
+
+    def hedge_transport(self) -> httpx.AsyncHTTPTransport:
+        """Small connection pool shared by hedged reads from every pooled session"""
+        if self._hedge_transport is None:
+            self._hedge_transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=self.hedge_max_connections,
+                                    max_keepalive_connections=self.hedge_max_connections)
+            )
+        return self._hedge_transport
+
+    def async_transport(self, limits: httpx.Limits) -> 'ResilientAsyncTransport':
+        """Transport for a pooled async session with the given connection limits"""
+        return ResilientAsyncTransport(httpx.AsyncHTTPTransport(limits=limits), self, self.hedge_transport())
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds to wait before hedging a read, or None while there is too little history"""
+        tracker = self.latencies.get(name)
+        if not self.hedge_enabled or tracker is None or len(tracker) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, tracker.percentile(95))
+
+    def admit(self, name: str) -> CircuitBreaker:
+        """Count a request and check its breaker; raises CircuitOpenError when open"""
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            self._counters['rejected'] += 1
+            raise CircuitOpenError(name, breaker.retry_in())
+        self._counters['requests'] += 1
+        self.budget.record_request()
+        return breaker
+
+    def may_retry(self, request: httpx.Request, error: Optional[Exception], attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if request.method not in _IDEMPOTENT_METHODS and not isinstance(error, _NOT_SENT_ERRORS):
+            return False
+        if not self.budget.try_acquire():
+            return False
+        self._counters['retries'] += 1
+        return True
+
+    def open_circuits(self) -> list:
+        return sorted(name for name, b in self.breakers.items() if b.state != CircuitBreaker.CLOSED)
+
+    def reset(self):
+        self.breakers.clear()
+        self.latencies.clear()
+        self.budget = RetryBudget(self.budget.ratio, self.budget.min_per_second, self.budget.window)
+        for key in self._counters:
+            self._counters[key] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get resilience statistics for the admin stats endpoint"""
+        return {
+            'enabled': self.enabled,
+            'status': 'degraded' if self.open_circuits() else 'healthy',
+            'open_circuits': self.open_circuits(),
+            **self._counters,
+            'retry_budget': self.budget.get_stats(),
+            'hedging': {
+                'enabled': self.hedge_enabled,
+                'delays_ms': {
+                    name: round(delay * 1000, 1)
+                    for name in sorted(self.latencies)
+                    if (delay := self.hedge_delay(name)) is not None
+                }
+            },
+            'circuits': {name: b.get_stats() for name, b in sorted(self.breakers.items())}
+        }
+
+
+def _is_failure(response: Optional[httpx.Response]) -> bool:
+    return response is not None and response.status_code in _FAILURE_STATUSES
+
+
+class ResilientAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the transport of an async PostgREST session.
+
+    Reads that outlive the table's recent p95 are hedged on a separate shared transport
+    (pooled sessions hold a single keep-alive connection, so the hedge cannot share it);
+    the first good response wins and the other attempt is cancelled.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, resilience: Optional[DatabaseResilience] = None,
+                 hedge_transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.inner = inner
+        self.resilience = resilience or db_resilience
+        self.hedge_transport = hedge_transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        resilience = self.resilience
+        if not resilience.enabled:
+            return await self.inner.handle_async_request(request)
+
+        name = resource_name(request)
+        attempt = 0
+        while True:
+            breaker = resilience.admit(name)
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                response = await self._send(request, name)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # Cancelled (or crashed) before an outcome: a half-open probe must not keep its slot
+                breaker.release()
+                raise
+
+            if error is None and not _is_failure(response):
+                breaker.record_success()
+                if request.method in _IDEMPOTENT_METHODS:
+                    resilience.tracker(name).record(time.monotonic() - started)
+                return response
+
+            breaker.record_failure()
+            if not resilience.may_retry(request, error, attempt):
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(backoff_delay(attempt, resilience.backoff_base, resilience.backoff_cap))
+            attempt += 1
+
+    async def _send(self, request: httpx.Request, name: str) -> httpx.Response:
+        delay = self.resilience.hedge_delay(name) if self.hedge_transport else None
+        if delay is None or request.method not in _IDEMPOTENT_METHODS:
+            return await self.inner.handle_async_request(request)
+
+        primary = asyncio.ensure_future(self.inner.handle_async_request(request))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self.resilience.budget.try_acquire():
+            return await primary
+
+        self.resilience._counters['hedges'] += 1
+        hedge = asyncio.ensure_future(self.hedge_transport.handle_async_request(request))
+        pending = {primary, hedge}
+        # Both attempts failing surfaces the primary's outcome
+        chosen = primary
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [t for t in done if not t.exception() and not _is_failure(t.result())]
+                if winners:
+                    chosen = winners[0]
+                    break
+            if chosen is hedge:
+                self.resilience._counters['hedge_wins'] += 1
+            return chosen.result()
+        finally:
+            for task in (primary, hedge):
+                if task is chosen:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and not task.exception():
+                    await task.result().aclose()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """
+    Breakers and retries for the sync Supabase sessions (no hedging: callers block a thread).
+    Those calls are made from async handlers, on the event loop, so retries back off by
+    at most DB_SYNC_RETRY_BACKOFF_CAP_MS (default 0: retry at once).
+    """
+
+    def __init__(self, inner: httpx.BaseTransport, resilience: Optional[DatabaseResilience] = None):
+        self.inner = inner
+        self.resilience = resilience or db_resilience
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        resilience = self.resilience
+        if not resilience.enabled:
+            return self.inner.handle_request(request)
+
+        name = resource_name(request)
+        attempt = 0
+        while True:
+            breaker = resilience.admit(name)
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                breaker.release()
+                raise
+
+            if error is None and not _is_failure(response):
+                breaker.record_success()
+                if request.method in _IDEMPOTENT_METHODS:
+                    resilience.tracker(name).record(time.monotonic() - started)
+                return response
+
+            breaker.record_failure()
+            if not resilience.may_retry(request, error, attempt):
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            cap = min(resilience.backoff_cap, resilience.sync_backoff_cap)
+            if cap > 0:
+                time.sleep(backoff_delay(attempt, resilience.backoff_base, cap))
+            attempt += 1
+
+    def close(self):
+        self.inner.close()
+
+
+def install_sync_client(client) -> None:
+    """
+    Route a supabase-py Client's table()/rpc() and auth (including auth.admin) calls
+    through the resilience layer.
+
+    The client rebuilds its PostgREST session on auth state changes, so the factory
+    is wrapped as well as any session that already exists.
+    """
+    def wrap_session(session):
+        if not isinstance(session._transport, ResilientTransport):
+            session._transport = ResilientTransport(session._transport)
+
+    def wrap(postgrest):
+        wrap_session(postgrest.session)
+        return postgrest
+
+    factory = client._init_postgrest_client
+    client._init_postgrest_client = lambda *args, **kwargs: wrap(factory(*args, **kwargs))
+    if client._postgrest is not None:
+        wrap(client._postgrest)
+    # auth and auth.admin share one HTTP session
+    wrap_session(client.auth._http_client)
+
+
+# Global resilience state shared by every PostgREST session in this worker
+db_resilience = DatabaseResilience()
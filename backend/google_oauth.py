@@ -8,11 +8,12 @@ import uuid
 import json
 import requests
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import HTTPException, status
 from pydantic import BaseModel
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
+from session_store import SessionManagerBase
 import logging
 
 logger = logging.getLogger(__name__)
@@ -162,101 +163,10 @@ class GoogleOAuthService:
                 detail="Invalid ID token"
             )
 
-class SessionManager:
-    """Manage user sessions with expiry"""
+class SessionManager(SessionManagerBase):
+    """Manage user sessions with expiry (storage: see session_store.py)"""
     
-    # In-memory session storage (in production, use Redis or database)
-    _sessions: Dict[str, Dict[str, Any]] = {}
-    
-    @classmethod
-    def create_session(cls, user_data: Dict[str, Any]) -> str:
-        """
-        Create a new session for the user
-        
-        Args:
-            user_data: User data from Google
-            
-        Returns:
-            Session token
-        """
-        session_token = str(uuid.uuid4())
-        
-        # Store session data with expiry (7 days)
-        expiry = datetime.utcnow() + timedelta(days=7)
-        
-        cls._sessions[session_token] = {
-            'user_id': user_data.get('id'),
-            'email': user_data.get('email'),
-            'name': user_data.get('name'),
-            'picture': user_data.get('picture'),
-            'created_at': datetime.utcnow(),
-            'expires_at': expiry,
-            'is_active': True
-        }
-        
-        logger.info(f"Created session for user {user_data.get('email')}")
-        return session_token
-    
-    @classmethod
-    def get_session(cls, session_token: str) -> Optional[Dict[str, Any]]:
-        """
-        Get session data if valid and not expired
-        
-        Args:
-            session_token: The session token
-            
-        Returns:
-            Session data or None if invalid/expired
-        """
-        session_data = cls._sessions.get(session_token)
-        
-        if not session_data:
-            return None
-        
-        # Check if session is expired
-        if datetime.utcnow() > session_data['expires_at']:
-            cls.delete_session(session_token)
-            return None
-        
-        # Check if session is active
-        if not session_data.get('is_active', True):
-            return None
-        
-        return session_data
-    
-    @classmethod
-    def delete_session(cls, session_token: str) -> bool:
-        """
-        Delete a session
-        
-        Args:
-            session_token: The session token to delete
-            
-        Returns:
-            True if session was deleted, False if not found
-        """
-        if session_token in cls._sessions:
-            del cls._sessions[session_token]
-            logger.info(f"Deleted session {session_token}")
-            return True
-        return False
-    
-    @classmethod
-    def extend_session(cls, session_token: str) -> bool:
-        """
-        Extend session expiry by 7 days
-        
-        Args:
-            session_token: The session token to extend
-            
-        Returns:
-            True if extended, False if session not found
-        """
-        session_data = cls._sessions.get(session_token)
-        if session_data:
-            session_data['expires_at'] = datetime.utcnow() + timedelta(days=7)
-            return True
-        return False
+    namespace = 'google'
 
 # Pydantic models for requests/responses
 class GoogleAuthInitiateResponse(BaseModel):
@@ -18,7 +18,7 @@ from graphql_schema import (
     AnalyticsPreferencesMutationResponse
 )
 from supabase_client import supabase_manager
-from cache_service import cache_service
+from cache_invalidation import publish_change
 from sentiment_analysis import analyze_journal_sentiment
 
 logger = logging.getLogger(__name__)
@@ -53,7 +53,7 @@ class Mutation:
                 task = Task(**response.data[0])
                 
                 # Invalidate cache
-                await cache_service.delete(f"tasks:{user.id}")
+                await publish_change(user.id, 'tasks', task.id)
                 
                 return TaskMutationResponse(
                     success=True,
@@ -109,7 +109,7 @@ class Mutation:
                 task = Task(**response.data[0])
                 
                 # Invalidate cache
-                await cache_service.delete(f"tasks:{user.id}")
+                await publish_change(user.id, 'tasks', input.id)
                 
                 # Update alignment score if task completed
                 if input.completed:
@@ -147,7 +147,7 @@ class Mutation:
             
             if response.data:
                 # Invalidate cache
-                await cache_service.delete(f"tasks:{user.id}")
+                await publish_change(user.id, 'tasks', id)
                 
                 return TaskMutationResponse(
                     success=True,
@@ -196,7 +196,7 @@ class Mutation:
                 project = Project(**response.data[0])
                 
                 # Invalidate cache
-                await cache_service.delete(f"projects:{user.id}")
+                await publish_change(user.id, 'projects', project.id)
                 
                 return ProjectMutationResponse(
                     success=True,
@@ -250,7 +250,7 @@ class Mutation:
                 project = Project(**response.data[0])
                 
                 # Invalidate cache
-                await cache_service.delete(f"projects:{user.id}")
+                await publish_change(user.id, 'projects', input.id)
                 
                 return ProjectMutationResponse(
                     success=True,
@@ -302,7 +302,7 @@ class Mutation:
                 )
                 
                 # Invalidate cache
-                await cache_service.delete(f"journal:{user.id}")
+                await publish_change(user.id, 'journal', entry.id)
                 
                 return JournalMutationResponse(
                     success=True,
@@ -367,7 +367,7 @@ class Mutation:
                 task = Task(**response.data[0])
                 
                 # Invalidate cache
-                await cache_service.delete(f"tasks:{user.id}")
+                await publish_change(user.id, 'tasks', id)
                 
                 # Update alignment score if completed
                 if new_completed:
@@ -455,6 +455,7 @@ class Mutation:
             
             if response.data:
                 created_area = Area(**response.data[0])
+                await publish_change(user.id, 'areas', created_area.id)
                 return AreaMutationResponse(
                     success=True,
                     message="Area created successfully",
@@ -503,6 +504,7 @@ class Mutation:
             
             if response.data:
                 updated_area = Area(**response.data[0])
+                await publish_change(user.id, 'areas', id)
                 return AreaMutationResponse(
                     success=True,
                     message="Area updated successfully",
@@ -532,6 +534,7 @@ class Mutation:
                 .eq('id', id)\
                 .eq('user_id', str(user.id))\
                 .execute()
+            await publish_change(user.id, 'areas', id, cascade=('projects', 'tasks'))
             
             return DeleteResponse(
                 success=True,
@@ -566,6 +569,7 @@ class Mutation:
             
             if response.data:
                 created_pillar = Pillar(**response.data[0])
+                await publish_change(user.id, 'pillars', created_pillar.id)
                 return PillarMutationResponse(
                     success=True,
                     message="Pillar created successfully",
@@ -612,6 +616,7 @@ class Mutation:
             
             if response.data:
                 updated_pillar = Pillar(**response.data[0])
+                await publish_change(user.id, 'pillars', id)
                 return PillarMutationResponse(
                     success=True,
                     message="Pillar updated successfully",
@@ -641,6 +646,7 @@ class Mutation:
                 .eq('id', id)\
                 .eq('user_id', str(user.id))\
                 .execute()
+            await publish_change(user.id, 'pillars', id, cascade=('areas', 'projects', 'tasks'))
             
             return DeleteResponse(
                 success=True,
@@ -24,7 +24,7 @@ from graphql_schema import (
     AnalyticsPreferences
 )
 from supabase_client import supabase_manager
-from cache_service import cache_service
+from cache_service import cache_service, user_tag
 from models import User as UserModel
 
 logger = logging.getLogger(__name__)
@@ -179,7 +179,8 @@ class Query:
         pillars = [Pillar(**pillar) for pillar in response.data]
         
         # Cache for 5 minutes
-        await cache_service.set(cache_key, response.data, ttl_seconds=300)
+        await cache_service.set(cache_key, response.data, ttl_seconds=300,
+                                tags=(user_tag(user.id), user_tag(user.id, 'pillars')))
         
         return pillars
     
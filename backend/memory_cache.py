@@ -0,0 +1,266 @@
+"""
+In-process Memory Cache Tier
+Size-bounded LRU with per-entry TTL used by CacheService. Reads, writes and evictions
+are O(1); entries are bounded by count, by estimated bytes and by optional per-prefix
+quotas, and a background sweeper drops expired entries nobody reads again.
+"""
+
+import os
+import json
+import time
+import heapq
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_prefix_quotas(spec: str) -> Dict[str, int]:
+    """Parse "dashboard=2000,insights=500" into {prefix: max entries}"""
+    quotas: Dict[str, int] = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        prefix, limit = item.split('=', 1)
+        try:
+            quotas[prefix.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid cache quota: {item}")
+    return quotas
+
+
+def key_prefix(key: str) -> str:
+    """Quota bucket of a cache key: everything before the first ':'"""
+    return key.split(':', 1)[0]
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate footprint of a cached value, measured as its JSON encoding"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'size', 'prefix', 'tags')
+
+    def __init__(self, value: Any, expires_at: float, size: int, prefix: str, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.prefix = prefix
+        self.tags = tags
+
+
+class MemoryCache:
+    """
+    LRU cache with TTL, entry / byte bounds and per-prefix quotas.
+
+    Recency is kept by an OrderedDict (move_to_end / popitem are O(1)); prefixes with
+    a quota keep their own recency order so the quota evicts that prefix's least
+    recently used key. Expiry times sit in a heap the sweeper pops in O(log n) per entry.
+    Entries may carry tags; invalidate_tags removes exactly the tagged keys.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 prefix_quotas: Optional[Dict[str, int]] = None, sweep_interval: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', '10000'))
+        self.max_bytes = max_bytes or int(os.getenv('CACHE_MEMORY_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.prefix_quotas = (prefix_quotas if prefix_quotas is not None
+                              else parse_prefix_quotas(os.getenv('CACHE_MEMORY_PREFIX_QUOTAS', '')))
+        self.sweep_interval = sweep_interval or float(os.getenv('CACHE_MEMORY_SWEEP_SECONDS', '30'))
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_prefix: Dict[str, "OrderedDict[str, None]"] = {}
+        self._prefix_counts: Dict[str, int] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self.bytes = 0
+        self._sweeper_task: Optional[asyncio.Task] = None
+        # Called as on_evict(key, reason) for entries dropped by a bound or by expiry
+        self.on_evict: Optional[Callable[[str, str], None]] = None
+        self._counters = {
+            'evicted_lru': 0,
+            'evicted_bytes': 0,
+            'evicted_quota': 0,
+            'expired': 0,
+            'rejected_oversize': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry.expires_at <= time.monotonic():
+            self._remove(key, entry)
+            self._counted_eviction(key, 'expired')
+            return default
+        self._entries.move_to_end(key)
+        bucket = self._by_prefix.get(entry.prefix)
+        if bucket is not None:
+            bucket.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl_seconds: float, size: Optional[int] = None,
+            tags: Iterable[str] = ()) -> bool:
+        """Store a value; returns False if it alone exceeds the byte bound"""
+        if size is None:
+            size = estimate_size(value)
+
+        existing = self._entries.get(key)
+        if existing is not None:
+            self._remove(key, existing)
+        if size > self.max_bytes:
+            self._counters['rejected_oversize'] += 1
+            return False
+
+        prefix = key_prefix(key)
+        expires_at = time.monotonic() + ttl_seconds
+        tags = tuple(tags)
+        self._entries[key] = _Entry(value, expires_at, size, prefix, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        self._prefix_counts[prefix] = self._prefix_counts.get(prefix, 0) + 1
+        self.bytes += size
+        heapq.heappush(self._expiry, (expires_at, key))
+
+        quota = self.prefix_quotas.get(prefix)
+        if quota is not None:
+            bucket = self._by_prefix.get(prefix)
+            if bucket is None:
+                bucket = self._by_prefix[prefix] = OrderedDict()
+            bucket[key] = None
+            while len(bucket) > quota:
+                self._evict(next(iter(bucket)), 'evicted_quota')
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)), 'evicted_lru')
+        while self.bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)), 'evicted_bytes')
+
+        # Overwrites leave stale heap items behind; rebuild before they dominate
+        if len(self._expiry) > 2 * len(self._entries) + 1024:
+            self._expiry = [(e.expires_at, k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry)
+
+        self._ensure_sweeper()
+        return True
+
+    def delete(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        self._remove(key, entry)
+        return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying any of the tags; O(number of tagged keys)"""
+        removed = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                removed += self.delete(key)
+        return removed
+
+    def tagged_keys(self, tag: str) -> Set[str]:
+        return set(self._tags.get(tag, ()))
+
+    def clear(self):
+        self._entries.clear()
+        self._by_prefix.clear()
+        self._prefix_counts.clear()
+        self._tags.clear()
+        self._expiry.clear()
+        self.bytes = 0
+
+    def _evict(self, key: str, reason: str):
+        self._remove(key, self._entries[key])
+        self._counted_eviction(key, reason)
+
+    def _counted_eviction(self, key: str, reason: str):
+        self._counters[reason] += 1
+        if self.on_evict is not None:
+            try:
+                self.on_evict(key, reason)
+            except Exception as e:
+                logger.debug(f"Memory cache eviction listener error: {e}")
+
+    def _remove(self, key: str, entry: _Entry):
+        del self._entries[key]
+        remaining = self._prefix_counts[entry.prefix] - 1
+        if remaining:
+            self._prefix_counts[entry.prefix] = remaining
+        else:
+            del self._prefix_counts[entry.prefix]
+        bucket = self._by_prefix.get(entry.prefix)
+        if bucket is not None:
+            del bucket[key]
+        for tag in entry.tags:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+        self.bytes -= entry.size
+
+    def sweep(self, now: Optional[float] = None, limit: int = 10000) -> int:
+        """Drop up to `limit` expired entries; returns how many were removed"""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now and removed < limit:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._entries.get(key)
+            # Skip heap items left behind by overwrites and deletes
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key, entry)
+                self._counted_eviction(key, 'expired')
+                removed += 1
+        return removed
+
+    def _ensure_sweeper(self):
+        """Start the TTL sweeper once an event loop is running"""
+        if self._sweeper_task is None or self._sweeper_task.done():
+            try:
+                self._sweeper_task = asyncio.get_running_loop().create_task(self._sweep_loop())
+            except RuntimeError:
+                pass
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.debug(f"🧹 Memory cache swept {removed} expired entries")
+            except Exception as e:
+                logger.warning(f"Memory cache sweep error: {e}")
+
+    def stop(self):
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            self._sweeper_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory tier statistics"""
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'tags': len(self._tags),
+            **self._counters,
+            'prefixes': {
+                prefix: {'entries': count, 'quota': self.prefix_quotas.get(prefix)}
+                for prefix, count in sorted(self._prefix_counts.items())
+            }
+        }
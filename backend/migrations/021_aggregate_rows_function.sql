@@ -0,0 +1,135 @@
+-- Server-side aggregation for SupabaseManager.aggregate_documents
+-- Migration: 021_aggregate_rows_function.sql
+--
+-- aggregate_documents compiles $match / $group / $sort / $limit pipelines
+-- (see backend/query_aggregation.py) into one call to aggregate_rows, so group-by
+-- counts come back as a handful of rows instead of whole tables.
+
+-- Render the JSON where-tree produced by query_aggregation.compile_match
+CREATE OR REPLACE FUNCTION aggregate_rows_where(p_node JSONB)
+RETURNS TEXT AS $$
+DECLARE
+    v_op TEXT := p_node->>'op';
+    v_column TEXT;
+    v_value JSONB;
+    v_text TEXT;
+    v_parts TEXT[] := ARRAY[]::TEXT[];
+    v_child JSONB;
+BEGIN
+    IF v_op IN ('and', 'or') THEN
+        FOR v_child IN SELECT * FROM jsonb_array_elements(COALESCE(p_node->'args', '[]'::JSONB)) LOOP
+            v_parts := v_parts || aggregate_rows_where(v_child);
+        END LOOP;
+        IF array_length(v_parts, 1) IS NULL THEN
+            RETURN 'TRUE';
+        END IF;
+        RETURN '(' || array_to_string(v_parts, CASE WHEN v_op = 'and' THEN ' AND ' ELSE ' OR ' END) || ')';
+    END IF;
+
+    v_column := p_node->>'column';
+    v_value := p_node->'value';
+    v_text := p_node->>'value';
+    IF v_column IS NULL OR v_column = '' THEN
+        RAISE EXCEPTION 'aggregate_rows: filter on % is missing a column', v_op;
+    END IF;
+
+    -- Untyped literals are coerced to the column type by Postgres
+    RETURN CASE v_op
+        WHEN 'eq' THEN format('%I = %L', v_column, v_text)
+        WHEN 'neq' THEN format('%I <> %L', v_column, v_text)
+        WHEN 'lt' THEN format('%I < %L', v_column, v_text)
+        WHEN 'lte' THEN format('%I <= %L', v_column, v_text)
+        WHEN 'gt' THEN format('%I > %L', v_column, v_text)
+        WHEN 'gte' THEN format('%I >= %L', v_column, v_text)
+        WHEN 'match' THEN format('%I::TEXT ~ %L', v_column, v_text)
+        WHEN 'imatch' THEN format('%I::TEXT ~* %L', v_column, v_text)
+        WHEN 'is_null' THEN format('%I IS NULL', v_column)
+        WHEN 'not_null' THEN format('%I IS NOT NULL', v_column)
+        WHEN 'in' THEN CASE WHEN jsonb_array_length(v_value) = 0 THEN 'FALSE' ELSE format('%I IN (%s)', v_column,
+            (SELECT string_agg(format('%L', e), ', ') FROM jsonb_array_elements_text(v_value) e)) END
+        WHEN 'nin' THEN CASE WHEN jsonb_array_length(v_value) = 0 THEN 'TRUE' ELSE format('%I NOT IN (%s)', v_column,
+            (SELECT string_agg(format('%L', e), ', ') FROM jsonb_array_elements_text(v_value) e)) END
+        ELSE NULL
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Returns a JSON array of rows: group keys as _group_<n>, then one field per aggregate
+CREATE OR REPLACE FUNCTION aggregate_rows(
+    p_table TEXT,
+    p_filter JSONB DEFAULT '{"op": "and", "args": []}'::JSONB,
+    p_group_by TEXT[] DEFAULT ARRAY[]::TEXT[],
+    p_aggregates JSONB DEFAULT '[]'::JSONB,
+    p_sort JSONB DEFAULT '[]'::JSONB,
+    p_limit INTEGER DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_select TEXT[] := ARRAY[]::TEXT[];
+    v_group TEXT[] := ARRAY[]::TEXT[];
+    v_order TEXT[] := ARRAY[]::TEXT[];
+    v_where TEXT;
+    v_sql TEXT;
+    v_result JSONB;
+    v_agg JSONB;
+    v_sort JSONB;
+    v_fn TEXT;
+    i INTEGER;
+BEGIN
+    -- Only plain tables in the public schema can be aggregated
+    IF to_regclass(format('public.%I', p_table)) IS NULL THEN
+        RAISE EXCEPTION 'aggregate_rows: unknown table %', p_table;
+    END IF;
+
+    FOR i IN 1 .. COALESCE(array_length(p_group_by, 1), 0) LOOP
+        v_select := v_select || format('%I AS %I', p_group_by[i], '_group_' || (i - 1));
+        v_group := v_group || format('%I', p_group_by[i]);
+    END LOOP;
+
+    FOR v_agg IN SELECT * FROM jsonb_array_elements(p_aggregates) LOOP
+        v_fn := v_agg->>'fn';
+        IF v_fn NOT IN ('count', 'sum', 'avg', 'min', 'max') THEN
+            RAISE EXCEPTION 'aggregate_rows: unsupported aggregate %', v_fn;
+        END IF;
+        IF v_agg->>'column' IS NULL THEN
+            IF v_fn <> 'count' THEN
+                RAISE EXCEPTION 'aggregate_rows: % requires a column', v_fn;
+            END IF;
+            v_select := v_select || format('count(*) AS %I', v_agg->>'name');
+        ELSE
+            v_select := v_select || format('%s(%I) AS %I', v_fn, v_agg->>'column', v_agg->>'name');
+        END IF;
+    END LOOP;
+
+    IF array_length(v_select, 1) IS NULL THEN
+        v_select := ARRAY['count(*) AS count'];
+    END IF;
+
+    v_where := aggregate_rows_where(p_filter);
+    IF v_where IS NULL THEN
+        RAISE EXCEPTION 'aggregate_rows: unsupported filter %', p_filter;
+    END IF;
+
+    v_sql := format('SELECT %s FROM public.%I WHERE %s', array_to_string(v_select, ', '), p_table, v_where);
+    IF array_length(v_group, 1) IS NOT NULL THEN
+        v_sql := v_sql || ' GROUP BY ' || array_to_string(v_group, ', ');
+    END IF;
+
+    FOR v_sort IN SELECT * FROM jsonb_array_elements(p_sort) LOOP
+        v_order := v_order || format('%I %s NULLS LAST', v_sort->>'key',
+            CASE WHEN (v_sort->>'desc')::BOOLEAN THEN 'DESC' ELSE 'ASC' END);
+    END LOOP;
+    IF array_length(v_order, 1) IS NOT NULL THEN
+        v_sql := v_sql || ' ORDER BY ' || array_to_string(v_order, ', ');
+    END IF;
+
+    IF p_limit IS NOT NULL THEN
+        v_sql := v_sql || format(' LIMIT %s', p_limit);
+    END IF;
+
+    EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(q)), ''[]''::JSONB) FROM (%s) q', v_sql) INTO v_result;
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+GRANT EXECUTE ON FUNCTION aggregate_rows(TEXT, JSONB, TEXT[], JSONB, JSONB, INTEGER) TO authenticated, service_role;
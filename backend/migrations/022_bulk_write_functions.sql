@@ -0,0 +1,140 @@
+-- Single-transaction bulk writes for backend/bulk_writes.py
+-- Migration: 022_bulk_write_functions.sql
+--
+-- BulkWriter(atomic=True) sends every buffered row in one call to bulk_write_rows /
+-- bulk_update_rows, so a multi-row write either lands completely or not at all.
+-- Rows are grouped by their key set and each group is written with one statement;
+-- columns a row leaves out keep their table defaults (insert) or current values (update).
+
+-- Columns named by a group of rows, checked against the table definition
+CREATE OR REPLACE FUNCTION bulk_write_columns(p_table REGCLASS, p_keys TEXT[])
+RETURNS TEXT[] AS $$
+DECLARE
+    v_key TEXT;
+BEGIN
+    FOREACH v_key IN ARRAY p_keys LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = p_table AND attname = v_key AND attnum > 0 AND NOT attisdropped
+        ) THEN
+            RAISE EXCEPTION 'bulk write: % has no column %', p_table, v_key;
+        END IF;
+    END LOOP;
+    RETURN p_keys;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION bulk_write_rows(
+    p_table TEXT,
+    p_rows JSONB,
+    p_mode TEXT DEFAULT 'insert',
+    p_on_conflict TEXT[] DEFAULT ARRAY['id']::TEXT[]
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_table REGCLASS := to_regclass(format('public.%I', p_table));
+    v_keys TEXT[];
+    v_batch JSONB;
+    v_columns TEXT;
+    v_updates TEXT;
+    v_conflict TEXT := '';
+    v_written JSONB;
+    v_result JSONB := '[]'::JSONB;
+BEGIN
+    IF v_table IS NULL THEN
+        RAISE EXCEPTION 'bulk_write_rows: unknown table %', p_table;
+    END IF;
+    IF p_mode NOT IN ('insert', 'upsert') THEN
+        RAISE EXCEPTION 'bulk_write_rows: unsupported mode %', p_mode;
+    END IF;
+    IF jsonb_typeof(p_rows) <> 'array' THEN
+        RAISE EXCEPTION 'bulk_write_rows: rows must be a JSON array';
+    END IF;
+
+    FOR v_keys, v_batch IN
+        SELECT k.keys, jsonb_agg(r.row ORDER BY r.ord)
+        FROM jsonb_array_elements(p_rows) WITH ORDINALITY AS r(row, ord)
+        CROSS JOIN LATERAL (
+            SELECT array_agg(key ORDER BY key) AS keys FROM jsonb_object_keys(r.row) AS key
+        ) k
+        GROUP BY k.keys
+        ORDER BY min(r.ord)
+    LOOP
+        SELECT string_agg(quote_ident(c), ', ') INTO v_columns
+        FROM unnest(bulk_write_columns(v_table, v_keys)) AS c;
+
+        IF p_mode = 'upsert' THEN
+            SELECT string_agg(format('%I = EXCLUDED.%I', c, c), ', ') INTO v_updates
+            FROM unnest(v_keys) AS c
+            WHERE c <> ALL (p_on_conflict);
+            v_conflict := format(' ON CONFLICT (%s) ', (
+                SELECT string_agg(quote_ident(c), ', ') FROM unnest(p_on_conflict) AS c
+            )) || CASE WHEN v_updates IS NULL THEN 'DO NOTHING' ELSE 'DO UPDATE SET ' || v_updates END;
+        END IF;
+
+        EXECUTE format(
+            'WITH written AS (INSERT INTO %s AS t (%s) SELECT %s FROM jsonb_populate_recordset(NULL::%s, $1)%s RETURNING to_jsonb(t.*) AS row) '
+            'SELECT COALESCE(jsonb_agg(row), ''[]''::JSONB) FROM written',
+            v_table, v_columns, v_columns, v_table, v_conflict
+        ) INTO v_written USING v_batch;
+        v_result := v_result || v_written;
+    END LOOP;
+
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bulk_update_rows(
+    p_table TEXT,
+    p_rows JSONB,
+    p_key TEXT DEFAULT 'id'
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_table REGCLASS := to_regclass(format('public.%I', p_table));
+    v_keys TEXT[];
+    v_batch JSONB;
+    v_updates TEXT;
+    v_written JSONB;
+    v_result JSONB := '[]'::JSONB;
+BEGIN
+    IF v_table IS NULL THEN
+        RAISE EXCEPTION 'bulk_update_rows: unknown table %', p_table;
+    END IF;
+    IF jsonb_typeof(p_rows) <> 'array' THEN
+        RAISE EXCEPTION 'bulk_update_rows: rows must be a JSON array';
+    END IF;
+
+    FOR v_keys, v_batch IN
+        SELECT k.keys, jsonb_agg(r.row ORDER BY r.ord)
+        FROM jsonb_array_elements(p_rows) WITH ORDINALITY AS r(row, ord)
+        CROSS JOIN LATERAL (
+            SELECT array_agg(key ORDER BY key) AS keys FROM jsonb_object_keys(r.row) AS key
+        ) k
+        GROUP BY k.keys
+        ORDER BY min(r.ord)
+    LOOP
+        IF NOT (p_key = ANY (v_keys)) THEN
+            RAISE EXCEPTION 'bulk_update_rows: every row needs a % value', p_key;
+        END IF;
+
+        SELECT string_agg(format('%I = src.%I', c, c), ', ') INTO v_updates
+        FROM unnest(bulk_write_columns(v_table, v_keys)) AS c
+        WHERE c <> p_key;
+        CONTINUE WHEN v_updates IS NULL;
+
+        EXECUTE format(
+            'WITH written AS (UPDATE %s AS t SET %s FROM jsonb_populate_recordset(NULL::%s, $1) AS src '
+            'WHERE t.%I = src.%I RETURNING to_jsonb(t.*) AS row) '
+            'SELECT COALESCE(jsonb_agg(row), ''[]''::JSONB) FROM written',
+            v_table, v_updates, v_table, p_key, p_key
+        ) INTO v_written USING v_batch;
+        v_result := v_result || v_written;
+    END LOOP;
+
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION bulk_write_rows(TEXT, JSONB, TEXT, TEXT[]) TO authenticated, service_role;
+GRANT EXECUTE ON FUNCTION bulk_update_rows(TEXT, JSONB, TEXT) TO authenticated, service_role;
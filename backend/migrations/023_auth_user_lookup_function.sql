@@ -0,0 +1,19 @@
+-- Indexed auth user lookup by email for backend/auth_user_directory.py
+-- Migration: 023_auth_user_lookup_function.sql
+--
+-- The GoTrue admin API can fetch a user by id but not by email, so finding an account
+-- by email meant paging through auth.admin.list_users() in Python. This function reads
+-- auth.users through its email index instead. GoTrue stores emails lower-cased.
+-- Only the service role may call it: it reveals whether an email has an account.
+
+CREATE OR REPLACE FUNCTION auth_user_id_by_email(p_email TEXT)
+RETURNS UUID AS $$
+    SELECT id
+    FROM auth.users
+    WHERE email = lower(trim(p_email))
+    ORDER BY is_sso_user, created_at
+    LIMIT 1;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = '';
+
+REVOKE EXECUTE ON FUNCTION auth_user_id_by_email(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION auth_user_id_by_email(TEXT) TO service_role;
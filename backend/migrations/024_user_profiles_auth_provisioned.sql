@@ -0,0 +1,15 @@
+-- Persistent "exists in auth.users" flag for backend/supabase_services.py
+-- Migration: 024_user_profiles_auth_provisioned.sql
+--
+-- Every pillar / area / project / task create first makes sure the user exists in
+-- auth.users. Once that check has passed the profile is flagged, so later creates (in
+-- any worker, after restarts) skip the Auth Admin API call.
+
+ALTER TABLE user_profiles
+    ADD COLUMN IF NOT EXISTS auth_provisioned BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Profiles whose auth user already exists
+UPDATE user_profiles p
+SET auth_provisioned = TRUE
+WHERE NOT p.auth_provisioned
+  AND EXISTS (SELECT 1 FROM auth.users u WHERE u.id = p.id);
@@ -0,0 +1,9 @@
+-- tasks.archived for the TASK_FIELDS projection (backend/projections.py)
+-- Migration: 025_tasks_archived_column.sql
+--
+-- The column was added by hand with fix_tasks_archived_column.sql and is read by the
+-- task readers (archived tasks are filtered client-side); make sure every database has
+-- it, since a projection naming a missing column fails the whole query.
+
+ALTER TABLE public.tasks
+    ADD COLUMN IF NOT EXISTS archived BOOLEAN DEFAULT FALSE;
@@ -9,6 +9,7 @@ import asyncio
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 from supabase import create_client, Client
+from db_resilience import install_sync_client
 from functools import wraps
 import json
 
@@ -28,6 +29,7 @@ class OptimizedSupabaseClient:
         
         # Create optimized client with connection pooling
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
+        install_sync_client(self.client)
         
         # Query optimization settings
         self.default_batch_size = 100
@@ -209,25 +211,20 @@ class OptimizedSupabaseClient:
     
     async def batch_insert(self, table: str, records: List[Dict]) -> List[Dict]:
         """
-        Optimized batch insert operation
+        Optimized batch insert operation (multi-row inserts via bulk_writes)
         """
+        from bulk_writes import bulk_insert
         try:
             if not records:
                 return []
             
-            # Split into batches to avoid Supabase limits
-            batches = [records[i:i + self.default_batch_size] 
-                      for i in range(0, len(records), self.default_batch_size)]
-            
-            all_results = []
-            for batch in batches:
-                response = self.client.table(table).insert(batch).execute()
-                all_results.extend(self._extract_data(response))
-            
+            result = await bulk_insert(table, records, max_rows=self.default_batch_size)
             self.query_stats['batch_operations'] += 1
-            logger.info(f"✅ Batch insert: {len(records)} records inserted into {table}")
+            result.raise_for_failures()
+            logger.info(f"✅ Batch insert: {len(records)} records inserted into {table} "
+                        f"in {result.round_trips} requests")
             
-            return all_results
+            return result.written
             
         except Exception as e:
             logger.error(f"Batch insert error: {e}")
@@ -235,22 +232,20 @@ class OptimizedSupabaseClient:
     
     async def batch_update(self, table: str, updates: List[Dict]) -> List[Dict]:
         """
-        Optimized batch update operation
+        Optimized batch update operation - rows with identical changes share one request
         """
+        from bulk_writes import bulk_update
         try:
             if not updates:
                 return []
             
-            all_results = []
-            for update in updates:
-                record_id = update.pop('id')  # Remove id from update data
-                response = self.client.table(table).update(update).eq('id', record_id).execute()
-                all_results.extend(self._extract_data(response))
-            
+            result = await bulk_update(table, updates, max_rows=self.default_batch_size)
             self.query_stats['batch_operations'] += 1
-            logger.info(f"✅ Batch update: {len(updates)} records updated in {table}")
+            result.raise_for_failures()
+            logger.info(f"✅ Batch update: {len(updates)} records updated in {table} "
+                        f"in {result.round_trips} requests")
             
-            return all_results
+            return result.written
             
         except Exception as e:
             logger.error(f"Batch update error: {e}")
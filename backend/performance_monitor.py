@@ -23,6 +23,7 @@ class PerformanceMonitor:
         self.metrics: Dict[str, List[Dict]] = {}
         self.query_counts: Dict[str, int] = {}
         self.slow_queries: List[Dict] = []
+        self.flagged_requests: List[Dict] = []
     
     def track_endpoint(self, endpoint: str):
         """Decorator to track endpoint performance"""
@@ -159,12 +160,21 @@ class PerformanceMonitor:
         if duration_ms > 100:  # Log slow queries
             logger.warning(f"🔍 QUERY: {query_type} took {duration_ms:.2f}ms (Count: {self.query_counts[query_type]})")
     
+    def record_query_ledger(self, summary: Dict[str, Any]):
+        """Keep a request-scoped query ledger summary that went over budget or showed N+1 patterns"""
+        self.flagged_requests.append({**summary, 'timestamp': datetime.utcnow().isoformat()})
+        
+        # Keep only last 50 flagged requests
+        if len(self.flagged_requests) > 50:
+            self.flagged_requests = self.flagged_requests[-50:]
+    
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get comprehensive performance summary"""
         summary = {
             'endpoints': {},
             'query_counts': self.query_counts.copy(),
             'slow_queries': self.slow_queries[-10:],  # Last 10 slow queries
+            'flagged_requests': self.flagged_requests[-10:],  # Last 10 over-budget / N+1 requests
             'timestamp': datetime.utcnow().isoformat()
         }
         
@@ -196,6 +206,13 @@ class PerformanceMonitor:
             if count > 10:  # More than 10 queries of same type might indicate N+1
                 warnings.append(f"High query count: {query_type} executed {count} times")
         
+        # Repeated same-shape queries seen within a single request (see query_ledger.py)
+        for flagged in self.flagged_requests:
+            for item in flagged.get('repeated_shapes', []):
+                warnings.append(f"N+1 in {flagged['name']}: {item['shape']} executed {item['count']} times")
+            if flagged.get('over_budget'):
+                warnings.append(f"Query budget exceeded in {flagged['name']}: {flagged['queries']} queries (budget {flagged['budget']})")
+        
         # Check for slow queries
         if len(self.slow_queries) > 5:
             warnings.append(f"Multiple slow queries detected: {len(self.slow_queries)} queries >500ms")
@@ -207,6 +224,7 @@ class PerformanceMonitor:
         self.metrics.clear()
         self.query_counts.clear()
         self.slow_queries.clear()
+        self.flagged_requests.clear()
 
 # Global performance monitor instance
 perf_monitor = PerformanceMonitor()
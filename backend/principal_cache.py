@@ -0,0 +1,106 @@
+"""
+Authenticated Principal Cache
+Caches the User a request authenticates as, keyed by (user id, token `iat`), so resolving
+get_current_active_user is a cache lookup instead of a user_profiles query per request.
+Entries live in the shared cache (L1 in-process, Redis across workers) for
+AUTH_PRINCIPAL_CACHE_SECONDS; a refreshed token has a new `iat` and so re-reads the profile.
+
+Profile writes (SupabaseUserService.update_user / update_user_profile, onboarding,
+account deletion) call invalidate_principal, which drops every cached principal of the
+user in Redis and in every worker's L1 through the profile tag. A load that overlaps an
+invalidation in this worker is returned but not cached; one overlapping an invalidation
+in another worker can survive for at most the TTL, which is why the TTL is short.
+"""
+
+import os
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cache_service import cache_service, user_tag
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Entity type tagging cached principals (see cache_service.user_tag)
+PROFILE_ENTITY = 'profile'
+
+
+class PrincipalCache:
+    """Per-token cache of authenticated User models"""
+
+    def __init__(self, cache=None, ttl_seconds: Optional[int] = None):
+        self.cache = cache or cache_service
+        self.enabled = os.getenv('AUTH_PRINCIPAL_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl = ttl_seconds or int(os.getenv('AUTH_PRINCIPAL_CACHE_SECONDS', '60'))
+        # Bumped by every invalidation; a load that saw it change doesn't cache its result
+        self._generation = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'uncacheable': 0,
+            'discarded': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def key(user_id: str, issued_at: Any) -> str:
+        return f"principal:user:{user_id}:iat:{issued_at}"
+
+    async def resolve(self, user_id: str, issued_at: Any, loader: Callable[[], Awaitable[User]]) -> User:
+        """
+        The cached principal for a token, or `loader()`'s result cached under it. Tokens
+        without an issue time (or a disabled cache) always run the loader.
+        """
+        if not self.enabled or not user_id or issued_at is None:
+            self.stats['uncacheable'] += 1
+            return await loader()
+
+        uid = str(user_id)
+        key = self.key(uid, issued_at)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            try:
+                user = User(**cached)
+                self.stats['hits'] += 1
+                return user
+            except Exception as e:
+                # Written by a deploy with a different User model
+                logger.debug(f"Discarding cached principal {key}: {e}")
+
+        self.stats['misses'] += 1
+        generation = self._generation
+        user = await loader()
+        if generation != self._generation:
+            self.stats['discarded'] += 1
+            return user
+        await self.cache.set(key, user.model_dump(mode='json'), self.ttl,
+                             tags=(user_tag(uid), user_tag(uid, PROFILE_ENTITY)))
+        return user
+
+    async def invalidate(self, user_id: str) -> int:
+        """Drop every cached principal of a user, in all workers"""
+        self._generation += 1
+        self.stats['invalidations'] += 1
+        return await self.cache.invalidate_tags([user_tag(str(user_id), PROFILE_ENTITY)])
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate_percentage': round(self.stats['hits'] / lookups * 100, 2) if lookups else 0,
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl
+        }
+
+
+# Global principal cache
+principal_cache = PrincipalCache()
+
+
+async def invalidate_principal(user_id: str) -> int:
+    """Invalidate a user's cached principals after a profile write (never raises)"""
+    try:
+        return await principal_cache.invalidate(user_id)
+    except Exception as e:
+        logger.warning(f"Principal cache invalidation failed for user {user_id}: {e}")
+        return 0
@@ -0,0 +1,54 @@
+"""
+Column Projections for Hot Read Paths
+Named field sets per use case so reads fetch only the columns they need instead of
+select('*'), which drags along journal bodies, descriptions and 1536-d embeddings.
+"""
+
+from typing import Optional, Sequence, Union
+
+# A projection is a tuple of column names; None (or '*') means every column
+Projection = Sequence[str]
+
+# Full entity rows as returned by the list endpoints (every schema column, no embeddings)
+PILLAR_FIELDS = (
+    'id', 'user_id', 'name', 'description', 'icon', 'color', 'sort_order', 'archived',
+    'time_allocation_percentage', 'created_at', 'updated_at', 'date_created',
+)
+
+AREA_FIELDS = (
+    'id', 'user_id', 'pillar_id', 'name', 'description', 'icon', 'color', 'importance',
+    'archived', 'sort_order', 'created_at', 'updated_at', 'date_created',
+)
+
+PROJECT_FIELDS = (
+    'id', 'user_id', 'area_id', 'name', 'description', 'icon', 'deadline', 'status',
+    'priority', 'importance', 'completion_percentage', 'archived', 'sort_order',
+    'created_at', 'updated_at', 'date_created',
+)
+
+TASK_FIELDS = (
+    'id', 'user_id', 'project_id', 'parent_task_id', 'name', 'description', 'status',
+    'priority', 'due_date', 'due_time', 'reminder_date', 'category', 'completed',
+    'completed_at', 'dependency_task_ids', 'recurrence', 'recurrence_interval',
+    'recurrence_pattern', 'next_due_date', 'kanban_column', 'sort_order', 'archived',
+    'estimated_duration', 'sub_task_completion_required', 'created_at', 'updated_at',
+    'date_created', 'current_score', 'area_importance', 'project_importance',
+    'dependencies_met', 'scheduled_date', 'is_overdue',
+)
+
+# Hierarchy links only - enough to bucket children under their parents
+AREA_REFS = ('id', 'pillar_id')
+PROJECT_REFS = ('id', 'area_id')
+
+# Counting and bucketing use cases
+JOURNAL_SENTIMENT = ('created_at', 'sentiment_score', 'sentiment_category', 'emotional_keywords')
+AI_INTERACTION_STATS = ('feature_type', 'success')
+
+
+def select_columns(projection: Optional[Union[Projection, str]]) -> str:
+    """Render a projection as a PostgREST select list"""
+    if not projection:
+        return '*'
+    if isinstance(projection, str):
+        return projection
+    return ','.join(projection)
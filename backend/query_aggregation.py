@@ -0,0 +1,247 @@
+"""
+Mongo-style Aggregation Pipeline Compiler
+Compiles $match / $group / $sort / $limit pipelines into a single call to the
+`aggregate_rows` SQL function (migration 021) so grouping happens in Postgres.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from query_filters import COMPARISON_OPERATORS, SUPPORTED_OPERATORS, FilterCompileError, format_value
+
+logger = logging.getLogger(__name__)
+
+# Mongo accumulator -> SQL aggregate understood by aggregate_rows
+ACCUMULATORS = {
+    '$sum': 'sum',
+    '$avg': 'avg',
+    '$min': 'min',
+    '$max': 'max',
+}
+
+SUPPORTED_STAGES = ('$match', '$group', '$sort', '$limit')
+
+# Group keys are returned under these aliases and folded back into `_id`
+_GROUP_ALIAS = '_group_{}'
+
+
+class AggregationCompileError(FilterCompileError):
+    """Raised when a pipeline uses an unsupported stage, accumulator or stage order"""
+    pass
+
+
+def _field_ref(value: Any, context: str) -> str:
+    """Resolve a "$column" reference to a column name"""
+    if not isinstance(value, str) or not value.startswith('$') or len(value) < 2:
+        raise AggregationCompileError(f"{context} expects a \"$column\" reference, got {value!r}")
+    column = value[1:]
+    if '.' in column:
+        raise AggregationCompileError(f"Nested field references are not supported: {value}")
+    return column
+
+
+def _condition(column: str, op: str, value: Any = None) -> Dict[str, Any]:
+    return {'column': column, 'op': op, 'value': value}
+
+
+def _compile_match_field(field: str, condition: Any) -> List[Dict[str, Any]]:
+    """Compile one field's condition into aggregate_rows where-tree leaves"""
+    if not isinstance(condition, dict):
+        if isinstance(condition, (list, tuple, set)):
+            return [_condition(field, 'in', [format_value(v) for v in condition])]
+        if condition is None:
+            return [_condition(field, 'is_null')]
+        return [_condition(field, 'eq', format_value(condition))]
+
+    unknown = [op for op in condition if op not in SUPPORTED_OPERATORS]
+    if unknown:
+        raise AggregationCompileError(f"Unsupported operator(s) for '{field}': {', '.join(sorted(unknown))}")
+    if '$options' in condition and '$regex' not in condition:
+        raise AggregationCompileError(f"$options without $regex for '{field}'")
+
+    leaves: List[Dict[str, Any]] = []
+    for op, value in condition.items():
+        if op in COMPARISON_OPERATORS:
+            if value is None and op in ('$eq', '$ne'):
+                leaves.append(_condition(field, 'is_null' if op == '$eq' else 'not_null'))
+            else:
+                leaves.append(_condition(field, COMPARISON_OPERATORS[op], format_value(value)))
+        elif op in ('$in', '$nin'):
+            if not isinstance(value, (list, tuple, set)):
+                raise AggregationCompileError(f"{op} expects a list, got {type(value).__name__}")
+            leaves.append(_condition(field, 'in' if op == '$in' else 'nin', [format_value(v) for v in value]))
+        elif op == '$exists':
+            leaves.append(_condition(field, 'not_null' if value else 'is_null'))
+        elif op == '$regex':
+            pattern = value.pattern if hasattr(value, 'pattern') else str(value)
+            case_insensitive = 'i' in str(condition.get('$options', ''))
+            leaves.append(_condition(field, 'imatch' if case_insensitive else 'match', pattern))
+    return leaves
+
+
+def compile_match(query: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compile a $match filter document into the JSON where-tree consumed by aggregate_rows.
+
+    Accepts the same operators as query_filters.compile_filters, including $or/$and groups.
+    """
+    args: List[Dict[str, Any]] = []
+    for field, condition in (query or {}).items():
+        if field in ('$or', '$and'):
+            if not isinstance(condition, list) or not condition:
+                raise AggregationCompileError(f"{field} expects a non-empty list of filter documents")
+            if any(not isinstance(clause, dict) for clause in condition):
+                raise AggregationCompileError(f"{field} entries must be filter documents")
+            args.append({'op': field[1:], 'args': [compile_match(clause) for clause in condition]})
+        elif field.startswith('$'):
+            raise AggregationCompileError(f"Unsupported top-level operator: {field}")
+        else:
+            args.extend(_compile_match_field(field, condition))
+    return {'op': 'and', 'args': args}
+
+
+def _compile_group(spec: Any) -> Tuple[List[Tuple[Optional[str], str]], List[Dict[str, Any]]]:
+    """Compile a $group stage into ([(id_key, column)], [aggregate])"""
+    if not isinstance(spec, dict) or '_id' not in spec:
+        raise AggregationCompileError("$group requires an _id")
+
+    group_id = spec['_id']
+    if group_id is None:
+        keys: List[Tuple[Optional[str], str]] = []
+    elif isinstance(group_id, dict):
+        if not group_id:
+            raise AggregationCompileError("$group _id document must not be empty")
+        keys = [(name, _field_ref(ref, '$group _id')) for name, ref in group_id.items()]
+    else:
+        keys = [(None, _field_ref(group_id, '$group _id'))]
+
+    aggregates: List[Dict[str, Any]] = []
+    for name, accumulator in spec.items():
+        if name == '_id':
+            continue
+        if name.startswith(_GROUP_ALIAS.format('')) or name.startswith('$'):
+            raise AggregationCompileError(f"Invalid $group output field: {name}")
+        if not isinstance(accumulator, dict) or len(accumulator) != 1:
+            raise AggregationCompileError(f"$group field '{name}' needs exactly one accumulator")
+
+        op, argument = next(iter(accumulator.items()))
+        if op == '$count':
+            aggregates.append({'name': name, 'fn': 'count', 'column': None})
+        elif op not in ACCUMULATORS:
+            raise AggregationCompileError(f"Unsupported accumulator for '{name}': {op}")
+        elif op == '$sum' and isinstance(argument, (int, float)) and not isinstance(argument, bool):
+            # {"$sum": 1} is the Mongo idiom for counting rows
+            if argument == 1:
+                aggregates.append({'name': name, 'fn': 'count', 'column': None})
+            else:
+                raise AggregationCompileError(f"$sum of a constant other than 1 is not supported ('{name}')")
+        else:
+            aggregates.append({'name': name, 'fn': ACCUMULATORS[op], 'column': _field_ref(argument, op)})
+    return keys, aggregates
+
+
+def compile_pipeline(pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compile an aggregation pipeline into aggregate_rows arguments.
+
+    Stages must appear in the order $match* -> $group -> $sort -> $limit, each at most
+    once apart from $match. $sort keys after $group refer to "_id", "_id.<key>" or
+    output fields. Returns {'group': bool, 'keys': [...], 'params': {...}} where
+    `params` is the RPC payload.
+    """
+    if not isinstance(pipeline, list):
+        raise AggregationCompileError("Aggregation pipeline must be a list of stages")
+
+    match: Dict[str, Any] = {}
+    group_spec = None
+    sort_spec = None
+    limit = None
+    last_rank = -1
+
+    for stage in pipeline:
+        if not isinstance(stage, dict) or len(stage) != 1:
+            raise AggregationCompileError(f"Each pipeline stage must have exactly one operator: {stage!r}")
+        name, spec = next(iter(stage.items()))
+        if name not in SUPPORTED_STAGES:
+            raise AggregationCompileError(f"Unsupported pipeline stage: {name}")
+
+        rank = SUPPORTED_STAGES.index(name)
+        if rank < last_rank or (rank == last_rank and name != '$match'):
+            raise AggregationCompileError(f"Stage {name} is not supported at this position in the pipeline")
+        last_rank = rank
+
+        if name == '$match':
+            if not isinstance(spec, dict):
+                raise AggregationCompileError("$match expects a filter document")
+            match = {'$and': [match, spec]} if match else dict(spec)
+        elif name == '$group':
+            group_spec = spec
+        elif name == '$sort':
+            if not isinstance(spec, dict) or not spec or any(d not in (1, -1) for d in spec.values()):
+                raise AggregationCompileError("$sort expects {field: 1 | -1}")
+            sort_spec = spec
+        elif name == '$limit':
+            if isinstance(spec, bool) or not isinstance(spec, int) or spec <= 0:
+                raise AggregationCompileError("$limit expects a positive integer")
+            limit = spec
+
+    keys: List[Tuple[Optional[str], str]] = []
+    aggregates: List[Dict[str, Any]] = []
+    if group_spec is not None:
+        keys, aggregates = _compile_group(group_spec)
+
+    sort: List[Dict[str, Any]] = []
+    for field, direction in (sort_spec or {}).items():
+        if group_spec is None:
+            sort.append({'key': field, 'desc': direction == -1})
+            continue
+        sort.append({'key': _resolve_sort_key(field, keys, aggregates), 'desc': direction == -1})
+
+    return {
+        'group': group_spec is not None,
+        'keys': keys,
+        'match': match,
+        'sort': sort,
+        'limit': limit,
+        'params': {
+            'p_filter': compile_match(match),
+            'p_group_by': [column for _, column in keys],
+            'p_aggregates': aggregates,
+            'p_sort': sort,
+            'p_limit': limit,
+        },
+    }
+
+
+def _resolve_sort_key(field: str, keys: List[Tuple[Optional[str], str]],
+                      aggregates: List[Dict[str, Any]]) -> str:
+    """Map a post-$group sort field to the column alias returned by aggregate_rows"""
+    if field == '_id' and len(keys) == 1:
+        return _GROUP_ALIAS.format(0)
+    if field.startswith('_id.'):
+        for index, (name, _) in enumerate(keys):
+            if name is not None and field == f"_id.{name}":
+                return _GROUP_ALIAS.format(index)
+    if any(aggregate['name'] == field for aggregate in aggregates):
+        return field
+    raise AggregationCompileError(f"Cannot sort on '{field}' after $group")
+
+
+def shape_results(compiled: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold the group-key aliases returned by aggregate_rows back into Mongo's `_id`"""
+    keys = compiled['keys']
+    shaped = []
+    for row in rows or []:
+        if not keys:
+            group_id = None
+        elif keys[0][0] is None:
+            group_id = row.get(_GROUP_ALIAS.format(0))
+        else:
+            group_id = {name: row.get(_GROUP_ALIAS.format(index)) for index, (name, _) in enumerate(keys)}
+
+        document = {'_id': group_id}
+        for key, value in row.items():
+            if not key.startswith(_GROUP_ALIAS.format('')):
+                document[key] = value
+        shaped.append(document)
+    return shaped
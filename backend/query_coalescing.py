@@ -0,0 +1,160 @@
+"""
+Worker-wide Query Coalescing (singleflight)
+Concurrent identical reads - same table, filters and projection - share one in-flight
+PostgREST request, and the result is reused for a short window. Page loads that fire
+/pillars, /areas, /projects and friends at once then hit Supabase once per distinct read.
+"""
+
+import os
+import copy
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (method, path, query string, Prefer header, Accept header)
+QueryKey = Tuple[str, str, str, str, str]
+
+_READ_METHODS = ('GET', 'HEAD')
+
+
+class LeaderCancelled(Exception):
+    """The request a caller was sharing got cancelled; the caller should run its own"""
+    pass
+
+
+class QueryCoalescer:
+    """
+    Singleflight for PostgREST reads.
+
+    Reads are keyed by the built request, so the key covers the table (path), filters,
+    ordering, limits and select list (params) as well as count/single headers. Every
+    caller receives its own deep copy of the response, because services mutate rows in
+    place. A write through the same worker drops windowed results for that table, and
+    reads that were in flight during the write are neither joined nor kept.
+    """
+
+    def __init__(self):
+        self.window = float(os.getenv('DB_COALESCE_WINDOW_MS', '500')) / 1000
+        self.max_entries = int(os.getenv('DB_COALESCE_MAX_ENTRIES', '1024'))
+        self.enabled = os.getenv('DB_COALESCE_ENABLED', 'true').lower() == 'true'
+
+        self._inflight: Dict[QueryKey, asyncio.Future] = {}
+        self._recent: "OrderedDict[QueryKey, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._counters = {
+            'executed': 0,
+            'coalesced': 0,
+            'window_hits': 0,
+            'invalidations': 0
+        }
+
+    def key_for(self, request) -> Optional[QueryKey]:
+        """Return the coalescing key for a read request, or None for writes / when disabled"""
+        method = str(getattr(request, 'http_method', '')).upper()
+        if not self.enabled or method not in _READ_METHODS:
+            return None
+        headers = request.headers
+        return (method, request.path, str(request.params),
+                headers.get('prefer', ''), headers.get('accept', ''))
+
+    def lookup(self, key: QueryKey) -> Optional[Awaitable[Any]]:
+        """Return an awaitable for a shared result, or None if the caller should lead"""
+        entry = self._recent.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._counters['window_hits'] += 1
+                return self._resolved(response)
+            del self._recent[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters['coalesced'] += 1
+            return self._follow(future)
+        return None
+
+    async def _resolved(self, response):
+        return copy.deepcopy(response)
+
+    async def _follow(self, future: asyncio.Future):
+        try:
+            response = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                raise LeaderCancelled()
+            raise
+        return copy.deepcopy(response)
+
+    async def lead(self, key: QueryKey, execute: Callable[[], Awaitable[Any]]):
+        """Execute a read and publish its result to concurrent callers with the same key"""
+        path = key[1]
+        generation = self._generations.get(path, 0)
+        future = asyncio.get_running_loop().create_future()
+        # Followers may all have gone away; never warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self._counters['executed'] += 1
+
+        try:
+            response = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        shared = copy.deepcopy(response)
+        future.set_result(shared)
+        if self.window > 0 and self._generations.get(path, 0) == generation:
+            self._remember(key, shared)
+        return response
+
+    def _remember(self, key: QueryKey, response):
+        now = time.monotonic()
+        self._recent[key] = (now + self.window, response)
+        self._recent.move_to_end(key)
+        while self._recent:
+            oldest_key, (expires_at, _) = next(iter(self._recent.items()))
+            if expires_at > now and len(self._recent) <= self.max_entries:
+                break
+            del self._recent[oldest_key]
+
+    def invalidate(self, path: str):
+        """Forget windowed and in-flight reads of a table after a write to it"""
+        self._generations[path] = self._generations.get(path, 0) + 1
+        stale = [key for key in self._recent if key[1] == path]
+        for key in stale:
+            del self._recent[key]
+        # Reads started before the write may return pre-write rows; later readers lead anew
+        started = [key for key in self._inflight if key[1] == path]
+        for key in started:
+            del self._inflight[key]
+        self._counters['invalidations'] += 1
+
+    def clear(self):
+        self._recent.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        reads = self._counters['executed'] + self._counters['coalesced'] + self._counters['window_hits']
+        saved = self._counters['coalesced'] + self._counters['window_hits']
+        return {
+            'enabled': self.enabled,
+            'window_ms': round(self.window * 1000, 1),
+            'in_flight': len(self._inflight),
+            'windowed_results': len(self._recent),
+            **self._counters,
+            'saved_ratio': round(saved / reads, 4) if reads else 0.0
+        }
+
+
+# Global coalescer shared by every request in this worker
+query_coalescer = QueryCoalescer()
@@ -0,0 +1,188 @@
+"""
+Mongo-style Filter Compiler for PostgREST
+Translates the filter documents used across the services (e.g. {"due_date": {"$lt": now}})
+into PostgREST operators so the database does the filtering.
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Mongo comparison operator -> PostgREST operator
+COMPARISON_OPERATORS = {
+    '$eq': 'eq',
+    '$ne': 'neq',
+    '$lt': 'lt',
+    '$lte': 'lte',
+    '$gt': 'gt',
+    '$gte': 'gte',
+}
+
+SUPPORTED_OPERATORS = set(COMPARISON_OPERATORS) | {'$in', '$nin', '$exists', '$regex', '$options'}
+
+# Characters that PostgREST treats as syntax inside in.(...) lists and or=(...) groups
+_RESERVED_CHARS = set(',.:()"\\ ')
+
+# A compiled filter is (column, operator, criteria); logical groups use column 'or' with operator None
+CompiledFilter = Tuple[str, Optional[str], str]
+
+
+class FilterCompileError(ValueError):
+    """Raised when a filter document uses an unsupported operator or shape"""
+    pass
+
+
+def format_value(value: Any) -> str:
+    """Render a Python value the way PostgREST expects it in a filter"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, Enum):
+        return format_value(value.value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _quote(value: str) -> str:
+    """Double-quote a value if it contains PostgREST reserved characters"""
+    if value and not any(ch in _RESERVED_CHARS for ch in value):
+        return value
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _format_list(values: Any) -> str:
+    if not isinstance(values, (list, tuple, set)):
+        raise FilterCompileError(f"$in/$nin expects a list, got {type(values).__name__}")
+    return '(' + ','.join(_quote(format_value(v)) for v in values) + ')'
+
+
+def _compile_field(field: str, condition: Any) -> List[Tuple[str, str]]:
+    """Compile one field's condition into (operator, criteria) pairs"""
+    # Plain values keep the historical semantics: list -> IN, None -> IS NULL, else equality
+    if not isinstance(condition, dict):
+        if isinstance(condition, (list, tuple, set)):
+            return [('in', _format_list(condition))]
+        if condition is None:
+            return [('is', 'null')]
+        return [('eq', format_value(condition))]
+
+    unknown = [op for op in condition if op not in SUPPORTED_OPERATORS]
+    if unknown:
+        raise FilterCompileError(f"Unsupported operator(s) for '{field}': {', '.join(sorted(unknown))}")
+
+    compiled: List[Tuple[str, str]] = []
+    for op, value in condition.items():
+        if op in COMPARISON_OPERATORS:
+            if value is None and op in ('$eq', '$ne'):
+                compiled.append(('is', 'null') if op == '$eq' else ('not.is', 'null'))
+            else:
+                compiled.append((COMPARISON_OPERATORS[op], format_value(value)))
+        elif op == '$in':
+            compiled.append(('in', _format_list(value)))
+        elif op == '$nin':
+            compiled.append(('not.in', _format_list(value)))
+        elif op == '$exists':
+            compiled.append(('not.is', 'null') if value else ('is', 'null'))
+        elif op == '$regex':
+            pattern = value.pattern if hasattr(value, 'pattern') else str(value)
+            case_insensitive = 'i' in str(condition.get('$options', ''))
+            compiled.append(('imatch' if case_insensitive else 'match', pattern))
+        # $options only modifies $regex
+
+    if '$options' in condition and '$regex' not in condition:
+        raise FilterCompileError(f"$options without $regex for '{field}'")
+    return compiled
+
+
+def _compile_group(clauses: Any, joiner: str) -> str:
+    """Compile the body of a $or / $and group for PostgREST's logical operator syntax"""
+    if not isinstance(clauses, list) or not clauses:
+        raise FilterCompileError(f"${joiner} expects a non-empty list of filter documents")
+
+    parts: List[str] = []
+    for clause in clauses:
+        if not isinstance(clause, dict):
+            raise FilterCompileError(f"${joiner} entries must be filter documents")
+        terms = _compile_terms(clause)
+        if len(terms) == 1:
+            parts.append(terms[0])
+        elif terms:
+            # A multi-field document inside $or means all of its fields must match
+            parts.append(f"and({','.join(terms)})")
+    return ','.join(parts)
+
+
+def _compile_terms(query: Dict[str, Any]) -> List[str]:
+    """Compile a filter document into PostgREST logical-tree terms (column.op.value)"""
+    terms: List[str] = []
+    for field, condition in query.items():
+        if field == '$or':
+            terms.append(f"or({_compile_group(condition, 'or')})")
+        elif field == '$and':
+            terms.append(f"and({_compile_group(condition, 'and')})")
+        elif field.startswith('$'):
+            raise FilterCompileError(f"Unsupported top-level operator: {field}")
+        else:
+            for operator, criteria in _compile_field(field, condition):
+                if operator.endswith('in'):
+                    # in./not.in. criteria are already a quoted list
+                    terms.append(f"{field}.{operator}.{criteria}")
+                else:
+                    terms.append(f"{field}.{operator}.{_quote(criteria)}")
+    return terms
+
+
+def compile_filters(query: Optional[Dict[str, Any]]) -> List[CompiledFilter]:
+    """
+    Compile a Mongo-style filter document into PostgREST filters.
+
+    Supports plain equality, lists (IN), $eq/$ne/$lt/$lte/$gt/$gte/$in/$nin/$exists/$regex
+    and $or/$and groups. Note that $ne follows SQL semantics and does not match NULL columns.
+    """
+    if not query:
+        return []
+
+    compiled: List[CompiledFilter] = []
+    for field, condition in query.items():
+        if field == '$or':
+            compiled.append(('or', None, _compile_group(condition, 'or')))
+        elif field == '$and':
+            # Top-level $and is just more filters on the same request
+            if not isinstance(condition, list):
+                raise FilterCompileError("$and expects a list of filter documents")
+            for clause in condition:
+                compiled.extend(compile_filters(clause))
+        elif field.startswith('$'):
+            raise FilterCompileError(f"Unsupported top-level operator: {field}")
+        else:
+            for operator, criteria in _compile_field(field, condition):
+                compiled.append((field, operator, criteria))
+    return compiled
+
+
+def apply_filters(query_builder, query: Optional[Dict[str, Any]]):
+    """Apply a Mongo-style filter document to a PostgREST filter builder"""
+    groups: List[str] = []
+    for column, operator, criteria in compile_filters(query):
+        if operator is None:
+            groups.append(criteria)
+        else:
+            query_builder = query_builder.filter(column, operator, criteria)
+
+    # Older postgrest-py releases have no or_(); add the logical group directly.
+    # Several $or groups (e.g. a caller's $or plus a pagination cursor) are ANDed together.
+    if len(groups) == 1:
+        query_builder.params = query_builder.params.add('or', f"({groups[0]})")
+    elif groups:
+        combined = ','.join(f"or({group})" for group in groups)
+        query_builder.params = query_builder.params.add('and', f"({combined})")
+    return query_builder
@@ -0,0 +1,184 @@
+"""
+Request-scoped Query Ledger
+Records every Supabase table / RPC call made while serving one request (or one
+background job) with its table, filter shape and duration, flags repeated same-shape
+queries (N+1 patterns) and enforces a per-request query budget.
+"""
+
+import os
+import re
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET_PER_REQUEST', '25'))
+N1_THRESHOLD = int(os.getenv('QUERY_N1_THRESHOLD', '5'))
+
+# Params whose values are part of the query shape rather than data
+_STRUCTURAL_PARAMS = {'select', 'order', 'on_conflict', 'columns'}
+_LOGICAL_PARAMS = {'or', 'and'}
+# column.operator.value terms inside or=(...) / and=(...) groups
+_LOGICAL_TERM = re.compile(r'([\w]+)\.((?:not\.)?[a-z]+)\.(?:"(?:[^"\\]|\\.)*"|\([^)]*\)|[^,()]*)')
+
+
+class QueryRecord(NamedTuple):
+    table: str
+    method: str
+    shape: str
+    duration_ms: float
+    shared: bool
+    paginated: bool
+
+
+def query_shape(request) -> Tuple[str, str, str]:
+    """Return (table, method, shape) for a PostgREST request builder, with filter values removed"""
+    method = str(getattr(request, 'http_method', 'GET')).upper()
+    path = str(getattr(request, 'path', ''))
+    table = path.strip('/') or 'unknown'
+
+    parts: List[str] = []
+    params = getattr(request, 'params', None)
+    for key, value in (params.multi_items() if params is not None else []):
+        if key in _STRUCTURAL_PARAMS:
+            parts.append(f"{key}={value}")
+        elif key in _LOGICAL_PARAMS:
+            parts.append(f"{key}={_LOGICAL_TERM.sub(lambda m: f'{m.group(1)}.{m.group(2)}', value)}")
+        elif key in ('limit', 'offset'):
+            parts.append(key)
+        else:
+            operator = value.split('.', 2)
+            operator = '.'.join(operator[:2]) if operator[0] == 'not' else operator[0]
+            parts.append(f"{key}={operator}")
+    return table, method, f"{method} {table}?{'&'.join(sorted(parts))}"
+
+
+class QueryLedger:
+    """Queries issued while serving one request or job"""
+
+    def __init__(self, name: str, budget: Optional[int] = None, n1_threshold: Optional[int] = None):
+        self.name = name
+        self.budget = QUERY_BUDGET if budget is None else budget
+        self.n1_threshold = N1_THRESHOLD if n1_threshold is None else n1_threshold
+        self.started_at = time.perf_counter()
+        self.records: List[QueryRecord] = []
+
+    def record(self, request, duration_ms: float, shared: bool = False, paginated: bool = False):
+        table, method, shape = query_shape(request)
+        self.records.append(QueryRecord(table, method, shape, duration_ms, shared, paginated))
+
+    @property
+    def query_count(self) -> int:
+        """Queries that actually reached the database (coalesced reads are free)"""
+        return sum(1 for r in self.records if not r.shared)
+
+    @property
+    def db_time_ms(self) -> float:
+        return sum(r.duration_ms for r in self.records)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget > 0 and self.query_count > self.budget
+
+    def repeated_shapes(self) -> List[Tuple[str, int]]:
+        """Same-shape queries issued at least n1_threshold times (keyset pages excluded)"""
+        counts: Dict[str, int] = {}
+        for r in self.records:
+            if not r.shared and not r.paginated:
+                counts[r.shape] = counts.get(r.shape, 0) + 1
+        return sorted(
+            ((shape, n) for shape, n in counts.items() if n >= self.n1_threshold),
+            key=lambda item: -item[1]
+        )
+
+    def server_timing(self) -> str:
+        """Server-Timing header value describing database work for this request"""
+        shared = len(self.records) - self.query_count
+        desc = f"{self.query_count} queries" + (f", {shared} coalesced" if shared else "")
+        return f'db;dur={self.db_time_ms:.1f};desc="{desc}"'
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'queries': self.query_count,
+            'coalesced': len(self.records) - self.query_count,
+            'db_time_ms': round(self.db_time_ms, 2),
+            'duration_ms': round((time.perf_counter() - self.started_at) * 1000, 2),
+            'budget': self.budget,
+            'over_budget': self.over_budget,
+            'repeated_shapes': [{'shape': shape, 'count': n} for shape, n in self.repeated_shapes()],
+            'tables': sorted({r.table for r in self.records})
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Log budget overruns and N+1 patterns and feed them to the performance monitor"""
+        summary = self.summary()
+        if summary['over_budget']:
+            logger.warning(f"🚨 QUERY BUDGET: {self.name} issued {summary['queries']} queries "
+                           f"(budget {self.budget}, {summary['db_time_ms']:.1f}ms in database)")
+        for item in summary['repeated_shapes']:
+            logger.warning(f"🔁 N+1: {self.name} ran {item['count']}x {item['shape']}")
+
+        if summary['over_budget'] or summary['repeated_shapes']:
+            try:
+                from performance_monitor import perf_monitor
+                perf_monitor.record_query_ledger(summary)
+            except Exception as e:
+                logger.debug(f"Could not record query ledger: {e}")
+        return summary
+
+
+_current_ledger: ContextVar[Optional[QueryLedger]] = ContextVar('query_ledger', default=None)
+_paginating: ContextVar[bool] = ContextVar('query_ledger_paginating', default=False)
+
+
+def current_ledger() -> Optional[QueryLedger]:
+    return _current_ledger.get()
+
+
+def record_query(request, duration_ms: float, shared: bool = False):
+    """Add a query to the active ledger, if any"""
+    ledger = _current_ledger.get()
+    if ledger is not None:
+        ledger.record(request, duration_ms, shared=shared, paginated=_paginating.get())
+
+
+@contextmanager
+def paginated() -> Iterator[None]:
+    """Mark queries as pages of one keyset scan so they are not reported as N+1"""
+    token = _paginating.set(True)
+    try:
+        yield
+    finally:
+        _paginating.reset(token)
+
+
+@contextmanager
+def track_queries(name: str, budget: Optional[int] = None, n1_threshold: Optional[int] = None) -> Iterator[QueryLedger]:
+    """
+    Collect every query issued inside the block, then report budget overruns and N+1
+    patterns. Used per HTTP request by QueryBudgetMiddleware and around background jobs.
+    """
+    ledger = QueryLedger(name, budget, n1_threshold)
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+        ledger.report()
+
+
+class QueryBudgetMiddleware(BaseHTTPMiddleware):
+    """Attach a query ledger to every request and expose it as a Server-Timing header"""
+
+    async def dispatch(self, request: Request, call_next):
+        with track_queries(f"{request.method} {request.url.path}") as ledger:
+            response = await call_next(request)
+            response.headers.append('Server-Timing', ledger.server_timing())
+            return response
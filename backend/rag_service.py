@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 import json
 import uuid
 from supabase import create_client, Client
+from db_resilience import install_sync_client
 from dotenv import load_dotenv
 import openai
 from pathlib import Path
@@ -33,6 +34,7 @@ class SupabaseRAGService:
             raise ValueError("Missing required environment variables for RAG service")
         
         self.supabase: Client = create_client(self.supabase_url, self.supabase_service_key)
+        install_sync_client(self.supabase)
         openai.api_key = self.openai_api_key
     
     async def get_relevant_context(self, user_id: str, query: str, 
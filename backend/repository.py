@@ -9,6 +9,7 @@ from datetime import datetime
 import asyncio
 import logging
 from supabase_client import find_documents, find_document
+from projections import PILLAR_FIELDS, AREA_FIELDS, PROJECT_FIELDS, TASK_FIELDS
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +45,11 @@ class DataRepository:
             # Fetch ALL user data in parallel - single database round-trip
             tasks = await asyncio.gather(
                 find_documents("users", {"id": self.user_id}),
-                find_documents("pillars", {"user_id": self.user_id}),
-                find_documents("areas", {"user_id": self.user_id}),  
-                find_documents("projects", {"user_id": self.user_id}),
-                find_documents("tasks", {"user_id": self.user_id}),
+                find_documents("pillars", {"user_id": self.user_id}, projection=PILLAR_FIELDS),
+                find_documents("areas", {"user_id": self.user_id}, projection=AREA_FIELDS),
+                find_documents("projects", {"user_id": self.user_id}, projection=PROJECT_FIELDS),
+                # Full rows: get_tasks() hands them to callers that build TaskResponse
+                find_documents("tasks", {"user_id": self.user_id}, projection=TASK_FIELDS),
                 return_exceptions=True
             )
             
@@ -0,0 +1,237 @@
+"""
+HTTP Response Cache for user-scoped GET endpoints
+Caches the encoded JSON body per user, per endpoint arguments and per version of the
+entity types the endpoint depends on, and answers conditional requests: every response
+carries a strong ETag and `If-None-Match` returns 304 from the cache without running the
+endpoint. `X-Data-Version` carries the user's overall data version, which clients can
+compare with GET /api/data-version to skip refetching entirely.
+
+Apply below the route decorator so FastAPI registers the cached function:
+
+    @api_router.get("/pillars")
+    @cache_user_endpoint(ttl=180, depends_on=("pillars", "areas", "projects", "tasks"))
+    async def get_pillars(current_user: User = Depends(get_current_active_user)):
+        ...
+
+The endpoint's `current_user` dependency still runs, so authentication is unchanged.
+Cached endpoints return a ready Response, bypassing any response_model.
+
+Versioned keys make long TTLs safe only with Redis: a worker without it keeps its own
+data versions and tag sets, so writes handled by other workers never reach its cache.
+Endpoints with a long TTL should pass `ttl_without_redis` to fall back to a short one.
+
+`get_pillars.warm(user_id)` fills the cache for the endpoint's default arguments without
+a request, e.g. right after login (see cache_warming.py).
+"""
+
+import os
+import json
+import inspect
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+from cache_service import ANY_CHANGE, cache_service, user_tag, version_token
+
+logger = logging.getLogger(__name__)
+
+# Browsers keep the body but revalidate it with If-None-Match on every use
+CACHE_CONTROL = os.getenv('RESPONSE_CACHE_CONTROL', 'private, max-age=0, must-revalidate')
+
+response_cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'not_modified': 0
+}
+
+
+def encode_body(result: Any) -> str:
+    """Encode an endpoint result the way FastAPI's JSONResponse does"""
+    return json.dumps(
+        jsonable_encoder(result),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    )
+
+
+def make_etag(version: str, body: str) -> str:
+    """Strong ETag: the version of the data it was built from plus a digest of the exact body"""
+    digest = hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 If-None-Match check (weak comparison, '*' matches anything)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class WarmUser(NamedTuple):
+    """Stands in for current_user when warming: cached endpoints only read its id"""
+    id: str
+
+
+def _default_arguments(signature: inspect.Signature) -> Optional[Dict[str, Any]]:
+    """
+    The arguments FastAPI passes when a request sets no query parameters, or None if a
+    parameter is required (such endpoints can't be warmed)
+    """
+    defaults = {}
+    for name, parameter in signature.parameters.items():
+        default = parameter.default
+        if name in ('current_user', 'request') or hasattr(default, 'dependency'):
+            continue
+        # Query(...) / Path(...) keep the actual default on .default
+        default = getattr(default, 'default', default)
+        if default is not None and not isinstance(default, (str, int, float, bool)):
+            return None
+        defaults[name] = default
+    return defaults
+
+
+def _headers(etag: str, status: str, data_version: int) -> Dict[str, str]:
+    return {
+        'ETag': etag,
+        'Cache-Control': CACHE_CONTROL,
+        'Vary': 'Authorization',
+        'X-Cache': status,
+        'X-Data-Version': str(data_version)
+    }
+
+
+def cache_user_endpoint(ttl: int = 300, cache_prefix: Optional[str] = None, depends_on: Sequence[str] = (),
+                        stale_ttl: int = 0, ttl_without_redis: Optional[int] = None):
+    """
+    Decorator to cache user-specific GET endpoint responses
+
+    Args:
+        ttl: Time to live in seconds (default: 5 minutes)
+        cache_prefix: Optional prefix for cache key (default: function name)
+        depends_on: Entity types the response is built from; invalidate_user_cache(user_id,
+            entity) drops it (default: the prefix)
+        stale_ttl: How long an expired body is still served while it is recomputed in the
+            background (default 0: expire outright)
+        ttl_without_redis: Cap on ttl and stale_ttl while the cache runs without Redis, where
+            writes on other workers don't invalidate this worker's entries (default: no cap)
+    """
+    stale = stale_ttl
+
+    def lifetimes():
+        """(ttl, stale ttl) for the cache as it is now; Redis may come up after import"""
+        if ttl_without_redis is None or cache_service.redis_client:
+            return ttl, stale
+        return min(ttl, ttl_without_redis), min(stale, ttl_without_redis)
+
+    def decorator(func):
+        prefix = cache_prefix or func.__name__
+        signature = inspect.signature(func)
+        # The wrapper needs the request for If-None-Match; add it if the endpoint doesn't take it
+        inject_request = 'request' not in signature.parameters
+        if inject_request:
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter('request', inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ])
+
+        entities = tuple(depends_on or (prefix,))
+        warm_arguments = _default_arguments(inspect.signature(func)) if inject_request else None
+
+        async def cache_slot(user_id: str, kwargs: Dict[str, Any]):
+            """(key, tags, versions, version token) for a call; versions None means bypass"""
+            versions = await cache_service.get_data_versions(user_id, entities)
+            if versions is None:
+                return None, None, None, None
+            version = version_token(versions, entities)
+            # Key on simple arguments only (query / path parameters)
+            params = {k: v for k, v in kwargs.items()
+                      if k != 'current_user' and isinstance(v, (str, int, float, bool))}
+            cache_key = cache_service._generate_cache_key(f"http:{prefix}", user_id=user_id, v=version, **params)
+            tags = [user_tag(user_id)] + [user_tag(user_id, e) for e in entities]
+            return cache_key, tags, versions, version
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.pop('request', None) if inject_request else kwargs.get('request')
+            current_user = kwargs.get('current_user')
+
+            # Skip caching if no user
+            if current_user is None or request is None:
+                return await func(*args, **kwargs)
+
+            try:
+                cache_key, tags, versions, version = await cache_slot(str(current_user.id), kwargs)
+                if cache_key is None:
+                    return await func(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Response cache lookup error: {e}")
+                return await func(*args, **kwargs)
+
+            uncacheable = []
+            loaded = []
+
+            async def load():
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    uncacheable.append(result)
+                    return None
+                loaded.append(True)
+                body = encode_body(result)
+                return {'etag': make_etag(version, body), 'body': body}
+
+            # Read-through with stale-while-revalidate: one computation per key at a time
+            entry_ttl, entry_stale = lifetimes()
+            entry = await cache_service.get_or_load(cache_key, load, entry_ttl, tags=tags,
+                                                    stale_ttl_seconds=entry_stale)
+            if entry is None:
+                return uncacheable[0] if uncacheable else await func(*args, **kwargs)
+
+            status = 'MISS' if loaded else 'HIT'
+            response_cache_stats['misses' if loaded else 'hits'] += 1
+            etag = entry['etag']
+            if etag_matches(request.headers.get('if-none-match'), etag):
+                response_cache_stats['not_modified'] += 1
+                return Response(status_code=304, headers=_headers(etag, status, versions[ANY_CHANGE]))
+            return Response(entry['body'], media_type='application/json',
+                            headers=_headers(etag, status, versions[ANY_CHANGE]))
+
+        async def warm(user_id: str) -> bool:
+            """Cache the response to a request without query parameters; True if it was computed"""
+            if warm_arguments is None:
+                return False
+            kwargs = {**warm_arguments, 'current_user': WarmUser(str(user_id))}
+            cache_key, tags, _, version = await cache_slot(str(user_id), kwargs)
+            if cache_key is None:
+                return False
+            loaded = []
+
+            async def load():
+                result = await func(**kwargs)
+                if isinstance(result, Response):
+                    return None
+                loaded.append(True)
+                body = encode_body(result)
+                return {'etag': make_etag(version, body), 'body': body}
+
+            entry_ttl, entry_stale = lifetimes()
+            await cache_service.get_or_load(cache_key, load, entry_ttl, tags=tags, stale_ttl_seconds=entry_stale)
+            return bool(loaded)
+
+        wrapper.__signature__ = signature
+        wrapper.warm = warm
+        return wrapper
+    return decorator
@@ -16,6 +16,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from services import RecurringTaskService
 from notification_service import notification_service
+from query_ledger import track_queries
 
 class ScheduledJobs:
     @staticmethod
@@ -35,10 +36,12 @@ class ScheduledJobs:
             print(f"[{datetime.now()}] Processing notifications...")
             
             # Process due reminders
-            sent_count = await notification_service.process_due_reminders()
+            with track_queries("job:process_due_reminders"):
+                sent_count = await notification_service.process_due_reminders()
             
             # Check for overdue tasks and create notifications
-            overdue_count = await notification_service.check_overdue_tasks()
+            with track_queries("job:check_overdue_tasks"):
+                overdue_count = await notification_service.check_overdue_tasks()
             
             if sent_count > 0 or overdue_count > 0:
                 print(f"[{datetime.now()}] Notifications processed: {sent_count} sent, {overdue_count} overdue tasks found")
@@ -8,7 +8,8 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from celery_app import app
-from supabase_client import find_document, find_documents, update_document
+from supabase_client import find_document, find_documents, iter_documents, update_document
+from cache_invalidation import publish_change
 from models import TaskResponse
 import logging
 
@@ -263,6 +264,9 @@ async def _recalculate_single_task_score(task_id: str) -> dict:
         }
         
         await update_document("tasks", {"id": task_id}, update_data)
+        # Task lists and today-priorities are cached per user, versioned on tasks
+        if task_doc.get("user_id"):
+            await publish_change(task_doc["user_id"], "tasks", task_id)
         
         return {
             "task_id": task_id,
@@ -465,36 +469,33 @@ async def _initialize_all_task_scores(user_id: Optional[str] = None, batch_size:
         if user_id:
             query_filter["user_id"] = user_id
         
-        # Get all incomplete tasks
-        all_tasks = await find_documents("tasks", query_filter)
-        
-        if not all_tasks:
-            return {"message": "No tasks found to initialize", "tasks_processed": 0}
-        
-        # Process tasks in batches to avoid overwhelming the system
+        # Stream all incomplete tasks page by page (keyset pagination, no row cap)
         processed_count = 0
         error_count = 0
+        total_tasks = 0
         
-        for i in range(0, len(all_tasks), batch_size):
-            batch = all_tasks[i:i + batch_size]
-            
-            for task in batch:
-                try:
-                    # Trigger individual score calculation
-                    recalculate_task_score.delay(task["id"])
-                    processed_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to trigger initialization for task {task['id']}: {e}")
-                    error_count += 1
+        async for task in iter_documents("tasks", query_filter, page_size=batch_size):
+            total_tasks += 1
+            try:
+                # Trigger individual score calculation
+                recalculate_task_score.delay(task["id"])
+                processed_count += 1
+            except Exception as e:
+                logger.error(f"Failed to trigger initialization for task {task['id']}: {e}")
+                error_count += 1
             
             # Small delay between batches to prevent system overload
-            await asyncio.sleep(1)
+            if total_tasks % batch_size == 0:
+                await asyncio.sleep(1)
+        
+        if not total_tasks:
+            return {"message": "No tasks found to initialize", "tasks_processed": 0}
         
         return {
             "user_id": user_id or "ALL",
             "tasks_processed": processed_count,
             "errors": error_count,
-            "total_tasks": len(all_tasks),
+            "total_tasks": total_tasks,
             "batch_size": batch_size
         }
         
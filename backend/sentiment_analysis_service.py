@@ -18,6 +18,8 @@ from models import (
     EmotionalInsightTypeEnum
 )
 from supabase_client import get_supabase_client, find_documents, update_document
+from cache_invalidation import publish_change
+from projections import select_columns, JOURNAL_SENTIMENT
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -411,6 +413,8 @@ Remember: This is personal reflective writing, so look for subtle emotional cues
             }
             
             result = self.supabase.table('journal_entries').update(update_data).eq('id', entry_id).execute()
+            if result.data and result.data[0].get('user_id'):
+                await publish_change(result.data[0]['user_id'], 'journal', entry_id)
             return bool(result.data)
             
         except Exception as e:
@@ -426,7 +430,7 @@ Remember: This is personal reflective writing, so look for subtle emotional cues
             
             # Get journal entries with sentiment data
             entries = self.supabase.table('journal_entries')\
-                .select('*')\
+                .select(select_columns(JOURNAL_SENTIMENT))\
                 .eq('user_id', user_id)\
                 .gte('created_at', start_date.isoformat())\
                 .not_.is_('sentiment_score', 'null')\
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, status, Request, UploadFile, File, Form, Path
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from pathlib import Path as PathlibPath
@@ -28,7 +28,7 @@ from services import (
     ProjectTemplateService, GoogleAuthService
 )
 from supabase_services import SupabasePillarService, SupabaseAreaService, SupabaseProjectService, SupabaseTaskService
-from supabase_auth import get_current_active_user
+from supabase_auth import get_current_active_user, get_current_active_user_strict
 from supabase_auth_endpoints import auth_router
 from analytics_service import AnalyticsService
 from user_behavior_analytics_service import UserBehaviorAnalyticsService
@@ -38,9 +38,17 @@ from ai_coach_mvp_service import AiCoachMvpService
 from ai_quota_service import ai_quota_service, AIFeatureType
 from hrm_endpoints import hrm_router
 from webhook_handlers import webhook_router
-from cache_service import cache_service
-from functools import wraps
+from cache_service import ANY_CHANGE, USER_EPOCH, cache_result, cache_service
+from response_cache import cache_user_endpoint, response_cache_stats
+from cache_invalidation import invalidation_bus
+from cache_warming import cache_warmer
+from principal_cache import principal_cache
+from auth_user_directory import auth_user_directory
+from connection_pool import connection_pool, initialize_performance_infrastructure
+from query_coalescing import query_coalescer
+from db_resilience import db_resilience
 import json
+import hmac
 import hashlib
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -90,6 +98,10 @@ app.add_middleware(SecurityHeadersMiddleware)
 from input_validation import InputValidationMiddleware
 app.add_middleware(InputValidationMiddleware)
 
+# Add per-request query ledger (Server-Timing header, query budget and N+1 warnings)
+from query_ledger import QueryBudgetMiddleware
+app.add_middleware(QueryBudgetMiddleware)
+
 # Import GraphQL router
 from graphql_app import graphql_router
 
@@ -121,7 +133,41 @@ async def root():
 @api_router.get("/health")
 @limiter.limit("60/minute")  # Health check can be called frequently
 async def health_check(request: Request):
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    # Public: status only; pool, coalescing and circuit details are under /admin/cache/stats
+    return {
+        "status": "degraded" if db_resilience.open_circuits() else "healthy",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+# Cache and database statistics for operators, behind CACHE_ADMIN_TOKEN as a bearer token; the
+# endpoints do not exist until a token is configured
+CACHE_ADMIN_TOKEN = os.environ.get('CACHE_ADMIN_TOKEN')
+
+def require_cache_admin(request: Request):
+    if not CACHE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, supplied = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.strip().encode(), CACHE_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@api_router.get("/admin/cache/stats", dependencies=[Depends(require_cache_admin)])
+async def cache_stats():
+    return {
+        "cache": cache_service.get_stats(),
+        "response_cache": response_cache_stats,
+        "invalidation": invalidation_bus.get_stats(),
+        "warming": cache_warmer.get_stats(),
+        "principals": principal_cache.get_stats(),
+        "auth_users": auth_user_directory.get_stats(),
+        "database_pool": connection_pool.get_pool_stats(),
+        "query_coalescing": query_coalescer.get_stats(),
+        "database_resilience": db_resilience.get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@api_router.get("/admin/cache/metrics", dependencies=[Depends(require_cache_admin)])
+async def cache_prometheus_metrics():
+    return Response(cache_service.get_prometheus_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
@@ -140,56 +186,6 @@ ai_coach_service = AiCoachMvpService()
 user_behavior_analytics_service = UserBehaviorAnalyticsService()
 sentiment_analysis_service = SentimentAnalysisService()
 
-# Caching decorator for user-specific endpoints
-def cache_user_endpoint(ttl=300, cache_prefix=None):
-    """
-    Decorator to cache user-specific endpoint responses
-    
-    Args:
-        ttl: Time to live in seconds (default: 5 minutes)
-        cache_prefix: Optional prefix for cache key
-    """
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, current_user=None, **kwargs):
-            # Skip caching if no user
-            if not current_user:
-                return await func(*args, current_user=current_user, **kwargs)
-            
-            # Generate cache key based on function name, user ID, and kwargs
-            prefix = cache_prefix or func.__name__
-            cache_key_parts = [prefix, str(current_user.id)]
-            
-            # Add relevant kwargs to cache key (exclude complex objects)
-            for key, value in sorted(kwargs.items()):
-                if isinstance(value, (str, int, float, bool)):
-                    cache_key_parts.append(f"{key}:{value}")
-            
-            cache_key = ":".join(cache_key_parts)
-            
-            # Try to get from cache
-            try:
-                cached_data = await cache_service.get(cache_key)
-                if cached_data is not None:
-                    logger.debug(f"Cache hit for {cache_key}")
-                    return cached_data
-            except Exception as e:
-                logger.warning(f"Cache get error: {e}")
-            
-            # Execute function if not cached
-            result = await func(*args, current_user=current_user, **kwargs)
-            
-            # Cache the result (non-blocking)
-            try:
-                await cache_service.set(cache_key, result, ttl_seconds=ttl)
-                logger.debug(f"Cached result for {cache_key}")
-            except Exception as e:
-                logger.warning(f"Cache set error: {e}")
-            
-            return result
-        return wrapper
-    return decorator
-
 # Image upload endpoint with WebP conversion
 @api_router.post("/upload/image")
 async def upload_image(
@@ -231,12 +227,24 @@ async def upload_image(
         raise HTTPException(status_code=500, detail="Failed to upload image")
 
 # Essential API endpoints
-@cache_user_endpoint(ttl=180)  # Cache for 3 minutes
+@api_router.get("/data-version")
+async def get_data_version(current_user: User = Depends(get_current_active_user)):
+    """The user's data version counters; a client holding data from an unchanged version can skip refetching"""
+    versions = await cache_service.get_data_versions(str(current_user.id))
+    if versions is None:
+        raise HTTPException(status_code=503, detail="Data version unavailable")
+    return {
+        "version": versions.pop(ANY_CHANGE),
+        "epoch": versions.pop(USER_EPOCH),
+        "entities": versions
+    }
+
 @api_router.get("/pillars")
+@cache_user_endpoint(ttl=3600, ttl_without_redis=180, depends_on=("pillars", "areas", "projects", "tasks"))  # Versioned; the 1h TTL needs Redis
 async def get_pillars(current_user: User = Depends(get_current_active_user)):
     try:
         service = SupabasePillarService()
-        return await service.get_user_pillars(str(current_user.id))
+        return await service.get_user_pillars(str(current_user.id), strict=True)
     except Exception as e:
         logger.error(f"Error getting pillars: {e}")
         raise HTTPException(status_code=500, detail="Failed to get pillars")
@@ -250,12 +258,12 @@ async def create_pillar(payload: PillarCreate, current_user: User = Depends(get_
         logger.error(f"Error creating pillar: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@cache_user_endpoint(ttl=180)  # Cache for 3 minutes
 @api_router.get("/areas")
+@cache_user_endpoint(ttl=3600, ttl_without_redis=180, depends_on=("pillars", "areas", "projects", "tasks"))  # Versioned; the 1h TTL needs Redis
 async def get_areas(current_user: User = Depends(get_current_active_user)):
     try:
         service = SupabaseAreaService()
-        return await service.get_user_areas(str(current_user.id))
+        return await service.get_user_areas(str(current_user.id), strict=True)
     except Exception as e:
         logger.error(f"Error getting areas: {e}")
         raise HTTPException(status_code=500, detail="Failed to get areas")
@@ -269,12 +277,12 @@ async def create_area(payload: AreaCreate, current_user: User = Depends(get_curr
         logger.error(f"Error creating area: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@cache_user_endpoint(ttl=180)  # Cache for 3 minutes
 @api_router.get("/projects")
+@cache_user_endpoint(ttl=3600, ttl_without_redis=180, depends_on=("areas", "projects", "tasks"))  # Versioned; the 1h TTL needs Redis
 async def get_projects(current_user: User = Depends(get_current_active_user)):
     try:
         service = SupabaseProjectService()
-        return await service.get_user_projects(str(current_user.id))
+        return await service.get_user_projects(str(current_user.id), strict=True)
     except Exception as e:
         logger.error(f"Error getting projects: {e}")
         raise HTTPException(status_code=500, detail="Failed to get projects")
@@ -288,8 +296,8 @@ async def create_project(payload: ProjectCreate, current_user: User = Depends(ge
         logger.error(f"Error creating project: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@cache_user_endpoint(ttl=120)  # Cache for 2 minutes
 @api_router.get("/tasks")
+@cache_user_endpoint(ttl=120, depends_on=("tasks",))  # Cache for 2 minutes
 async def get_tasks(
     project_id: Optional[str] = Query(default=None),
     q: Optional[str] = Query(default=None),
@@ -310,6 +318,7 @@ async def get_tasks(
             status=status,
             priority=priority,
             due_date=due_date,
+            strict=True,
         )
         if not page or not limit:
             return all_tasks
@@ -348,8 +357,8 @@ async def get_insights(
         logger.error(f"Error getting insights: {e}")
         raise HTTPException(status_code=500, detail="Failed to get insights")
 
-@cache_user_endpoint(ttl=180)  # Cache for 3 minutes
 @api_router.get("/journal")
+@cache_user_endpoint(ttl=180, depends_on=("journal",))  # Cache for 3 minutes
 async def get_journal(current_user: User = Depends(get_current_active_user)):
     try:
         journal_service = JournalService()
@@ -681,8 +690,19 @@ async def decompose_project(
         logger.error(f"Error decomposing project: {e}")
         raise HTTPException(status_code=500, detail="Failed to decompose project")
 
-@cache_user_endpoint(ttl=300)  # Cache for 5 minutes
+@cache_result("alignment_scores", ttl_seconds=300,
+              depends_on=("pillars", "areas", "projects", "tasks", "alignment_goal"))
+async def load_alignment_scores(user_id: str) -> dict:
+    """
+    Database side of the alignment dashboard (scores, goal, progress). Cached and warmed
+    after login; the HRM analysis on top is an LLM call and only runs for real requests.
+    Raises on database errors so the zero-score placeholder is never cached.
+    """
+    return await alignment_service.get_dashboard_scores(user_id, strict=True)
+
 @api_router.get("/alignment/dashboard", tags=["Alignment"])
+@cache_user_endpoint(ttl=300, stale_ttl=300,  # Cache for 5 minutes, then refresh in the background
+                     depends_on=("pillars", "areas", "projects", "tasks", "alignment_goal"))
 async def get_alignment_dashboard(
     current_user: User = Depends(get_current_active_user)
 ):
@@ -698,13 +718,15 @@ async def get_alignment_dashboard(
     - Trend analysis and predictions
     """
     try:
-        # Get basic alignment data with HRM enhancement
-        basic_data = await alignment_service.get_alignment_dashboard_data(
-            user_id=str(current_user.id),
-            use_hrm=True
-        )
+        try:
+            basic_data = await load_alignment_scores(str(current_user.id))
+        except Exception as e:
+            # Placeholder scores go out as a Response, which the response cache doesn't keep
+            logger.warning(f"Alignment scores unavailable, serving placeholder: {e}")
+            return JSONResponse(alignment_service.empty_dashboard_scores())
         
-        return basic_data
+        # Get basic alignment data with HRM enhancement
+        return await alignment_service.add_hrm_enhancement(str(current_user.id), basic_data)
         
     except Exception as e:
         logger.error(f"Error getting alignment dashboard: {e}")
@@ -1309,7 +1331,7 @@ async def anonymize_analytics_data(
 
 @api_router.delete("/analytics/data", tags=["Analytics", "Privacy"])
 async def delete_analytics_data(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_strict)
 ):
     """
     Delete all analytics data for the user
@@ -1587,6 +1609,26 @@ async def analyze_text_sentiment(
         logger.error(f"❌ Sentiment analysis endpoint failed: {e}")
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
 
+# Payloads precomputed after login / refresh / onboarding / bulk imports (see cache_warming.py)
+cache_warmer.register("pillars", get_pillars.warm)
+cache_warmer.register("areas", get_areas.warm)
+cache_warmer.register("projects", get_projects.warm)
+cache_warmer.register("tasks", get_tasks.warm)
+cache_warmer.register("today_priorities", AiCoachMvpService.load_today_context)
+# Scores only: the dashboard's HRM analysis is a paid LLM call, not worth running speculatively
+cache_warmer.register("alignment_scores", load_alignment_scores)
+
+@app.on_event("startup")
+async def startup_event():
+    """Warm the database connection pool for this worker"""
+    await initialize_performance_infrastructure()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled PostgREST connections held by this worker"""
+    cache_warmer.stop()
+    await supabase_manager.close()
+
 # Include all routers after endpoints are defined
 app.include_router(api_router)
 app.include_router(auth_router, prefix="/api")
@@ -1,7 +1,7 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta, timezone
 from models import *
-from supabase_client import find_document, find_documents, create_document, update_document, delete_document
+from supabase_client import find_document, find_documents, iter_documents, create_document, update_document, delete_document
 from sentiment_analysis_service import SentimentAnalysisService
 import logging
 import asyncio
@@ -9,6 +9,8 @@ import uuid
 
 # New: import Supabase services for tasks and hierarchy lookups
 from supabase_services import SupabaseTaskService, SupabaseProjectService, SupabaseAreaService, SupabasePillarService
+from cache_service import cache_insights_data
+from cache_invalidation import publish_change
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,7 @@ class JournalService:
         entry_id = await create_document("journal_entries", entry_dict)
         if entry_id:
             entry_dict["id"] = entry_id
+            await publish_change(user_id, 'journal', entry_id)
             
             # Trigger sentiment analysis asynchronously (non-blocking)
             try:
@@ -113,21 +116,30 @@ class JournalService:
         """Soft delete a journal entry using Supabase columns"""
         query = {"id": entry_id, "user_id": user_id}
         update = {"deleted": True, "deleted_at": datetime.utcnow().isoformat()}
-        return await update_document("journal_entries", query, update)
+        success = await update_document("journal_entries", query, update)
+        if success:
+            await publish_change(user_id, 'journal', entry_id)
+        return success
     
     @staticmethod
     async def restore_entry(user_id: str, entry_id: str) -> bool:
         """Restore a soft-deleted journal entry"""
         query = {"id": entry_id, "user_id": user_id}
         update = {"deleted": False, "deleted_at": None}
-        return await update_document("journal_entries", query, update)
+        success = await update_document("journal_entries", query, update)
+        if success:
+            await publish_change(user_id, 'journal', entry_id)
+        return success
     
     @staticmethod
     async def purge_entry(user_id: str, entry_id: str) -> bool:
         """Permanently delete a journal entry"""
         # Since we're using hard delete for soft delete, this is the same operation
         query = {"id": entry_id, "user_id": user_id}
-        return await delete_document("journal_entries", query)
+        success = await delete_document("journal_entries", query)
+        if success:
+            await publish_change(user_id, 'journal', entry_id)
+        return success
     
     @staticmethod
     async def update_entry(user_id: str, entry_id: str, entry_data: JournalEntryUpdate) -> bool:
@@ -143,7 +155,10 @@ class JournalService:
                 update_dict["reading_time_minutes"] = max(1, word_count // 200)
             
             update_dict["updated_at"] = datetime.utcnow()
-            return await update_document("journal_entries", query, update_dict)
+            success = await update_document("journal_entries", query, update_dict)
+            if success:
+                await publish_change(user_id, 'journal', entry_id)
+            return success
         return False
     
     @staticmethod
@@ -177,13 +192,20 @@ class JournalService:
     @staticmethod
     async def get_on_this_day(user_id: str, date: datetime) -> List[OnThisDayEntry]:
         """Get journal entries from the same date in previous years"""
-        # Get all entries for the user and filter by date in Python
-        all_docs = await find_documents("journal_entries", {"user_id": user_id}, sort=[("created_at", -1)])
+        # Only the last 5 years can match; stream them newest first instead of loading all entries
+        earliest = datetime(date.year - 5, 1, 1)
+        docs = iter_documents(
+            "journal_entries",
+            {"user_id": user_id, "created_at": {"$gte": earliest}},
+            order_key="created_at",
+            page_size=200,
+            ascending=False
+        )
         
         entries = []
         target_month_day = (date.month, date.day)
         
-        for doc in all_docs:
+        async for doc in docs:
             try:
                 # Parse the created_at date
                 created_at = doc["created_at"]
@@ -423,13 +445,16 @@ class TaskService:
         status: Optional[str] = None,
         priority: Optional[str] = None,
         due_date: Optional[str] = None,
+        strict: bool = False,
     ) -> List[Dict[str, Any]]:
         """Return user's tasks with optional server-side filters.
         Supported filters: q (search), status (all|active|completed|todo|in_progress|review),
         priority (low|medium|high), due_date (overdue|today|week), project_id.
+        With strict, database errors raise instead of yielding no tasks.
         """
         # Base fetch via Supabase service (handles user_id, project_id)
-        base_tasks = await SupabaseTaskService.get_user_tasks(user_id, project_id=project_id, completed=None)
+        base_tasks = await SupabaseTaskService.get_user_tasks(user_id, project_id=project_id, completed=None,
+                                                              strict=strict)
 
         # Normalize helper
         def parse_dt(val):
@@ -498,158 +523,169 @@ class InsightsService:
     async def get_user_insights(user_id: str, date_range: str = 'all_time', area_id: Optional[str] = None) -> Dict[str, Any]:
         """Compute a minimal but stable insights payload with Eisenhower matrix and alignment snapshot."""
         try:
-            # Fetch tasks and hierarchy for enrichment
-            tasks = await SupabaseTaskService.get_user_tasks(user_id)
-            projects = await SupabaseProjectService.get_user_projects(user_id)
-            areas = await SupabaseAreaService.get_user_areas(user_id)
-            pillars = await SupabasePillarService.get_user_pillars(user_id)
-
-            # Build lookup maps
-            proj_by_id = {p['id']: p for p in (projects or [])}
-            area_by_id = {a['id']: a for a in (areas or [])}
-            pillar_by_id = {pl['id']: pl for pl in (pillars or [])}
-
-            # Enrich tasks with project/area/pillar names
-            def get_names(t):
-                pn = an = pln = None
-                pid = t.get('project_id')
-                if pid and pid in proj_by_id:
-                    pn = proj_by_id[pid].get('name')
-                    aid = proj_by_id[pid].get('area_id')
-                    if aid and aid in area_by_id:
-                        an = area_by_id[aid].get('name')
-                        plid = area_by_id[aid].get('pillar_id')
-                        if plid and plid in pillar_by_id:
-                            pln = pillar_by_id[plid].get('name')
-                return pn, an, pln
-
-            # Eisenhower matrix classification (timezone-safe)
-            now = datetime.now(timezone.utc)
-            end_of_today = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-            urgent_threshold = end_of_today
-
-            Q1, Q2, Q3, Q4 = [], [], [], []
-            for t in tasks or []:
-                due_str = t.get('due_date')
-                try:
-                    due = datetime.fromisoformat(str(due_str).replace('Z', '+00:00')) if due_str else None
-                    if due and not due.tzinfo:
-                        due = due.replace(tzinfo=timezone.utc)
-                except Exception:
-                    due = None
-                urgent = bool(due and due <= urgent_threshold)
-                important = (t.get('priority', 'medium') == 'high')
-                task_view = {
-                    'id': t.get('id'),
-                    'title': t.get('name'),
-                    'priority': t.get('priority'),
-                    'status': t.get('status'),
-                    'due_date': t.get('due_date'),
-                }
-                pn, an, pln = get_names(t)
-                if pn: task_view['project_name'] = pn
-                if an: task_view['area_name'] = an
-                if pln: task_view['pillar_name'] = pln
-
-                if urgent and important:
-                    Q1.append(task_view)
-                elif important and not urgent:
-                    Q2.append(task_view)
-                elif urgent and not important:
-                    Q3.append(task_view)
-                else:
-                    Q4.append(task_view)
-
-            eisenhower = {
-                'Q1': { 'label': 'Urgent & Important', 'count': len(Q1), 'tasks': Q1 },
-                'Q2': { 'label': 'Important, Not Urgent', 'count': len(Q2), 'tasks': Q2 },
-                'Q3': { 'label': 'Urgent, Not Important', 'count': len(Q3), 'tasks': Q3 },
-                'Q4': { 'label': 'Not Urgent & Not Important', 'count': len(Q4), 'tasks': Q4 },
-            }
-
-            # Alignment snapshot by pillar (based on completed tasks)
-            completed = [t for t in (tasks or []) if t.get('completed')]
-            total_completed = len(completed) or 1  # avoid div-by-zero
-            counts_by_pillar: Dict[str, int] = {}
-            for t in completed:
-                pid = t.get('project_id')
-                aid = proj_by_id.get(pid, {}).get('area_id') if pid else None
-                plid = area_by_id.get(aid, {}).get('pillar_id') if aid else None
-                if plid:
-                    counts_by_pillar[plid] = counts_by_pillar.get(plid, 0) + 1
-            pillar_alignment = []
-            for plid, cnt in counts_by_pillar.items():
-                pillar_alignment.append({
-                    'pillar_id': plid,
-                    'pillar_name': pillar_by_id.get(plid, {}).get('name', 'Unknown'),
-                    'percentage': round((cnt / total_completed) * 100, 1),
-                    'tasks_completed': cnt,
-                })
-            pillar_alignment.sort(key=lambda x: x['percentage'], reverse=True)
-            alignment_snapshot = {
-                'score': 0,  # placeholder for future scoring
-                'pillar_alignment': pillar_alignment,
-            }
-
-            # Area distribution
-            area_counts: Dict[str, int] = {}
-            for t in completed:
-                pid = t.get('project_id')
-                aid = proj_by_id.get(pid, {}).get('area_id') if pid else None
-                if aid:
-                    area_counts[aid] = area_counts.get(aid, 0) + 1
-            total_area_completed = sum(area_counts.values()) or 1
-            area_distribution = []
-            for aid, cnt in area_counts.items():
-                a = area_by_id.get(aid, {})
-                projects_in_area = [p for p in (projects or []) if p.get('area_id') == aid]
-                area_distribution.append({
-                    'area_id': aid,
-                    'area_name': a.get('name', 'Unknown'),
-                    'projects_count': len(projects_in_area),
-                    'task_count': cnt,
-                    'percentage': round((cnt / total_area_completed) * 100, 1),
-                    'area_color': a.get('color', '#3B82F6'),
-                    'area_icon': a.get('icon', 'Circle'),
-                })
-            area_distribution.sort(key=lambda x: x['percentage'], reverse=True)
-
-            insights_text = []
-            if len(Q1) > 0:
-                insights_text.append(f"You have {len(Q1)} urgent and important task(s) to prioritize today.")
-            if pillar_alignment:
-                top = pillar_alignment[0]
-                insights_text.append(f"Most of your recent completions align with '{top['pillar_name']}' ({top['percentage']}%).")
-
-            data = {
-                'eisenhower_matrix': eisenhower,
-                'alignment_snapshot': alignment_snapshot,
-                'area_distribution': area_distribution,
-                'alignment_progress': {},
-                'productivity_trends': {},
-                'insights_text': insights_text,
-                'recommendations': [],
-                'generated_at': datetime.now(timezone.utc).isoformat()
-            }
-            return data
+            return await InsightsService.compute_user_insights(user_id, date_range=date_range, area_id=area_id)
         except Exception as e:
             logger.error(f"Insights computation failed: {e}")
-            # Return a minimal but valid payload to keep UI stable
-            return {
-                'eisenhower_matrix': {
-                    'Q1': {'label': 'Urgent & Important', 'count': 0, 'tasks': []},
-                    'Q2': {'label': 'Important, Not Urgent', 'count': 0, 'tasks': []},
-                    'Q3': {'label': 'Urgent, Not Important', 'count': 0, 'tasks': []},
-                    'Q4': {'label': 'Not Urgent & Not Important', 'count': 0, 'tasks': []},
-                },
-                'alignment_snapshot': {'score': 0, 'pillar_alignment': []},
-                'area_distribution': [],
-                'alignment_progress': {},
-                'productivity_trends': {},
-                'insights_text': [],
-                'recommendations': [],
-                'generated_at': datetime.now(timezone.utc).isoformat()
+            # Return a minimal but valid payload to keep UI stable (not cached, so the next call retries)
+            return InsightsService.empty_insights()
+
+    @staticmethod
+    def empty_insights() -> Dict[str, Any]:
+        """Insights payload shown when they can't be computed"""
+        return {
+            'eisenhower_matrix': {
+                'Q1': {'label': 'Urgent & Important', 'count': 0, 'tasks': []},
+                'Q2': {'label': 'Important, Not Urgent', 'count': 0, 'tasks': []},
+                'Q3': {'label': 'Urgent, Not Important', 'count': 0, 'tasks': []},
+                'Q4': {'label': 'Not Urgent & Not Important', 'count': 0, 'tasks': []},
+            },
+            'alignment_snapshot': {'score': 0, 'pillar_alignment': []},
+            'area_distribution': [],
+            'alignment_progress': {},
+            'productivity_trends': {},
+            'insights_text': [],
+            'recommendations': [],
+            'generated_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    @staticmethod
+    @cache_insights_data(ttl_seconds=300, stale_ttl_seconds=300)
+    async def compute_user_insights(user_id: str, date_range: str = 'all_time', area_id: Optional[str] = None) -> Dict[str, Any]:
+        """Insights payload for get_user_insights; cached, and raises if the data can't be read"""
+        # Fetch tasks and hierarchy for enrichment
+        tasks = await SupabaseTaskService.get_user_tasks(user_id, strict=True)
+        projects = await SupabaseProjectService.get_user_projects(user_id, strict=True)
+        areas = await SupabaseAreaService.get_user_areas(user_id, strict=True)
+        pillars = await SupabasePillarService.get_user_pillars(user_id, strict=True)
+
+        # Build lookup maps
+        proj_by_id = {p['id']: p for p in (projects or [])}
+        area_by_id = {a['id']: a for a in (areas or [])}
+        pillar_by_id = {pl['id']: pl for pl in (pillars or [])}
+
+        # Enrich tasks with project/area/pillar names
+        def get_names(t):
+            pn = an = pln = None
+            pid = t.get('project_id')
+            if pid and pid in proj_by_id:
+                pn = proj_by_id[pid].get('name')
+                aid = proj_by_id[pid].get('area_id')
+                if aid and aid in area_by_id:
+                    an = area_by_id[aid].get('name')
+                    plid = area_by_id[aid].get('pillar_id')
+                    if plid and plid in pillar_by_id:
+                        pln = pillar_by_id[plid].get('name')
+            return pn, an, pln
+
+        # Eisenhower matrix classification (timezone-safe)
+        now = datetime.now(timezone.utc)
+        end_of_today = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+        urgent_threshold = end_of_today
+
+        Q1, Q2, Q3, Q4 = [], [], [], []
+        for t in tasks or []:
+            due_str = t.get('due_date')
+            try:
+                due = datetime.fromisoformat(str(due_str).replace('Z', '+00:00')) if due_str else None
+                if due and not due.tzinfo:
+                    due = due.replace(tzinfo=timezone.utc)
+            except Exception:
+                due = None
+            urgent = bool(due and due <= urgent_threshold)
+            important = (t.get('priority', 'medium') == 'high')
+            task_view = {
+                'id': t.get('id'),
+                'title': t.get('name'),
+                'priority': t.get('priority'),
+                'status': t.get('status'),
+                'due_date': t.get('due_date'),
             }
+            pn, an, pln = get_names(t)
+            if pn: task_view['project_name'] = pn
+            if an: task_view['area_name'] = an
+            if pln: task_view['pillar_name'] = pln
+
+            if urgent and important:
+                Q1.append(task_view)
+            elif important and not urgent:
+                Q2.append(task_view)
+            elif urgent and not important:
+                Q3.append(task_view)
+            else:
+                Q4.append(task_view)
+
+        eisenhower = {
+            'Q1': { 'label': 'Urgent & Important', 'count': len(Q1), 'tasks': Q1 },
+            'Q2': { 'label': 'Important, Not Urgent', 'count': len(Q2), 'tasks': Q2 },
+            'Q3': { 'label': 'Urgent, Not Important', 'count': len(Q3), 'tasks': Q3 },
+            'Q4': { 'label': 'Not Urgent & Not Important', 'count': len(Q4), 'tasks': Q4 },
+        }
+
+        # Alignment snapshot by pillar (based on completed tasks)
+        completed = [t for t in (tasks or []) if t.get('completed')]
+        total_completed = len(completed) or 1  # avoid div-by-zero
+        counts_by_pillar: Dict[str, int] = {}
+        for t in completed:
+            pid = t.get('project_id')
+            aid = proj_by_id.get(pid, {}).get('area_id') if pid else None
+            plid = area_by_id.get(aid, {}).get('pillar_id') if aid else None
+            if plid:
+                counts_by_pillar[plid] = counts_by_pillar.get(plid, 0) + 1
+        pillar_alignment = []
+        for plid, cnt in counts_by_pillar.items():
+            pillar_alignment.append({
+                'pillar_id': plid,
+                'pillar_name': pillar_by_id.get(plid, {}).get('name', 'Unknown'),
+                'percentage': round((cnt / total_completed) * 100, 1),
+                'tasks_completed': cnt,
+            })
+        pillar_alignment.sort(key=lambda x: x['percentage'], reverse=True)
+        alignment_snapshot = {
+            'score': 0,  # placeholder for future scoring
+            'pillar_alignment': pillar_alignment,
+        }
+
+        # Area distribution
+        area_counts: Dict[str, int] = {}
+        for t in completed:
+            pid = t.get('project_id')
+            aid = proj_by_id.get(pid, {}).get('area_id') if pid else None
+            if aid:
+                area_counts[aid] = area_counts.get(aid, 0) + 1
+        total_area_completed = sum(area_counts.values()) or 1
+        area_distribution = []
+        for aid, cnt in area_counts.items():
+            a = area_by_id.get(aid, {})
+            projects_in_area = [p for p in (projects or []) if p.get('area_id') == aid]
+            area_distribution.append({
+                'area_id': aid,
+                'area_name': a.get('name', 'Unknown'),
+                'projects_count': len(projects_in_area),
+                'task_count': cnt,
+                'percentage': round((cnt / total_area_completed) * 100, 1),
+                'area_color': a.get('color', '#3B82F6'),
+                'area_icon': a.get('icon', 'Circle'),
+            })
+        area_distribution.sort(key=lambda x: x['percentage'], reverse=True)
+
+        insights_text = []
+        if len(Q1) > 0:
+            insights_text.append(f"You have {len(Q1)} urgent and important task(s) to prioritize today.")
+        if pillar_alignment:
+            top = pillar_alignment[0]
+            insights_text.append(f"Most of your recent completions align with '{top['pillar_name']}' ({top['percentage']}%).")
+
+        data = {
+            'eisenhower_matrix': eisenhower,
+            'alignment_snapshot': alignment_snapshot,
+            'area_distribution': area_distribution,
+            'alignment_progress': {},
+            'productivity_trends': {},
+            'insights_text': insights_text,
+            'recommendations': [],
+            'generated_at': datetime.now(timezone.utc).isoformat()
+        }
+        return data
 
 
 # Placeholder service classes to satisfy imports (kept for backward compatibility)
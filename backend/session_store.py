@@ -0,0 +1,258 @@
+"""
+OAuth Session Store
+Storage behind the SessionManagers of emergent_auth.py and google_oauth.py, which used to
+keep sessions in a class-level dict: a session created on one uvicorn worker was
+invisible to the others, the dict grew without bound, and expired sessions were only
+dropped when someone read them.
+
+- RedisSessionStore: one hash per session (`session:{namespace}:{token}`) with a native
+  TTL, shared by every worker; Redis drops expired sessions itself. Extending a session
+  sets its expires_at field and the key's TTL without rewriting the record.
+- MemorySessionStore: bounded LRU with per-entry TTL and a background sweeper
+  (memory_cache.MemoryCache), for single-process mode.
+
+SESSION_STORE picks the backend: 'redis', 'memory' or 'auto' (Redis whenever the cache
+service has a connection). Lookups are O(1) either way.
+"""
+
+import os
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from cache_service import _text, cache_service
+from memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = 'session:'
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(7 * 24 * 3600)))
+# Record fields stored as ISO timestamps
+DATETIME_FIELDS = ('created_at', 'expires_at')
+
+
+def _encode_field(value: Any) -> str:
+    return json.dumps(value.isoformat() if isinstance(value, datetime) else value)
+
+
+def _decode_record(fields: Dict[Any, Any]) -> Dict[str, Any]:
+    record = {}
+    for field, raw in fields.items():
+        field = _text(field)
+        value = json.loads(_text(raw))
+        if field in DATETIME_FIELDS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        record[field] = value
+    return record
+
+
+class MemorySessionStore:
+    """Sessions of a single process, bounded by SESSION_MEMORY_MAX_ENTRIES (LRU)"""
+
+    backend = 'memory'
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.sessions = MemoryCache(max_entries=max_entries or int(os.getenv('SESSION_MEMORY_MAX_ENTRIES', '10000')))
+
+    async def save(self, token: str, record: Dict[str, Any], ttl_seconds: float):
+        self.sessions.set(token, record, ttl_seconds)
+
+    async def load(self, token: str) -> Optional[Dict[str, Any]]:
+        return self.sessions.get(token)
+
+    async def delete(self, token: str) -> bool:
+        return self.sessions.delete(token)
+
+    async def touch(self, token: str, expires_at: datetime, ttl_seconds: float) -> bool:
+        record = self.sessions.get(token)
+        if record is None:
+            return False
+        record['expires_at'] = expires_at
+        self.sessions.set(token, record, ttl_seconds)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class RedisSessionStore:
+    """Sessions shared by all workers, one Redis hash per session"""
+
+    backend = 'redis'
+
+    def __init__(self, client, namespace: str):
+        self.client = client
+        self.namespace = namespace
+
+    def _key(self, token: str) -> str:
+        return f"{SESSION_KEY_PREFIX}{self.namespace}:{token}"
+
+    async def save(self, token: str, record: Dict[str, Any], ttl_seconds: float):
+        key = self._key(token)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={field: _encode_field(value) for field, value in record.items()})
+            pipe.pexpire(key, int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def load(self, token: str) -> Optional[Dict[str, Any]]:
+        fields = await self.client.hgetall(self._key(token))
+        return _decode_record(fields) if fields else None
+
+    async def delete(self, token: str) -> bool:
+        return bool(await self.client.delete(self._key(token)))
+
+    async def touch(self, token: str, expires_at: datetime, ttl_seconds: float) -> bool:
+        key = self._key(token)
+        async with self.client.pipeline(transaction=True) as pipe:
+            # A session deleted meanwhile must not come back as a bare expires_at field
+            await pipe.watch(key)
+            if not await pipe.exists(key):
+                return False
+            pipe.multi()
+            pipe.hset(key, 'expires_at', _encode_field(expires_at))
+            pipe.pexpire(key, int(ttl_seconds * 1000))
+            await pipe.execute()
+        return True
+
+
+def create_session_store(namespace: str):
+    """The store SESSION_STORE asks for; 'auto' uses Redis when the cache service has it"""
+    backend = os.getenv('SESSION_STORE', 'auto').lower()
+    if backend != 'memory' and cache_service.redis_client is not None:
+        return RedisSessionStore(cache_service.redis_client, namespace)
+    if backend == 'redis':
+        logger.warning("SESSION_STORE=redis but Redis is unavailable; sessions are per worker")
+    return MemorySessionStore()
+
+
+class SessionManagerBase:
+    """
+    Session lifecycle shared by the OAuth SessionManagers. Subclasses set `namespace`
+    (their sessions' key space) and may override new_token.
+    """
+
+    namespace = 'default'
+    ttl_seconds = SESSION_TTL_SECONDS
+
+    @classmethod
+    def store(cls):
+        # One store per subclass, created on first use
+        if cls.__dict__.get('_store') is None:
+            cls._store = create_session_store(cls.namespace)
+        return cls._store
+
+    @classmethod
+    def use_store(cls, store):
+        """Replace the session store (e.g. to pin a backend)"""
+        cls._store = store
+
+    @classmethod
+    def new_token(cls, user_data: Dict[str, Any]) -> str:
+        return str(uuid.uuid4())
+
+    @classmethod
+    async def create_session(cls, user_data: Dict[str, Any]) -> str:
+        """
+        Create a new session for the user
+
+        Args:
+            user_data: User data from the identity provider
+
+        Returns:
+            Session token
+        """
+        session_token = cls.new_token(user_data)
+        now = datetime.utcnow()
+        record = {
+            'user_id': user_data.get('id'),
+            'email': user_data.get('email'),
+            'name': user_data.get('name'),
+            'picture': user_data.get('picture'),
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=cls.ttl_seconds),
+            'is_active': True
+        }
+        try:
+            await cls.store().save(session_token, record, cls.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to store session: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Session store temporarily unavailable"
+            )
+
+        logger.info(f"Created session for user {user_data.get('email')}")
+        return session_token
+
+    @classmethod
+    async def get_session(cls, session_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Get session data if valid and not expired
+
+        Args:
+            session_token: The session token
+
+        Returns:
+            Session data or None if invalid/expired
+        """
+        try:
+            session_data = await cls.store().load(session_token)
+        except Exception as e:
+            logger.error(f"Failed to load session: {e}")
+            return None
+
+        if not session_data:
+            return None
+
+        # The store expires sessions itself; this guards against clock skew between workers
+        if datetime.utcnow() > session_data['expires_at']:
+            await cls.delete_session(session_token)
+            return None
+
+        if not session_data.get('is_active', True):
+            return None
+
+        return session_data
+
+    @classmethod
+    async def delete_session(cls, session_token: str) -> bool:
+        """
+        Delete a session
+
+        Args:
+            session_token: The session token to delete
+
+        Returns:
+            True if session was deleted, False if not found
+        """
+        try:
+            deleted = await cls.store().delete(session_token)
+        except Exception as e:
+            logger.error(f"Failed to delete session: {e}")
+            return False
+        if deleted:
+            logger.info(f"Deleted session {session_token}")
+        return deleted
+
+    @classmethod
+    async def extend_session(cls, session_token: str) -> bool:
+        """
+        Slide the session's expiry to ttl_seconds from now
+
+        Args:
+            session_token: The session token to extend
+
+        Returns:
+            True if extended, False if session not found
+        """
+        try:
+            expires_at = datetime.utcnow() + timedelta(seconds=cls.ttl_seconds)
+            return await cls.store().touch(session_token, expires_at, cls.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to extend session: {e}")
+            return False
@@ -1,6 +1,11 @@
 """
 Supabase Authentication Module
 Replaces custom JWT auth with Supabase Auth
+
+Access tokens are verified locally (see supabase_jwt.py) so authenticating a request
+costs no network round trip; GoTrue is asked only when no signing key is configured or
+available, and by verify_token_strict for endpoints that must see revoked sessions. The
+User a token resolves to is cached per (user id, iat), see principal_cache.py.
 """
 
 import os
@@ -8,6 +13,9 @@ from typing import Optional
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import create_client, Client
+from db_resilience import install_sync_client
+from principal_cache import principal_cache
+from supabase_jwt import TokenVerificationError, UnverifiableTokenError, VerifiedUser, jwt_verifier
 from models import User
 import logging
 
@@ -19,10 +27,20 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+install_sync_client(supabase)
 
 # HTTP Bearer for token authentication
 security = HTTPBearer()
 
+# Verify access tokens in-process; set to false to ask GoTrue on every request
+LOCAL_JWT_VERIFICATION = os.getenv('AUTH_LOCAL_JWT_VERIFICATION', 'true').lower() == 'true'
+
+def _bearer_token(credentials) -> Optional[str]:
+    # Support both FastAPI-injected credentials and direct string token usage
+    if isinstance(credentials, str):
+        return credentials
+    return getattr(credentials, 'credentials', None)
+
 class SupabaseAuth:
     """Supabase authentication handler"""
     
@@ -37,16 +55,31 @@ class SupabaseAuth:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-        try:
-            # Support both FastAPI-injected credentials and direct string token usage
-            if isinstance(credentials, str):
-                token = credentials
-            elif hasattr(credentials, 'credentials'):
-                token = credentials.credentials
-            else:
+        token = _bearer_token(credentials)
+        if not token:
+            raise credentials_exception
+        
+        if LOCAL_JWT_VERIFICATION:
+            try:
+                return await jwt_verifier.verify(token)
+            except TokenVerificationError as e:
+                logger.info(f"Token rejected: {e}")
                 raise credentials_exception
-            
-            # Verify token with Supabase
+            except UnverifiableTokenError as e:
+                logger.debug(f"Local token verification unavailable ({e}), asking Supabase")
+        
+        return await SupabaseAuth.verify_token_remote(token)
+    
+    @staticmethod
+    async def verify_token_remote(token: str):
+        """Verify a token with Supabase (GoTrue), which also knows about revoked sessions"""
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        
+        try:
             user_response = supabase.auth.get_user(token)
             
             if not getattr(user_response, 'user', None):
@@ -60,7 +93,19 @@ class SupabaseAuth:
     
     @staticmethod
     async def get_current_user(supabase_user: dict) -> User:
-        """Get current authenticated user with profile data"""
+        """
+        Get current authenticated user with profile data. Cached per token (user id, iat)
+        in principal_cache, so the profile is read once per token rather than per request.
+        """
+        return await principal_cache.resolve(
+            supabase_user.id,
+            getattr(supabase_user, 'issued_at', None),
+            lambda: SupabaseAuth.load_user_profile(supabase_user)
+        )
+    
+    @staticmethod
+    async def load_user_profile(supabase_user: dict) -> User:
+        """Build the User from the user_profiles row, creating the row if it is missing"""
         try:
             # Get user profile from our user_profiles table
             profile_response = supabase.table('user_profiles').select('*').eq('id', supabase_user.id).single().execute()
@@ -110,11 +155,23 @@ class SupabaseAuth:
                 detail="User not found"
             )
 
+    @staticmethod
+    async def verify_token_strict(credentials: HTTPAuthorizationCredentials = Depends(security)):
+        """Verify a token locally, then with Supabase so signed-out sessions are refused too"""
+        supabase_user = await SupabaseAuth.verify_token(credentials)
+        if isinstance(supabase_user, VerifiedUser):
+            supabase_user = await SupabaseAuth.verify_token_remote(_bearer_token(credentials))
+        return supabase_user
+
 # Export functions for use in FastAPI dependencies
 async def get_current_user(supabase_user: dict = Depends(SupabaseAuth.verify_token)) -> User:
     """Get current authenticated user with profile data"""
     return await SupabaseAuth.get_current_user(supabase_user)
 
+async def get_current_user_strict(supabase_user: dict = Depends(SupabaseAuth.verify_token_strict)) -> User:
+    """Like get_current_user, but also refuses revoked sessions (one call to Supabase)"""
+    return await SupabaseAuth.get_current_user(supabase_user)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     if not current_user.is_active:
@@ -124,5 +181,14 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         )
     return current_user
 
+async def get_current_active_user_strict(current_user: User = Depends(get_current_user_strict)) -> User:
+    """Current active user for revocation-sensitive endpoints (e.g. deleting data)"""
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return current_user
+
 # Export token verification function
 verify_token = SupabaseAuth.verify_token
@@ -20,7 +20,10 @@ from fastapi import APIRouter, HTTPException, status, Request, Depends
 from pydantic import BaseModel, EmailStr, validator
 
 from supabase_client import supabase_manager
+from auth_user_directory import auth_user_directory
 from supabase_auth import verify_token, get_current_active_user
+from cache_warming import request_warmup
+from principal_cache import invalidate_principal
 from models import UserCreate, UserLogin, UserResponse, User
 
 # Configure logging
@@ -96,25 +99,8 @@ class UserManager:
             bool: True if user exists, False otherwise
         """
         try:
-            supabase = supabase_manager.get_client()
-            existing = supabase.auth.admin.list_users()
-            existing_users = (
-                existing.users if hasattr(existing, 'users') 
-                else existing.get('users') if isinstance(existing, dict) 
-                else existing
-            )
-            
-            for user in (existing_users or []):
-                user_email = (
-                    getattr(user, 'email', None) if hasattr(user, 'email')
-                    else user.get('email') if isinstance(user, dict)
-                    else None
-                )
-                
-                if isinstance(user_email, str) and user_email.lower() == email.lower():
-                    return True
-                    
-            return False
+            # Indexed lookup of auth.users by email (see auth_user_directory.py)
+            return await auth_user_directory.find_user_id(email) is not None
             
         except Exception as e:
             logger.warning(f"Could not check existing users: {e}")
@@ -394,6 +380,13 @@ async def register_user(user_data: UserCreate):
         )
 
 
+def _session_user_id(response: Any, session: Any) -> Optional[str]:
+    """User id from a Supabase auth response or its session, if present"""
+    user = getattr(response, 'user', None) or getattr(session, 'user', None)
+    user_id = getattr(user, 'id', None)
+    return str(user_id) if user_id else None
+
+
 @auth_router.post("/login")
 async def login_user(user_credentials: UserLogin):
     """
@@ -423,6 +416,9 @@ async def login_user(user_credentials: UserLogin):
             
             session = auth_response.session
             
+            # Precompute the dashboard payloads while the client loads
+            request_warmup(_session_user_id(auth_response, session), 'login')
+            
             return {
                 "access_token": session.access_token,
                 "refresh_token": getattr(session, 'refresh_token', None),
@@ -490,6 +486,8 @@ async def refresh_session(payload: RefreshRequest):
         if not access_token:
             raise SupabaseError("No access token in refresh response", 401)
         
+        request_warmup(_session_user_id(refreshed, session), 'refresh')
+        
         return {
             "access_token": access_token,
             "refresh_token": getattr(session, 'refresh_token', None) or payload.refresh_token,
@@ -714,6 +712,8 @@ async def complete_onboarding(current_user: User = Depends(get_current_active_us
                     {"level": 2}
                 )
         
+        await invalidate_principal(user_id)
+        request_warmup(user_id, 'onboarding', force=True)
         return {"success": True}
         
     except Exception as e:
@@ -20,6 +20,7 @@ from fastapi import APIRouter, HTTPException, status, Request, Depends
 from pydantic import BaseModel, EmailStr, validator
 
 from supabase_client import supabase_manager
+from auth_user_directory import auth_user_directory
 from supabase_auth import verify_token, get_current_active_user
 from models import UserCreate, UserLogin, UserResponse, User
 
@@ -96,25 +97,8 @@ class UserManager:
             bool: True if user exists, False otherwise
         """
         try:
-            supabase = supabase_manager.get_client()
-            existing = supabase.auth.admin.list_users()
-            existing_users = (
-                existing.users if hasattr(existing, 'users') 
-                else existing.get('users') if isinstance(existing, dict) 
-                else existing
-            )
-            
-            for user in (existing_users or []):
-                user_email = (
-                    getattr(user, 'email', None) if hasattr(user, 'email')
-                    else user.get('email') if isinstance(user, dict)
-                    else None
-                )
-                
-                if isinstance(user_email, str) and user_email.lower() == email.lower():
-                    return True
-                    
-            return False
+            # Indexed lookup of auth.users by email (see auth_user_directory.py)
+            return await auth_user_directory.find_user_id(email) is not None
             
         except Exception as e:
             logger.warning(f"Could not check existing users: {e}")
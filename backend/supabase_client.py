@@ -4,11 +4,19 @@ Replaces MongoDB database.py
 """
 
 import os
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, Callable, AsyncIterator
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
+from connection_pool import connection_pool, PooledConnection
+from query_filters import apply_filters
+from query_aggregation import compile_pipeline, shape_results
+from projections import Projection, select_columns
+from query_coalescing import query_coalescer, LeaderCancelled
+from query_ledger import record_query, paginated
+from db_resilience import install_sync_client
 
 # Load environment variables from main .env file
 load_dotenv('.env')
@@ -20,6 +28,8 @@ class SupabaseManager:
     
     def __init__(self):
         self.client: Optional[Client] = None
+        self.pool = connection_pool
+        self.coalescer = query_coalescer
         self._initialize_client()
     
     def _initialize_client(self):
@@ -31,7 +41,13 @@ class SupabaseManager:
             if not url or not key:
                 raise ValueError("Supabase credentials not found in environment")
             
+            # Sync client is kept for auth admin and storage APIs
             self.client = create_client(url, key)
+            # Direct client.table(...).execute() calls share the pooled sessions' circuit breakers
+            install_sync_client(self.client)
+            
+            # Pooled async PostgREST connections serve all table reads and writes
+            self.pool.configure(f"{url.rstrip('/')}/rest/v1", key)
             logger.info("✅ Supabase client initialized")
             
         except Exception as e:
@@ -44,6 +60,47 @@ class SupabaseManager:
             self._initialize_client()
         return self.client
     
+    async def run_query(self, build: Callable[[PooledConnection], Any]):
+        """
+        Build and execute a PostgREST query without blocking the event loop.
+        
+        `build` receives a pooled connection and returns a request builder, e.g.
+        `await supabase_manager.run_query(lambda db: db.table('tasks').select('*').eq('user_id', user_id))`.
+        At most `DB_POOL_MAX_SIZE` queries run at once per worker; the rest wait for a connection.
+        
+        Identical concurrent reads are coalesced into one request (see query_coalescing.py);
+        writes drop the short-lived shared results for their table.
+        """
+        while True:
+            start = time.perf_counter()
+            async with self.pool.get_connection() as conn:
+                request = build(conn)
+                key = self.coalescer.key_for(request)
+                shared = self.coalescer.lookup(key) if key is not None else None
+                if shared is None:
+                    try:
+                        if key is None:
+                            response = await request.execute()
+                            if str(getattr(request, 'http_method', 'GET')).upper() not in ('GET', 'HEAD'):
+                                self.coalescer.invalidate(request.path)
+                            return response
+                        return await self.coalescer.lead(key, request.execute)
+                    finally:
+                        # Every query is recorded on the request's ledger (see query_ledger.py)
+                        record_query(request, (time.perf_counter() - start) * 1000)
+            
+            # Another caller is already running this read; wait without holding a connection
+            try:
+                return await shared
+            except LeaderCancelled:
+                continue
+            finally:
+                record_query(request, (time.perf_counter() - start) * 1000, shared=True)
+    
+    async def close(self):
+        """Close pooled connections"""
+        await self.pool.close()
+    
     # CRUD Operations
     async def create_document(self, table_name: str, document: Dict[str, Any]) -> str:
         """Create a new document in the specified table"""
@@ -51,7 +108,7 @@ class SupabaseManager:
             # Convert datetime objects to ISO string format
             document = self._serialize_document(document)
             
-            result = self.client.table(table_name).insert(document).execute()
+            result = await self.run_query(lambda db: db.table(table_name).insert(document))
             return result.data[0]['id'] if result.data else None
         except Exception as e:
             logger.error(f"Create failed for table {table_name}: {e}")
@@ -76,17 +133,19 @@ class SupabaseManager:
                 serialized[key] = value
         return serialized
     
-    async def find_document(self, table_name: str, query: Dict[str, Any]) -> Optional[Dict]:
-        """Find a single document"""
+    async def find_document(self, table_name: str, query: Dict[str, Any],
+                            projection: Optional[Projection] = None) -> Optional[Dict]:
+        """Find a single document, optionally fetching only the `projection` columns"""
         try:
-            # Build query
-            query_builder = self.client.table(table_name).select('*')
-            
-            # Apply filters
-            for key, value in query.items():
-                query_builder = query_builder.eq(key, value)
+            def build(db):
+                query_builder = db.table(table_name).select(select_columns(projection))
+                
+                # Apply filters (Mongo-style operators are compiled to PostgREST filters)
+                query_builder = apply_filters(query_builder, query)
+                
+                return query_builder.limit(1)
             
-            result = query_builder.limit(1).execute()
+            result = await self.run_query(build)
             return result.data[0] if result.data else None
             
         except Exception as e:
@@ -95,36 +154,94 @@ class SupabaseManager:
     
     async def find_documents(self, table_name: str, query: Dict[str, Any] = None, 
                            skip: int = 0, limit: int = 100, 
-                           order_by: str = None, ascending: bool = True) -> List[Dict]:
-        """Find multiple documents"""
+                           order_by: str = None, ascending: bool = True,
+                           projection: Optional[Projection] = None) -> List[Dict]:
+        """
+        Find multiple documents
+        
+        `projection` is a named field set from projections.py (e.g. TASK_FIELDS); by
+        default every column is returned.
+        """
         try:
-            query_builder = self.client.table(table_name).select('*')
-            
-            # Apply filters
-            if query:
-                for key, value in query.items():
-                    if isinstance(value, list):
-                        query_builder = query_builder.in_(key, value)
-                    else:
-                        query_builder = query_builder.eq(key, value)
-            
-            # Apply ordering
-            if order_by:
-                query_builder = query_builder.order(order_by, desc=not ascending)
+            def build(db):
+                query_builder = db.table(table_name).select(select_columns(projection))
+                
+                # Apply filters (Mongo-style operators are compiled to PostgREST filters)
+                query_builder = apply_filters(query_builder, query)
+                
+                # Apply ordering
+                if order_by:
+                    query_builder = query_builder.order(order_by, desc=not ascending)
+                
+                # Apply pagination
+                if skip > 0:
+                    query_builder = query_builder.range(skip, skip + limit - 1)
+                else:
+                    query_builder = query_builder.limit(limit)
+                
+                return query_builder
             
-            # Apply pagination
-            if skip > 0:
-                query_builder = query_builder.range(skip, skip + limit - 1)
-            else:
-                query_builder = query_builder.limit(limit)
-            
-            result = query_builder.execute()
+            result = await self.run_query(build)
             return result.data or []
             
         except Exception as e:
             logger.error(f"Find documents failed for table {table_name}: {e}")
             raise
     
+    async def iter_documents(self, table_name: str, query: Dict[str, Any] = None,
+                             order_key: str = 'id', page_size: int = 500,
+                             ascending: bool = True,
+                             projection: Optional[Projection] = None) -> AsyncIterator[Dict]:
+        """
+        Stream every matching document using keyset pagination.
+        
+        Each page is fetched with a cursor on (order_key, id) instead of an offset, so
+        per-page latency stays flat and memory stays at one page no matter how many rows
+        match. `order_key` should be a non-null column such as `id` or `created_at`.
+        A pooled connection is only held while a page is being fetched. A `projection`
+        must include `id` and `order_key`, which the cursor is built from.
+        """
+        comparison = '$gt' if ascending else '$lt'
+        cursor: Optional[Dict[str, Any]] = None
+        
+        while True:
+            page_query = dict(query or {})
+            if cursor is not None:
+                page_query = {'$and': [page_query, cursor]}
+            
+            def build(db):
+                query_builder = apply_filters(db.table(table_name).select(select_columns(projection)), page_query)
+                if order_key == 'id':
+                    query_builder = query_builder.order('id', desc=not ascending)
+                else:
+                    # id breaks ties between rows sharing the same order_key value
+                    direction = 'asc' if ascending else 'desc'
+                    query_builder.params = query_builder.params.add('order', f"{order_key}.{direction},id.{direction}")
+                return query_builder.limit(page_size)
+            
+            try:
+                with paginated():
+                    result = await self.run_query(build)
+            except Exception as e:
+                logger.error(f"Iterate documents failed for table {table_name}: {e}")
+                raise
+            
+            rows = result.data or []
+            for row in rows:
+                yield row
+            
+            if len(rows) < page_size:
+                return
+            
+            last = rows[-1]
+            if order_key == 'id':
+                cursor = {'id': {comparison: last['id']}}
+            else:
+                cursor = {'$or': [
+                    {order_key: {comparison: last[order_key]}},
+                    {order_key: last[order_key], 'id': {comparison: last['id']}}
+                ]}
+    
     async def update_document(self, table_name: str, document_id: str, 
                             update: Dict[str, Any]) -> bool:
         """Update a document"""
@@ -132,7 +249,7 @@ class SupabaseManager:
             # Convert datetime objects to ISO string format
             update = self._serialize_document(update)
             
-            result = self.client.table(table_name).update(update).eq('id', document_id).execute()
+            result = await self.run_query(lambda db: db.table(table_name).update(update).eq('id', document_id))
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Update failed for table {table_name}: {e}")
@@ -141,7 +258,7 @@ class SupabaseManager:
     async def delete_document(self, table_name: str, document_id: str) -> bool:
         """Delete a document"""
         try:
-            result = self.client.table(table_name).delete().eq('id', document_id).execute()
+            result = await self.run_query(lambda db: db.table(table_name).delete().eq('id', document_id))
             # Supabase delete returns empty data on success, so we check if no error occurred
             return True  # If no exception was raised, deletion was successful
         except Exception as e:
@@ -154,13 +271,14 @@ class SupabaseManager:
     async def count_documents(self, table_name: str, query: Dict[str, Any] = None) -> int:
         """Count documents matching query"""
         try:
-            query_builder = self.client.table(table_name).select('id', count='exact')
+            def build(db):
+                query_builder = db.table(table_name).select('id', count='exact')
+                
+                query_builder = apply_filters(query_builder, query)
+                
+                return query_builder
             
-            if query:
-                for key, value in query.items():
-                    query_builder = query_builder.eq(key, value)
-            
-            result = query_builder.execute()
+            result = await self.run_query(build)
             return result.count or 0
             
         except Exception as e:
@@ -173,14 +291,15 @@ class SupabaseManager:
             # Convert datetime objects to ISO string format
             update = self._serialize_document(update)
             
-            query_builder = self.client.table(table_name).update(update)
-            
-            # Apply query filters
-            if query:
-                for key, value in query.items():
-                    query_builder = query_builder.eq(key, value)
+            def build(db):
+                query_builder = db.table(table_name).update(update)
+                
+                # Apply query filters
+                query_builder = apply_filters(query_builder, query)
+                
+                return query_builder
             
-            result = query_builder.execute()
+            result = await self.run_query(build)
             return len(result.data) if result.data else 0
             
         except Exception as e:
@@ -190,14 +309,15 @@ class SupabaseManager:
     async def bulk_delete_documents(self, table_name: str, query: Dict[str, Any]) -> int:
         """Delete multiple documents matching query"""
         try:
-            query_builder = self.client.table(table_name).delete()
+            def build(db):
+                query_builder = db.table(table_name).delete()
+                
+                # Apply query filters
+                query_builder = apply_filters(query_builder, query)
+                
+                return query_builder
             
-            # Apply query filters
-            if query:
-                for key, value in query.items():
-                    query_builder = query_builder.eq(key, value)
-            
-            result = query_builder.execute()
+            result = await self.run_query(build)
             return len(result.data) if result.data else 0
             
         except Exception as e:
@@ -219,14 +339,34 @@ class SupabaseManager:
 
     async def aggregate_documents(self, table_name: str, pipeline: List[Dict]) -> List[Dict]:
         """
-        Simplified aggregation for Supabase - handles basic grouping and filtering
-        Note: This is a simplified version. Complex MongoDB aggregations may need to be rewritten.
+        Run a Mongo-style aggregation pipeline in Postgres.
+        
+        Supports `$match`, `$group` (count / `{"$sum": 1}`, sum, avg, min, max), `$sort` and
+        `$limit`, e.g. counting tasks per project is a single round trip returning one row
+        per group: `[{"$match": {...}}, {"$group": {"_id": "$project_id", "n": {"$sum": 1}}}]`.
+        Grouped pipelines run through the `aggregate_rows` SQL function (migration 021);
+        pipelines without `$group` become a plain filtered select. Unsupported stages raise
+        AggregationCompileError instead of silently returning unaggregated rows.
         """
         try:
-            # For now, return basic query results - complex aggregations need to be rewritten
-            # This is a placeholder to prevent immediate errors
-            logger.warning(f"Aggregation pipeline not fully supported for {table_name}, returning basic query")
-            return await self.find_documents(table_name, {}, limit=100)
+            compiled = compile_pipeline(pipeline)
+            
+            if not compiled['group']:
+                def build(db):
+                    query_builder = apply_filters(db.table(table_name).select('*'), compiled['match'])
+                    if compiled['sort']:
+                        order = ','.join(f"{s['key']}.{'desc' if s['desc'] else 'asc'}" for s in compiled['sort'])
+                        query_builder.params = query_builder.params.add('order', order)
+                    if compiled['limit']:
+                        query_builder = query_builder.limit(compiled['limit'])
+                    return query_builder
+                
+                result = await self.run_query(build)
+                return result.data or []
+            
+            params = {'p_table': table_name, **compiled['params']}
+            result = await self.run_query(lambda db: db.rpc('aggregate_rows', params))
+            return shape_results(compiled, result.data)
             
         except Exception as e:
             logger.error(f"Aggregation failed for table {table_name}: {e}")
@@ -240,19 +380,23 @@ def get_supabase_client():
     """Get the Supabase client - replaces get_database()"""
     return supabase_manager.get_client()
 
+async def run_query(build):
+    """Execute a PostgREST query on the shared async client (see SupabaseManager.run_query)"""
+    return await supabase_manager.run_query(build)
+
 # CRUD helpers - compatible with existing database.py interface
 async def create_document(table_name: str, document: Dict[str, Any]):
     """Create a new document"""
     return await supabase_manager.create_document(table_name, document)
 
-async def find_document(table_name: str, query: Dict[str, Any]):
+async def find_document(table_name: str, query: Dict[str, Any], projection: Optional[Projection] = None):
     """Find a single document"""
-    return await supabase_manager.find_document(table_name, query)
+    return await supabase_manager.find_document(table_name, query, projection)
 
 async def find_documents(table_name: str, query: Dict[str, Any] = None, 
                         skip: int = 0, limit: int = 100, 
-                        sort: List[tuple] = None):
-    """Find multiple documents"""
+                        sort: List[tuple] = None, projection: Optional[Projection] = None):
+    """Find multiple documents (optionally only the `projection` columns)"""
     # Convert sort format if provided
     order_by = None
     ascending = True
@@ -261,7 +405,14 @@ async def find_documents(table_name: str, query: Dict[str, Any] = None,
         order_by = field
         ascending = direction == 1
     
-    return await supabase_manager.find_documents(table_name, query, skip, limit, order_by, ascending)
+    return await supabase_manager.find_documents(table_name, query, skip, limit, order_by, ascending, projection)
+
+async def iter_documents(table_name: str, query: Dict[str, Any] = None,
+                         order_key: str = 'id', page_size: int = 500,
+                         ascending: bool = True, projection: Optional[Projection] = None) -> AsyncIterator[Dict]:
+    """Stream all matching documents with keyset pagination (no result cap)"""
+    async for document in supabase_manager.iter_documents(table_name, query, order_key, page_size, ascending, projection):
+        yield document
 
 async def update_document(table_name: str, query: Dict[str, Any], update: Dict[str, Any]):
     """Update a document - modified to work with Supabase"""
@@ -289,7 +440,7 @@ async def atomic_update_document(table_name: str, query: Dict[str, Any], update:
     return await supabase_manager.atomic_update_document(table_name, query, update)
 
 async def aggregate_documents(table_name: str, pipeline: List[Dict]) -> List[Dict]:
-    """Aggregate documents - simplified for Supabase"""
+    """Aggregate documents server-side ($match / $group / $sort / $limit)"""
     return await supabase_manager.aggregate_documents(table_name, pipeline)
 
 async def bulk_update_documents(table_name: str, query: Dict[str, Any], update: Dict[str, Any]) -> int:
@@ -0,0 +1,198 @@
+"""
+Local Supabase Access Token Verification
+Verifies Supabase (GoTrue) access tokens in-process instead of calling auth.get_user for
+every request: HS256 tokens with the project's JWT secret (SUPABASE_JWT_SECRET), and
+asymmetric (RS256 / ES256) tokens with the project's JWKS, fetched once, cached and
+refetched when a token names a key id the cache doesn't know (key rotation).
+
+Signature, expiry, not-before, audience and issuer are checked locally; a token's
+revocation (sign-out, deleted user) is only visible to GoTrue, so endpoints where that
+matters still ask it (see supabase_auth.verify_token_strict).
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+logger = logging.getLogger(__name__)
+
+SYMMETRIC_ALGORITHMS = {'HS256'}
+ASYMMETRIC_ALGORITHMS = {'RS256', 'ES256'}
+
+
+class TokenVerificationError(Exception):
+    """The token is invalid, expired or not meant for this project"""
+
+
+class UnverifiableTokenError(Exception):
+    """No key material to verify the token locally; the caller should ask GoTrue"""
+
+
+class VerifiedUser:
+    """
+    The user a verified access token was issued to, built from its claims. Exposes the
+    attributes callers read from GoTrue's User (id, email, user_metadata, app_metadata).
+    """
+
+    __slots__ = ('id', 'email', 'phone', 'role', 'aud', 'user_metadata', 'app_metadata',
+                 'session_id', 'issued_at', 'expires_at', 'claims')
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.id = claims['sub']
+        self.email = claims.get('email') or ''
+        self.phone = claims.get('phone') or ''
+        self.role = claims.get('role')
+        self.aud = claims.get('aud')
+        self.user_metadata = claims.get('user_metadata') or {}
+        self.app_metadata = claims.get('app_metadata') or {}
+        self.session_id = claims.get('session_id')
+        self.issued_at = claims.get('iat')
+        self.expires_at = claims.get('exp')
+        self.claims = claims
+
+    def __repr__(self) -> str:
+        return f"VerifiedUser(id={self.id!r}, email={self.email!r})"
+
+
+class SupabaseJWTVerifier:
+    """Verifies access tokens with the HS256 secret or cached JWKS keys"""
+
+    def __init__(self, supabase_url: Optional[str] = None, jwt_secret: Optional[str] = None,
+                 jwks_url: Optional[str] = None, audience: Optional[str] = None,
+                 issuer: Optional[str] = None, leeway_seconds: Optional[float] = None,
+                 jwks_ttl_seconds: Optional[float] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        supabase_url = (supabase_url or os.getenv('SUPABASE_URL') or '').rstrip('/')
+        self.jwt_secret = jwt_secret if jwt_secret is not None else os.getenv('SUPABASE_JWT_SECRET')
+        self.jwks_url = jwks_url or os.getenv('SUPABASE_JWKS_URL') or (
+            f"{supabase_url}/auth/v1/.well-known/jwks.json" if supabase_url else None)
+        self.audience = audience or os.getenv('SUPABASE_JWT_AUDIENCE', 'authenticated')
+        self.issuer = issuer or os.getenv('SUPABASE_JWT_ISSUER') or (
+            f"{supabase_url}/auth/v1" if supabase_url else None)
+        self.leeway = (leeway_seconds if leeway_seconds is not None
+                       else float(os.getenv('SUPABASE_JWT_LEEWAY_SECONDS', '30')))
+        self.jwks_ttl = jwks_ttl_seconds or float(os.getenv('SUPABASE_JWKS_CACHE_SECONDS', '600'))
+        # A token with an unknown key id refetches the JWKS at most this often
+        self.jwks_min_refresh = float(os.getenv('SUPABASE_JWKS_MIN_REFRESH_SECONDS', '30'))
+        self._transport = transport
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._jwks_fetched_at: Optional[float] = None
+        self._jwks_lock = asyncio.Lock()
+        self.stats = {
+            'verified': 0,
+            'rejected': 0,
+            'unverifiable': 0,
+            'jwks_fetches': 0,
+            'jwks_errors': 0
+        }
+
+    async def verify(self, token: str) -> VerifiedUser:
+        """
+        Verify a token locally. Raises TokenVerificationError if it is invalid and
+        UnverifiableTokenError if there is no key to check it with.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            self.stats['rejected'] += 1
+            raise TokenVerificationError(f"malformed token: {e}") from e
+
+        algorithm = header.get('alg')
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            if not self.jwt_secret:
+                self.stats['unverifiable'] += 1
+                raise UnverifiableTokenError("SUPABASE_JWT_SECRET is not configured")
+            key: Any = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self._signing_key(header.get('kid'), algorithm)
+        else:
+            # Includes 'none': the header must never choose a weaker check
+            self.stats['rejected'] += 1
+            raise TokenVerificationError(f"unsupported token algorithm {algorithm!r}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={'leeway': self.leeway, 'verify_at_hash': False},
+            )
+        except ExpiredSignatureError as e:
+            self.stats['rejected'] += 1
+            raise TokenVerificationError("token expired") from e
+        except (JWTClaimsError, JWTError) as e:
+            self.stats['rejected'] += 1
+            raise TokenVerificationError(str(e)) from e
+
+        if not claims.get('sub') or 'exp' not in claims:
+            self.stats['rejected'] += 1
+            raise TokenVerificationError("token has no subject or expiry")
+        self.stats['verified'] += 1
+        return VerifiedUser(claims)
+
+    async def _signing_key(self, kid: Optional[str], algorithm: str) -> Dict[str, Any]:
+        if not self.jwks_url:
+            self.stats['unverifiable'] += 1
+            raise UnverifiableTokenError("no JWKS URL configured")
+
+        now = time.monotonic()
+        stale = self._jwks_fetched_at is None or now - self._jwks_fetched_at > self.jwks_ttl
+        unknown = kid not in self._keys
+        may_refresh = self._jwks_fetched_at is None or now - self._jwks_fetched_at > self.jwks_min_refresh
+        if stale or (unknown and may_refresh):
+            await self._refresh_jwks()
+
+        key = self._keys.get(kid) if kid else self._single_key(algorithm)
+        if key is None:
+            if not self._keys:
+                self.stats['unverifiable'] += 1
+                raise UnverifiableTokenError("JWKS unavailable")
+            self.stats['rejected'] += 1
+            raise TokenVerificationError(f"unknown signing key {kid!r}")
+        if key.get('alg') and key['alg'] != algorithm:
+            self.stats['rejected'] += 1
+            raise TokenVerificationError("token algorithm does not match its key")
+        return key
+
+    def _single_key(self, algorithm: str) -> Optional[Dict[str, Any]]:
+        """Tokens without a key id are accepted only when exactly one key fits"""
+        candidates = [k for k in self._keys.values() if k.get('alg') in (None, algorithm)]
+        return candidates[0] if len(candidates) == 1 else None
+
+    async def _refresh_jwks(self):
+        async with self._jwks_lock:
+            # Another request may have refreshed while this one waited
+            if self._jwks_fetched_at is not None and time.monotonic() - self._jwks_fetched_at < 1:
+                return
+            try:
+                async with httpx.AsyncClient(transport=self._transport, timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    keys: List[Dict[str, Any]] = response.json().get('keys', [])
+                self._keys = {k.get('kid'): k for k in keys if k.get('kty') in ('RSA', 'EC')}
+                self.stats['jwks_fetches'] += 1
+                logger.info(f"🔑 Loaded {len(self._keys)} JWT signing keys from JWKS")
+            except Exception as e:
+                # Keep serving with the keys we have; retry after the minimum interval
+                self.stats['jwks_errors'] += 1
+                logger.warning(f"JWKS fetch failed: {e}")
+            self._jwks_fetched_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'hs256_configured': bool(self.jwt_secret),
+            'jwks_keys': len(self._keys)
+        }
+
+
+# Global verifier
+jwt_verifier = SupabaseJWTVerifier()
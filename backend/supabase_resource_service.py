@@ -16,7 +16,7 @@ except ImportError:
     HAS_MAGIC = False
 
 from models import Resource, ResourceCreate, ResourceUpdate, ResourceResponse, FileTypeEnum
-from supabase_client import create_document, find_document, find_documents, update_document, delete_document
+from supabase_client import create_document, find_document, find_documents, iter_documents, update_document, delete_document
 from supabase_storage import storage_service
 import logging
 
@@ -182,25 +182,21 @@ class SupabaseResourceService:
     async def migrate_base64_to_storage(user_id: str = None, batch_size: int = 10) -> Dict[str, Any]:
         """Migrate existing base64-stored files to Supabase Storage"""
         try:
-            # Get resources that still have base64 content
-            query = {}
+            # Only resources that still have base64 content
+            query = {"file_content": {"$exists": True}}
             if user_id:
                 query["user_id"] = user_id
             
-            resources_docs = await find_documents("resources", query, limit=batch_size)
-            
-            # Filter to only resources with file_content client-side
-            resources_docs = [r for r in resources_docs if r.get("file_content") is not None]
-            
-            if not resources_docs:
-                return {"success": True, "message": "No resources to migrate", "migrated": 0}
-            
-            await storage_service.create_buckets_if_not_exist()
-            
             migrated_count = 0
             failed_count = 0
+            buckets_ready = False
             
-            for doc in resources_docs:
+            # Walk every matching resource in keyset-paginated batches
+            async for doc in iter_documents("resources", query, page_size=batch_size):
+                if not buckets_ready:
+                    await storage_service.create_buckets_if_not_exist()
+                    buckets_ready = True
+                
                 try:
                     # Upload to Supabase Storage
                     upload_result = await storage_service.upload_file_from_base64(
@@ -235,6 +231,9 @@ class SupabaseResourceService:
                     failed_count += 1
                     logger.error(f"❌ Error migrating resource {doc.get('filename', 'unknown')}: {e}")
             
+            if not buckets_ready:
+                return {"success": True, "message": "No resources to migrate", "migrated": 0}
+            
             return {
                 "success": True,
                 "message": f"Migration completed: {migrated_count} succeeded, {failed_count} failed",
@@ -16,6 +16,15 @@ from pathlib import Path
 import asyncio
 import time
 from cache_service import cache_dashboard_data
+from cache_invalidation import publish_change
+from principal_cache import invalidate_principal
+from auth_user_directory import auth_user_directory
+from memory_cache import MemoryCache
+from db_resilience import install_sync_client
+from supabase_client import run_query, aggregate_documents
+from projections import (
+    select_columns, PILLAR_FIELDS, AREA_FIELDS, PROJECT_FIELDS, TASK_FIELDS, AREA_REFS, PROJECT_REFS
+)
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -31,8 +40,33 @@ supabase_service_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
 if not supabase_url or not supabase_anon_key:
     raise ValueError(f"Missing Supabase configuration: URL={bool(supabase_url)}, KEY={bool(supabase_anon_key)}")
 
-# Use service role key for CRUD operations (bypasses RLS for testing)
+# Sync client is only used for Auth Admin calls; table access goes through run_query
 supabase: Client = create_client(supabase_url, supabase_service_key or supabase_anon_key)
+install_sync_client(supabase)
+
+# Users known to exist in auth.users, so creates skip the check (see _ensure_user_exists_in_auth_users)
+verified_auth_users = MemoryCache(max_entries=int(os.getenv('AUTH_VERIFIED_USERS_MAX', '10000')))
+AUTH_VERIFIED_USERS_TTL_SECONDS = float(os.getenv('AUTH_VERIFIED_USERS_TTL_SECONDS', '3600'))
+
+
+async def count_tasks_by_project(project_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Return {project_id: {'total': n, 'completed': m}} using one server-side aggregation"""
+    if not project_ids:
+        return {}
+
+    rows = await aggregate_documents('tasks', [
+        {'$match': {'project_id': {'$in': project_ids}}},
+        {'$group': {'_id': {'project_id': '$project_id', 'completed': '$completed'}, 'count': {'$sum': 1}}}
+    ])
+
+    counts: Dict[str, Dict[str, int]] = {}
+    for row in rows:
+        project_id = row['_id']['project_id']
+        entry = counts.setdefault(project_id, {'total': 0, 'completed': 0})
+        entry['total'] += row['count']
+        if row['_id']['completed']:
+            entry['completed'] += row['count']
+    return counts
 
 
 class SupabaseSleepReflectionService:
@@ -57,9 +91,8 @@ class SupabaseSleepReflectionService:
             }
             
             # Insert into sleep_reflections table
-            response = (supabase.table('sleep_reflections')
-                       .insert(sleep_data)
-                       .execute())
+            response = await run_query(lambda db: (db.table('sleep_reflections')
+                       .insert(sleep_data)))
             
             if response.data:
                 logger.info(f"✅ Created sleep reflection for user: {user_id}")
@@ -76,12 +109,11 @@ class SupabaseSleepReflectionService:
     async def get_user_sleep_reflections(user_id: str, limit: int = 30) -> List[Dict[str, Any]]:
         """Get user's sleep reflections ordered by date (most recent first)"""
         try:
-            response = (supabase.table('sleep_reflections')
+            response = await run_query(lambda db: (db.table('sleep_reflections')
                        .select('*')
                        .eq('user_id', user_id)
                        .order('date', desc=True)
-                       .limit(limit)
-                       .execute())
+                       .limit(limit)))
             
             reflections = response.data or []
             
@@ -96,12 +128,11 @@ class SupabaseSleepReflectionService:
     async def get_sleep_reflection_by_date(user_id: str, date: str) -> Dict[str, Any]:
         """Get sleep reflection for a specific date"""
         try:
-            response = (supabase.table('sleep_reflections')
+            response = await run_query(lambda db: (db.table('sleep_reflections')
                        .select('*')
                        .eq('user_id', user_id)
                        .eq('date', date)
-                       .single()
-                       .execute())
+                       .single()))
             
             if response.data:
                 logger.info(f"✅ Found sleep reflection for user {user_id} on {date}")
@@ -122,7 +153,7 @@ class SupabaseUserService:
     async def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile from user_profiles table"""
         try:
-            response = supabase.table('user_profiles').select('*').eq('id', user_id).single().execute()
+            response = await run_query(lambda db: db.table('user_profiles').select('*').eq('id', user_id).single())
             return response.data
         except Exception as e:
             logger.error(f"Error getting user profile: {e}")
@@ -132,7 +163,7 @@ class SupabaseUserService:
     async def create_user_profile(user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create user profile in user_profiles table"""
         try:
-            response = supabase.table('user_profiles').insert(user_data).execute()
+            response = await run_query(lambda db: db.table('user_profiles').insert(user_data))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error creating user profile: {e}")
@@ -149,11 +180,10 @@ class SupabaseUserService:
             username_change = profile_data.get('username')
             if username_change:
                 # Get current user data to check existing username and last username change
-                current_user_response = supabase.table('user_profiles')\
+                current_user_response = await run_query(lambda db: db.table('user_profiles')\
                     .select('*')\
                     .eq('id', user_id)\
-                    .limit(1)\
-                    .execute()
+                    .limit(1))
                 
                 if not current_user_response.data:
                     raise Exception("User not found")
@@ -185,12 +215,11 @@ class SupabaseUserService:
                             logger.warning(f"Failed to parse last username change date: {str(e)}")
                     
                     # Check if username is already taken
-                    existing_user = supabase.table('user_profiles')\
+                    existing_user = await run_query(lambda db: db.table('user_profiles')\
                         .select('id')\
                         .eq('username', username_change)\
                         .neq('id', user_id)\
-                        .limit(1)\
-                        .execute()
+                        .limit(1))
                     
                     if existing_user.data and len(existing_user.data) > 0:
                         raise Exception("Username is already taken")
@@ -225,7 +254,7 @@ class SupabaseUserService:
             
             # Try to update legacy users table first
             try:
-                legacy_response = supabase.table('users').update(update_data).eq('id', user_id).execute()
+                legacy_response = await run_query(lambda db: db.table('users').update(update_data).eq('id', user_id))
                 
                 if legacy_response.data:
                     logger.info(f"✅ Updated legacy user record for user: {user_id}")
@@ -235,7 +264,7 @@ class SupabaseUserService:
             
             # CRITICAL FIX: Also try to update user_profiles table to ensure consistency
             try:
-                profile_response = supabase.table('user_profiles').update(update_data).eq('id', user_id).execute()
+                profile_response = await run_query(lambda db: db.table('user_profiles').update(update_data).eq('id', user_id))
                 
                 if profile_response.data:
                     logger.info(f"✅ Updated user_profiles record for user: {user_id}")
@@ -246,6 +275,8 @@ class SupabaseUserService:
                 logger.info(f"User_profiles table update failed: {profile_error}")
             
             if updated_record:
+                # Requests authenticate with a cached User; make them re-read the profile
+                await invalidate_principal(user_id)
                 return updated_record
             
             logger.warning(f"No user record found for user: {user_id}")
@@ -302,7 +333,7 @@ class SupabaseUserService:
             # Delete data from each table explicitly
             for table_name in tables_to_clean:
                 try:
-                    response = supabase.table(table_name).delete().eq('user_id', user_id).execute()
+                    response = await run_query(lambda db: db.table(table_name).delete().eq('user_id', user_id))
                     deleted_count = len(response.data) if response.data else 0
                     
                     if deleted_count > 0:
@@ -334,6 +365,10 @@ class SupabaseUserService:
                 deletion_summary['errors'].append(error_msg)
                 logger.error(f"❌ {error_msg}")
             
+            await invalidate_principal(user_id)
+            await auth_user_directory.forget(user_id, user_email)
+            verified_auth_users.delete(user_id)
+            
             # Determine if deletion was successful
             auth_deleted = any("auth.users" in entry for entry in deletion_summary['tables_cleaned'])
             has_data_deleted = len(deletion_summary['tables_cleaned']) > 0
@@ -386,12 +421,13 @@ class SupabasePillarService:
                 'date_created': datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('pillars').insert(pillar_dict).execute()
+            response = await run_query(lambda db: db.table('pillars').insert(pillar_dict))
             
             if not response.data:
                 raise Exception("Failed to create pillar")
                 
             logger.info(f"✅ Created pillar: {pillar_data.name} for user: {user_id}")
+            await publish_change(user_id, 'pillars', response.data[0].get('id'))
             return response.data[0]
             
         except Exception as e:
@@ -400,27 +436,40 @@ class SupabasePillarService:
     
     @staticmethod
     async def _ensure_user_exists_in_auth_users(user_id: str):
-        """Ensure user exists in auth.users table by creating them via Supabase Auth Admin API"""
+        """
+        Ensure user exists in auth.users table by creating them via Supabase Auth Admin API.
+        A verified user is remembered by this worker (bounded, TTL'd) and flagged
+        auth_provisioned on their profile, so later creates skip the Admin API entirely.
+        """
+        if verified_auth_users.get(user_id):
+            return
         try:
-            # Check if user exists in auth.users
             from supabase_client import get_supabase_client
             supabase = get_supabase_client()
             
-            # Try to get user from auth.users via admin API
+            # Verified by an earlier create, possibly in another worker
             try:
-                auth_user = supabase.auth.admin.get_user_by_id(user_id)
-                if auth_user and auth_user.user:
-                    logger.info(f"✅ User {user_id} already exists in auth.users")
+                flag = await run_query(lambda db: db.table('user_profiles').select('auth_provisioned').eq('id', user_id).limit(1))
+                if flag.data and flag.data[0].get('auth_provisioned'):
+                    verified_auth_users.set(user_id, True, AUTH_VERIFIED_USERS_TTL_SECONDS, size=1)
                     return
-            except Exception as auth_check_error:
-                logger.info(f"🔍 User {user_id} not found in auth.users: {auth_check_error}")
+            except Exception as flag_error:
+                # Migration 024 not applied yet
+                logger.debug(f"auth_provisioned flag unavailable: {flag_error}")
+            
+            # Check if user exists in auth.users (cached lookup by id)
+            if await auth_user_directory.get_user(user_id):
+                logger.info(f"✅ User {user_id} already exists in auth.users")
+                await SupabasePillarService._mark_auth_provisioned(user_id)
+                return
+            logger.info(f"🔍 User {user_id} not found in auth.users")
             
             # Get user data from user_profiles to create auth user
-            user_profile = supabase.table('user_profiles').select('*').eq('id', user_id).execute()
+            user_profile = await run_query(lambda db: db.table('user_profiles').select('*').eq('id', user_id))
             
             if not user_profile.data or len(user_profile.data) == 0:
                 # Also check public.users table
-                legacy_user = supabase.table('users').select('*').eq('id', user_id).execute()
+                legacy_user = await run_query(lambda db: db.table('users').select('*').eq('id', user_id))
                 if legacy_user.data and len(legacy_user.data) > 0:
                     profile = legacy_user.data[0]
                     logger.info(f"📋 Found user in legacy users table: {profile.get('email')}")
@@ -454,6 +503,8 @@ class SupabasePillarService:
                     if new_user_id != user_id:
                         logger.warning(f"⚠️ User ID changed from {user_id} to {new_user_id}")
                         # Would need to update all related records - complex migration
+                    else:
+                        await SupabasePillarService._mark_auth_provisioned(user_id)
                 else:
                     logger.warning(f"⚠️ Failed to create auth user - no response data")
                     
@@ -466,15 +517,27 @@ class SupabasePillarService:
             # Don't raise - let the pillar creation proceed and see what happens
     
     @staticmethod
-    async def get_user_pillars(user_id: str, include_areas: bool = False, include_archived: bool = False) -> List[Dict[str, Any]]:
-        """Get user's pillars with calculated statistics"""
+    async def _mark_auth_provisioned(user_id: str):
+        """Remember that a user exists in auth.users, in this worker and on their profile"""
+        verified_auth_users.set(user_id, True, AUTH_VERIFIED_USERS_TTL_SECONDS, size=1)
         try:
-            query = supabase.table('pillars').select('*').eq('user_id', user_id)
-            
-            if not include_archived:
-                query = query.eq('archived', False)  # Use archived instead of is_active
+            await run_query(lambda db: db.table('user_profiles').update({'auth_provisioned': True}).eq('id', user_id))
+        except Exception as e:
+            logger.debug(f"Could not flag user {user_id} as auth provisioned: {e}")
+    
+    @staticmethod
+    async def get_user_pillars(user_id: str, include_areas: bool = False, include_archived: bool = False,
+                               strict: bool = False) -> List[Dict[str, Any]]:
+        """Get user's pillars with calculated statistics (strict: raise on errors instead of returning [])"""
+        try:
+            def build(db):
+                query = db.table('pillars').select(select_columns(PILLAR_FIELDS)).eq('user_id', user_id)
+                
+                if not include_archived:
+                    query = query.eq('archived', False)  # Use archived instead of is_active
+                return query
                 
-            response = query.execute()
+            response = await run_query(build)
             pillars = response.data or []
             
             if not pillars:
@@ -483,8 +546,9 @@ class SupabasePillarService:
             # Get pillar IDs for batch operations
             pillar_ids = [pillar['id'] for pillar in pillars]
             
-            # Batch fetch areas for all pillars
-            areas_response = supabase.table('areas').select('*').in_('pillar_id', pillar_ids).execute()
+            # Batch fetch areas for all pillars (full rows only when they are returned)
+            area_columns = select_columns(AREA_FIELDS if include_areas else AREA_REFS)
+            areas_response = await run_query(lambda db: db.table('areas').select(area_columns).in_('pillar_id', pillar_ids))
             all_areas = areas_response.data or []
             
             # Group areas by pillar_id
@@ -502,7 +566,7 @@ class SupabasePillarService:
             projects_by_area = {}
             project_ids = []
             if area_ids:
-                projects_response = supabase.table('projects').select('*').in_('area_id', area_ids).execute()
+                projects_response = await run_query(lambda db: db.table('projects').select(select_columns(PROJECT_REFS)).in_('area_id', area_ids))
                 all_projects = projects_response.data or []
                 
                 for project in all_projects:
@@ -513,18 +577,8 @@ class SupabasePillarService:
                         projects_by_area[area_id].append(project)
                         project_ids.append(project['id'])
             
-            # Batch fetch tasks for all projects
-            tasks_by_project = {}
-            if project_ids:
-                tasks_response = supabase.table('tasks').select('*').in_('project_id', project_ids).execute()
-                all_tasks = tasks_response.data or []
-                
-                for task in all_tasks:
-                    project_id = task.get('project_id')
-                    if project_id:
-                        if project_id not in tasks_by_project:
-                            tasks_by_project[project_id] = []
-                        tasks_by_project[project_id].append(task)
+            # Count tasks per project in the database (one row per project/completed pair)
+            task_counts = await count_tasks_by_project(project_ids)
             
             # Transform data and calculate statistics for each pillar
             for pillar in pillars:
@@ -544,19 +598,14 @@ class SupabasePillarService:
                 pillar['project_count'] = len(pillar_projects)
                 
                 # Count tasks across all projects of this pillar
-                pillar_tasks = []
-                for project in pillar_projects:
-                    project_tasks = tasks_by_project.get(project['id'], [])
-                    pillar_tasks.extend(project_tasks)
+                task_count = sum(task_counts.get(project['id'], {}).get('total', 0) for project in pillar_projects)
+                completed_count = sum(task_counts.get(project['id'], {}).get('completed', 0) for project in pillar_projects)
                 
-                pillar['task_count'] = len(pillar_tasks)
+                pillar['task_count'] = task_count
+                pillar['completed_task_count'] = completed_count
                 
-                # Calculate completion statistics
-                completed_tasks = [task for task in pillar_tasks if task.get('completed', False)]
-                pillar['completed_task_count'] = len(completed_tasks)
-                
-                if pillar_tasks:
-                    pillar['progress_percentage'] = (len(completed_tasks) / len(pillar_tasks)) * 100
+                if task_count:
+                    pillar['progress_percentage'] = (completed_count / task_count) * 100
                 else:
                     pillar['progress_percentage'] = 0.0
                 
@@ -569,6 +618,8 @@ class SupabasePillarService:
             
         except Exception as e:
             logger.error(f"Error getting pillars: {e}")
+            if strict:
+                raise
             return []
     
     @staticmethod
@@ -593,12 +644,13 @@ class SupabasePillarService:
             if getattr(pillar_data, 'is_active', None) is not None:
                 update_dict['archived'] = not pillar_data.is_active  # Map is_active to archived (inverted)
                 
-            response = supabase.table('pillars').update(update_dict).eq('id', pillar_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('pillars').update(update_dict).eq('id', pillar_id).eq('user_id', user_id))
             
             if not response.data:
                 raise Exception("Pillar not found or no changes made")
                 
             logger.info(f"✅ Updated pillar: {pillar_id} for user: {user_id}")
+            await publish_change(user_id, 'pillars', pillar_id)
             result = response.data[0]
             
             # Transform back to expected format
@@ -616,30 +668,31 @@ class SupabasePillarService:
         """Delete a pillar and cascade delete its areas, projects, and tasks."""
         try:
             # 1) Fetch areas under this pillar
-            areas_resp = supabase.table('areas').select('id').eq('pillar_id', pillar_id).eq('user_id', user_id).execute()
+            areas_resp = await run_query(lambda db: db.table('areas').select('id').eq('pillar_id', pillar_id).eq('user_id', user_id))
             area_ids = [row['id'] for row in (areas_resp.data or [])]
 
             project_ids = []
             if area_ids:
                 # 2) Fetch projects under these areas
-                projects_resp = supabase.table('projects').select('id').in_('area_id', area_ids).eq('user_id', user_id).execute()
+                projects_resp = await run_query(lambda db: db.table('projects').select('id').in_('area_id', area_ids).eq('user_id', user_id))
                 project_ids = [row['id'] for row in (projects_resp.data or [])]
 
                 # 3) Delete tasks under these projects
                 if project_ids:
-                    supabase.table('tasks').delete().in_('project_id', project_ids).eq('user_id', user_id).execute()
+                    await run_query(lambda db: db.table('tasks').delete().in_('project_id', project_ids).eq('user_id', user_id))
                 
                 # 4) Delete projects under these areas
                 if project_ids:
-                    supabase.table('projects').delete().in_('id', project_ids).eq('user_id', user_id).execute()
+                    await run_query(lambda db: db.table('projects').delete().in_('id', project_ids).eq('user_id', user_id))
                 
                 # 5) Delete areas under this pillar
-                supabase.table('areas').delete().in_('id', area_ids).eq('user_id', user_id).execute()
+                await run_query(lambda db: db.table('areas').delete().in_('id', area_ids).eq('user_id', user_id))
             
             # 6) Finally, delete the pillar
-            supabase.table('pillars').delete().eq('id', pillar_id).eq('user_id', user_id).execute()
+            await run_query(lambda db: db.table('pillars').delete().eq('id', pillar_id).eq('user_id', user_id))
 
             logger.info(f"✅ Cascaded delete for pillar {pillar_id}: areas={len(area_ids)}, projects={len(project_ids)}")
+            await publish_change(user_id, 'pillars', pillar_id, cascade=('areas', 'projects', 'tasks'))
             return True
             
         except Exception as e:
@@ -665,7 +718,7 @@ class SupabaseAreaService:
                 except ValueError:
                     raise ValueError(f"Invalid pillar_id format: '{area_data.pillar_id}' is not a valid UUID")
                 
-                pillar_check = supabase.table('pillars').select('id').eq('id', area_data.pillar_id).eq('user_id', user_id).execute()
+                pillar_check = await run_query(lambda db: db.table('pillars').select('id').eq('id', area_data.pillar_id).eq('user_id', user_id))
                 if not pillar_check.data:
                     raise ValueError(f"Pillar with id '{area_data.pillar_id}' not found for user '{user_id}'")
             
@@ -712,12 +765,13 @@ class SupabaseAreaService:
                 'date_created': datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('areas').insert(area_dict).execute()
+            response = await run_query(lambda db: db.table('areas').insert(area_dict))
             
             if not response.data:
                 raise Exception("Failed to create area")
                 
             logger.info(f"✅ Created area: {area_data.name} for user: {user_id}")
+            await publish_change(user_id, 'areas', response.data[0].get('id'))
             return response.data[0]
             
         except Exception as e:
@@ -725,16 +779,19 @@ class SupabaseAreaService:
             raise
     
     @staticmethod
-    async def get_user_areas(user_id: str, include_projects: bool = False, include_archived: bool = False) -> List[Dict[str, Any]]:
-        """Get user's areas with optimized batch queries"""
+    async def get_user_areas(user_id: str, include_projects: bool = False, include_archived: bool = False,
+                             strict: bool = False) -> List[Dict[str, Any]]:
+        """Get user's areas with optimized batch queries (strict: raise on errors instead of returning [])"""
         try:
             # Single optimized query for areas
-            query = supabase.table('areas').select('*').eq('user_id', user_id)
-            
-            if not include_archived:
-                query = query.eq('archived', False)  # Use archived instead of is_active
+            def build(db):
+                query = db.table('areas').select(select_columns(AREA_FIELDS)).eq('user_id', user_id)
                 
-            response = query.execute()
+                if not include_archived:
+                    query = query.eq('archived', False)  # Use archived instead of is_active
+                return query
+                
+            response = await run_query(build)
             areas = response.data or []
             
             if not areas:
@@ -748,7 +805,8 @@ class SupabaseAreaService:
             projects_by_area = {}
             project_ids = []
             if area_ids:
-                projects_response = supabase.table('projects').select('*').in_('area_id', area_ids).execute()
+                project_columns = select_columns(PROJECT_FIELDS if include_projects else PROJECT_REFS)
+                projects_response = await run_query(lambda db: db.table('projects').select(project_columns).in_('area_id', area_ids))
                 all_projects = projects_response.data or []
                 
                 # Group projects by area_id
@@ -759,23 +817,13 @@ class SupabaseAreaService:
                     projects_by_area[area_id].append(project)
                     project_ids.append(project['id'])
             
-            # Batch fetch tasks for all projects (needed for counts)
-            tasks_by_project = {}
-            if project_ids:
-                tasks_response = supabase.table('tasks').select('*').in_('project_id', project_ids).execute()
-                all_tasks = tasks_response.data or []
-                
-                for task in all_tasks:
-                    project_id = task.get('project_id')
-                    if project_id:
-                        if project_id not in tasks_by_project:
-                            tasks_by_project[project_id] = []
-                        tasks_by_project[project_id].append(task)
+            # Count tasks per project in the database (needed for counts)
+            task_counts = await count_tasks_by_project(project_ids)
             
             # Batch fetch all pillar names in one query (if needed)
             pillars_by_id = {}
             if pillar_ids:
-                pillars_response = supabase.table('pillars').select('id, name').in_('id', pillar_ids).execute()
+                pillars_response = await run_query(lambda db: db.table('pillars').select('id, name').in_('id', pillar_ids))
                 pillars_data = pillars_response.data or []
                 pillars_by_id = {pillar['id']: pillar['name'] for pillar in pillars_data}
             
@@ -792,19 +840,14 @@ class SupabaseAreaService:
                 area['project_count'] = len(area_projects)
                 
                 # Count tasks across all projects of this area
-                area_tasks = []
-                for project in area_projects:
-                    project_tasks = tasks_by_project.get(project['id'], [])
-                    area_tasks.extend(project_tasks)
+                task_count = sum(task_counts.get(project['id'], {}).get('total', 0) for project in area_projects)
+                completed_count = sum(task_counts.get(project['id'], {}).get('completed', 0) for project in area_projects)
                 
-                area['task_count'] = len(area_tasks)
+                area['task_count'] = task_count
+                area['completed_task_count'] = completed_count
                 
-                # Calculate completion statistics
-                completed_tasks = [task for task in area_tasks if task.get('completed', False)]
-                area['completed_task_count'] = len(completed_tasks)
-                
-                if area_tasks:
-                    area['progress_percentage'] = (len(completed_tasks) / len(area_tasks)) * 100
+                if task_count:
+                    area['progress_percentage'] = (completed_count / task_count) * 100
                 else:
                     area['progress_percentage'] = 0.0
                 
@@ -821,6 +864,8 @@ class SupabaseAreaService:
             
         except Exception as e:
             logger.error(f"Error getting areas: {e}")
+            if strict:
+                raise
             return []
     
     @staticmethod
@@ -856,12 +901,13 @@ class SupabaseAreaService:
             if getattr(area_data, 'is_active', None) is not None:
                 update_dict['archived'] = not area_data.is_active  # Map is_active to archived (inverted)
                 
-            response = supabase.table('areas').update(update_dict).eq('id', area_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('areas').update(update_dict).eq('id', area_id).eq('user_id', user_id))
             
             if not response.data:
                 raise Exception("Area not found or no changes made")
                 
             logger.info(f"✅ Updated area: {area_id} for user: {user_id}")
+            await publish_change(user_id, 'areas', area_id)
             result = response.data[0]
             
             # Transform back to expected format
@@ -883,21 +929,22 @@ class SupabaseAreaService:
         """Delete an area and cascade delete its projects and tasks"""
         try:
             # 1) Fetch projects under this area
-            projects_resp = supabase.table('projects').select('id').eq('area_id', area_id).eq('user_id', user_id).execute()
+            projects_resp = await run_query(lambda db: db.table('projects').select('id').eq('area_id', area_id).eq('user_id', user_id))
             project_ids = [row['id'] for row in (projects_resp.data or [])]
 
             # 2) Delete tasks under these projects
             if project_ids:
-                supabase.table('tasks').delete().in_('project_id', project_ids).eq('user_id', user_id).execute()
+                await run_query(lambda db: db.table('tasks').delete().in_('project_id', project_ids).eq('user_id', user_id))
             
             # 3) Delete projects under this area
             if project_ids:
-                supabase.table('projects').delete().in_('id', project_ids).eq('user_id', user_id).execute()
+                await run_query(lambda db: db.table('projects').delete().in_('id', project_ids).eq('user_id', user_id))
             
             # 4) Delete the area
-            supabase.table('areas').delete().eq('id', area_id).eq('user_id', user_id).execute()
+            await run_query(lambda db: db.table('areas').delete().eq('id', area_id).eq('user_id', user_id))
             
             logger.info(f"✅ Cascaded delete for area {area_id}: projects={len(project_ids)}")
+            await publish_change(user_id, 'areas', area_id, cascade=('projects', 'tasks'))
             return True
             
         except Exception as e:
@@ -939,12 +986,13 @@ class SupabaseProjectService:
                 'date_created': datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('projects').insert(project_dict).execute()
+            response = await run_query(lambda db: db.table('projects').insert(project_dict))
             
             if not response.data:
                 raise Exception("Failed to create project")
                 
             logger.info(f"✅ Created project: {project_data.name} for user: {user_id}")
+            await publish_change(user_id, 'projects', response.data[0].get('id'))
             result = response.data[0]
             
             # Transform back to expected format
@@ -962,9 +1010,9 @@ class SupabaseProjectService:
         """Get or create a default 'No Area' area for projects without an area"""
         try:
             # First, try to find an existing "No Area" area for this user
-            response = supabase.table('areas').select('id').eq(
+            response = await run_query(lambda db: db.table('areas').select('id').eq(
                 'user_id', user_id
-            ).eq('name', 'No Area').limit(1).execute()
+            ).eq('name', 'No Area').limit(1))
             
             if response.data:
                 return response.data[0]['id']
@@ -984,12 +1032,13 @@ class SupabaseProjectService:
                 'updated_at': datetime.utcnow().isoformat()
             }
             
-            create_response = supabase.table('areas').insert(no_area_dict).execute()
+            create_response = await run_query(lambda db: db.table('areas').insert(no_area_dict))
             
             if not create_response.data:
                 raise Exception("Failed to create default 'No Area' area")
             
             logger.info(f"✅ Created default 'No Area' area for user: {user_id}")
+            await publish_change(user_id, 'areas', create_response.data[0]['id'])
             return create_response.data[0]['id']
             
         except Exception as e:
@@ -997,15 +1046,18 @@ class SupabaseProjectService:
             raise
     
     @staticmethod
-    async def get_user_projects(user_id: str, include_tasks: bool = False, include_archived: bool = False) -> List[Dict[str, Any]]:
-        """Get user's projects with optimized batch queries"""
+    async def get_user_projects(user_id: str, include_tasks: bool = False, include_archived: bool = False,
+                                strict: bool = False) -> List[Dict[str, Any]]:
+        """Get user's projects with optimized batch queries (strict: raise on errors instead of returning [])"""
         try:
-            query = supabase.table('projects').select('*').eq('user_id', user_id)
-            
-            if not include_archived:
-                query = query.eq('archived', False)  # Use archived instead of is_active
+            def build(db):
+                query = db.table('projects').select(select_columns(PROJECT_FIELDS)).eq('user_id', user_id)
                 
-            response = query.execute()
+                if not include_archived:
+                    query = query.eq('archived', False)  # Use archived instead of is_active
+                return query
+                
+            response = await run_query(build)
             projects = response.data or []
             
             if not projects:
@@ -1018,7 +1070,7 @@ class SupabaseProjectService:
             # Batch fetch all tasks for all projects in one query (if needed)
             tasks_by_project = {}
             if include_tasks and project_ids:
-                tasks_response = supabase.table('tasks').select('*').in_('project_id', project_ids).execute()
+                tasks_response = await run_query(lambda db: db.table('tasks').select(select_columns(TASK_FIELDS)).in_('project_id', project_ids))
                 all_tasks = tasks_response.data or []
                 
                 # Group tasks by project_id
@@ -1031,7 +1083,7 @@ class SupabaseProjectService:
             # Batch fetch all area names in one query (if needed)
             areas_by_id = {}
             if area_ids:
-                areas_response = supabase.table('areas').select('id, name').in_('id', area_ids).execute()
+                areas_response = await run_query(lambda db: db.table('areas').select('id, name').in_('id', area_ids))
                 areas_data = areas_response.data or []
                 areas_by_id = {area['id']: area['name'] for area in areas_data}
             
@@ -1053,6 +1105,8 @@ class SupabaseProjectService:
             
         except Exception as e:
             logger.error(f"Error getting projects: {e}")
+            if strict:
+                raise
             return []
     
     @staticmethod
@@ -1087,12 +1141,13 @@ class SupabaseProjectService:
             if project_data.deadline is not None:
                 update_dict['deadline'] = project_data.deadline.isoformat() if project_data.deadline else None
                 
-            response = supabase.table('projects').update(update_dict).eq('id', project_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('projects').update(update_dict).eq('id', project_id).eq('user_id', user_id))
             
             if not response.data:
                 raise Exception("Project not found or no changes made")
                 
             logger.info(f"✅ Updated project: {project_id} for user: {user_id}")
+            await publish_change(user_id, 'projects', project_id)
             result = response.data[0]
             
             # Transform back to expected format
@@ -1119,12 +1174,13 @@ class SupabaseProjectService:
         """Delete a project and all its tasks"""
         try:
             # First, delete all tasks in this project
-            tasks_response = supabase.table('tasks').delete().eq('project_id', project_id).execute()
+            tasks_response = await run_query(lambda db: db.table('tasks').delete().eq('project_id', project_id))
             
             # Then delete the project
-            response = supabase.table('projects').delete().eq('id', project_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('projects').delete().eq('id', project_id).eq('user_id', user_id))
             
             logger.info(f"✅ Deleted project: {project_id} and {len(tasks_response.data or [])} tasks")
+            await publish_change(user_id, 'projects', project_id, cascade=('tasks',))
             return True
             
         except Exception as e:
@@ -1148,7 +1204,7 @@ class SupabaseTaskService:
             except ValueError:
                 raise ValueError(f"Invalid project_id format: '{task_data.project_id}' is not a valid UUID")
                 
-            project_check = supabase.table('projects').select('id').eq('id', task_data.project_id).eq('user_id', user_id).execute()
+            project_check = await run_query(lambda db: db.table('projects').select('id').eq('id', task_data.project_id).eq('user_id', user_id))
             if not project_check.data:
                 raise ValueError(f"Project with id '{task_data.project_id}' not found for user '{user_id}'")
             
@@ -1159,7 +1215,7 @@ class SupabaseTaskService:
                 except ValueError:
                     raise ValueError(f"Invalid parent_task_id format: '{task_data.parent_task_id}' is not a valid UUID")
                     
-                parent_task_check = supabase.table('tasks').select('id').eq('id', task_data.parent_task_id).eq('user_id', user_id).execute()
+                parent_task_check = await run_query(lambda db: db.table('tasks').select('id').eq('id', task_data.parent_task_id).eq('user_id', user_id))
                 if not parent_task_check.data:
                     raise ValueError(f"Parent task with id '{task_data.parent_task_id}' not found for user '{user_id}'")
                     
@@ -1196,12 +1252,13 @@ class SupabaseTaskService:
                 'date_created': datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('tasks').insert(task_dict).execute()
+            response = await run_query(lambda db: db.table('tasks').insert(task_dict))
             
             if not response.data:
                 raise Exception("Failed to create task")
                 
             logger.info(f"✅ Created task: {task_data.name} for user: {user_id}")
+            await publish_change(user_id, 'tasks', response.data[0].get('id'))
             result = response.data[0]
             
             # Transform back to expected format
@@ -1228,17 +1285,20 @@ class SupabaseTaskService:
             raise
     
     @staticmethod
-    async def get_user_tasks(user_id: str, project_id: str = None, completed: bool = None) -> List[Dict[str, Any]]:
-        """Get user's tasks"""
+    async def get_user_tasks(user_id: str, project_id: str = None, completed: bool = None,
+                             strict: bool = False) -> List[Dict[str, Any]]:
+        """Get user's tasks (strict: raise on errors instead of returning [])"""
         try:
-            query = supabase.table('tasks').select('*').eq('user_id', user_id)
-            
-            if project_id:
-                query = query.eq('project_id', project_id)
-            if completed is not None:
-                query = query.eq('completed', completed)
+            def build(db):
+                query = db.table('tasks').select('*').eq('user_id', user_id)
                 
-            response = query.execute()
+                if project_id:
+                    query = query.eq('project_id', project_id)
+                if completed is not None:
+                    query = query.eq('completed', completed)
+                return query
+                
+            response = await run_query(build)
             tasks = response.data or []
             
             # Transform data to match expected format
@@ -1264,6 +1324,8 @@ class SupabaseTaskService:
             
         except Exception as e:
             logger.error(f"Error getting tasks: {e}")
+            if strict:
+                raise
             return []
     
     @staticmethod
@@ -1272,23 +1334,21 @@ class SupabaseTaskService:
         try:
             # Search for tasks matching the name query and filter by status
             # Using ilike for case-insensitive search with wildcards
-            query = (supabase.table('tasks')
+            response = await run_query(lambda db: (db.table('tasks')
                     .select('*, projects(name)')  # Join with projects to get project name
                     .eq('user_id', user_id)
                     .ilike('name', f'%{search_query}%')  # Case-insensitive partial match
                     .in_('status', ['todo', 'in_progress'])  # Only todo and in_progress tasks
                     .eq('completed', False)  # Exclude completed tasks
                     .order('created_at', desc=True)  # Most recent first
-                    .limit(20))  # Limit results for performance
-            
-            response = query.execute()
+                    .limit(20)))  # Limit results for performance
             tasks = response.data or []
 
             # Enrich with project color/name
             try:
                 proj_ids = list({t.get('project_id') for t in tasks if t.get('project_id')})
                 if proj_ids:
-                    p_resp = supabase.table('projects').select('id,name,color').in_('id', proj_ids).execute()
+                    p_resp = await run_query(lambda db: db.table('projects').select('id,name,color').in_('id', proj_ids))
                     p_lookup = {p['id']: p for p in (p_resp.data or [])}
                     for t in tasks:
                         if t.get('project_id') and t['project_id'] in p_lookup:
@@ -1385,12 +1445,13 @@ class SupabaseTaskService:
                     if task_data.status is None:
                         update_dict['status'] = 'todo'
                         
-            response = supabase.table('tasks').update(update_dict).eq('id', task_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('tasks').update(update_dict).eq('id', task_id).eq('user_id', user_id))
             
             if not response.data:
                 raise Exception("Task not found or no changes made")
                 
             logger.info(f"✅ Updated task: {task_id} for user: {user_id}")
+            await publish_change(user_id, 'tasks', task_id)
             result = response.data[0]
             
             # Transform back to expected format
@@ -1423,12 +1484,13 @@ class SupabaseTaskService:
         """Delete a task and all its subtasks"""
         try:
             # First, delete all subtasks
-            subtasks_response = supabase.table('tasks').delete().eq('parent_task_id', task_id).execute()
+            subtasks_response = await run_query(lambda db: db.table('tasks').delete().eq('parent_task_id', task_id))
             
             # Then delete the task
-            response = supabase.table('tasks').delete().eq('id', task_id).eq('user_id', user_id).execute()
+            response = await run_query(lambda db: db.table('tasks').delete().eq('id', task_id).eq('user_id', user_id))
             
             logger.info(f"✅ Deleted task: {task_id} and {len(subtasks_response.data or [])} subtasks")
+            await publish_change(user_id, 'tasks', task_id)
             return True
             
         except Exception as e:
@@ -1446,9 +1508,9 @@ class SupabaseDashboardService:
             start = time.monotonic()
             
             # Fire independent queries concurrently with minimal selects
-            tasks_future = asyncio.to_thread(lambda: supabase.table('tasks').select('completed,created_at').eq('user_id', user_id).execute())
-            projects_future = asyncio.to_thread(lambda: supabase.table('projects').select('status').eq('user_id', user_id).execute())
-            areas_future = asyncio.to_thread(lambda: supabase.table('areas').select('id').eq('user_id', user_id).execute())
+            tasks_future = run_query(lambda db: db.table('tasks').select('completed,created_at').eq('user_id', user_id))
+            projects_future = run_query(lambda db: db.table('projects').select('status').eq('user_id', user_id))
+            areas_future = run_query(lambda db: db.table('areas').select('id').eq('user_id', user_id))
             profile_future = asyncio.create_task(SupabaseUserService.get_user_profile(user_id))
 
             tasks_resp, projects_resp, areas_resp, user_profile = await asyncio.gather(
@@ -2,20 +2,34 @@
 Supabase Webhook Handlers for Performance Optimization
 Handles real-time database events to improve app responsiveness
 """
+import os
+import hmac
 import asyncio
 import json
 import logging
 from datetime import datetime
 from typing import Dict, Any
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from sentiment_analysis_service import SentimentAnalysisService
 from alignment_score_service import AlignmentScoreService
 from user_behavior_analytics_service import UserBehaviorAnalyticsService
 from hrm_service import HierarchicalReasoningModel
+from cache_invalidation import normalize_entity, publish_change
 
 logger = logging.getLogger(__name__)
 webhook_router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
+# Shared secret the Supabase database webhooks send as a bearer token (set in the
+# webhook's HTTP headers); webhooks that change server state are refused without it
+WEBHOOK_SECRET = os.environ.get('SUPABASE_WEBHOOK_SECRET')
+
+def require_webhook_secret(request: Request):
+    if not WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    scheme, _, supplied = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.strip().encode(), WEBHOOK_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
 # Initialize services
 sentiment_service = SentimentAnalysisService()
 alignment_service = AlignmentScoreService()
@@ -163,7 +177,7 @@ async def handle_analytics_aggregation(request: Request):
         logger.error(f"Error processing analytics webhook: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@webhook_router.post("/cache-invalidation")
+@webhook_router.post("/cache-invalidation", dependencies=[Depends(require_webhook_secret)])
 async def handle_cache_invalidation(request: Request):
     """
     Webhook handler for cache invalidation.
@@ -172,33 +186,22 @@ async def handle_cache_invalidation(request: Request):
     try:
         payload = await request.json()
         table = payload.get('table', '')
-        record = payload.get('record', {})
+        # DELETE events carry the row in old_record
+        record = payload.get('record') or payload.get('old_record') or {}
         
         user_id = record.get('user_id')
         
         if not user_id:
             return {"status": "ignored", "reason": "no_user_id"}
         
-        # Map tables to cache keys that need invalidation
-        cache_invalidation_map = {
-            'tasks': ['user_tasks', 'alignment_score', 'dashboard_stats'],
-            'projects': ['user_projects', 'alignment_score', 'dashboard_stats'],
-            'journal_entries': ['user_journal', 'sentiment_trends', 'wellness_score'],
-            'areas': ['user_hierarchy', 'alignment_score'],
-            'pillars': ['user_hierarchy', 'alignment_score']
-        }
+        entity = normalize_entity(table)
+        if entity is None:
+            return {"status": "ignored", "reason": "untracked_table"}
         
-        cache_keys_to_invalidate = cache_invalidation_map.get(table, [])
+        logger.info(f"🗂️ Invalidating {entity} caches for user {user_id}")
+        evicted = await publish_change(user_id, entity, record.get('id'))
         
-        if cache_keys_to_invalidate:
-            logger.info(f"🗂️ Invalidating caches for user {user_id}: {cache_keys_to_invalidate}")
-            
-            # Invalidate caches in background
-            asyncio.create_task(
-                invalidate_user_caches(user_id, cache_keys_to_invalidate)
-            )
-        
-        return {"status": "success", "invalidated": cache_keys_to_invalidate}
+        return {"status": "success", "invalidated": entity, "evicted": evicted}
         
     except Exception as e:
         logger.error(f"Error processing cache invalidation webhook: {e}")
@@ -224,19 +227,6 @@ async def generate_hrm_insights_background(user_id: str, trigger_event: str):
     except Exception as e:
         logger.error(f"Background HRM insight generation failed: {e}")
 
-async def invalidate_user_caches(user_id: str, cache_keys: list):
-    """Invalidate user-specific caches"""
-    try:
-        # Implement cache invalidation logic based on your cache system
-        # This could be Redis, in-memory cache, etc.
-        for key in cache_keys:
-            cache_key = f"user:{user_id}:{key}"
-            # await cache_service.delete(cache_key)
-            logger.info(f"Cache invalidated: {cache_key}")
-            
-    except Exception as e:
-        logger.error(f"Cache invalidation failed: {e}")
-
 # Health check for webhooks
 @webhook_router.get("/health")
 async def webhook_health():
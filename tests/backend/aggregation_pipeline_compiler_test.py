@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+AGGREGATION PIPELINE COMPILER TESTING
+Verifies that aggregate_documents pipelines compile to a single aggregate_rows RPC
+call (migration 021) instead of returning unaggregated rows.
+
+Run with: python -m pytest tests/backend/aggregation_pipeline_compiler_test.py -q
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from query_aggregation import (  # noqa: E402
+    AggregationCompileError,
+    compile_match,
+    compile_pipeline,
+    shape_results,
+)
+
+NOW = datetime(2024, 5, 1, 12, 30, 0)
+
+
+def test_tasks_per_pillar_is_one_grouped_call():
+    compiled = compile_pipeline([
+        {"$match": {"user_id": "u1"}},
+        {"$group": {"_id": "$pillar_id", "task_count": {"$sum": 1}}},
+        {"$sort": {"task_count": -1}},
+        {"$limit": 5},
+    ])
+    assert compiled["group"] is True
+    assert compiled["params"] == {
+        "p_filter": {"op": "and", "args": [{"column": "user_id", "op": "eq", "value": "u1"}]},
+        "p_group_by": ["pillar_id"],
+        "p_aggregates": [{"name": "task_count", "fn": "count", "column": None}],
+        "p_sort": [{"key": "task_count", "desc": True}],
+        "p_limit": 5,
+    }
+
+
+def test_all_accumulators():
+    compiled = compile_pipeline([{"$group": {
+        "_id": None,
+        "n": {"$count": {}},
+        "total": {"$sum": "$estimated_duration"},
+        "mean": {"$avg": "$estimated_duration"},
+        "first": {"$min": "$created_at"},
+        "last": {"$max": "$created_at"},
+    }}])
+    assert compiled["params"]["p_group_by"] == []
+    assert [(a["fn"], a["column"]) for a in compiled["params"]["p_aggregates"]] == [
+        ("count", None),
+        ("sum", "estimated_duration"),
+        ("avg", "estimated_duration"),
+        ("min", "created_at"),
+        ("max", "created_at"),
+    ]
+
+
+def test_compound_group_id_and_sort_on_group_keys():
+    compiled = compile_pipeline([
+        {"$group": {"_id": {"project": "$project_id", "done": "$completed"}, "n": {"$sum": 1}}},
+        {"$sort": {"_id.project": 1, "n": -1}},
+    ])
+    assert compiled["params"]["p_group_by"] == ["project_id", "completed"]
+    assert compiled["params"]["p_sort"] == [
+        {"key": "_group_0", "desc": False},
+        {"key": "n", "desc": True},
+    ]
+
+
+def test_results_are_shaped_like_mongo():
+    single = compile_pipeline([{"$group": {"_id": "$pillar_id", "n": {"$sum": 1}}}])
+    assert shape_results(single, [{"_group_0": "p1", "n": 3}]) == [{"_id": "p1", "n": 3}]
+
+    compound = compile_pipeline([{"$group": {"_id": {"project": "$project_id", "done": "$completed"}, "n": {"$sum": 1}}}])
+    assert shape_results(compound, [{"_group_0": "a", "_group_1": True, "n": 2}]) == [
+        {"_id": {"project": "a", "done": True}, "n": 2}
+    ]
+
+    total = compile_pipeline([{"$group": {"_id": None, "n": {"$sum": 1}}}])
+    assert shape_results(total, [{"n": 7}]) == [{"_id": None, "n": 7}]
+
+
+def test_match_supports_filter_operators_and_groups():
+    tree = compile_match({
+        "completed": False,
+        "due_date": {"$lt": NOW},
+        "status": {"$in": ["todo", "in_progress"]},
+        "$or": [{"priority": "high"}, {"parent_task_id": None}],
+    })
+    assert tree == {"op": "and", "args": [
+        {"column": "completed", "op": "eq", "value": "false"},
+        {"column": "due_date", "op": "lt", "value": "2024-05-01T12:30:00"},
+        {"column": "status", "op": "in", "value": ["todo", "in_progress"]},
+        {"op": "or", "args": [
+            {"op": "and", "args": [{"column": "priority", "op": "eq", "value": "high"}]},
+            {"op": "and", "args": [{"column": "parent_task_id", "op": "is_null", "value": None}]},
+        ]},
+    ]}
+
+
+def test_repeated_match_stages_are_anded():
+    compiled = compile_pipeline([{"$match": {"a": 1}}, {"$match": {"b": 2}}, {"$group": {"_id": None, "n": {"$sum": 1}}}])
+    assert compiled["match"] == {"$and": [{"a": 1}, {"b": 2}]}
+
+
+def test_pipeline_without_group_is_a_plain_select():
+    compiled = compile_pipeline([{"$match": {"user_id": "u1"}}, {"$sort": {"created_at": -1}}, {"$limit": 10}])
+    assert compiled["group"] is False
+    assert compiled["sort"] == [{"key": "created_at", "desc": True}]
+    assert compiled["limit"] == 10
+
+
+@pytest.mark.parametrize("pipeline", [
+    [{"$lookup": {"from": "projects"}}],
+    [{"$group": {"_id": "$pillar_id", "n": {"$sum": 1}}}, {"$match": {"n": {"$gt": 1}}}],
+    [{"$limit": 5}, {"$sort": {"a": 1}}],
+    [{"$group": {"n": {"$sum": 1}}}],
+    [{"$group": {"_id": "pillar_id", "n": {"$sum": 1}}}],
+    [{"$group": {"_id": None, "n": {"$push": "$id"}}}],
+    [{"$group": {"_id": None, "n": {"$sum": 2}}}],
+    [{"$group": {"_id": "$a", "n": {"$sum": 1}}}, {"$sort": {"missing": 1}}],
+    [{"$limit": 0}],
+    [{"$match": {"a": {"$where": 1}}}],
+])
+def test_unsupported_pipelines_are_rejected(pipeline):
+    with pytest.raises(AggregationCompileError):
+        compile_pipeline(pipeline)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+AUTH PROVISIONING CHECK TESTING
+Verifies that _ensure_user_exists_in_auth_users, awaited by every pillar / area / project
+/ task create, asks the Auth Admin API once per user: afterwards the worker's verified
+set answers, and a fresh worker reads the profile's auth_provisioned flag instead.
+PostgREST and the auth directory are local stand-ins.
+
+Run with: python -m pytest tests/backend/auth_provisioning_test.py -q
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'aaa.bbb.ccc')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+
+supabase_services = pytest.importorskip('supabase_services')
+from memory_cache import MemoryCache  # noqa: E402
+
+ensure = supabase_services.SupabasePillarService._ensure_user_exists_in_auth_users
+
+
+class Profiles:
+    """user_profiles rows behind a PostgREST-style builder; counts reads and writes"""
+
+    def __init__(self, **rows):
+        self.rows = rows
+        self.reads = 0
+        self.writes = []
+
+    async def run_query(self, build):
+        return build(self).execute()
+
+    def table(self, name):
+        assert name == 'user_profiles'
+        return Query(self)
+
+
+class Query:
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.update_data = None
+        self.user_id = None
+
+    def select(self, columns):
+        return self
+
+    def update(self, data):
+        self.update_data = data
+        return self
+
+    def eq(self, column, value):
+        self.user_id = value
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        row = self.profiles.rows.get(self.user_id)
+        if self.update_data is not None:
+            self.profiles.writes.append((self.user_id, self.update_data))
+            row.update(self.update_data)
+        else:
+            self.profiles.reads += 1
+        return SimpleNamespace(data=[dict(row)] if row else [])
+
+
+class Directory:
+    def __init__(self, *existing):
+        self.existing = set(existing)
+        self.lookups = 0
+
+    async def get_user(self, user_id):
+        self.lookups += 1
+        return {'id': user_id, 'email': None} if user_id in self.existing else None
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    def start(profiles, directory):
+        monkeypatch.setattr(supabase_services, 'run_query', profiles.run_query)
+        monkeypatch.setattr(supabase_services, 'auth_user_directory', directory)
+        monkeypatch.setattr(supabase_services, 'verified_auth_users', MemoryCache(max_entries=100))
+    return start
+
+
+def test_admin_api_is_asked_once_per_user(worker):
+    profiles = Profiles(u1={'id': 'u1', 'auth_provisioned': False})
+    directory = Directory('u1')
+    worker(profiles, directory)
+
+    async def bulk_create(rows):
+        for _ in range(rows):
+            await ensure('u1')
+
+    asyncio.run(bulk_create(50))
+    assert directory.lookups == 1
+    assert profiles.reads == 1
+    assert profiles.writes == [('u1', {'auth_provisioned': True})]
+
+    # A restarted worker trusts the flag and skips the Admin API
+    worker(profiles, directory)
+    asyncio.run(bulk_create(50))
+    assert directory.lookups == 1
+    assert profiles.reads == 2
+
+
+def test_unverified_users_are_checked_again(worker):
+    profiles = Profiles()
+    directory = Directory()
+    worker(profiles, directory)
+
+    async def creates():
+        await ensure('ghost')
+        await ensure('ghost')
+
+    asyncio.run(creates())
+    assert directory.lookups == 2
+    assert profiles.writes == []
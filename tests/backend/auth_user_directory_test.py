@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+AUTH USER DIRECTORY TESTING
+Verifies that auth users are found by id and by email through indexed lookups instead of
+auth.admin.list_users() scans, at 100k synthetic users in a local GoTrue / PostgREST
+stand-in, that found accounts are cached, misses are not, and deleted accounts are
+forgotten.
+
+Run with: python -m pytest tests/backend/auth_user_directory_test.py -q
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'aaa.bbb.ccc')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+
+from auth_user_directory import AuthUserDirectory  # noqa: E402
+from cache_service import CacheService  # noqa: E402
+
+USERS = 100_000
+
+
+class FakeAuth:
+    """auth.users with its primary key and email indexes, behind GoTrue and PostgREST"""
+
+    def __init__(self, count):
+        self.by_id = {}
+        self.by_email = {}
+        self.calls = {'get_user_by_id': 0, 'rpc': 0, 'list_users': 0}
+        for i in range(count):
+            self.add(str(uuid.UUID(int=i + 1)), f"user{i}@example.com")
+        self.auth = SimpleNamespace(admin=self)
+
+    def add(self, user_id, email):
+        user = SimpleNamespace(id=user_id, email=email)
+        self.by_id[user_id] = user
+        self.by_email[email] = user
+
+    # GoTrue admin API
+    def get_user_by_id(self, user_id):
+        self.calls['get_user_by_id'] += 1
+        if user_id not in self.by_id:
+            raise Exception("User not found")
+        return SimpleNamespace(user=self.by_id[user_id])
+
+    def list_users(self):
+        self.calls['list_users'] += 1
+        raise AssertionError("list_users scans every account")
+
+    # PostgREST rpc('auth_user_id_by_email')
+    def rpc(self, name, params):
+        assert name == 'auth_user_id_by_email'
+        self.calls['rpc'] += 1
+        user = self.by_email.get(params['p_email'])
+        return SimpleNamespace(data=user.id if user else None)
+
+
+def directory(auth):
+    service = CacheService()
+    service.redis_client = None
+
+    async def query(build):
+        return build(auth)
+
+    return AuthUserDirectory(service, client_factory=lambda: auth, query=query, ttl_seconds=60), service
+
+
+def test_lookups_at_100k_users_are_indexed_and_cached():
+    auth = FakeAuth(USERS)
+    sample = random.Random(7).sample(range(USERS), 500)
+
+    async def scenario():
+        users, service = directory(auth)
+        started = time.perf_counter()
+        for n, i in enumerate(sample):
+            user_id, email = str(uuid.UUID(int=i + 1)), f"  User{i}@Example.com "
+            if n % 2:
+                assert await users.find_user_id(email) == user_id
+                assert (await users.get_user(user_id))['id'] == user_id
+            else:
+                assert (await users.get_user(user_id))['email'] == f"user{i}@example.com"
+                assert await users.find_user_id(email) == user_id
+        first_pass = (time.perf_counter() - started) / len(sample)
+        for i in sample:
+            await users.get_user(str(uuid.UUID(int=i + 1)))
+            await users.find_user_id(f"user{i}@example.com")
+        service.memory_cache.stop()
+        return first_pass, users.get_stats()
+
+    per_user, stats = asyncio.run(scenario())
+    assert auth.calls['list_users'] == 0
+    # Either lookup caches both keys, so each user costs one indexed query
+    assert auth.calls['get_user_by_id'] == 250 and auth.calls['rpc'] == 250
+    assert stats['cache_hits'] == 1500
+    # A Python scan of 100k users costs milliseconds per lookup; indexed lookups don't grow with it
+    assert per_user < 0.005
+
+
+def test_missing_accounts_are_not_cached():
+    auth = FakeAuth(10)
+
+    async def scenario():
+        users, service = directory(auth)
+        before = await users.find_user_id('new@example.com')
+        unknown = await users.get_user(str(uuid.uuid4()))
+        auth.add('new-id', 'new@example.com')       # signs up a moment later
+        after = await users.find_user_id('new@example.com')
+        service.memory_cache.stop()
+        return before, unknown, after, users.get_stats()
+
+    before, unknown, after, stats = asyncio.run(scenario())
+    assert before is None and unknown is None
+    assert after == 'new-id'
+    assert stats['not_found'] == 1 and stats['errors'] == 1
+
+
+def test_deleted_accounts_are_forgotten():
+    auth = FakeAuth(10)
+    user_id = str(uuid.UUID(int=3))
+
+    async def scenario():
+        users, service = directory(auth)
+        await users.find_user_id('user2@example.com')
+        await users.get_user(user_id)
+        del auth.by_id[user_id], auth.by_email['user2@example.com']
+        await users.forget(user_id, 'User2@example.com')
+        result = (await users.get_user(user_id), await users.find_user_id('user2@example.com'))
+        service.memory_cache.stop()
+        return result
+
+    assert asyncio.run(scenario()) == (None, None)
+
+
+def test_lookup_failures_are_misses():
+    async def failing(build):
+        raise RuntimeError("function auth_user_id_by_email does not exist")
+
+    service = CacheService()
+    service.redis_client = None
+    users = AuthUserDirectory(service, client_factory=lambda: None, query=failing)
+
+    async def scenario():
+        result = (await users.find_user_id('a@example.com'), await users.get_user('u1'))
+        service.memory_cache.stop()
+        return result
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert users.get_stats()['errors'] == 2
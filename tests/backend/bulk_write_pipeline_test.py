@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+BULK WRITE PIPELINE TESTING
+Verifies multi-row chunking by row count and payload size, bisection of rejected
+chunks down to the failing rows, grouping of identical updates into one PATCH and
+the single-transaction RPC path.
+
+Run with: python -m pytest tests/backend/bulk_write_pipeline_test.py -q
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+
+import bulk_writes  # noqa: E402
+from bulk_writes import BulkWriteError, BulkWriter, bulk_insert, bulk_update, chunk_rows  # noqa: E402
+
+
+class FakePostgrest:
+    """Runs request builders against an in-memory table; rows named 'bad' violate a constraint"""
+
+    def __init__(self):
+        self.client = AsyncPostgrestClient("http://127.0.0.1:54321/rest/v1")
+        self.requests = []
+
+    async def run_query(self, build):
+        request = build(self.client)
+        self.requests.append(request)
+        rows = request.json if isinstance(request.json, list) else [request.json]
+        if request.path.startswith('/rpc/'):
+            rows = request.json['p_rows']
+        if any(row.get('name') == 'bad' for row in rows):
+            raise APIError({'message': 'new row violates check constraint "tasks_name_check"', 'code': '23514'})
+        if request.http_method == 'PATCH':
+            ids = request.params['id'][len('in.('):-1].split(',')
+            return SimpleNamespace(data=[{'id': i, **request.json} for i in ids])
+        return SimpleNamespace(data=rows)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakePostgrest()
+    monkeypatch.setattr(bulk_writes, 'run_query', fake.run_query)
+    return fake
+
+
+def tasks(n, **extra):
+    return [{'id': f"t{i}", 'name': f"Task {i}", 'sort_order': i, **extra} for i in range(n)]
+
+
+def test_chunks_respect_row_count_byte_size_and_key_sets():
+    rows = tasks(10)
+    assert [len(c) for c in chunk_rows(rows, max_rows=4, max_bytes=1 << 20)] == [4, 4, 2]
+
+    wide = [{'id': str(i), 'description': 'x' * 100} for i in range(5)]
+    assert [len(c) for c in chunk_rows(wide, max_rows=100, max_bytes=300)] == [2, 2, 1]
+
+    mixed = [{'id': '1', 'name': 'a'}, {'id': '2'}, {'id': '3', 'name': 'c'}]
+    assert [[r['id'] for r in c] for c in chunk_rows(mixed, 100, 1 << 20)] == [['1', '3'], ['2']]
+
+
+def test_fifteen_tasks_cost_one_round_trip(db):
+    result = asyncio.run(bulk_insert('tasks', tasks(15)))
+    assert result.ok
+    assert len(result.written) == 15
+    assert result.round_trips == 1
+    assert len(db.requests) == 1 and db.requests[0].http_method == 'POST'
+
+
+def test_writer_flushes_full_chunks_while_buffering(db):
+    async def scenario():
+        async with BulkWriter('tasks', max_rows=5) as writer:
+            for row in tasks(12):
+                await writer.add(row)
+            assert len(db.requests) == 2
+        return writer.result
+
+    result = asyncio.run(scenario())
+    assert len(result.written) == 12
+    assert len(db.requests) == 3
+
+
+def test_rejected_chunk_is_bisected_to_the_failing_rows(db):
+    rows = tasks(8)
+    rows[5]['name'] = 'bad'
+    result = asyncio.run(bulk_insert('tasks', rows))
+
+    assert [row['id'] for row in result.written] == ['t0', 't1', 't2', 't3', 't4', 't6', 't7']
+    assert [row['id'] for row, _ in result.failed] == ['t5']
+    assert 'check constraint' in result.failed[0][1]
+    with pytest.raises(BulkWriteError):
+        result.raise_for_failures()
+
+
+def test_upsert_sets_conflict_target(db):
+    asyncio.run(bulk_writes.bulk_upsert('user_stats', [{'user_id': 'u1', 'level': 2}], on_conflict='user_id'))
+    request = db.requests[-1]
+    assert request.params['on_conflict'] == 'user_id'
+    assert 'resolution=merge-duplicates' in request.headers['prefer']
+
+
+def test_identical_updates_share_one_patch(db):
+    rows = [{'id': f"t{i}", 'completed': True} for i in range(6)] + [{'id': 't9', 'sort_order': 3}, {'name': 'no id'}]
+    result = asyncio.run(bulk_update('tasks', rows))
+
+    assert result.round_trips == 2
+    assert len(result.written) == 7
+    assert result.failed == [({'name': 'no id'}, 'missing id')]
+    assert db.requests[0].params['id'] == 'in.(t0,t1,t2,t3,t4,t5)'
+
+
+def test_atomic_write_is_one_rpc_and_all_or_nothing(db):
+    async def scenario(rows):
+        async with BulkWriter('tasks', atomic=True, max_rows=2) as writer:
+            await writer.extend(rows)
+        return writer.result
+
+    result = asyncio.run(scenario(tasks(5)))
+    assert result.round_trips == 1 and len(result.written) == 5
+    assert db.requests[-1].path == '/rpc/bulk_write_rows'
+    assert db.requests[-1].json['p_on_conflict'] == ['id']
+
+    rows = tasks(5)
+    rows[2]['name'] = 'bad'
+    result = asyncio.run(scenario(rows))
+    assert result.written == [] and len(result.failed) == 5
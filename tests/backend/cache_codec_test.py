@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+CACHE CODEC TESTING
+Verifies the cache value codec (format byte, compression above a threshold, legacy JSON
+and unknown-format handling) and that CacheService stores compact binary payloads in
+Redis while its in-process tier keeps them uncompressed. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/cache_codec_test.py -q
+"""
+
+import asyncio
+
+import pytest
+
+from cache_codec import FLAG_ZLIB, FORMAT_JSON, CacheCodec, CodecError
+
+
+def hierarchy(pillars=3, areas=4, projects=5, tasks=10):
+    return [{
+        'id': f'pillar-{p}',
+        'name': f'Pillar {p}',
+        'areas': [{
+            'id': f'area-{p}-{a}',
+            'name': f'Area {a}',
+            'projects': [{
+                'id': f'project-{p}-{a}-{j}',
+                'name': f'Project {j}',
+                'status': 'In Progress',
+                'tasks': [{'id': f'task-{p}-{a}-{j}-{t}', 'name': f'Task {t}', 'completed': t % 3 == 0,
+                           'priority': 'high', 'due_date': None} for t in range(tasks)]
+            } for j in range(projects)]
+        } for a in range(areas)]
+    } for p in range(pillars)]
+
+
+def test_round_trip_with_format_byte():
+    codec = CacheCodec('json', compress_min_bytes=1 << 20)
+    value = {'id': 'p1', 'tags': ['a', 'b'], 'count': 3, 'ratio': 0.5, 'none': None}
+    payload = codec.encode(value)
+
+    assert payload[0] == FORMAT_JSON
+    assert codec.compress(payload) == payload  # below threshold
+    assert codec.decode(payload) == value
+
+
+def test_large_payloads_are_compressed_and_expand_back():
+    codec = CacheCodec('json', compress_min_bytes=1024)
+    value = hierarchy()
+    raw = codec.encode(value)
+    stored = codec.compress(raw)
+
+    assert stored[0] == FORMAT_JSON | FLAG_ZLIB
+    assert len(stored) < len(raw) / 4
+    assert codec.expand(stored) == raw
+    assert codec.decode(stored) == value
+    assert codec.get_stats()['compressed'] == 1
+
+
+def test_legacy_json_text_still_decodes():
+    codec = CacheCodec()
+    assert codec.decode('{"score": 1}') == {'score': 1}
+    assert codec.decode(b'[1, 2]') == [1, 2]
+    assert codec.decode('"text"') == 'text'
+
+
+def test_unknown_format_is_rejected():
+    codec = CacheCodec()
+    with pytest.raises(CodecError):
+        codec.decode(b'\x1f' + b'future-format')
+    with pytest.raises(CodecError):
+        codec.decode(bytes((FORMAT_JSON | FLAG_ZLIB,)) + b'not zlib')
+    assert codec.get_stats()['decode_errors'] == 2
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    codec = CacheCodec('msgpack', compress_min_bytes=1024)
+    value = hierarchy(pillars=2)
+    assert codec.decode(codec.compress(codec.encode(value))) == value
+
+
+def test_cache_service_stores_compressed_binary_in_redis(worker, shutdown):
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        for service in (a, b):
+            service.codec.compress_min_bytes = 1024
+        value = hierarchy()
+
+        await a.set('user_data:hierarchy:user:u1', value, 300, tags=['user:u1'])
+        stored = await a.redis_client.get('user_data:hierarchy:user:u1')
+        from_other_worker = await b.get('user_data:hierarchy:user:u1')
+        l1_payload = b.memory_cache.get('user_data:hierarchy:user:u1')
+        deleted = await a.invalidate_tags(['user:u1'])
+
+        # A payload from a newer release reads as a miss
+        await a.redis_client.set('dashboard:user:u1', b'\x1fnewer')
+        unknown = await a.get('dashboard:user:u1')
+
+        await shutdown(a, b)
+        return value, stored, from_other_worker, l1_payload, deleted, unknown
+
+    value, stored, from_other_worker, l1_payload, deleted, unknown = asyncio.run(scenario())
+    assert stored[0] & FLAG_ZLIB
+    assert from_other_worker == value
+    assert l1_payload[0] == FORMAT_JSON  # L1 keeps it uncompressed
+    assert deleted >= 1
+    assert unknown is None
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+CACHE INVALIDATION BUS TESTING
+Verifies that (user, entity type, id) change events evict exactly the dependent cache
+entries (entity-type tags, record tags, cascades), bump the user's data version, reach
+other workers' L1, and that the cache-invalidation webhook publishes them.
+Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/cache_invalidation_bus_test.py -q
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'aaa.bbb.ccc')
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+from cache_invalidation import InvalidationBus, normalize_entity  # noqa: E402
+from cache_service import CacheService, entity_tag, user_tag  # noqa: E402
+
+
+async def seed(service, user_id="u1"):
+    """Entries as the endpoints tag them"""
+    entries = {
+        f"dashboard:user:{user_id}": ("pillars", "areas", "projects", "tasks"),
+        f"projects:user:{user_id}": ("projects", "tasks"),
+        f"pillars:user:{user_id}": ("pillars", "areas", "projects", "tasks"),
+        f"journal:user:{user_id}": ("journal",),
+    }
+    for key, depends_on in entries.items():
+        tags = [user_tag(user_id)] + [user_tag(user_id, e) for e in depends_on]
+        await service.set(key, {"key": key}, 300, tags=tags)
+
+
+async def present(service, *keys):
+    return [key for key in keys if await service.get(key) is not None]
+
+
+def test_task_change_evicts_only_task_dependents_and_bumps_version(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        bus = InvalidationBus(service)
+        await seed(service)
+        await seed(service, "u2")
+        evicted = await bus.publish("u1", "task", "t1")
+        remaining = await present(service, "dashboard:user:u1", "projects:user:u1", "pillars:user:u1",
+                                  "journal:user:u1", "dashboard:user:u2")
+        version = await service.get_data_version("u1")
+        await shutdown(service)
+        return evicted, remaining, version, bus.get_stats()
+
+    evicted, remaining, version, stats = asyncio.run(scenario())
+    assert evicted == 3
+    assert remaining == ["journal:user:u1", "dashboard:user:u2"]
+    assert version == 1
+    assert stats["by_entity"] == {"tasks": 1}
+
+
+def test_record_tags_evict_only_that_record(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        bus = InvalidationBus(service)
+        await service.set("project_detail:p1", 1, 300, tags=[entity_tag("projects", "p1")])
+        await service.set("project_detail:p2", 2, 300, tags=[entity_tag("projects", "p2")])
+        await bus.publish("u1", "projects", "p1")
+        remaining = await present(service, "project_detail:p1", "project_detail:p2")
+        await shutdown(service)
+        return remaining
+
+    assert asyncio.run(scenario()) == ["project_detail:p2"]
+
+
+def test_cascade_and_unknown_entities(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        bus = InvalidationBus(service)
+        await service.set("tasks:user:u1", 1, 300, tags=[user_tag("u1"), user_tag("u1", "tasks")])
+        await service.set("journal:user:u1", 2, 300, tags=[user_tag("u1"), user_tag("u1", "journal")])
+
+        await bus.publish("u1", "areas", "a1", cascade=("projects", "tasks"))
+        after_cascade = await present(service, "tasks:user:u1", "journal:user:u1")
+        await bus.publish("u1", "some_new_table", "x")
+        after_unknown = await present(service, "journal:user:u1")
+        await shutdown(service)
+        return after_cascade, after_unknown
+
+    after_cascade, after_unknown = asyncio.run(scenario())
+    assert after_cascade == ["journal:user:u1"]
+    assert after_unknown == []
+
+
+def test_change_on_one_worker_evicts_other_workers_l1(worker, shutdown):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        await seed(a)
+        assert await b.get("projects:user:u1") is not None
+        await asyncio.sleep(0.05)
+
+        await InvalidationBus(a).publish("u1", "projects", "p1")
+        await asyncio.sleep(0.05)
+        in_l1 = "projects:user:u1" in b.memory_cache
+        await shutdown(a, b)
+        return in_l1
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_subscribers_receive_events():
+    events = []
+
+    async def handler(event):
+        events.append(event)
+
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        bus = InvalidationBus(service)
+        bus.subscribe(handler)
+        await bus.publish("u1", "journal_entries", "j1")
+        service.memory_cache.stop()
+
+    asyncio.run(scenario())
+    assert [(e.user_id, e.entity_type, e.entity_id) for e in events] == [("u1", "journal_entries", "j1")]
+    assert normalize_entity("journal_entries") == "journal"
+
+
+def test_alignment_goal_change_evicts_alignment_caches_only(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        bus = InvalidationBus(service)
+        await seed(service)
+        depends_on = ("pillars", "areas", "projects", "tasks", "alignment_goal")
+        await service.set("alignment_scores:user:u1", {"monthly_goal": 80}, 300,
+                          tags=[user_tag("u1")] + [user_tag("u1", e) for e in depends_on])
+        await bus.publish("u1", "alignment_goal")
+        remaining = await present(service, "alignment_scores:user:u1", "dashboard:user:u1", "journal:user:u1")
+        versions = await service.get_data_versions("u1", ("alignment_goal",))
+        await shutdown(service)
+        return remaining, versions
+
+    remaining, versions = asyncio.run(scenario())
+    assert remaining == ["dashboard:user:u1", "journal:user:u1"]
+    assert versions["alignment_goal"] == 1
+
+
+def test_webhook_publishes_change_for_record_and_old_record(monkeypatch):
+    webhook_handlers = pytest.importorskip("webhook_handlers")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    published = []
+
+    async def fake_publish(user_id, entity_type, entity_id=None, cascade=()):
+        published.append((user_id, entity_type, entity_id))
+        return 2
+
+    monkeypatch.setattr(webhook_handlers, "publish_change", fake_publish)
+    monkeypatch.setattr(webhook_handlers, "WEBHOOK_SECRET", "s3cret")
+    app = FastAPI()
+    app.include_router(webhook_handlers.webhook_router)
+    client = TestClient(app, headers={"Authorization": "Bearer s3cret"})
+
+    insert = client.post("/webhooks/cache-invalidation",
+                         json={"table": "tasks", "type": "INSERT", "record": {"id": "t1", "user_id": "u1"}})
+    delete = client.post("/webhooks/cache-invalidation",
+                         json={"table": "projects", "type": "DELETE", "record": None,
+                               "old_record": {"id": "p1", "user_id": "u1"}})
+    ignored = client.post("/webhooks/cache-invalidation",
+                          json={"table": "audit_log", "record": {"id": "x", "user_id": "u1"}})
+
+    assert insert.json() == {"status": "success", "invalidated": "tasks", "evicted": 2}
+    assert delete.json()["invalidated"] == "projects"
+    assert ignored.json()["status"] == "ignored"
+    assert published == [("u1", "tasks", "t1"), ("u1", "projects", "p1")]
+
+
+def test_webhook_without_the_shared_secret_is_refused(monkeypatch):
+    webhook_handlers = pytest.importorskip("webhook_handlers")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    published = []
+
+    async def fake_publish(user_id, entity_type, entity_id=None, cascade=()):
+        published.append(user_id)
+        return 1
+
+    monkeypatch.setattr(webhook_handlers, "publish_change", fake_publish)
+    app = FastAPI()
+    app.include_router(webhook_handlers.webhook_router)
+    client = TestClient(app)
+    body = {"table": "tasks", "type": "INSERT", "record": {"id": "t1", "user_id": "victim"}}
+
+    monkeypatch.setattr(webhook_handlers, "WEBHOOK_SECRET", None)
+    unconfigured = client.post("/webhooks/cache-invalidation", json=body,
+                               headers={"Authorization": "Bearer anything"})
+    monkeypatch.setattr(webhook_handlers, "WEBHOOK_SECRET", "s3cret")
+    missing = client.post("/webhooks/cache-invalidation", json=body)
+    wrong = client.post("/webhooks/cache-invalidation", json=body, headers={"Authorization": "Bearer guess"})
+
+    assert (unconfigured.status_code, missing.status_code, wrong.status_code) == (503, 401, 401)
+    assert published == []
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+CACHE METRICS TESTING
+Verifies per-prefix cache counters (L1 / L2 hits, misses, stale serves, evictions, bytes),
+the L1 / L2 latency histograms and the Prometheus text output. Redis is stood in by
+fakeredis.
+
+Run with: python -m pytest tests/backend/cache_metrics_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from cache_metrics import CacheMetrics, LatencyHistogram, metric_prefix, render_prometheus  # noqa: E402
+from cache_service import CacheService  # noqa: E402
+from memory_cache import MemoryCache  # noqa: E402
+
+
+def test_metric_prefix():
+    assert metric_prefix("dashboard:user:u1:v:0.3") == "dashboard"
+    assert metric_prefix("http:pillars:user:u1") == "http:pillars"
+    assert metric_prefix("user_data:hierarchy:user:u1") == "user_data:hierarchy"
+    assert metric_prefix("plain") == "plain"
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram(buckets=(0.001, 0.01))
+    for seconds in (0.0005, 0.0005, 0.005, 0.5):
+        histogram.observe(seconds)
+
+    assert histogram.cumulative() == [(0.001, 2), (0.01, 3), (float('inf'), 4)]
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.get_stats()["p99_ms"] is None  # beyond the last bucket
+
+
+def test_per_prefix_counters_across_tiers(worker, shutdown):
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+
+        await a.set("dashboard:user:u1", {"score": 1}, 300)
+        await a.get("dashboard:user:u1")            # L1 hit on the writer
+        await b.get("dashboard:user:u1")            # L2 hit on another worker
+        await b.get("insights:user:u1")             # miss
+        stats = b.get_stats()
+        await shutdown(a, b)
+        return a.get_stats(), stats
+
+    writer, reader = asyncio.run(scenario())
+    assert writer["prefixes"]["dashboard"]["sets"] == 1
+    assert writer["prefixes"]["dashboard"]["l1_hits"] == 1
+    assert writer["prefixes"]["dashboard"]["bytes_written"] > 0
+    assert reader["prefixes"]["dashboard"]["l2_hits"] == 1
+    assert reader["prefixes"]["dashboard"]["bytes_read"] == writer["prefixes"]["dashboard"]["bytes_written"]
+    assert reader["prefixes"]["insights"]["misses"] == 1
+    assert reader["prefixes"]["insights"]["hit_rate_percentage"] == 0
+    assert reader["latency"]["get_l2"]["count"] == 2
+    assert writer["latency"]["set_l2"]["count"] == 1
+
+
+def test_stale_serves_are_counted_per_prefix(shutdown):
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        await service.get_or_load("insights:user:u1", lambda: asyncio.sleep(0, "v1"), ttl_seconds=0.05,
+                                  stale_ttl_seconds=60)
+        await asyncio.sleep(0.1)
+        await service.get_or_load("insights:user:u1", lambda: asyncio.sleep(0, "v2"), ttl_seconds=0.05,
+                                  stale_ttl_seconds=60)
+        await asyncio.sleep(0.05)
+        await shutdown(service)
+        return service.get_stats()["prefixes"]["insights"]
+
+    assert asyncio.run(scenario())["stale_served"] == 1
+
+
+def test_memory_evictions_reach_the_listener():
+    metrics = CacheMetrics()
+    cache = MemoryCache(max_entries=2)
+    cache.on_evict = metrics.record_eviction
+    for i in range(3):
+        cache.set(f"projects:user:u{i}", i, 60, size=1)
+    cache.set("tasks:user:u1", 1, -1, size=1)
+    cache.get("tasks:user:u1")
+
+    assert metrics.prefixes["projects"]["evictions"] == 2
+    assert metrics.evictions == {("projects", "evicted_lru"): 2, ("tasks", "expired"): 1}
+
+
+def test_prefix_cardinality_is_capped():
+    metrics = CacheMetrics(max_prefixes=2)
+    for prefix in ("a", "b", "c", "d"):
+        metrics.record(f"{prefix}:key", "misses")
+    assert set(metrics.prefixes) == {"a", "b", "other"}
+    assert metrics.prefixes["other"]["misses"] == 2
+
+
+def test_prometheus_output(shutdown):
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        await service.set('dashboard:user:u1', [1], 300)
+        await service.get('dashboard:user:u1')
+        text = service.get_prometheus_metrics()
+        await shutdown(service)
+        return text
+
+    text = asyncio.run(scenario())
+    lines = text.splitlines()
+    assert '# TYPE aurum_cache_operation_seconds histogram' in lines
+    assert 'aurum_cache_lookups_total{prefix="dashboard",result="l1_hits"} 1' in lines
+    assert 'aurum_cache_sets_total{prefix="dashboard"} 1' in lines
+    assert 'aurum_cache_operation_seconds_count{operation="get",tier="l1"} 1' in lines
+    assert 'aurum_cache_operation_seconds_bucket{operation="get",tier="l1",le="+Inf"} 1' in lines
+    assert 'aurum_cache_redis_available 0' in lines
+    assert render_prometheus(CacheMetrics(), {}).endswith('\n')
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+STALE-WHILE-REVALIDATE CACHE TESTING
+Verifies soft/hard TTLs in CacheService.get_or_load: stale values are served while a
+single background refresh runs, concurrent misses across workers compute once behind
+the Redis lock, and XFetch refreshes ahead of expiry. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/cache_stale_while_revalidate_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import cache_service as cache_module  # noqa: E402
+from cache_service import LOCK_KEY_PREFIX, CacheService  # noqa: E402
+
+
+class CountingLoader:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"version": self.calls}
+
+
+def test_stale_value_is_served_while_one_refresh_runs(worker, shutdown):
+    loader = CountingLoader(delay=0.05)
+
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        await service.get_or_load("insights:user:u1", loader, 0.05, stale_ttl_seconds=60)
+        await asyncio.sleep(0.06)
+
+        stale = await asyncio.gather(*(
+            service.get_or_load("insights:user:u1", loader, 0.05, stale_ttl_seconds=60) for _ in range(10)))
+        calls_during_refresh = loader.calls
+        await asyncio.sleep(0.1)
+        fresh = (await service.get("insights:user:u1"))["value"]
+        await shutdown(service)
+        return stale, calls_during_refresh, fresh, service.get_stats()
+
+    stale, calls_during_refresh, fresh, stats = asyncio.run(scenario())
+    assert all(value == {"version": 1} for value in stale)
+    assert calls_during_refresh == 1  # refresh started in the background, not awaited
+    assert loader.calls == 2
+    assert fresh == {"version": 2}
+    assert stats["stale_served"] == 10 and stats["refreshes"] == 1
+
+
+def test_concurrent_misses_on_two_workers_compute_once(worker, shutdown):
+    loader = CountingLoader(delay=0.1)
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        results = await asyncio.gather(
+            a.get_or_load("dashboard:user:u1", loader, 60, stale_ttl_seconds=60),
+            b.get_or_load("dashboard:user:u1", loader, 60, stale_ttl_seconds=60),
+        )
+        lock_left = await a.redis_client.exists(LOCK_KEY_PREFIX + "dashboard:user:u1")
+        await shutdown(a, b)
+        return results, lock_left, b.get_stats()
+
+    results, lock_left, stats = asyncio.run(scenario())
+    assert results == [{"version": 1}, {"version": 1}]
+    assert loader.calls == 1
+    assert stats["lock_waits"] == 1
+    assert lock_left == 0
+
+
+def test_refresh_is_skipped_while_another_worker_holds_the_lock(worker, shutdown):
+    loader = CountingLoader()
+
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        await service.get_or_load("insights:user:u1", loader, 0.01, stale_ttl_seconds=60)
+        await asyncio.sleep(0.02)
+        await service.redis_client.set(LOCK_KEY_PREFIX + "insights:user:u1", "other-worker", px=10000)
+
+        value = await service.get_or_load("insights:user:u1", loader, 0.01, stale_ttl_seconds=60)
+        await asyncio.sleep(0.05)
+        await shutdown(service)
+        return value
+
+    assert asyncio.run(scenario()) == {"version": 1}
+    assert loader.calls == 1
+
+
+def test_xfetch_refreshes_early_in_proportion_to_cost(monkeypatch):
+    service = CacheService()
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.5)  # -ln(0.5) ~ 0.69
+
+    cheap = {"_swr": 1, "value": 1, "fresh_until": now + 5, "delta": 0.01}
+    costly = {"_swr": 1, "value": 1, "fresh_until": now + 5, "delta": 10.0}
+    expired = {"_swr": 1, "value": 1, "fresh_until": now - 1, "delta": 0.0}
+
+    assert not service._should_refresh(cheap)
+    assert service._should_refresh(costly)
+    assert service._should_refresh(expired)
+
+
+def test_cache_result_serves_stale_then_refreshes(monkeypatch):
+    calls = []
+
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        monkeypatch.setattr(cache_module, "cache_service", service)
+
+        @cache_module.cache_result("dashboard", ttl_seconds=0.05, stale_ttl_seconds=60)
+        async def dashboard(user_id):
+            calls.append(user_id)
+            return {"n": len(calls)}
+
+        first = await dashboard("u1")
+        await asyncio.sleep(0.06)
+        stale = await dashboard("u1")
+        await asyncio.sleep(0.02)
+        refreshed = await dashboard("u1")
+        service.memory_cache.stop()
+        return first, stale, refreshed
+
+    assert asyncio.run(scenario()) == ({"n": 1}, {"n": 1}, {"n": 2})
+
+
+def test_cache_result_does_not_serve_stale_unless_asked(monkeypatch):
+    calls = []
+
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        monkeypatch.setattr(cache_module, "cache_service", service)
+
+        @cache_module.cache_result("today_priorities", ttl_seconds=0.05)
+        async def today_priorities(user_id):
+            calls.append(user_id)
+            return {"n": len(calls)}
+
+        first = await today_priorities("u1")
+        await asyncio.sleep(0.06)
+        expired = await today_priorities("u1")
+        service.memory_cache.stop()
+        return first, expired
+
+    assert asyncio.run(scenario()) == ({"n": 1}, {"n": 2})
+
+
+def test_insights_placeholder_is_served_but_not_cached(monkeypatch):
+    monkeypatch.setenv('SUPABASE_URL', 'http://127.0.0.1:54321')
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'aaa.bbb.ccc')
+    monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+    import services
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(services.SupabaseTaskService, "get_user_tasks", unavailable)
+
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        insights = await services.InsightsService.get_user_insights("u1")
+        service.memory_cache.stop()
+        return insights, service.get_stats()
+
+    insights, stats = asyncio.run(scenario())
+    assert insights["eisenhower_matrix"]["Q1"]["count"] == 0
+    assert insights["alignment_snapshot"]["score"] == 0
+    assert stats["sets"] == 0
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+CACHE TAG INVALIDATION TESTING
+Verifies that cache entries tagged with user / entity tags are invalidated exactly, that
+a task edit drops only task-dependent entries, that no KEYS scan is issued, and that
+tag invalidation reaches other workers' L1. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/cache_tag_invalidation_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import cache_service as cache_module  # noqa: E402
+from cache_service import CacheService, cache_result, user_tag  # noqa: E402
+
+
+def test_invalidate_user_cache_drops_exactly_the_tagged_entries(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        await service.cache_user_data("u1", "tasks", [1])
+        await service.cache_user_data("u1", "pillars", [2])
+        await service.cache_user_data("u2", "tasks", [3])
+        await service.set("unrelated", "x", 300)
+
+        deleted = await service.invalidate_user_cache("u1", "tasks")
+        remaining = sorted(key.decode() for key in await service.redis_client.keys("*"))
+        await shutdown(service)
+        return deleted, remaining, service
+
+    deleted, remaining, service = asyncio.run(scenario())
+    assert deleted >= 1
+    assert "user_data:tasks:user:u1" not in remaining
+    assert {"user_data:pillars:user:u1", "user_data:tasks:user:u2", "unrelated"} <= set(remaining)
+    assert "cache:tag:user:u1:tasks" not in remaining
+    assert service.memory_cache.get("user_data:tasks:user:u1") is None
+    assert service.memory_cache.get("user_data:pillars:user:u1") is not None
+
+
+def test_task_edit_invalidates_only_task_dependent_endpoints(monkeypatch, worker, shutdown):
+    calls = []
+
+    def endpoint(prefix, depends_on):
+        @cache_result(prefix, ttl_seconds=300, depends_on=depends_on)
+        async def load(user_id):
+            calls.append(prefix)
+            return {"prefix": prefix}
+        return load
+
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        dashboard = endpoint("dashboard", ("pillars", "areas", "projects", "tasks"))
+        projects = endpoint("projects", ("projects", "tasks"))
+        journal = endpoint("journal", ())
+
+        for load in (dashboard, projects, journal):
+            await load("u1")
+        await service.invalidate_user_cache("u1", "tasks")
+        for load in (dashboard, projects, journal):
+            await load("u1")
+        await shutdown(service)
+
+    asyncio.run(scenario())
+    assert calls == ["dashboard", "projects", "journal", "dashboard", "projects"]
+
+
+def test_invalidation_never_issues_keys(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+
+        async def forbidden(*args, **kwargs):
+            raise AssertionError("KEYS must not be used")
+
+        monkeypatch.setattr(service.redis_client, "keys", forbidden)
+        for i in range(20):
+            await service.set(f"insights:user:u1:{i}", i, 300, tags=[user_tag("u1")])
+        await service.set("insights:user:u2:0", 0, 300, tags=[user_tag("u2")])
+
+        by_tag = await service.invalidate_user_cache("u1")
+        by_pattern = await service.invalidate_pattern("insights:user:u2:*")
+        await shutdown(service)
+        return by_tag, by_pattern
+
+    by_tag, by_pattern = asyncio.run(scenario())
+    assert by_tag >= 20
+    assert by_pattern >= 1
+
+
+def test_tag_invalidation_reaches_other_workers_l1(worker, shutdown):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        await a.cache_user_data("u1", "projects", ["p1"])
+        assert await b.get("user_data:projects:user:u1") == ["p1"]
+        await asyncio.sleep(0.05)
+
+        # b now holds the entry in its L1
+        await a.invalidate_user_cache("u1", "projects")
+        await asyncio.sleep(0.05)
+        in_l1 = "user_data:projects:user:u1" in b.memory_cache
+        await shutdown(a, b)
+        return in_l1
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_pattern_invalidation_uses_glob_semantics_in_memory(shutdown):
+    async def scenario():
+        service = CacheService()
+        service.redis_client = None
+        await service.set("dashboard:user:u1", 1, 300)
+        await service.set("dashboard:user:u10", 2, 300)
+        await service.set("xdashboard:user:u1", 3, 300)
+        deleted = await service.invalidate_pattern("dashboard:user:u1")
+        await shutdown(service)
+        return deleted, sorted(service.memory_cache.keys())
+
+    deleted, keys = asyncio.run(scenario())
+    assert deleted == 1
+    assert keys == ["dashboard:user:u10", "xdashboard:user:u1"]
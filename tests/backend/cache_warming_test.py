@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+CACHE WARMING TESTING
+Verifies that warming fills the same cache entries the endpoints read, that the warming
+queue is bounded (worker concurrency, queue size, per-user cooldown across workers) and
+that nothing is warmed while the database is degraded. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/cache_warming_test.py -q
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Header, Query
+from fastapi.testclient import TestClient
+
+import response_cache
+from cache_service import CacheService
+from cache_warming import CacheWarmer
+from response_cache import cache_user_endpoint
+
+
+def memory_service():
+    service = CacheService()
+    service.redis_client = None
+    return service
+
+
+def test_warmed_response_is_served_from_cache(monkeypatch):
+    service = memory_service()
+    monkeypatch.setattr(response_cache, "cache_service", service)
+    calls = []
+    router = APIRouter(prefix="/api")
+
+    async def current_user(x_user: str = Header(default="u1")):
+        return SimpleNamespace(id=x_user)
+
+    @router.get("/tasks")
+    @cache_user_endpoint(ttl=120, depends_on=("tasks",))
+    async def get_tasks(project_id: Optional[str] = Query(default=None),
+                        return_meta: Optional[bool] = Query(default=False),
+                        current_user=Depends(current_user)):
+        calls.append((current_user.id, project_id, return_meta))
+        return [{"id": "t1"}]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    computed = asyncio.run(get_tasks.warm("u1"))
+    again = asyncio.run(get_tasks.warm("u1"))
+    response = client.get("/api/tasks")
+    filtered = client.get("/api/tasks", params={"project_id": "p1"})
+    service.memory_cache.stop()
+
+    assert computed is True and again is False
+    assert response.headers["x-cache"] == "HIT"
+    assert response.json() == [{"id": "t1"}]
+    assert filtered.headers["x-cache"] == "MISS"
+    assert calls == [("u1", None, False), ("u1", "p1", False)]
+
+
+def test_worker_concurrency_is_bounded():
+    async def scenario():
+        warmer = CacheWarmer(memory_service(), concurrency=2, queue_size=100, cooldown_seconds=0,
+                             is_degraded=lambda: False)
+        in_flight, peak, warmed = [0], [0], []
+
+        async def slow(user_id):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            warmed.append(user_id)
+
+        warmer.register("slow", slow)
+        for i in range(10):
+            assert warmer.request(f"u{i}")
+        assert warmer.request("u0")  # already queued, not queued twice
+        await warmer._queue.join()
+        warmer.stop()
+        return peak[0], warmed, warmer.get_stats()
+
+    peak, warmed, stats = asyncio.run(scenario())
+    assert peak == 2
+    assert sorted(warmed) == sorted(f"u{i}" for i in range(10))
+    assert stats["queued"] == 10 and stats["users_warmed"] == 10
+
+
+def test_full_queue_drops_requests():
+    async def scenario():
+        warmer = CacheWarmer(memory_service(), concurrency=1, queue_size=2, cooldown_seconds=0,
+                             is_degraded=lambda: False)
+        release = asyncio.Event()
+
+        async def blocked(user_id):
+            await release.wait()
+
+        warmer.register("blocked", blocked)
+        accepted = [warmer.request(f"u{i}") for i in range(2)]
+        await asyncio.sleep(0)  # the worker takes u0 off the queue
+        accepted += [warmer.request(f"u{i}") for i in range(2, 5)]
+        release.set()
+        await warmer._queue.join()
+        warmer.stop()
+        return accepted, warmer.get_stats()
+
+    accepted, stats = asyncio.run(scenario())
+    assert accepted == [True, True, True, False, False]
+    assert stats["dropped"] == 2
+
+
+def test_cooldown_is_shared_across_workers(worker, shutdown):
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        services = [worker(server), worker(server)]
+        warmed = []
+
+        async def record(user_id):
+            warmed.append(user_id)
+
+        a, b = (CacheWarmer(service, cooldown_seconds=60, is_degraded=lambda: False) for service in services)
+        for warmer in (a, b):
+            warmer.register("record", record)
+
+        await a.warm_user("u1")
+        await b.warm_user("u1")                       # within the cooldown elsewhere
+        await b.warm_user("u1", 'bulk_import', force=True)
+        await b.warm_user("u2")
+        await shutdown(*services)
+        return warmed, b.get_stats()
+
+    warmed, stats = asyncio.run(scenario())
+    assert warmed == ["u1", "u1", "u2"]
+    assert stats["skipped_recent"] == 1
+
+
+def test_failures_and_degraded_database():
+    async def scenario():
+        degraded = [False]
+        warmer = CacheWarmer(memory_service(), cooldown_seconds=0, timeout_seconds=0.05,
+                             is_degraded=lambda: degraded[0])
+        warmed = []
+
+        async def broken(user_id):
+            raise RuntimeError("db error")
+
+        async def hanging(user_id):
+            await asyncio.sleep(1)
+
+        async def record(user_id):
+            warmed.append(user_id)
+
+        for name, fn in (("broken", broken), ("hanging", hanging), ("record", record)):
+            warmer.register(name, fn)
+
+        computed = await warmer.warm_user("u1")
+        degraded[0] = True
+        skipped = await warmer.warm_user("u2")
+        return computed, skipped, warmed, warmer.get_stats()
+
+    computed, skipped, warmed, stats = asyncio.run(scenario())
+    assert computed == 1 and skipped == 0
+    assert warmed == ["u1"]
+    assert stats["failures"] == 2 and stats["skipped_degraded"] == 1
+
+
+def test_request_without_event_loop_is_ignored():
+    warmer = CacheWarmer(memory_service())
+    warmer.register("noop", lambda user_id: asyncio.sleep(0))
+    assert warmer.request("u1") is False
+    assert CacheWarmer(memory_service()).request("u1") is False  # no warmers registered
+
+
+def test_alignment_scores_placeholder_is_not_cached(monkeypatch):
+    import cache_service as cache_module
+    from alignment_score_service import AlignmentScoreService
+
+    class FailingTable:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self
+
+        def execute(self):
+            raise ConnectionError("database unavailable")
+
+    alignment = AlignmentScoreService.__new__(AlignmentScoreService)
+    alignment.supabase = SimpleNamespace(table=lambda name: FailingTable())
+    service = memory_service()
+    monkeypatch.setattr(cache_module, "cache_service", service)
+
+    @cache_module.cache_result("alignment_scores", ttl_seconds=300, depends_on=("tasks",))
+    async def load_alignment_scores(user_id):
+        return await alignment.get_dashboard_scores(user_id, strict=True)
+
+    async def scenario():
+        placeholder = await alignment.get_dashboard_scores("u1")
+        with pytest.raises(ConnectionError):
+            await load_alignment_scores("u1")
+        service.memory_cache.stop()
+        return placeholder, service.get_stats()
+
+    placeholder, stats = asyncio.run(scenario())
+    assert placeholder == AlignmentScoreService.empty_dashboard_scores()
+    assert stats["sets"] == 0
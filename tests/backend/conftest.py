@@ -0,0 +1,46 @@
+"""
+Shared fixtures for the cache test suites: CacheService instances as each API worker
+holds them, on a fakeredis server and with the production client settings (binary
+values, decode_responses=False, and a dedicated pub/sub connection).
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+
+@pytest.fixture
+def worker():
+    """Factory for CacheServices sharing a Redis server: worker(server=None)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from cache_service import CacheService
+
+    def make(server=None):
+        server = server or fakeredis.FakeServer()
+        service = CacheService()
+        service.redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=False)
+        service.pubsub_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=False)
+        return service
+
+    return make
+
+
+@pytest.fixture
+def shutdown():
+    """Stops the listeners and L1 sweepers of the given CacheServices"""
+    async def stop(*services):
+        for service in services:
+            task = service._listener_task
+            # fakeredis reads can swallow a cancellation that lands while they complete
+            # (asyncio.wait_for on Python 3.11), so cancel until the listener is gone
+            while task is not None and not task.done():
+                task.cancel()
+                await asyncio.wait({task}, timeout=0.05)
+            service.memory_cache.stop()
+        await asyncio.sleep(0)
+
+    return stop
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+CONNECTION POOL TESTING
+Verifies that ConnectionPoolManager bounds checked-out connections, recycles expired
+ones on acquire, and gives the slot back when an acquire is cancelled while it closes
+expired connections.
+
+Run with: python -m pytest tests/backend/connection_pool_test.py -q
+"""
+
+import asyncio
+
+import pytest
+
+from connection_pool import ConnectionPoolManager, PoolTimeoutError
+
+
+def make_pool(size=2):
+    pool = ConnectionPoolManager()
+    pool.configure("http://127.0.0.1:54321/rest/v1", "aaa.bbb.ccc")
+    pool.min_size = 0
+    pool.pool_size = size
+    return pool
+
+
+def test_acquire_times_out_when_every_connection_is_in_use():
+    async def scenario():
+        pool = make_pool(size=1)
+        conn = await pool.acquire()
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire(timeout=0.05)
+        await pool.release(conn)
+        again = await pool.acquire(timeout=0.05)
+        await pool.release(again)
+        await pool.close()
+        return conn, again
+
+    conn, again = asyncio.run(scenario())
+    assert again is conn
+
+
+def test_cancelled_acquire_does_not_leak_its_slot():
+    async def scenario():
+        pool = make_pool(size=1)
+        conn = await pool.acquire()
+        conn.broken = True
+        await pool.release(conn)
+        # Hand a broken idle connection to the next acquire, whose close() then hangs
+        pool._idle.append(conn)
+        pool._size += 1
+        closing = asyncio.Event()
+
+        async def hanging_close():
+            closing.set()
+            await asyncio.sleep(10)
+
+        conn.close = hanging_close
+        pending = asyncio.ensure_future(pool.acquire())
+        await closing.wait()
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+        stats = pool.get_pool_stats()
+        replacement = await pool.acquire(timeout=0.05)
+        await pool.release(replacement)
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["in_use"] == 0
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+DATA VERSION TESTING
+Verifies the per-user data version counters: writes bump only the changed entity types,
+versioned cache keys make a load that raced a write unreachable, response ETags and
+X-Data-Version follow the versions, versions are read from Redis once per local TTL and
+dropped over pub/sub when another worker bumps them, and a failed or slow Redis read
+bypasses the cache instead of guessing a version. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/data_version_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Header
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import cache_service as cache_module  # noqa: E402
+import response_cache  # noqa: E402
+from cache_invalidation import InvalidationBus  # noqa: E402
+from cache_service import ANY_CHANGE, USER_EPOCH, CacheService, cache_result  # noqa: E402
+from response_cache import cache_user_endpoint  # noqa: E402
+
+
+def test_changes_bump_only_the_changed_entity_types(worker, shutdown):
+    async def scenario():
+        service = worker()
+        bus = InvalidationBus(service)
+        await bus.publish("u1", "task", "t1")
+        await bus.publish("u1", "projects", "p1", cascade=("tasks",))
+        await bus.publish("u1", "some_new_table", "x")
+        versions = await service.get_data_versions("u1")
+        other = await service.get_data_versions("u2", ("tasks",))
+        await shutdown(service)
+        return versions, other
+
+    versions, other = asyncio.run(scenario())
+    assert versions == {ANY_CHANGE: 3, USER_EPOCH: 1, "tasks": 2, "projects": 1}
+    assert other == {ANY_CHANGE: 0, USER_EPOCH: 0, "tasks": 0}
+
+
+def test_load_racing_a_write_is_not_served_afterwards(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker()
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        store = {"tasks": ["old"]}
+        started, release = asyncio.Event(), asyncio.Event()
+
+        @cache_result("task_list", ttl_seconds=3600, depends_on=("tasks",))
+        async def task_list(user_id):
+            value = list(store["tasks"])
+            started.set()
+            await release.wait()
+            return value
+
+        # A read computes from the old data while a write lands and invalidates
+        slow_read = asyncio.create_task(task_list("u1"))
+        await started.wait()
+        store["tasks"] = ["new"]
+        await service.invalidate_user_cache("u1", "tasks")
+        release.set()
+        raced = await slow_read
+        after = await task_list("u1")
+        await shutdown(service)
+        return raced, after
+
+    raced, after = asyncio.run(scenario())
+    assert raced == ["old"]
+    assert after == ["new"]
+
+
+def test_unrelated_writes_keep_versioned_entries(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker()
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        calls = []
+
+        @cache_result("journal_list", ttl_seconds=3600, depends_on=("journal",))
+        async def journal_list(user_id):
+            calls.append(user_id)
+            return ["entry"]
+
+        await journal_list("u1")
+        await InvalidationBus(service).publish("u1", "tasks", "t1")
+        await journal_list("u1")
+        await InvalidationBus(service).publish("u1", "journal", "j1")
+        await journal_list("u1")
+        await shutdown(service)
+        return calls
+
+    assert asyncio.run(scenario()) == ["u1", "u1"]
+
+
+def test_redis_version_read_failure_bypasses_the_cache(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker()
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        calls = []
+
+        @cache_result("pillars", ttl_seconds=3600)
+        async def pillars(user_id):
+            calls.append(user_id)
+            return ["p1"]
+
+        await pillars("u1")
+
+        async def broken(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(service.redis_client, "hgetall", broken)
+        service.memory_cache.clear()   # the local copy of the versions has expired
+        versions = await service.get_data_versions("u1", ("pillars",))
+        await pillars("u1")
+        await shutdown(service)
+        return versions, calls
+
+    versions, calls = asyncio.run(scenario())
+    assert versions is None
+    assert calls == ["u1", "u1"]
+
+
+def test_versions_are_read_from_redis_once_per_ttl(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker()
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        reads = []
+        hgetall = service.redis_client.hgetall
+
+        async def counted(key):
+            reads.append(key)
+            return await hgetall(key)
+
+        monkeypatch.setattr(service.redis_client, "hgetall", counted)
+
+        @cache_result("pillars", ttl_seconds=3600)
+        async def pillars(user_id):
+            return ["p1"]
+
+        for _ in range(20):
+            await pillars("u1")
+        await service.bump_data_version("u1", ["pillars"])
+        versions = await service.get_data_versions("u1", ("pillars",))
+        await shutdown(service)
+        return reads, versions
+
+    reads, versions = asyncio.run(scenario())
+    assert reads == ["cache:versions:u1", "cache:versions:u1"]
+    assert versions["pillars"] == 1
+
+
+def test_bumps_on_another_worker_drop_the_local_versions(worker, shutdown):
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        reader, writer = worker(server), worker(server)
+        before = await reader.get_data_versions("u1", ("tasks",))
+        await asyncio.sleep(0.05)   # listener subscribed
+        await writer.bump_data_version("u1", ["tasks"])
+        await asyncio.sleep(0.05)
+        after = await reader.get_data_versions("u1", ("tasks",))
+        await shutdown(reader)
+        await shutdown(writer)
+        return before["tasks"], after["tasks"]
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_slow_version_read_bypasses_the_cache(monkeypatch, worker, shutdown):
+    async def scenario():
+        service = worker()
+
+        async def slow(key):
+            await asyncio.sleep(0.5)
+            return {}
+
+        monkeypatch.setattr(service.redis_client, "hgetall", slow)
+        started = asyncio.get_running_loop().time()
+        versions = await service.get_data_versions("u1", ("tasks",))
+        elapsed = asyncio.get_running_loop().time() - started
+        await shutdown(service)
+        return versions, elapsed
+
+    versions, elapsed = asyncio.run(scenario())
+    assert versions is None and elapsed < 0.3
+
+
+def test_response_headers_follow_the_data_version(monkeypatch):
+    service = CacheService()
+    service.redis_client = None
+    monkeypatch.setattr(response_cache, "cache_service", service)
+    router = APIRouter(prefix="/api")
+
+    async def current_user(x_user: str = Header(default="u1")):
+        return SimpleNamespace(id=x_user)
+
+    @router.get("/journal")
+    @cache_user_endpoint(ttl=3600, depends_on=("journal",))
+    async def get_journal(current_user=Depends(current_user)):
+        return [{"id": "j1"}]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    first = client.get("/api/journal")
+    asyncio.run(service.bump_data_version("u1", ["tasks"]))
+    after_task_write = client.get("/api/journal", headers={"If-None-Match": first.headers["etag"]})
+    asyncio.run(service.bump_data_version("u1", ["journal"]))
+    after_journal_write = client.get("/api/journal", headers={"If-None-Match": first.headers["etag"]})
+    service.memory_cache.stop()
+
+    assert first.headers["x-data-version"] == "0"
+    assert after_task_write.status_code == 304
+    assert after_task_write.headers["x-data-version"] == "1"
+    assert after_journal_write.status_code == 200
+    assert after_journal_write.headers["etag"] != first.headers["etag"]
+    assert after_journal_write.headers["x-data-version"] == "2"
+
+
+def test_long_ttls_are_capped_without_redis(monkeypatch, worker, shutdown):
+    lifetimes = []
+
+    async def scenario(service):
+        monkeypatch.setattr(response_cache, "cache_service", service)
+        load = service.get_or_load
+
+        async def recording_load(key, loader, ttl_seconds=300, tags=(), stale_ttl_seconds=0):
+            lifetimes.append((ttl_seconds, stale_ttl_seconds))
+            return await load(key, loader, ttl_seconds, tags=tags, stale_ttl_seconds=stale_ttl_seconds)
+
+        monkeypatch.setattr(service, "get_or_load", recording_load)
+
+        @cache_user_endpoint(ttl=3600, ttl_without_redis=180, depends_on=("pillars",))
+        async def get_pillars(current_user=None):
+            return [{"id": "p1"}]
+
+        @cache_user_endpoint(ttl=3600, stale_ttl=3600, ttl_without_redis=180, depends_on=("areas",))
+        async def get_areas(current_user=None):
+            return [{"id": "a1"}]
+
+        await get_pillars.warm("u1")
+        await get_areas.warm("u1")
+        await shutdown(service)
+
+    local = CacheService()
+    local.redis_client = None
+    asyncio.run(scenario(local))
+    asyncio.run(scenario(worker()))
+    # No stale window unless the endpoint asks for one
+    assert lifetimes == [(180, 0), (180, 180), (3600, 0), (3600, 3600)]
+
+
+def test_hierarchy_read_failures_are_not_cached(monkeypatch):
+    monkeypatch.setenv('SUPABASE_URL', 'http://127.0.0.1:54321')
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'aaa.bbb.ccc')
+    monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+    import supabase_services
+    from db_resilience import CircuitOpenError
+
+    async def circuit_open(*args, **kwargs):
+        raise CircuitOpenError('pillars', 30)
+
+    monkeypatch.setattr(supabase_services, 'run_query', circuit_open)
+    service = CacheService()
+    service.redis_client = None
+    monkeypatch.setattr(response_cache, "cache_service", service)
+    router = APIRouter(prefix="/api")
+
+    async def current_user():
+        return SimpleNamespace(id="u1")
+
+    @router.get("/pillars")
+    @cache_user_endpoint(ttl=3600, ttl_without_redis=180, depends_on=("pillars",))
+    async def get_pillars(current_user=Depends(current_user)):
+        return await supabase_services.SupabasePillarService.get_user_pillars(current_user.id, strict=True)
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app, raise_server_exceptions=False)
+
+    lenient = asyncio.run(supabase_services.SupabasePillarService.get_user_pillars("u1"))
+    failed = client.get("/api/pillars")
+    cached_entries = service.get_stats()["sets"]
+    service.memory_cache.stop()
+
+    assert lenient == []
+    assert failed.status_code == 500
+    assert cached_entries == 0
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+DATABASE RESILIENCE TESTING
+Runs the resilience layer (circuit breakers, retry budget, hedged reads) against a local
+fault-injecting stand-in for PostgREST that can return 503s, stall or drop requests
+per table.
+
+Run with: python -m pytest tests/backend/db_resilience_test.py -q
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from db_resilience import (  # noqa: E402
+    CircuitBreaker,
+    CircuitOpenError,
+    DatabaseResilience,
+    ResilientAsyncTransport,
+    ResilientTransport,
+    db_resilience,
+)
+
+
+class FaultServer:
+    """
+    Stand-in PostgREST. `faults[table]` is a list consumed one entry per request:
+    'ok', '503', 'drop' (close the socket without replying) or a float delay in seconds.
+    Requests past the end of the list succeed.
+    """
+
+    def __init__(self):
+        self.faults = {}
+        self.hits = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                table = self.path.split('?')[0].rsplit('/', 1)[-1]
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                with server.lock:
+                    server.hits[table] = server.hits.get(table, 0) + 1
+                    queue = server.faults.get(table, [])
+                    fault = queue.pop(0) if queue else 'ok'
+
+                if fault == 'drop':
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if isinstance(fault, float):
+                    time.sleep(fault)
+                status = 503 if fault == '503' else 200
+                body = json.dumps([{'id': '1', 'table': table}]).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _handle
+            do_POST = _handle
+            do_PATCH = _handle
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/rest/v1"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    fault_server = FaultServer()
+    yield fault_server
+    fault_server.close()
+
+
+def make_resilience(**overrides):
+    resilience = DatabaseResilience()
+    resilience.enabled = True
+    resilience.failure_threshold = 3
+    resilience.reset_timeout = 0.2
+    resilience.max_retries = 0
+    resilience.backoff_base = 0.001
+    resilience.backoff_cap = 0.005
+    resilience.hedge_enabled = False
+    for key, value in overrides.items():
+        setattr(resilience, key, value)
+    return resilience
+
+
+def async_client(server, resilience, hedge=False):
+    transport = ResilientAsyncTransport(
+        httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=1)),
+        resilience,
+        httpx.AsyncHTTPTransport() if hedge else None
+    )
+    return httpx.AsyncClient(base_url=server.url, transport=transport, timeout=5)
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_half_open(server):
+    resilience = make_resilience()
+    server.faults['tasks'] = ['503'] * 3
+
+    async def scenario():
+        async with async_client(server, resilience) as client:
+            for _ in range(3):
+                assert (await client.get('/tasks')).status_code == 503
+            assert resilience.breakers['tasks'].state == CircuitBreaker.OPEN
+
+            started = time.monotonic()
+            with pytest.raises(CircuitOpenError):
+                await client.get('/tasks')
+            assert time.monotonic() - started < 0.05
+            assert server.hits['tasks'] == 3
+
+            # Other tables keep working while tasks is open
+            assert (await client.get('/projects')).status_code == 200
+
+            await asyncio.sleep(0.25)
+            assert (await client.get('/tasks')).status_code == 200
+            assert resilience.breakers['tasks'].state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+    stats = resilience.get_stats()
+    assert stats['status'] == 'healthy'
+    assert stats['rejected'] == 1
+    assert stats['circuits']['tasks']['opened'] == 1
+
+
+def test_failed_half_open_probe_reopens_the_circuit(server):
+    resilience = make_resilience(failure_threshold=1)
+    server.faults['areas'] = ['503', '503']
+
+    async def scenario():
+        async with async_client(server, resilience) as client:
+            await client.get('/areas')
+            await asyncio.sleep(0.25)
+            assert (await client.get('/areas')).status_code == 503
+            with pytest.raises(CircuitOpenError):
+                await client.get('/areas')
+
+    asyncio.run(scenario())
+    assert resilience.get_stats()['open_circuits'] == ['areas']
+    assert resilience.get_stats()['status'] == 'degraded'
+
+
+def test_cancelled_half_open_probe_frees_its_slot(server):
+    resilience = make_resilience(failure_threshold=1)
+    server.faults['areas'] = ['503', 1.0]
+
+    async def scenario():
+        async with async_client(server, resilience) as client:
+            await client.get('/areas')
+            await asyncio.sleep(0.25)
+            probe = asyncio.ensure_future(client.get('/areas'))
+            await asyncio.sleep(0.1)
+            assert resilience.breakers['areas'].state == CircuitBreaker.HALF_OPEN
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+        # A fresh connection: the cancelled one was torn down mid-request
+        async with async_client(server, resilience) as client:
+            assert (await client.get('/areas')).status_code == 200
+
+    asyncio.run(scenario())
+    assert resilience.breakers['areas'].state == CircuitBreaker.CLOSED
+
+
+def test_reads_are_retried_with_budget_but_writes_are_not(server):
+    resilience = make_resilience(max_retries=2)
+    server.faults['pillars'] = ['503', 'drop']
+    server.faults['journal_entries'] = ['503']
+
+    async def scenario():
+        async with async_client(server, resilience) as client:
+            read = await client.get('/pillars')
+            write = await client.post('/journal_entries', json={'content': 'x'})
+            return read, write
+
+    read, write = asyncio.run(scenario())
+    assert read.status_code == 200 and server.hits['pillars'] == 3
+    assert write.status_code == 503 and server.hits['journal_entries'] == 1
+    assert resilience.get_stats()['retries'] == 2
+
+
+def test_exhausted_retry_budget_stops_retries(server):
+    resilience = make_resilience(max_retries=3)
+    resilience.budget.ratio = 0.0
+    resilience.budget.min_per_second = 0.0
+    server.faults['tasks'] = ['503']
+
+    async def scenario():
+        async with async_client(server, resilience) as client:
+            return await client.get('/tasks')
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert server.hits['tasks'] == 1
+    assert resilience.budget.get_stats()['exhausted'] == 1
+
+
+def test_slow_read_is_hedged_after_p95(server):
+    resilience = make_resilience(hedge_enabled=True, hedge_min_samples=5, hedge_min_delay=0.02)
+
+    async def scenario():
+        async with async_client(server, resilience, hedge=True) as client:
+            for _ in range(5):
+                await client.get('/tasks')
+            server.faults['tasks'] = [1.0]
+            started = time.monotonic()
+            response = await client.get('/tasks')
+            return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert elapsed < 0.5
+    stats = resilience.get_stats()
+    assert stats['hedges'] == 1 and stats['hedge_wins'] == 1
+    assert 'tasks' in stats['hedging']['delays_ms']
+
+
+def test_writes_are_never_hedged(server):
+    resilience = make_resilience(hedge_enabled=True, hedge_min_samples=1, hedge_min_delay=0.01)
+    resilience.tracker('tasks').record(0.001)
+    server.faults['tasks'] = [0.1]
+
+    async def scenario():
+        async with async_client(server, resilience, hedge=True) as client:
+            return await client.post('/tasks', json={'name': 'x'})
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert server.hits['tasks'] == 1
+    assert resilience.get_stats()['hedges'] == 0
+
+
+def test_sync_client_shares_breaker_state(server):
+    resilience = make_resilience(failure_threshold=2)
+    server.faults['user_profiles'] = ['503', '503']
+    client = httpx.Client(base_url=server.url, transport=ResilientTransport(httpx.HTTPTransport(), resilience))
+
+    client.get('/user_profiles')
+    client.get('/user_profiles')
+    with pytest.raises(CircuitOpenError):
+        client.get('/user_profiles')
+    client.close()
+    assert server.hits['user_profiles'] == 2
+
+
+def test_sync_retries_do_not_sleep_by_default(server, monkeypatch):
+    resilience = make_resilience(max_retries=2, backoff_base=1.0, backoff_cap=5.0)
+    server.faults['user_profiles'] = ['503', '503']
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    client = httpx.Client(base_url=server.url, transport=ResilientTransport(httpx.HTTPTransport(), resilience))
+
+    response = client.get('/user_profiles')
+    client.close()
+    assert response.status_code == 200 and server.hits['user_profiles'] == 3
+    assert sleeps == []
+
+
+def test_installed_sync_client_guards_auth_admin_calls():
+    from supabase import create_client
+    from db_resilience import install_sync_client, resource_name
+
+    client = create_client('http://127.0.0.1:54321', 'aaa.bbb.ccc')
+    install_sync_client(client)
+
+    assert isinstance(client.auth.admin._http_client._transport, ResilientTransport)
+    assert isinstance(client.postgrest.session._transport, ResilientTransport)
+    admin_request = httpx.Request('GET', 'http://127.0.0.1:54321/auth/v1/admin/users/3f2a')
+    assert resource_name(admin_request) == 'auth'
+
+
+def test_pooled_postgrest_session_uses_global_resilience(server):
+    from connection_pool import PooledConnection
+
+    saved = (db_resilience.failure_threshold, db_resilience.max_retries)
+    db_resilience.reset()
+    db_resilience.failure_threshold, db_resilience.max_retries = 1, 0
+    server.faults['habits'] = ['503']
+
+    async def scenario():
+        conn = PooledConnection(1, server.url, {'apikey': 'k'}, 5)
+        try:
+            with pytest.raises(Exception):
+                await conn.table('habits').select('*').execute()
+            with pytest.raises(CircuitOpenError):
+                await conn.table('habits').select('*').execute()
+        finally:
+            await conn.close()
+
+    try:
+        asyncio.run(scenario())
+        assert db_resilience.get_stats()['open_circuits'] == ['habits']
+    finally:
+        db_resilience.failure_threshold, db_resilience.max_retries = saved
+        db_resilience.reset()
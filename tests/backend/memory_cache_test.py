@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+MEMORY CACHE TIER TESTING
+Verifies LRU eviction order, TTL expiry and sweeping, byte and per-prefix bounds of the
+in-process cache tier, and that CacheService falls back to it without Redis.
+
+Run with: python -m pytest tests/backend/memory_cache_test.py -q
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from memory_cache import MemoryCache, parse_prefix_quotas  # noqa: E402
+from cache_service import CacheService  # noqa: E402
+
+
+def test_evicts_least_recently_used_not_alphabetical():
+    cache = MemoryCache(max_entries=3, max_bytes=10_000, prefix_quotas={})
+    for key in ("c", "b", "a"):
+        cache.set(key, key, 60)
+    cache.get("c")
+    cache.set("d", "d", 60)
+
+    assert cache.keys() == ["a", "c", "d"]
+    assert cache.get_stats()["evicted_lru"] == 1
+
+
+def test_expired_entries_are_misses_and_swept():
+    cache = MemoryCache(max_entries=100, max_bytes=10_000, prefix_quotas={})
+    cache.set("short", 1, 0.01)
+    cache.set("long", 2, 60)
+    cache.set("rewritten", 3, 0.01)
+    cache.set("rewritten", 4, 60)
+
+    time.sleep(0.02)
+    assert cache.sweep() == 1
+    assert cache.keys() == ["long", "rewritten"]
+    assert cache.get("rewritten") == 4
+
+    cache.set("lazy", 5, 0.01)
+    time.sleep(0.02)
+    assert cache.get("lazy", "missing") == "missing"
+    assert cache.get_stats()["expired"] == 2
+
+
+def test_byte_bound_evicts_until_under_budget():
+    cache = MemoryCache(max_entries=100, max_bytes=100, prefix_quotas={})
+    for i in range(5):
+        cache.set(f"k{i}", "x" * 30, 60)
+
+    assert cache.bytes <= 100
+    assert cache.keys() == ["k2", "k3", "k4"]
+    assert cache.get_stats()["evicted_bytes"] == 2
+    assert cache.set("huge", "x" * 500, 60) is False
+    assert "huge" not in cache
+
+
+def test_prefix_quota_evicts_within_the_prefix_only():
+    cache = MemoryCache(max_entries=100, max_bytes=100_000, prefix_quotas=parse_prefix_quotas("insights=2, bad"))
+    cache.set("dashboard:user:1", 1, 60)
+    for i in range(4):
+        cache.set(f"insights:user:{i}", i, 60)
+
+    assert cache.keys() == ["dashboard:user:1", "insights:user:2", "insights:user:3"]
+    stats = cache.get_stats()
+    assert stats["evicted_quota"] == 2
+    assert stats["prefixes"]["insights"] == {"entries": 2, "quota": 2}
+
+
+def test_overwrite_and_delete_keep_accounting_exact():
+    cache = MemoryCache(max_entries=100, max_bytes=100_000, prefix_quotas={})
+    cache.set("a", "x" * 10, 60)
+    cache.set("a", "x" * 20, 60)
+    assert cache.bytes == 22
+    assert cache.delete("a") and not cache.delete("a")
+    assert cache.bytes == 0 and len(cache) == 0
+
+
+def test_background_sweeper_runs_on_the_event_loop():
+    cache = MemoryCache(max_entries=100, max_bytes=10_000, prefix_quotas={}, sweep_interval=0.02)
+
+    async def scenario():
+        cache.set("k", 1, 0.01)
+        await asyncio.sleep(0.06)
+        cache.stop()
+
+    asyncio.run(scenario())
+    assert len(cache) == 0
+
+
+def test_cache_service_uses_memory_tier_without_redis():
+    service = CacheService()
+    service.redis_client = None
+
+    async def scenario():
+        await service.set("projects:user:u1", [{"id": "p1"}], ttl_seconds=60)
+        hit = await service.get("projects:user:u1")
+        await service.delete("projects:user:u1")
+        miss = await service.get("projects:user:u1")
+        service.memory_cache.stop()
+        return hit, miss
+
+    hit, miss = asyncio.run(scenario())
+    assert hit == [{"id": "p1"}] and miss is None
+    stats = service.get_stats()
+    assert stats["memory_cache"]["entries"] == 0
+    assert stats["hits"] == 1 and stats["misses"] == 1
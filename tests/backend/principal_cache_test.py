@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+PRINCIPAL CACHE TESTING
+Verifies that the authenticated User is cached per (user id, token iat), that a new token
+re-reads the profile, that profile writes invalidate the cached principals in every worker
+and that SupabaseAuth.get_current_user only queries user_profiles on a miss. Redis is
+stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/principal_cache_test.py -q
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+
+from cache_service import CacheService  # noqa: E402
+from models import User  # noqa: E402
+from principal_cache import PrincipalCache  # noqa: E402
+
+
+def memory_service():
+    service = CacheService()
+    service.redis_client = None
+    return service
+
+
+def profile_loader(calls, **fields):
+    async def load():
+        calls.append(1)
+        return User(id='u1', email='ada@example.com', username='ada', first_name='Ada',
+                    last_name='Lovelace', **fields)
+    return load
+
+
+def test_principal_is_cached_per_token():
+    async def scenario():
+        service = memory_service()
+        principals = PrincipalCache(service, ttl_seconds=60)
+        calls = []
+        first = await principals.resolve('u1', 1000, profile_loader(calls))
+        again = await principals.resolve('u1', 1000, profile_loader(calls))
+        refreshed = await principals.resolve('u1', 2000, profile_loader(calls))
+        untimed = await principals.resolve('u1', None, profile_loader(calls))
+        service.memory_cache.stop()
+        return first, again, refreshed, untimed, len(calls), principals.get_stats()
+
+    first, again, refreshed, untimed, calls, stats = asyncio.run(scenario())
+    assert again == first and isinstance(again, User)
+    assert again.created_at == first.created_at
+    assert calls == 3  # new token and token without iat re-read the profile
+    assert stats['hits'] == 1 and stats['misses'] == 2 and stats['uncacheable'] == 1
+
+
+def test_invalidation_reaches_other_workers(worker, shutdown):
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        services = [worker(server), worker(server)]
+        a, b = (PrincipalCache(service, ttl_seconds=60) for service in services)
+        calls = []
+
+        await a.resolve('u1', 1000, profile_loader(calls))
+        cached = await b.resolve('u1', 1000, profile_loader(calls))      # L2 hit, then in b's L1
+        await b.resolve('u1', 1000, profile_loader(calls))
+
+        await a.invalidate('u1')                                           # e.g. update_user_profile
+        await asyncio.sleep(0.05)                                          # pub/sub reaches b
+        reloaded = await b.resolve('u1', 1000, profile_loader(calls, is_active=False))
+        await shutdown(*services)
+        return cached, reloaded, len(calls), b.get_stats()
+
+    cached, reloaded, calls, stats = asyncio.run(scenario())
+    assert cached.username == 'ada'
+    assert reloaded.is_active is False
+    assert calls == 2
+    assert stats['hits'] == 2
+
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    async def scenario():
+        service = memory_service()
+        principals = PrincipalCache(service, ttl_seconds=60)
+        calls = []
+        load = profile_loader(calls)
+
+        async def slow_load():
+            user = await load()
+            await principals.invalidate('u1')    # a profile write lands mid-load
+            return user
+
+        await principals.resolve('u1', 1000, slow_load)
+        await principals.resolve('u1', 1000, load)
+        service.memory_cache.stop()
+        return len(calls), principals.get_stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == 2
+    assert stats['discarded'] == 1
+
+
+def test_get_current_user_reads_profile_once_per_token(monkeypatch):
+    supabase_auth = pytest.importorskip('supabase_auth')
+    from supabase_jwt import VerifiedUser
+
+    service = memory_service()
+    monkeypatch.setattr(supabase_auth, 'principal_cache', PrincipalCache(service, ttl_seconds=60))
+    queries = []
+
+    class Query:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self
+
+        def execute(self):
+            queries.append(1)
+            return SimpleNamespace(data={'id': 'u1', 'username': 'ada', 'first_name': 'Ada',
+                                         'last_name': 'Lovelace', 'is_active': True,
+                                         'created_at': '2025-01-01T00:00:00',
+                                         'updated_at': '2025-01-02T00:00:00'})
+
+    monkeypatch.setattr(supabase_auth.supabase, 'table', lambda name: Query())
+    token_user = VerifiedUser({'sub': 'u1', 'email': 'ada@example.com', 'iat': 1000, 'exp': 4600})
+
+    async def scenario():
+        users = [await supabase_auth.get_current_user(token_user) for _ in range(5)]
+        active = await supabase_auth.get_current_active_user(users[-1])
+        service.memory_cache.stop()
+        return users, active
+
+    users, active = asyncio.run(scenario())
+    assert len(queries) == 1
+    assert {(u.id, u.email, u.username) for u in users} == {('u1', 'ada@example.com', 'ada')}
+    assert active.id == 'u1'
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+QUERY COALESCING TESTING
+Verifies that identical concurrent reads share one PostgREST request, that results
+live for a short window, and that writes to a table drop its windowed results.
+
+Run with: python -m pytest tests/backend/query_coalescing_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from httpx import Headers, QueryParams
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from query_coalescing import LeaderCancelled, QueryCoalescer  # noqa: E402
+
+
+class FakeRequest:
+    """Stands in for a postgrest request builder"""
+
+    def __init__(self, path="/tasks", params="select=*&user_id=eq.u1", method="GET", prefer="", delay=0.05):
+        self.path = path
+        self.params = QueryParams(params)
+        self.http_method = method
+        self.headers = Headers({"prefer": prefer} if prefer else {})
+        self.delay = delay
+        self.calls = 0
+
+    async def execute(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"data": [{"id": "t1", "completed": False}]}
+
+
+async def read(coalescer, request):
+    key = coalescer.key_for(request)
+    shared = coalescer.lookup(key)
+    if shared is None:
+        return await coalescer.lead(key, request.execute)
+    return await shared
+
+
+def make(window_ms="500"):
+    coalescer = QueryCoalescer()
+    coalescer.window = float(window_ms) / 1000
+    coalescer.enabled = True
+    return coalescer
+
+
+def test_concurrent_identical_reads_share_one_request():
+    coalescer = make()
+    request = FakeRequest()
+
+    async def scenario():
+        return await asyncio.gather(*(read(coalescer, request) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert request.calls == 1
+    assert all(r == {"data": [{"id": "t1", "completed": False}]} for r in results)
+    stats = coalescer.get_stats()
+    assert stats["executed"] == 1 and stats["coalesced"] == 9
+
+
+def test_each_caller_gets_its_own_copy():
+    coalescer = make()
+    request = FakeRequest()
+
+    async def scenario():
+        first, second = await asyncio.gather(read(coalescer, request), read(coalescer, request))
+        first["data"][0]["is_active"] = True
+        third = await read(coalescer, request)
+        return second, third
+
+    second, third = asyncio.run(scenario())
+    assert "is_active" not in second["data"][0]
+    assert "is_active" not in third["data"][0]
+
+
+def test_different_filters_projection_or_count_do_not_share():
+    coalescer = make()
+    requests = [
+        FakeRequest(params="select=*&user_id=eq.u1"),
+        FakeRequest(params="select=*&user_id=eq.u2"),
+        FakeRequest(params="select=id,completed&user_id=eq.u1"),
+        FakeRequest(params="select=*&user_id=eq.u1", prefer="count=exact"),
+        FakeRequest(path="/projects"),
+    ]
+
+    async def scenario():
+        await asyncio.gather(*(read(coalescer, r) for r in requests))
+
+    asyncio.run(scenario())
+    assert [r.calls for r in requests] == [1, 1, 1, 1, 1]
+
+
+def test_result_window_and_expiry():
+    coalescer = make(window_ms="50")
+    request = FakeRequest(delay=0)
+
+    async def scenario():
+        await read(coalescer, request)
+        await read(coalescer, request)
+        assert request.calls == 1
+        await asyncio.sleep(0.06)
+        await read(coalescer, request)
+
+    asyncio.run(scenario())
+    assert request.calls == 2
+    assert coalescer.get_stats()["window_hits"] == 1
+
+
+def test_writes_are_never_coalesced_and_invalidate_the_table():
+    coalescer = make()
+    assert coalescer.key_for(FakeRequest(method="PATCH")) is None
+    request = FakeRequest(delay=0)
+
+    async def scenario():
+        await read(coalescer, request)
+        coalescer.invalidate("/tasks")
+        await read(coalescer, request)
+
+    asyncio.run(scenario())
+    assert request.calls == 2
+
+
+def test_read_in_flight_during_a_write_is_not_windowed():
+    coalescer = make()
+    request = FakeRequest(delay=0.05)
+
+    async def scenario():
+        pending = asyncio.ensure_future(read(coalescer, request))
+        await asyncio.sleep(0.01)
+        coalescer.invalidate("/tasks")
+        await pending
+        await read(coalescer, request)
+
+    asyncio.run(scenario())
+    assert request.calls == 2
+
+
+def test_read_after_a_write_does_not_join_a_read_started_before_it():
+    coalescer = make()
+    request = FakeRequest(delay=0.05)
+
+    async def scenario():
+        leader = asyncio.ensure_future(read(coalescer, request))
+        await asyncio.sleep(0.01)
+        coalescer.invalidate("/tasks")
+        follower = asyncio.ensure_future(read(coalescer, request))
+        await asyncio.gather(leader, follower)
+
+    asyncio.run(scenario())
+    assert request.calls == 2
+    assert coalescer.get_stats()["coalesced"] == 0
+    assert coalescer.get_stats()["in_flight"] == 0
+
+
+def test_errors_propagate_to_followers():
+    coalescer = make()
+
+    class Failing(FakeRequest):
+        async def execute(self):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+    request = Failing()
+
+    async def scenario():
+        return await asyncio.gather(*(read(coalescer, request) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert request.calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert coalescer.get_stats()["windowed_results"] == 0
+
+
+def test_followers_are_told_to_retry_when_the_leader_is_cancelled():
+    coalescer = make()
+    request = FakeRequest(delay=1)
+
+    async def scenario():
+        leader = asyncio.ensure_future(read(coalescer, request))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(read(coalescer, request))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(LeaderCancelled):
+            await follower
+
+    asyncio.run(scenario())
+
+
+def test_disabled_coalescer_passes_everything_through():
+    coalescer = make()
+    coalescer.enabled = False
+    assert coalescer.key_for(FakeRequest()) is None
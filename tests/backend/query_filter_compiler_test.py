@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+QUERY FILTER COMPILER TESTING
+Verifies that Mongo-style filter documents passed to find_documents and friends
+compile to PostgREST operators instead of equality checks.
+
+Run with: python -m pytest tests/backend/query_filter_compiler_test.py -q
+"""
+
+import sys
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from urllib.parse import unquote
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from postgrest import AsyncPostgrestClient  # noqa: E402
+from query_filters import FilterCompileError, apply_filters, compile_filters  # noqa: E402
+
+NOW = datetime(2024, 5, 1, 12, 30, 0)
+
+
+class Kind(str, Enum):
+    overdue = "task_overdue"
+
+
+def build_params(query):
+    """Apply filters to a real PostgREST builder and return the decoded query string"""
+    builder = AsyncPostgrestClient("http://localhost:54321/rest/v1").from_("tasks").select("*")
+    builder = apply_filters(builder, query)
+    return unquote(str(builder.params))
+
+
+def test_plain_equality_and_list_keep_existing_semantics():
+    assert compile_filters({"user_id": "u1", "completed": False}) == [
+        ("user_id", "eq", "u1"),
+        ("completed", "eq", "false"),
+    ]
+    assert compile_filters({"id": ["a", "b"]}) == [("id", "in", "(a,b)")]
+    assert compile_filters({"parent_task_id": None}) == [("parent_task_id", "is", "null")]
+
+
+@pytest.mark.parametrize("op, pg_op", [
+    ("$eq", "eq"),
+    ("$ne", "neq"),
+    ("$lt", "lt"),
+    ("$lte", "lte"),
+    ("$gt", "gt"),
+    ("$gte", "gte"),
+])
+def test_comparison_operators(op, pg_op):
+    assert compile_filters({"scheduled_time": {op: NOW}}) == [
+        ("scheduled_time", pg_op, "2024-05-01T12:30:00")
+    ]
+
+
+def test_eq_and_ne_none_become_is_null_checks():
+    assert compile_filters({"deleted_at": {"$eq": None}}) == [("deleted_at", "is", "null")]
+    assert compile_filters({"deleted_at": {"$ne": None}}) == [("deleted_at", "not.is", "null")]
+
+
+def test_range_on_one_column_produces_two_filters():
+    params = build_params({"due_date": {"$gte": "2024-01-01", "$lt": "2024-02-01"}})
+    assert "due_date=gte.2024-01-01" in params
+    assert "due_date=lt.2024-02-01" in params
+
+
+def test_in_and_nin_quote_reserved_characters():
+    assert compile_filters({"status": {"$in": ["todo", "in progress", "a,b"]}}) == [
+        ("status", "in", '(todo,"in progress","a,b")')
+    ]
+    assert compile_filters({"status": {"$nin": ["done"]}}) == [("status", "not.in", "(done)")]
+
+
+def test_in_requires_a_list():
+    with pytest.raises(FilterCompileError):
+        compile_filters({"status": {"$in": "todo"}})
+
+
+def test_exists():
+    assert compile_filters({"sent_at": {"$exists": True}}) == [("sent_at", "not.is", "null")]
+    assert compile_filters({"sent_at": {"$exists": False}}) == [("sent_at", "is", "null")]
+
+
+def test_regex_with_and_without_case_insensitive_option():
+    assert compile_filters({"name": {"$regex": "^Plan"}}) == [("name", "match", "^Plan")]
+    assert compile_filters({"name": {"$regex": "plan", "$options": "i"}}) == [("name", "imatch", "plan")]
+
+
+def test_options_without_regex_is_rejected():
+    with pytest.raises(FilterCompileError):
+        compile_filters({"name": {"$options": "i"}})
+
+
+def test_or_compiles_to_postgrest_logical_group():
+    compiled = compile_filters({
+        "user_id": "u1",
+        "$or": [
+            {"completed": True},
+            {"due_date": {"$lt": NOW}, "priority": {"$in": ["high", "medium"]}},
+        ],
+    })
+    assert compiled == [
+        ("user_id", "eq", "u1"),
+        ("or", None, 'completed.eq.true,and(due_date.lt."2024-05-01T12:30:00",priority.in.(high,medium))'),
+    ]
+
+    params = build_params({"$or": [{"status": "todo"}, {"status": {"$exists": False}}]})
+    assert "or=(status.eq.todo,status.is.null)" in params
+
+
+def test_multiple_or_groups_are_anded_together():
+    params = build_params({"$and": [
+        {"$or": [{"a": 1}, {"b": 2}]},
+        {"$or": [{"c": {"$gt": 3}}, {"d": None}]},
+    ]})
+    assert "and=(or(a.eq.1,b.eq.2),or(c.gt.3,d.is.null))" in params
+    assert "or=" not in params.replace("and=(or(", "")
+
+
+def test_top_level_and_flattens_into_filters():
+    assert compile_filters({"$and": [{"a": 1}, {"b": {"$gt": 2}}]}) == [("a", "eq", "1"), ("b", "gt", "2")]
+
+
+def test_enum_values_are_unwrapped():
+    assert compile_filters({"notification_type": Kind.overdue}) == [
+        ("notification_type", "eq", "task_overdue")
+    ]
+
+
+def test_unknown_operators_are_rejected():
+    with pytest.raises(FilterCompileError):
+        compile_filters({"access_count": {"$inc": 1}})
+    with pytest.raises(FilterCompileError):
+        compile_filters({"$where": "1 = 1"})
+
+
+def test_caller_filters_reach_the_database():
+    # NotificationService.process_due_reminders
+    params = build_params({"is_sent": False, "scheduled_time": {"$lte": NOW}})
+    assert "is_sent=eq.false" in params
+    assert "scheduled_time=lte.2024-05-01T12:30:00" in params
+
+    # Scheduler.run_daily_cleanup
+    params = build_params({"created_at": {"$lt": NOW}})
+    assert "created_at=lt.2024-05-01T12:30:00" in params
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+QUERY LEDGER TESTING
+Verifies the request-scoped query ledger: filter shapes, N+1 detection, query budget
+and the Server-Timing header.
+
+Run with: python -m pytest tests/backend/query_ledger_test.py -q
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from postgrest import AsyncPostgrestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from query_filters import apply_filters  # noqa: E402
+from query_ledger import (  # noqa: E402
+    QueryBudgetMiddleware,
+    current_ledger,
+    paginated,
+    query_shape,
+    record_query,
+    track_queries,
+)
+
+CLIENT = AsyncPostgrestClient("http://localhost:54321/rest/v1")
+
+
+def select(table, query, columns="*"):
+    return apply_filters(CLIENT.from_(table).select(columns), query)
+
+
+def test_shape_drops_filter_values_but_keeps_structure():
+    first = query_shape(select("notification_preferences", {"user_id": "u1"}))
+    second = query_shape(select("notification_preferences", {"user_id": "u2"}))
+    assert first == second
+    assert first[0] == "notification_preferences"
+    assert first[2] == "GET notification_preferences?select=*&user_id=eq"
+
+    projected = query_shape(select("notification_preferences", {"user_id": "u1"}, "id,user_id"))
+    assert projected != first
+
+    grouped = query_shape(select("tasks", {"$or": [{"status": "todo"}, {"due_date": {"$lt": "2024-01-01"}}]}))
+    assert grouped[2] == "GET tasks?or=(status.eq,due_date.lt)&select=*"
+
+    negated = query_shape(select("tasks", {"status": {"$nin": ["done"]}}))
+    assert negated[2].endswith("status=not.in")
+
+
+def test_per_item_lookups_are_flagged_as_n_plus_one():
+    # Shape of NotificationService.process_due_reminders: one preference fetch per reminder
+    with track_queries("job:process_due_reminders", n1_threshold=3) as ledger:
+        record_query(select("task_reminders", {"is_sent": False}), 5.0)
+        for user_id in ("u1", "u2", "u3", "u4"):
+            record_query(select("notification_preferences", {"user_id": user_id}), 2.0)
+
+    assert ledger.query_count == 5
+    assert ledger.repeated_shapes() == [("GET notification_preferences?select=*&user_id=eq", 4)]
+    assert current_ledger() is None
+
+
+def test_keyset_pages_and_coalesced_reads_are_not_n_plus_one():
+    with track_queries("scan", n1_threshold=2) as ledger:
+        with paginated():
+            for _ in range(5):
+                record_query(select("journal_entries", {"user_id": "u1"}), 1.0)
+        record_query(select("tasks", {"user_id": "u1"}), 1.0)
+        record_query(select("tasks", {"user_id": "u1"}), 0.5, shared=True)
+
+    assert ledger.repeated_shapes() == []
+    assert ledger.query_count == 6
+    assert ledger.server_timing() == 'db;dur=6.5;desc="6 queries, 1 coalesced"'
+
+
+def test_budget_is_enforced():
+    with track_queries("GET /api/dashboard", budget=2, n1_threshold=100) as ledger:
+        for table in ("pillars", "areas", "projects"):
+            record_query(select(table, {"user_id": "u1"}), 1.0)
+    assert ledger.over_budget
+    assert ledger.summary()["tables"] == ["areas", "pillars", "projects"]
+
+
+def test_queries_from_gathered_tasks_land_on_the_request_ledger():
+    async def fetch(table):
+        await asyncio.sleep(0)
+        record_query(select(table, {"user_id": "u1"}), 1.0)
+
+    async def scenario():
+        with track_queries("GET /api/today") as ledger:
+            await asyncio.gather(fetch("tasks"), fetch("projects"))
+        return ledger
+
+    assert asyncio.run(scenario()).query_count == 2
+
+
+def test_middleware_sets_server_timing_header():
+    async def endpoint(request):
+        for user_id in ("u1", "u2"):
+            record_query(select("tasks", {"user_id": user_id}), 3.0)
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/tasks", endpoint)])
+    app.add_middleware(QueryBudgetMiddleware)
+
+    response = TestClient(app).get("/tasks")
+    assert response.status_code == 200
+    assert response.headers["server-timing"] == 'db;dur=6.0;desc="2 queries"'
+
+
+def test_record_outside_a_ledger_is_a_no_op():
+    record_query(select("tasks", {"user_id": "u1"}), 1.0)
+    assert current_ledger() is None
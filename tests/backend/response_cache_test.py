@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+RESPONSE CACHE TESTING
+Verifies that cache_user_endpoint, applied below the route decorator, serves cached
+bodies per user, returns strong ETags with private Cache-Control, answers If-None-Match
+with 304 without running the endpoint, and changes the ETag after a write.
+
+Run with: python -m pytest tests/backend/response_cache_test.py -q
+"""
+
+import ast
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Header, Query
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import response_cache  # noqa: E402
+from cache_invalidation import InvalidationBus  # noqa: E402
+from cache_service import CacheService  # noqa: E402
+from response_cache import cache_user_endpoint, etag_matches  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    cache = CacheService()
+    cache.redis_client = None
+    monkeypatch.setattr(response_cache, "cache_service", cache)
+    yield cache
+    cache.memory_cache.stop()
+
+
+@pytest.fixture
+def app_and_calls(service):
+    calls = []
+    router = APIRouter(prefix="/api")
+
+    async def current_user(x_user: str = Header(default="u1")):
+        return SimpleNamespace(id=x_user)
+
+    @router.get("/pillars")
+    @cache_user_endpoint(ttl=180, depends_on=("pillars", "tasks"))
+    async def get_pillars(include_archived: Optional[bool] = Query(default=False),
+                          current_user=Depends(current_user)):
+        calls.append((current_user.id, include_archived))
+        return [{"id": "p1", "owner": current_user.id, "archived": include_archived}]
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app), calls
+
+
+def test_second_request_is_served_from_cache(app_and_calls):
+    client, calls = app_and_calls
+    first = client.get("/api/pillars")
+    second = client.get("/api/pillars")
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json() == [{"id": "p1", "owner": "u1", "archived": False}]
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"].startswith("private")
+    assert calls == [("u1", False)]
+
+
+def test_if_none_match_returns_304_without_running_the_endpoint(app_and_calls):
+    client, calls = app_and_calls
+    etag = client.get("/api/pillars").headers["etag"]
+
+    response = client.get("/api/pillars", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert calls == [("u1", False)]
+
+
+def test_keys_are_per_user_and_per_argument(app_and_calls):
+    client, calls = app_and_calls
+    client.get("/api/pillars")
+    other = client.get("/api/pillars", headers={"X-User": "u2"})
+    archived = client.get("/api/pillars?include_archived=true")
+
+    assert other.json()[0]["owner"] == "u2"
+    assert archived.json()[0]["archived"] is True
+    assert calls == [("u1", False), ("u2", False), ("u1", True)]
+
+
+def test_write_changes_the_etag(app_and_calls, service):
+    client, calls = app_and_calls
+    etag = client.get("/api/pillars").headers["etag"]
+
+    asyncio.run(service.invalidate_user_cache("u1", "tasks"))
+    response = client.get("/api/pillars", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(calls) == 2
+
+
+def declared_dependencies(route):
+    """The depends_on server.py declares for a cached GET route (server.py needs Supabase to import)"""
+    source = Path(__file__).resolve().parents[2] / 'backend' / 'server.py'
+    for node in ast.walk(ast.parse(source.read_text())):
+        if not isinstance(node, ast.AsyncFunctionDef):
+            continue
+        decorators = [d for d in node.decorator_list if isinstance(d, ast.Call)]
+        if not any(getattr(d.func, 'attr', None) == 'get' and d.args and ast.literal_eval(d.args[0]) == route
+                   for d in decorators):
+            continue
+        for decorator in decorators:
+            if getattr(decorator.func, 'id', None) == 'cache_user_endpoint':
+                return next(ast.literal_eval(k.value) for k in decorator.keywords if k.arg == 'depends_on')
+    raise LookupError(route)
+
+
+def test_renaming_an_area_refreshes_projects(service):
+    areas = {"a1": "Health"}
+    router = APIRouter(prefix="/api")
+
+    async def current_user():
+        return SimpleNamespace(id="u1")
+
+    # Like get_user_projects, each project carries the name of its area
+    @router.get("/projects")
+    @cache_user_endpoint(ttl=3600, depends_on=declared_dependencies("/projects"))
+    async def get_projects(current_user=Depends(current_user)):
+        return [{"id": "pr1", "area_id": "a1", "area_name": areas["a1"]}]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    assert client.get("/api/projects").json()[0]["area_name"] == "Health"
+
+    # update_area publishes the area change without a cascade
+    areas["a1"] = "Fitness"
+    asyncio.run(InvalidationBus(cache=service).publish("u1", "areas", "a1"))
+
+    response = client.get("/api/projects")
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()[0]["area_name"] == "Fitness"
+
+
+def test_areas_and_projects_depend_on_the_names_they_embed():
+    assert "pillars" in declared_dependencies("/areas")
+    assert "areas" in declared_dependencies("/projects")
+
+
+def test_etag_matching():
+    assert etag_matches('"1-abc"', '"1-abc"')
+    assert etag_matches('W/"1-abc", "2-def"', '"1-abc"')
+    assert etag_matches('*', '"1-abc"')
+    assert not etag_matches('"1-abcd"', '"1-abc"')
+    assert not etag_matches(None, '"1-abc"')
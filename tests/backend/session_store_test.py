@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+OAUTH SESSION STORE TESTING
+Verifies the SessionManager storage: sessions created on one worker are visible to the
+others through Redis, expire natively, slide their expiry without rewriting the record,
+and the single-process memory store stays bounded and sweeps expired sessions. Redis is
+stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/session_store_test.py -q
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from session_store import MemorySessionStore, RedisSessionStore, SessionManagerBase  # noqa: E402
+
+USER = {'id': 'u1', 'email': 'ada@example.com', 'name': 'Ada', 'picture': None}
+
+
+def manager(store, ttl_seconds=3600):
+    class Sessions(SessionManagerBase):
+        namespace = 'test'
+    Sessions.ttl_seconds = ttl_seconds
+    Sessions.use_store(store)
+    return Sessions
+
+
+def test_sessions_are_shared_across_workers():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = (manager(RedisSessionStore(fakeredis.aioredis.FakeRedis(server=server), 'test'))
+                for _ in range(2))
+        token = await a.create_session(USER)
+        seen = await b.get_session(token)
+        deleted = await b.delete_session(token)
+        return seen, deleted, await a.get_session(token), await a.delete_session(token)
+
+    seen, deleted, after, deleted_again = asyncio.run(scenario())
+    assert seen['user_id'] == 'u1' and seen['picture'] is None and seen['is_active'] is True
+    assert isinstance(seen['created_at'], datetime) and seen['expires_at'] > seen['created_at']
+    assert deleted is True and after is None and deleted_again is False
+
+
+def test_redis_extend_only_touches_expiry():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        sessions = manager(RedisSessionStore(client, 'test'), ttl_seconds=60)
+        token = await sessions.create_session(USER)
+        key = f"session:test:{token}"
+        await client.hset(key, 'name', '"Ada L."')   # written elsewhere meanwhile
+        await client.pexpire(key, 1000)
+        before = await sessions.get_session(token)
+
+        sessions.ttl_seconds = 600
+        extended = await sessions.extend_session(token)
+        ttl_ms = await client.pttl(key)
+        after = await sessions.get_session(token)
+
+        await sessions.delete_session(token)
+        revived = await sessions.extend_session(token)
+        return before, extended, ttl_ms, after, revived, await client.exists(key)
+
+    before, extended, ttl_ms, after, revived, exists = asyncio.run(scenario())
+    assert extended is True and ttl_ms > 590_000
+    assert after['name'] == 'Ada L.' and after['created_at'] == before['created_at']
+    assert after['expires_at'] > before['expires_at']
+    assert revived is False and exists == 0
+
+
+def test_expired_sessions_disappear():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def scenario():
+        redis_sessions = manager(RedisSessionStore(fakeredis.aioredis.FakeRedis(), 'test'), ttl_seconds=0.05)
+        memory_sessions = manager(MemorySessionStore(), ttl_seconds=0.05)
+        tokens = [await redis_sessions.create_session(USER), await memory_sessions.create_session(USER)]
+        await asyncio.sleep(0.1)
+        memory_store = memory_sessions.store()
+        swept = memory_store.sessions.sweep()
+        memory_store.sessions.stop()
+        return (await redis_sessions.get_session(tokens[0]), swept, len(memory_store))
+
+    assert asyncio.run(scenario()) == (None, 1, 0)
+
+
+def test_memory_store_is_bounded():
+    async def scenario():
+        store = MemorySessionStore(max_entries=100)
+        sessions = manager(store)
+        tokens = [await sessions.create_session({**USER, 'id': f"u{i}"}) for i in range(250)]
+        latest = await sessions.get_session(tokens[-1])
+        oldest = await sessions.get_session(tokens[0])
+        extended = await sessions.extend_session(tokens[-1])
+        store.sessions.stop()
+        return len(store), latest, oldest, extended
+
+    size, latest, oldest, extended = asyncio.run(scenario())
+    assert size == 100
+    assert latest['user_id'] == 'u249' and oldest is None
+    assert extended is True
+
+
+def test_subclasses_get_their_own_store(monkeypatch):
+    monkeypatch.setenv('SESSION_STORE', 'memory')
+
+    class First(SessionManagerBase):
+        namespace = 'first'
+
+    class Second(SessionManagerBase):
+        namespace = 'second'
+
+    assert isinstance(First.store(), MemorySessionStore)
+    assert First.store() is First.store() and First.store() is not Second.store()
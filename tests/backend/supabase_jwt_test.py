@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+SUPABASE JWT VERIFICATION TESTING
+Verifies local access token verification: HS256 with the project secret, RS256 with a
+cached JWKS (including key rotation), rejection of expired / foreign / tampered tokens,
+and SupabaseAuth falling back to GoTrue only when a token can't be checked locally.
+Tokens are signed by the tests; the JWKS endpoint is an httpx mock transport.
+
+Run with: python -m pytest tests/backend/supabase_jwt_test.py -q
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'aaa.bbb.ccc')
+
+from supabase_jwt import (  # noqa: E402
+    SupabaseJWTVerifier,
+    TokenVerificationError,
+    UnverifiableTokenError,
+    VerifiedUser,
+)
+
+URL = 'https://project.supabase.co'
+ISSUER = f'{URL}/auth/v1'
+SECRET = 'super-secret-jwt-token-with-at-least-32-characters'
+
+
+def claims(**overrides):
+    now = int(time.time())
+    base = {
+        'sub': 'user-1',
+        'email': 'ada@example.com',
+        'aud': 'authenticated',
+        'iss': ISSUER,
+        'role': 'authenticated',
+        'iat': now,
+        'exp': now + 3600,
+        'user_metadata': {'first_name': 'Ada'},
+        'session_id': 's1',
+    }
+    base.update(overrides)
+    return base
+
+
+def rsa_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    public = jwk.construct(pem, 'RS256').public_key().to_dict()
+    public.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return pem, {k: (v.decode() if isinstance(v, bytes) else v) for k, v in public.items()}
+
+
+class JWKSServer:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.requests = 0
+        self.fail = False
+
+    def transport(self):
+        def handler(request):
+            self.requests += 1
+            if self.fail:
+                return httpx.Response(503)
+            return httpx.Response(200, json={'keys': self.keys})
+        return httpx.MockTransport(handler)
+
+
+def hs_verifier(**kwargs):
+    return SupabaseJWTVerifier(supabase_url=URL, jwt_secret=SECRET, **kwargs)
+
+
+def test_valid_hs256_token():
+    token = jwt.encode(claims(), SECRET, algorithm='HS256')
+    user = asyncio.run(hs_verifier().verify(token))
+
+    assert isinstance(user, VerifiedUser)
+    assert (user.id, user.email, user.user_metadata) == ('user-1', 'ada@example.com', {'first_name': 'Ada'})
+    assert user.session_id == 's1'
+
+
+@pytest.mark.parametrize('token', [
+    jwt.encode(claims(exp=int(time.time()) - 120), SECRET, algorithm='HS256'),
+    jwt.encode(claims(aud='anon-service'), SECRET, algorithm='HS256'),
+    jwt.encode(claims(iss='https://other.supabase.co/auth/v1'), SECRET, algorithm='HS256'),
+    jwt.encode(claims(), 'a-different-secret-of-sufficient-length!!', algorithm='HS256'),
+    jwt.encode(claims(nbf=int(time.time()) + 600), SECRET, algorithm='HS256'),
+    'not-a-jwt',
+], ids=['expired', 'audience', 'issuer', 'signature', 'not-before', 'malformed'])
+def test_invalid_tokens_are_rejected(token):
+    with pytest.raises(TokenVerificationError):
+        asyncio.run(hs_verifier().verify(token))
+
+
+def test_expiry_leeway():
+    token = jwt.encode(claims(exp=int(time.time()) - 5), SECRET, algorithm='HS256')
+    assert asyncio.run(hs_verifier(leeway_seconds=30).verify(token)).id == 'user-1'
+
+
+def test_unsigned_and_unconfigured_tokens():
+    header = 'eyJhbGciOiJub25lIiwidHlwIjoiSldUIn0'  # {"alg":"none","typ":"JWT"}
+    payload = jwt.encode(claims(), SECRET, algorithm='HS256').split('.')[1]
+    with pytest.raises(TokenVerificationError):
+        asyncio.run(hs_verifier().verify(f'{header}.{payload}.'))
+
+    token = jwt.encode(claims(), SECRET, algorithm='HS256')
+    with pytest.raises(UnverifiableTokenError):
+        asyncio.run(SupabaseJWTVerifier(supabase_url=URL, jwt_secret='').verify(token))
+
+
+def test_rs256_with_cached_jwks_and_rotation():
+    old_pem, old_public = rsa_key('key-1')
+    new_pem, new_public = rsa_key('key-2')
+    server = JWKSServer(old_public)
+
+    async def scenario():
+        verifier = SupabaseJWTVerifier(supabase_url=URL, jwt_secret='', transport=server.transport())
+        verifier.jwks_min_refresh = 0
+        old_token = jwt.encode(claims(), old_pem, algorithm='RS256', headers={'kid': 'key-1'})
+        for _ in range(20):
+            await verifier.verify(old_token)
+        fetches_before_rotation = server.requests
+
+        # Supabase rotates: the new key is published and new tokens name it
+        server.keys = [old_public, new_public]
+        verifier._jwks_fetched_at -= 2
+        new_token = jwt.encode(claims(sub='user-2'), new_pem, algorithm='RS256', headers={'kid': 'key-2'})
+        user = await verifier.verify(new_token)
+        return fetches_before_rotation, server.requests, user, verifier.get_stats()
+
+    fetches_before_rotation, fetches_after, user, stats = asyncio.run(scenario())
+    assert fetches_before_rotation == 1
+    assert fetches_after == 2
+    assert user.id == 'user-2'
+    assert stats['verified'] == 21 and stats['jwks_keys'] == 2
+
+
+def test_unknown_key_ids_do_not_hammer_the_jwks_endpoint():
+    pem, public = rsa_key('key-1')
+    forged_pem, _ = rsa_key('key-9')
+    server = JWKSServer(public)
+
+    async def scenario():
+        verifier = SupabaseJWTVerifier(supabase_url=URL, jwt_secret='', transport=server.transport())
+        await verifier.verify(jwt.encode(claims(), pem, algorithm='RS256', headers={'kid': 'key-1'}))
+        forged = jwt.encode(claims(), forged_pem, algorithm='RS256', headers={'kid': 'key-9'})
+        errors = []
+        for _ in range(5):
+            try:
+                await verifier.verify(forged)
+            except TokenVerificationError as e:
+                errors.append(e)
+        # A token signed by another key under a known kid fails the signature check
+        wrong_key = jwt.encode(claims(), forged_pem, algorithm='RS256', headers={'kid': 'key-1'})
+        with pytest.raises(TokenVerificationError):
+            await verifier.verify(wrong_key)
+        return len(errors)
+
+    assert asyncio.run(scenario()) == 5
+    assert server.requests == 1
+
+
+def test_jwks_outage_is_unverifiable():
+    pem, public = rsa_key('key-1')
+    server = JWKSServer(public)
+    server.fail = True
+    token = jwt.encode(claims(), pem, algorithm='RS256', headers={'kid': 'key-1'})
+    verifier = SupabaseJWTVerifier(supabase_url=URL, jwt_secret='', transport=server.transport())
+
+    with pytest.raises(UnverifiableTokenError):
+        asyncio.run(verifier.verify(token))
+    assert verifier.get_stats()['jwks_errors'] == 1
+
+
+def test_supabase_auth_verifies_locally_and_falls_back_to_gotrue(monkeypatch):
+    supabase_auth = pytest.importorskip('supabase_auth')
+    remote_calls = []
+
+    def get_user(token):
+        remote_calls.append(token)
+        return SimpleNamespace(user=SimpleNamespace(id='user-1', email='ada@example.com', user_metadata={}))
+
+    monkeypatch.setattr(supabase_auth, 'jwt_verifier', hs_verifier())
+    monkeypatch.setattr(supabase_auth, 'LOCAL_JWT_VERIFICATION', True)
+    monkeypatch.setattr(supabase_auth.supabase.auth, 'get_user', get_user)
+
+    token = jwt.encode(claims(), SECRET, algorithm='HS256')
+    local = asyncio.run(supabase_auth.verify_token(token))
+    assert local.id == 'user-1' and remote_calls == []
+
+    strict = asyncio.run(supabase_auth.SupabaseAuth.verify_token_strict(token))
+    assert strict.id == 'user-1' and remote_calls == [token]
+
+    with pytest.raises(supabase_auth.HTTPException) as rejected:
+        asyncio.run(supabase_auth.verify_token(jwt.encode(claims(aud='other'), SECRET, algorithm='HS256')))
+    assert rejected.value.status_code == 401
+    assert len(remote_calls) == 1  # invalid tokens never reach GoTrue
+
+    monkeypatch.setattr(supabase_auth, 'jwt_verifier', SupabaseJWTVerifier(supabase_url=URL, jwt_secret=''))
+    asyncio.run(supabase_auth.verify_token(token))
+    assert len(remote_calls) == 2
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+TWO-TIER CACHE TESTING
+Verifies the in-process L1 in front of Redis (L2): L1 fills on L2 hits, L1 entries
+never outlive Redis, read-through loading runs once per key, and writes on one worker
+invalidate the other workers' L1 over pub/sub. Redis is stood in by fakeredis.
+
+Run with: python -m pytest tests/backend/two_tier_cache_test.py -q
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+from pydantic import BaseModel
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import cache_service as cache_module  # noqa: E402
+from cache_service import CacheService, cache_result  # noqa: E402
+
+
+async def settle():
+    # Let pub/sub listeners subscribe / deliver
+    await asyncio.sleep(0.05)
+
+
+def test_l2_hit_populates_l1_and_next_read_skips_redis(worker, shutdown):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        writer, reader = worker(server), worker(server)
+        await writer.set("user_data:hierarchy:user:u1", {"pillars": [{"id": "p1"}]}, 300)
+
+        first = await reader.get("user_data:hierarchy:user:u1")
+        reader.redis_client = None  # an L1 hit must not need Redis at all
+        second = await reader.get("user_data:hierarchy:user:u1")
+        await shutdown(writer, reader)
+        return first, second, reader.get_stats()
+
+    first, second, stats = asyncio.run(scenario())
+    assert first == second == {"pillars": [{"id": "p1"}]}
+    assert stats["l2_hits"] == 1 and stats["l1_hits"] == 1
+
+
+def test_l1_copies_are_not_shared_with_callers(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        await service.set("projects:user:u1", [{"id": "p1"}], 300)
+        first = await service.get("projects:user:u1")
+        first.append({"id": "mutated"})
+        second = await service.get("projects:user:u1")
+        await shutdown(service)
+        return second
+
+    assert asyncio.run(scenario()) == [{"id": "p1"}]
+
+
+def test_l1_ttl_is_short_and_bounded_by_redis_ttl(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        service.l1_ttl = 30
+        await service.redis_client.setex("insights:user:u1", 2, '{"score": 1}')
+        await service.get("insights:user:u1")
+        await shutdown(service)
+        return service.memory_cache._entries["insights:user:u1"].expires_at
+
+    remaining = asyncio.run(scenario()) - time.monotonic()
+    assert 0 < remaining <= 2
+
+
+def test_failed_redis_write_keeps_l1_copy_only_for_the_l1_ttl(worker, shutdown):
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        service.l1_ttl = 30
+
+        def broken_pipeline(*args, **kwargs):
+            raise ConnectionError("redis unavailable")
+
+        service.redis_client.pipeline = broken_pipeline
+        stored = await service.set("pillars:user:u1", [{"id": "p1"}], 3600)
+        await shutdown(service)
+        return stored, service.memory_cache._entries["pillars:user:u1"].expires_at
+
+    stored, expires_at = asyncio.run(scenario())
+    assert stored
+    assert 0 < expires_at - time.monotonic() <= 30
+
+
+def test_writes_invalidate_other_workers_l1_over_pubsub(worker, shutdown):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        await a.set("pillars:user:u1", ["old"], 300)
+        assert await b.get("pillars:user:u1") == ["old"]
+        await settle()
+
+        await a.set("pillars:user:u1", ["new"], 300)
+        await settle()
+        after_set = await b.get("pillars:user:u1")
+
+        await a.delete("pillars:user:u1")
+        await settle()
+        after_delete = await b.get("pillars:user:u1")
+        await shutdown(a, b)
+        return after_set, after_delete, b.get_stats()
+
+    after_set, after_delete, stats = asyncio.run(scenario())
+    assert after_set == ["new"]
+    assert after_delete is None
+    assert stats["invalidations_received"] >= 2
+
+
+def test_invalidation_listener_stays_off_the_shared_pool(worker, shutdown):
+    def no_pubsub(**kwargs):
+        raise AssertionError("listener took a connection from the shared pool")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = worker(server), worker(server)
+        b.redis_client.pubsub = no_pubsub
+        await a.set("areas:user:u1", ["old"], 300)
+        assert await b.get("areas:user:u1") == ["old"]
+        await settle()
+
+        await a.delete("areas:user:u1")
+        await settle()
+        listener_alive = not b._listener_task.done()
+        after_delete = await b.get("areas:user:u1")
+        await shutdown(a, b)
+        return listener_alive, after_delete
+
+    assert asyncio.run(scenario()) == (True, None)
+
+
+def test_read_through_loads_once_for_concurrent_misses(worker, shutdown):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"tasks": 3}
+
+    async def scenario():
+        service = worker(fakeredis.FakeServer())
+        results = await asyncio.gather(*(service.get_or_load("dashboard:user:u1", loader, 60) for _ in range(5)))
+        cached = await service.get_or_load("dashboard:user:u1", loader, 60)
+        await shutdown(service)
+        return results, cached
+
+    results, cached = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"tasks": 3} for r in results) and cached == {"tasks": 3}
+
+
+def test_invalidations_from_this_worker_are_ignored():
+    service = CacheService()
+    service.memory_cache.set("k", '"v"', 60)
+    assert service._apply_invalidation('{"origin": "other", "keys": ["k"]}') == 1
+    service.memory_cache.set("k", '"v"', 60)
+    assert service._apply_invalidation(f'{{"origin": "{service.instance_id}", "keys": ["k"]}}') == 0
+    assert "k" in service.memory_cache
+
+
+class Item(BaseModel):
+    id: str
+    due: datetime
+
+
+def test_cached_results_come_back_as_the_declared_types(monkeypatch, worker, shutdown):
+    due = datetime(2026, 1, 2, 3, 4, 5)
+    calls = []
+
+    @cache_result("items", ttl_seconds=300)
+    async def items(user_id) -> List[Item]:
+        calls.append(user_id)
+        return [Item(id="a", due=due)]
+
+    @cache_result("window", ttl_seconds=300)
+    async def window(user_id) -> Tuple[datetime, datetime]:
+        return due, due
+
+    async def scenario(service):
+        monkeypatch.setattr(cache_module, "cache_service", service)
+        results = [await items("u1"), await items("u1"), await window("u1"), await window("u1")]
+        await shutdown(service)
+        return results
+
+    memory_only = CacheService()
+    memory_only.redis_client = None
+    for service in (memory_only, worker(fakeredis.FakeServer())):
+        miss, hit, window_miss, window_hit = asyncio.run(scenario(service))
+        assert miss == hit == [Item(id="a", due=due)]
+        assert window_miss == window_hit == (due, due)
+    assert len(calls) == 2
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Async Data Layer Throughput Test
+Fires concurrent requests at a single uvicorn worker and reports how throughput
+scales with concurrency. With table access on the async PostgREST client the
+requests/second figure should keep rising with concurrency (up to
+SUPABASE_MAX_CONCURRENCY) instead of flat-lining at 1 / query latency.
+
+Run the backend with a single worker first:
+    uvicorn server:app --port 8001 --workers 1
+"""
+
+import asyncio
+import aiohttp
+import time
+import sys
+from typing import Dict, List
+
+# Configuration
+BASE_URL = "http://localhost:8001/api"
+TEST_USER_CREDENTIALS = {
+    "email": "nav.test@aurumlife.com",
+    "password": "testpassword123"
+}
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32]
+REQUESTS_PER_LEVEL = 64
+
+# A mix of a slow hierarchy fetch and cheap list calls
+ENDPOINTS = [
+    "/pillars",
+    "/tasks",
+    "/areas",
+    "/projects",
+]
+
+
+class AsyncDataLayerBenchmark:
+    def __init__(self):
+        self.session = None
+        self.auth_token = None
+        self.results: List[Dict] = []
+
+    async def setup_session(self):
+        """Initialize aiohttp session with enough connections for the highest level"""
+        connector = aiohttp.TCPConnector(limit=max(CONCURRENCY_LEVELS) * 2)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60)
+        )
+
+    async def cleanup_session(self):
+        """Close aiohttp session"""
+        if self.session:
+            await self.session.close()
+
+    async def authenticate(self) -> bool:
+        """Authenticate and get JWT token"""
+        try:
+            print("🔐 Authenticating user...")
+            async with self.session.post(f"{BASE_URL}/auth/login", json=TEST_USER_CREDENTIALS) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    self.auth_token = data.get("access_token")
+                    print("✅ Authentication successful")
+                    return True
+                print(f"❌ Authentication failed: {response.status}")
+                return False
+        except Exception as e:
+            print(f"❌ Authentication error: {e}")
+            return False
+
+    async def _fire(self, endpoint: str, latencies: List[float]) -> bool:
+        headers = {"Authorization": f"Bearer {self.auth_token}"}
+        start = time.perf_counter()
+        try:
+            async with self.session.get(f"{BASE_URL}{endpoint}", headers=headers) as response:
+                await response.read()
+                latencies.append((time.perf_counter() - start) * 1000)
+                return response.status < 400
+        except Exception:
+            return False
+
+    async def run_level(self, concurrency: int) -> Dict:
+        """Run REQUESTS_PER_LEVEL requests with at most `concurrency` in flight"""
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+
+        async def bounded(i: int) -> bool:
+            async with semaphore:
+                return await self._fire(ENDPOINTS[i % len(ENDPOINTS)], latencies)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(bounded(i) for i in range(REQUESTS_PER_LEVEL)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "concurrency": concurrency,
+            "ok": sum(1 for o in outcomes if o),
+            "throughput_rps": REQUESTS_PER_LEVEL / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        }
+
+    async def run(self):
+        print("🎯 Async data layer throughput benchmark")
+        print(f"📊 {REQUESTS_PER_LEVEL} requests per level over {', '.join(ENDPOINTS)}")
+        print("=" * 60)
+
+        # Warm up connections and caches so the first level is not penalised
+        await self.run_level(2)
+
+        for level in CONCURRENCY_LEVELS:
+            result = await self.run_level(level)
+            self.results.append(result)
+            print(
+                f"⚡ concurrency={result['concurrency']:>3}  "
+                f"throughput={result['throughput_rps']:7.1f} req/s  "
+                f"p50={result['p50_ms']:7.1f}ms  p95={result['p95_ms']:7.1f}ms  "
+                f"ok={result['ok']}/{REQUESTS_PER_LEVEL}"
+            )
+
+        print("=" * 60)
+
+    def analyze_results(self) -> bool:
+        """Throughput at the highest level should clearly exceed the serial baseline"""
+        if len(self.results) < 2:
+            return False
+        baseline = self.results[0]["throughput_rps"]
+        peak = max(r["throughput_rps"] for r in self.results)
+        scaling = peak / baseline if baseline else 0.0
+        print(f"📈 Peak/serial throughput: {scaling:.1f}x")
+        if scaling >= 2.0:
+            print("✅ Throughput scales with concurrency - event loop is not blocked by queries")
+            return True
+        print("❌ Throughput flat-lines - queries are still serialized on the event loop")
+        return False
+
+
+async def main():
+    benchmark = AsyncDataLayerBenchmark()
+    try:
+        await benchmark.setup_session()
+        if not await benchmark.authenticate():
+            return False
+        await benchmark.run()
+        return benchmark.analyze_results()
+    finally:
+        await benchmark.cleanup_session()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
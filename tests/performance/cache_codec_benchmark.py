@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Cache Codec Benchmark
+Measures encode / decode time and stored size of realistic pillar → area → project → task
+hierarchies for the previous json.dumps / json.loads path and each codec in
+backend/cache_codec.py. Stored size is what Redis keeps for the value; when a Redis is
+reachable at REDIS_URL its MEMORY USAGE is reported as well.
+    python tests/performance/cache_codec_benchmark.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from cache_codec import MSGPACK_AVAILABLE, ORJSON_AVAILABLE, CacheCodec  # noqa: E402
+
+ITERATIONS = int(os.getenv('BENCHMARK_ITERATIONS', '200'))
+
+# (label, pillars, areas per pillar, projects per area, tasks per project)
+SIZES = [
+    ('small user', 2, 2, 3, 5),
+    ('typical user', 4, 3, 4, 12),
+    ('heavy user', 6, 5, 6, 25),
+]
+
+
+def hierarchy(pillars, areas, projects, tasks):
+    """Shaped like SupabasePillarService.get_user_pillars(include_areas=True) output"""
+    return [{
+        'id': f'7c1d4a0e-0000-4000-8000-{p:012d}',
+        'user_id': '0f9e8d7c-6b5a-4321-8765-0123456789ab',
+        'name': f'Pillar {p}: Health & Fitness',
+        'description': 'Keep energy high so everything else works',
+        'icon': '💪',
+        'color': '#F4B400',
+        'time_allocation_percentage': 25.0,
+        'archived': False,
+        'created_at': '2025-01-15T09:30:00.000000+00:00',
+        'updated_at': '2025-03-02T18:04:11.123456+00:00',
+        'area_count': areas,
+        'project_count': areas * projects,
+        'task_count': areas * projects * tasks,
+        'completed_task_count': areas * projects * tasks // 3,
+        'progress_percentage': 33.3,
+        'areas': [{
+            'id': f'a2b3c4d5-0000-4000-8000-{p:06d}{a:06d}',
+            'pillar_id': f'7c1d4a0e-0000-4000-8000-{p:012d}',
+            'name': f'Area {a}',
+            'importance': 3,
+            'projects': [{
+                'id': f'b3c4d5e6-0000-4000-8000-{p:04d}{a:04d}{j:04d}',
+                'name': f'Project {j}',
+                'status': 'In Progress',
+                'priority': 'medium',
+                'deadline': '2025-06-30T00:00:00+00:00',
+                'tasks': [{
+                    'id': f'c4d5e6f7-0000-4000-8000-{p:03d}{a:03d}{j:03d}{t:03d}',
+                    'name': f'Task {t}: follow up on the weekly plan',
+                    'status': 'todo' if t % 3 else 'completed',
+                    'completed': t % 3 == 0,
+                    'priority': ('low', 'medium', 'high')[t % 3],
+                    'due_date': None if t % 2 else '2025-04-01T00:00:00+00:00',
+                    'estimated_duration': 30,
+                } for t in range(tasks)]
+            } for j in range(projects)]
+        } for a in range(areas)]
+    } for p in range(pillars)]
+
+
+class LegacyJson:
+    """The previous CacheService path: json.dumps(default=str) / json.loads"""
+    name = 'json (stdlib, before)'
+
+    def store(self, value):
+        return json.dumps(value, default=str).encode('utf-8')
+
+    def load(self, payload):
+        return json.loads(payload)
+
+
+class CodecUnderTest:
+    def __init__(self, codec: CacheCodec, name: str):
+        self.codec = codec
+        self.name = name
+
+    def store(self, value):
+        return self.codec.compress(self.codec.encode(value))
+
+    def load(self, payload):
+        return self.codec.decode(payload)
+
+
+def timed(fn, arg, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn(arg)
+    return (time.perf_counter() - start) / iterations * 1e6, result
+
+
+async def redis_memory_usage(payloads):
+    """MEMORY USAGE per payload if a real Redis is reachable, else None"""
+    try:
+        import redis.asyncio as redis
+        client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), socket_connect_timeout=0.5)
+        usage = []
+        for i, payload in enumerate(payloads):
+            key = f'benchmark:codec:{i}'
+            await client.set(key, payload, ex=60)
+            usage.append(await client.memory_usage(key))
+            await client.delete(key)
+        await client.aclose()
+        return usage
+    except Exception:
+        return None
+
+
+def main() -> bool:
+    candidates = [LegacyJson(), CodecUnderTest(CacheCodec('json', compress_min_bytes=1 << 30), 'json codec, uncompressed')]
+    candidates.append(CodecUnderTest(CacheCodec('json', compress_min_bytes=4096), 'json codec + zlib'))
+    if MSGPACK_AVAILABLE:
+        candidates.append(CodecUnderTest(CacheCodec('msgpack', compress_min_bytes=4096), 'msgpack + zlib'))
+
+    print(f"🎯 Cache codec benchmark ({ITERATIONS} iterations, orjson={'yes' if ORJSON_AVAILABLE else 'no'}, "
+          f"msgpack={'yes' if MSGPACK_AVAILABLE else 'no'})")
+    improved = True
+    for label, *shape in SIZES:
+        value = hierarchy(*shape)
+        print("=" * 86)
+        print(f"{label}: {shape[0]} pillars, {shape[0] * shape[1] * shape[2] * shape[3]:,} tasks")
+        print(f"{'codec':<28}{'encode µs':>12}{'decode µs':>12}{'stored bytes':>15}{'redis bytes':>15}")
+        rows = []
+        for candidate in candidates:
+            encode_us, payload = timed(candidate.store, value, ITERATIONS)
+            decode_us, decoded = timed(candidate.load, payload, ITERATIONS)
+            assert decoded == json.loads(json.dumps(value))
+            rows.append((candidate.name, encode_us, decode_us, payload))
+        usage = asyncio.run(redis_memory_usage([row[3] for row in rows]))
+        for i, (name, encode_us, decode_us, payload) in enumerate(rows):
+            redis_bytes = f"{usage[i]:,}" if usage else "n/a"
+            print(f"{name:<28}{encode_us:>12,.0f}{decode_us:>12,.0f}{len(payload):>15,}{redis_bytes:>15}")
+
+        legacy, best = rows[0], rows[2]
+        print(f"⚡ json codec + zlib vs before: {legacy[1] / best[1]:.1f}x encode, {legacy[2] / best[2]:.1f}x decode, "
+              f"{len(legacy[3]) / len(best[3]):.1f}x smaller")
+        improved = improved and len(best[3]) < len(legacy[3])
+    print("=" * 86)
+    return improved
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
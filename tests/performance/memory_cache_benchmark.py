@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Memory Cache Tier Microbenchmark
+Measures get/set throughput of backend/memory_cache.py at 100k entries, next to the
+previous dict-based tier that sorted every key to trim itself once it passed its
+entry limit. Runs without Redis or Supabase:
+    python tests/performance/memory_cache_benchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from memory_cache import MemoryCache  # noqa: E402
+
+ENTRIES = int(os.getenv('BENCHMARK_ENTRIES', '100000'))
+OPERATIONS = int(os.getenv('BENCHMARK_OPERATIONS', '200000'))
+VALUE = {'id': 'p1', 'name': 'Project', 'task_count': 12, 'completed_task_count': 4}
+# CacheService passes the size of the JSON it already encoded for Redis
+VALUE_SIZE = len(json.dumps(VALUE))
+
+
+class LegacyDictCache:
+    """The old CacheService memory tier: sorted() trim on every insert past the limit"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = {}
+
+    def set(self, key, value, ttl_seconds, size=None):
+        self.data[key] = {'data': value, 'expires_at': datetime.utcnow() + timedelta(seconds=ttl_seconds)}
+        if len(self.data) > self.limit:
+            for old_key in sorted(self.data.keys())[:100]:
+                del self.data[old_key]
+
+    def get(self, key, default=None):
+        entry = self.data.get(key)
+        if entry is None:
+            return default
+        if entry['expires_at'] > datetime.utcnow():
+            return entry['data']
+        del self.data[key]
+        return default
+
+
+def ops_per_second(count: int, seconds: float) -> float:
+    return count / seconds if seconds else float('inf')
+
+
+def bench(name: str, cache, operations: int):
+    keys = [f"projects:user:{i}" for i in range(ENTRIES)]
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, VALUE, 300, size=VALUE_SIZE)
+    fill = time.perf_counter() - start
+
+    rng = random.Random(42)
+    lookups = [keys[rng.randrange(ENTRIES)] for _ in range(operations)]
+    start = time.perf_counter()
+    for key in lookups:
+        cache.get(key)
+    get_time = time.perf_counter() - start
+
+    # Steady state: every set past the bound forces an eviction
+    start = time.perf_counter()
+    for i in range(operations // 10):
+        cache.set(f"projects:user:new:{i}", VALUE, 300, size=VALUE_SIZE)
+    churn = time.perf_counter() - start
+
+    print(f"{name:<26}{ops_per_second(ENTRIES, fill):>14,.0f}{ops_per_second(operations, get_time):>14,.0f}"
+          f"{ops_per_second(operations // 10, churn):>16,.0f}")
+    return ops_per_second(operations // 10, churn)
+
+
+def main() -> bool:
+    print(f"🎯 Memory cache microbenchmark: {ENTRIES:,} entries, {OPERATIONS:,} gets")
+    print("=" * 70)
+    print(f"{'tier':<26}{'fill set/s':>14}{'get/s':>14}{'evicting set/s':>16}")
+
+    lru_churn = bench("MemoryCache (LRU+TTL)", MemoryCache(max_entries=ENTRIES, max_bytes=1 << 30, prefix_quotas={}),
+                      OPERATIONS)
+    # The legacy trim sorts all keys on each insert, so keep its churn run short
+    legacy_churn = bench("legacy dict + sorted trim", LegacyDictCache(ENTRIES), max(OPERATIONS // 100, 100))
+
+    print("=" * 70)
+    print(f"⚡ Evicting inserts: {lru_churn / legacy_churn:,.0f}x faster than the sorted() trim")
+    return lru_churn > legacy_churn
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Column Projection Payload Benchmark
+Runs the queries behind each hot read path twice - once with select('*') and once
+with its named projection from backend/projections.py - and reports response bytes
+and latency, so the bytes saved per endpoint are visible.
+
+Needs the backend .env (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY) and a user with data:
+    BENCHMARK_USER_ID=<uuid> python tests/performance/projection_payload_benchmark.py
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from supabase_client import run_query  # noqa: E402
+from projections import (  # noqa: E402
+    select_columns, PILLAR_FIELDS, AREA_FIELDS, PROJECT_FIELDS, TASK_FIELDS,
+    AREA_REFS, PROJECT_REFS, JOURNAL_SENTIMENT, AI_INTERACTION_STATS
+)
+
+USER_ID = os.getenv('BENCHMARK_USER_ID', '')
+RUNS = int(os.getenv('BENCHMARK_RUNS', '10'))
+SINCE = (datetime.utcnow() - timedelta(days=30)).isoformat()
+
+# endpoint -> [(table, projection, filter)]; each query mirrors one read on that path
+ENDPOINTS: Dict[str, List[Tuple[str, tuple, Callable]]] = {
+    "GET /pillars": [
+        ("pillars", PILLAR_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+        ("areas", AREA_REFS, lambda q: q.eq('user_id', USER_ID)),
+        ("projects", PROJECT_REFS, lambda q: q.eq('user_id', USER_ID)),
+    ],
+    "GET /projects?include_tasks": [
+        ("projects", PROJECT_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+        ("tasks", TASK_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+    ],
+    "GET /areas?include_projects": [
+        ("areas", AREA_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+        ("projects", PROJECT_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+    ],
+    "repository.get_all_user_data": [
+        ("tasks", TASK_FIELDS, lambda q: q.eq('user_id', USER_ID)),
+    ],
+    "GET /sentiment/trends": [
+        ("journal_entries", JOURNAL_SENTIMENT,
+         lambda q: q.eq('user_id', USER_ID).gte('created_at', SINCE).not_.is_('sentiment_score', 'null')),
+    ],
+    "ai_quota.get_usage_analytics": [
+        ("ai_interactions", AI_INTERACTION_STATS, lambda q: q.eq('user_id', USER_ID).gte('created_at', SINCE)),
+    ],
+}
+
+
+async def measure(table: str, columns: str, apply_filter: Callable) -> Tuple[int, float]:
+    """Return (payload bytes, median latency ms) for one query shape"""
+    latencies = []
+    payload = 0
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = await run_query(lambda db: apply_filter(db.table(table).select(columns)))
+        latencies.append((time.perf_counter() - start) * 1000)
+        payload = len(json.dumps(result.data or [], default=str).encode())
+    return payload, statistics.median(latencies)
+
+
+async def main() -> bool:
+    if not USER_ID:
+        print("❌ Set BENCHMARK_USER_ID to a user with pillars, projects, tasks and journal entries")
+        return False
+
+    print("🎯 Column projection payload benchmark")
+    print(f"📊 {RUNS} runs per query, median latency reported")
+    print("=" * 78)
+    print(f"{'endpoint':<32}{'select *':>12}{'projected':>12}{'saved':>8}{'ms *':>7}{'ms proj':>8}")
+
+    total_full = total_projected = 0
+    for endpoint, queries in ENDPOINTS.items():
+        full_bytes = projected_bytes = 0
+        full_ms = projected_ms = 0.0
+        for table, projection, apply_filter in queries:
+            try:
+                size, latency = await measure(table, '*', apply_filter)
+                full_bytes += size
+                full_ms += latency
+                size, latency = await measure(table, select_columns(projection), apply_filter)
+                projected_bytes += size
+                projected_ms += latency
+            except Exception as e:
+                print(f"⚠️  {endpoint}: {table} failed: {e}")
+
+        total_full += full_bytes
+        total_projected += projected_bytes
+        saved = (1 - projected_bytes / full_bytes) * 100 if full_bytes else 0.0
+        print(f"{endpoint:<32}{full_bytes:>12,}{projected_bytes:>12,}{saved:>7.1f}%{full_ms:>7.1f}{projected_ms:>8.1f}")
+
+    print("=" * 78)
+    saved = (1 - total_projected / total_full) * 100 if total_full else 0.0
+    print(f"📉 Total payload: {total_full:,} -> {total_projected:,} bytes ({saved:.1f}% saved)")
+    return total_projected <= total_full
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)